@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""
+TRADEAI ML API Load Test
+Drive the serving endpoints at fixed concurrency and check latency SLOs
+
+Reports: p50/p95/p99/max latency, throughput and error rate per endpoint
+Checks: monitoring.alerting.thresholds in config.yaml (latency_p99, error_rate)
+    and regressions against a stored baseline run
+Exit code: 1 if any check fails, so the script can gate CI
+
+Usage:
+    python load_test.py --concurrency 32 --duration 20
+    python load_test.py --url http://localhost:8001 --endpoints forecast price
+    python load_test.py --save-baseline
+"""
+
+import sys
+import os
+import argparse
+import asyncio
+import itertools
+import json
+import socket
+import subprocess
+import time
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+import numpy as np
+import yaml
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+logging.getLogger('httpx').setLevel(logging.WARNING)
+
+ML_SERVICES_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_CONFIG = ML_SERVICES_DIR / 'config.yaml'
+DEFAULT_BASELINE = Path(__file__).resolve().parent / 'baseline.json'
+
+
+@dataclass
+class Scenario:
+    """One endpoint call; payload(i) builds the body of the i-th request"""
+    name: str
+    method: str
+    path: str
+    payload: Optional[Callable[[int], Dict[str, Any]]] = None
+    headers: Dict[str, str] = field(default_factory=dict)
+
+
+def build_scenarios(key_space: int) -> List[Scenario]:
+    """
+    Requests for every read-only endpoint in serving/api.py
+
+    Rollback, traffic-split updates and promotion change serving state and
+    are not load tested. Product/customer ids cycle through key_space
+    values, so a small key space measures the prediction cache and a large
+    one measures the models.
+    """
+    today = datetime.now()
+
+    def day(offset: int) -> str:
+        return (today - timedelta(days=offset)).strftime('%Y-%m-%d')
+
+    def forecast(i: int) -> Dict[str, Any]:
+        return {
+            'product_id': f'PROD{i % key_space:05d}',
+            'customer_id': f'CUST{i % key_space:05d}',
+            'horizon_days': 90,
+            'include_promotions': True,
+            'confidence_level': 0.95
+        }
+
+    return [
+        Scenario('health', 'GET', '/health'),
+        Scenario('root', 'GET', '/'),
+        Scenario('metrics', 'GET', '/metrics'),
+        Scenario('forecast', 'POST', '/api/v1/forecast/demand', forecast),
+        Scenario('forecast_columnar', 'POST', '/api/v1/forecast/demand', forecast,
+                 {'Accept': 'application/vnd.tradeai.columnar+json'}),
+        Scenario('forecast_arrow', 'POST', '/api/v1/forecast/demand', forecast,
+                 {'Accept': 'application/vnd.apache.arrow.stream'}),
+        Scenario('forecast_batch', 'POST', '/api/v1/forecast/demand/batch',
+                 lambda i: {'requests': [forecast(i * 16 + j) for j in range(16)]}),
+        Scenario('price', 'POST', '/api/v1/optimize/price', lambda i: {
+            'product_id': f'PROD{i % key_space:05d}',
+            'current_price': 25.99,
+            'cost': 15.00,
+            'constraints': {'min_price': 20.0, 'max_price': 35.0},
+            'optimization_objective': 'profit'
+        }),
+        Scenario('promotion_lift', 'POST', '/api/v1/analyze/promotion-lift', lambda i: {
+            'promotion_id': f'PROMO{i % key_space:05d}',
+            'pre_period': {'start_date': day(30), 'end_date': day(15)},
+            'post_period': {'start_date': day(14), 'end_date': day(0)}
+        }),
+        Scenario('recommendations', 'POST', '/api/v1/recommend/products', lambda i: {
+            'customer_id': f'CUST{i % key_space:05d}',
+            'context': {},
+            'top_n': 10
+        }),
+        Scenario('segmentation', 'POST', '/api/v1/segment/customers', lambda i: {
+            'method': 'rfm',
+            'tenant_id': f'tenant_{i % key_space}'
+        }),
+        Scenario('anomalies', 'POST', '/api/v1/detect/anomalies', lambda i: {
+            'metric_type': 'sales',
+            'tenant_id': f'tenant_{i % key_space}',
+            'start_date': day(30),
+            'end_date': day(0),
+            'threshold': 2.5
+        }),
+        Scenario('model_info', 'GET', '/api/v1/models/demand_forecasting'),
+        Scenario('traffic', 'GET', '/api/v1/models/demand_forecasting/traffic'),
+    ]
+
+
+def summarize(latencies: List[float], statuses: List[int], elapsed: float) -> Dict[str, float]:
+    """Latency percentiles (ms), throughput (req/s) and error rate of one scenario"""
+    count = len(latencies)
+    errors = sum(1 for status in statuses if not 200 <= status < 300)
+    if count:
+        p50, p95, p99 = np.percentile(np.asarray(latencies) * 1000, [50, 95, 99])
+        max_ms = max(latencies) * 1000
+    else:
+        p50 = p95 = p99 = max_ms = 0.0
+
+    return {
+        'requests': count,
+        'errors': errors,
+        'error_rate': errors / count if count else 1.0,
+        'throughput_rps': count / elapsed if elapsed > 0 else 0.0,
+        'p50_ms': float(p50),
+        'p95_ms': float(p95),
+        'p99_ms': float(p99),
+        'max_ms': float(max_ms)
+    }
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    scenario: Scenario,
+    concurrency: int,
+    duration: float,
+    warmup: float = 0.0
+) -> Dict[str, float]:
+    """
+    Closed-loop load: concurrency workers send back-to-back requests
+
+    Requests started during the warmup are sent but not recorded.
+    """
+    latencies: List[float] = []
+    statuses: List[int] = []
+    counter = itertools.count()
+    start = time.perf_counter()
+    record_from = start + warmup
+    stop_at = record_from + duration
+
+    async def worker():
+        while True:
+            sent = time.perf_counter()
+            if sent >= stop_at:
+                return
+            i = next(counter)
+            try:
+                response = await client.request(
+                    scenario.method,
+                    scenario.path,
+                    json=scenario.payload(i) if scenario.payload else None,
+                    headers=scenario.headers
+                )
+                await response.aread()
+                status = response.status_code
+            except httpx.HTTPError as e:
+                logger.debug(f"{scenario.name} request failed: {e}")
+                status = 0
+            if sent >= record_from:
+                latencies.append(time.perf_counter() - sent)
+                statuses.append(status)
+
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return summarize(latencies, statuses, time.perf_counter() - record_from)
+
+
+async def run_load_test(
+    client: httpx.AsyncClient,
+    scenarios: List[Scenario],
+    concurrency: int,
+    duration: float,
+    warmup: float = 0.0
+) -> Dict[str, Dict[str, float]]:
+    """Run each scenario in turn and return stats keyed by scenario name"""
+    results = {}
+    for scenario in scenarios:
+        results[scenario.name] = await run_scenario(client, scenario, concurrency, duration, warmup)
+        stats = results[scenario.name]
+        logger.info(
+            f"{scenario.name}: {stats['throughput_rps']:.1f} req/s, "
+            f"p50 {stats['p50_ms']:.1f} ms, p99 {stats['p99_ms']:.1f} ms, "
+            f"errors {stats['error_rate']:.2%}"
+        )
+    return results
+
+
+def load_thresholds(config_path: Path) -> Dict[str, float]:
+    """SLO thresholds from monitoring.alerting.thresholds in config.yaml"""
+    with open(config_path, 'r') as f:
+        config = yaml.safe_load(f)
+    thresholds = config['monitoring']['alerting']['thresholds']
+    return {
+        'latency_p99': float(thresholds['latency_p99']),
+        'error_rate': float(thresholds['error_rate'])
+    }
+
+
+def check_results(
+    results: Dict[str, Dict[str, float]],
+    thresholds: Dict[str, float],
+    baseline: Optional[Dict[str, Dict[str, float]]] = None,
+    max_regression: float = 0.2,
+    min_delta_ms: float = 2.0
+) -> List[str]:
+    """
+    Failed checks, empty when the run passes
+
+    Args:
+        results: Stats per endpoint from run_load_test
+        thresholds: Absolute limits (latency_p99 in ms, error_rate)
+        baseline: Stats per endpoint from an earlier run
+        max_regression: Allowed relative increase in p50/p99 latency and
+            decrease in throughput versus the baseline
+        min_delta_ms: Latency increases smaller than this are noise
+    """
+    failures = []
+
+    for name, stats in results.items():
+        if stats['p99_ms'] > thresholds['latency_p99']:
+            failures.append(f"{name}: p99 {stats['p99_ms']:.1f} ms exceeds {thresholds['latency_p99']:.0f} ms")
+        if stats['error_rate'] > thresholds['error_rate']:
+            failures.append(f"{name}: error rate {stats['error_rate']:.2%} exceeds {thresholds['error_rate']:.2%}")
+
+        base = (baseline or {}).get(name)
+        if not base:
+            continue
+        for metric in ('p50_ms', 'p99_ms'):
+            limit = base[metric] * (1 + max_regression)
+            if stats[metric] > limit and stats[metric] - base[metric] > min_delta_ms:
+                failures.append(
+                    f"{name}: {metric[:3]} {stats[metric]:.1f} ms regressed from {base[metric]:.1f} ms"
+                )
+        if stats['throughput_rps'] < base['throughput_rps'] * (1 - max_regression):
+            failures.append(
+                f"{name}: throughput {stats['throughput_rps']:.1f} req/s "
+                f"regressed from {base['throughput_rps']:.1f} req/s"
+            )
+
+    return failures
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int, workers: int, timeout: float) -> subprocess.Popen:
+    """Start uvicorn with serving.api:app and wait until /health answers"""
+    process = subprocess.Popen(
+        [
+            sys.executable, '-m', 'uvicorn', 'serving.api:app',
+            '--host', '127.0.0.1', '--port', str(port),
+            '--workers', str(workers), '--log-level', 'warning'
+        ],
+        cwd=ML_SERVICES_DIR
+    )
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with code {process.returncode}")
+        try:
+            if httpx.get(f'http://127.0.0.1:{port}/health', timeout=1.0).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+
+    process.terminate()
+    raise RuntimeError(f"uvicorn did not become healthy within {timeout:.0f}s")
+
+
+def print_report(results: Dict[str, Dict[str, float]]):
+    print("\n" + "=" * 92)
+    print(f"{'endpoint':<20}{'requests':>10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}"
+          f"{'p99 ms':>10}{'max ms':>10}{'errors':>12}")
+    print("-" * 92)
+    for name, stats in results.items():
+        print(f"{name:<20}{stats['requests']:>10}{stats['throughput_rps']:>10.1f}"
+              f"{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}"
+              f"{stats['max_ms']:>10.1f}{stats['error_rate']:>12.2%}")
+    print("=" * 92 + "\n")
+
+
+def main():
+    scenario_names = [scenario.name for scenario in build_scenarios(1)]
+
+    parser = argparse.ArgumentParser(description="Load test the TRADEAI ML API")
+    parser.add_argument('--url', type=str, default=None, help='Test a running server instead of starting uvicorn')
+    parser.add_argument('--workers', type=int, default=1, help='uvicorn workers when starting a local server')
+    parser.add_argument('--startup-timeout', type=float, default=120.0, help='Seconds to wait for model loading')
+    parser.add_argument('--endpoints', type=str, nargs='+', default=scenario_names, choices=scenario_names)
+    parser.add_argument('--concurrency', type=int, default=16, help='Requests in flight per endpoint')
+    parser.add_argument('--duration', type=float, default=10.0, help='Measured seconds per endpoint')
+    parser.add_argument('--warmup', type=float, default=2.0, help='Unmeasured seconds per endpoint')
+    parser.add_argument('--key-space', type=int, default=1000, help='Distinct product/customer ids per endpoint')
+    parser.add_argument('--request-timeout', type=float, default=30.0)
+    parser.add_argument('--config', type=str, default=str(DEFAULT_CONFIG), help='config.yaml with alerting thresholds')
+    parser.add_argument('--max-p99-ms', type=float, default=None, help='Override monitoring latency_p99')
+    parser.add_argument('--max-error-rate', type=float, default=None, help='Override monitoring error_rate')
+    parser.add_argument('--baseline', type=str, default=str(DEFAULT_BASELINE), help='Baseline results JSON')
+    parser.add_argument('--max-regression', type=float, default=0.2, help='Allowed relative regression vs baseline')
+    parser.add_argument('--min-delta-ms', type=float, default=2.0, help='Ignore latency regressions below this')
+    parser.add_argument('--save-baseline', action='store_true', help='Store this run as the baseline')
+    parser.add_argument('--output', type=str, default=None, help='Write results JSON to this file')
+
+    args = parser.parse_args()
+
+    thresholds = load_thresholds(Path(args.config))
+    if args.max_p99_ms is not None:
+        thresholds['latency_p99'] = args.max_p99_ms
+    if args.max_error_rate is not None:
+        thresholds['error_rate'] = args.max_error_rate
+
+    scenarios = [s for s in build_scenarios(args.key_space) if s.name in args.endpoints]
+
+    process = None
+    url = args.url
+    if url is None:
+        port = free_port()
+        logger.info(f"Starting uvicorn on port {port} with {args.workers} worker(s)")
+        process = start_server(port, args.workers, args.startup_timeout)
+        url = f'http://127.0.0.1:{port}'
+
+    async def run():
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=url, timeout=args.request_timeout, limits=limits) as client:
+            return await run_load_test(client, scenarios, args.concurrency, args.duration, args.warmup)
+
+    try:
+        logger.info(f"Load testing {url}: {len(scenarios)} endpoints, concurrency {args.concurrency}, {args.duration:.0f}s each")
+        results = asyncio.run(run())
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+
+    print_report(results)
+
+    run_info = {
+        'timestamp': datetime.now().isoformat(),
+        'url': url,
+        'concurrency': args.concurrency,
+        'duration': args.duration,
+        'key_space': args.key_space,
+        'thresholds': thresholds,
+        'endpoints': results
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(run_info, f, indent=2)
+        logger.info(f"Results written to {args.output}")
+
+    baseline = None
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        with open(baseline_path, 'w') as f:
+            json.dump(run_info, f, indent=2)
+        logger.info(f"✅ Baseline saved to {baseline_path}")
+    elif baseline_path.exists():
+        with open(baseline_path, 'r') as f:
+            baseline_run = json.load(f)
+        if baseline_run.get('concurrency') != args.concurrency:
+            logger.warning(f"Baseline was recorded at concurrency {baseline_run.get('concurrency')}")
+        baseline = baseline_run['endpoints']
+    else:
+        logger.warning(f"No baseline at {baseline_path}; checking absolute thresholds only")
+
+    failures = check_results(results, thresholds, baseline, args.max_regression, args.min_delta_ms)
+    if failures:
+        for failure in failures:
+            logger.error(f"❌ {failure}")
+        sys.exit(1)
+
+    logger.info("✅ All endpoints within thresholds")
+
+
+if __name__ == "__main__":
+    main()
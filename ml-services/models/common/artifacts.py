@@ -0,0 +1,219 @@
+"""
+TRADEAI Model Artifacts
+Versioned on-disk format for trained models
+
+Layout: {root}/{model_type}/{version}/manifest.json + model files
+Formats: XGBoost UBJ, Torch state dicts, Prophet JSON, JSON tables, .npy arrays
+Loading: Arrays are memory-mapped read-only, so serving workers share pages
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime
+from pathlib import Path
+import logging
+
+import scipy.sparse as sp
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+MANIFEST = 'manifest.json'
+
+
+class Artifact:
+    """
+    One published model version
+
+    Args:
+        path: Version directory containing manifest.json
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path / MANIFEST, 'r') as f:
+            self.manifest = json.load(f)
+
+        if self.manifest.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported artifact format {self.manifest.get('format_version')} in {self.path}")
+
+    @property
+    def model_type(self) -> str:
+        return self.manifest['model_type']
+
+    @property
+    def version(self) -> str:
+        return self.manifest['version']
+
+    @property
+    def metadata(self) -> Dict:
+        return self.manifest.get('metadata', {})
+
+    def file(self, name: str) -> Path:
+        """Path of a stored file"""
+        if name not in self.manifest['files']:
+            raise KeyError(f"Artifact {self.model_type}/{self.version} has no file '{name}'")
+        return self.path / name
+
+    def has(self, name: str) -> bool:
+        return name in self.manifest['files']
+
+    def load_array(self, name: str, mmap: bool = True) -> np.ndarray:
+        """Load an array saved with ArtifactWriter.save_array (read-only memory map by default)"""
+        return np.load(self.file(f'{name}.npy'), mmap_mode='r' if mmap else None, allow_pickle=False)
+
+    def load_sparse(self, name: str, mmap: bool = True) -> sp.csr_matrix:
+        """Load a CSR matrix saved with ArtifactWriter.save_sparse"""
+        shape = tuple(self.load_json(f'{name}.shape'))
+        data = self.load_array(f'{name}.data', mmap)
+        indices = self.load_array(f'{name}.indices', mmap)
+        indptr = self.load_array(f'{name}.indptr', mmap)
+        return sp.csr_matrix((data, indices, indptr), shape=shape, copy=False)
+
+    def load_json(self, name: str) -> Any:
+        with open(self.file(f'{name}.json'), 'r') as f:
+            return json.load(f)
+
+
+class ArtifactWriter:
+    """
+    Writes a new model version into a hidden staging directory
+
+    Used as a context manager: on success the manifest is written and the
+    directory is renamed into place in one step, so readers never see a
+    partially written version; on error the staging directory is removed.
+    """
+
+    def __init__(self, model_dir: Path, model_type: str, metadata: Optional[Dict] = None):
+        self.model_dir = Path(model_dir)
+        self.model_type = model_type
+        self.metadata = metadata or {}
+        self.version = None
+        self.files: Dict[str, Dict] = {}
+
+        self.model_dir.mkdir(parents=True, exist_ok=True)
+        self.path = Path(tempfile.mkdtemp(prefix='.', suffix='.tmp', dir=self.model_dir))
+        os.chmod(self.path, 0o755)
+
+    def file(self, name: str) -> Path:
+        """Path for a file written by a native serializer (XGBoost, Torch, ...)"""
+        self.files[name] = {}
+        return self.path / name
+
+    def save_array(self, name: str, array: np.ndarray):
+        """Save an array as .npy (object arrays are stored as fixed-width strings)"""
+        array = np.asarray(array)
+        if array.dtype == object:
+            array = array.astype(str)
+        np.save(self.file(f'{name}.npy'), np.ascontiguousarray(array), allow_pickle=False)
+
+    def save_sparse(self, name: str, matrix: sp.spmatrix):
+        """Save a sparse matrix as CSR component arrays"""
+        matrix = sp.csr_matrix(matrix)
+        self.save_array(f'{name}.data', matrix.data)
+        self.save_array(f'{name}.indices', matrix.indices)
+        self.save_array(f'{name}.indptr', matrix.indptr)
+        self.save_json(f'{name}.shape', list(matrix.shape))
+
+    def save_json(self, name: str, obj: Any):
+        with open(self.file(f'{name}.json'), 'w') as f:
+            json.dump(obj, f, indent=2, default=_json_default)
+
+    def commit(self) -> str:
+        """Publish the staged files as the next version"""
+        for name in self.files:
+            self.files[name] = {'bytes': (self.path / name).stat().st_size}
+
+        stamp = datetime.now().strftime('%Y%m%dT%H%M%S')
+        version = stamp
+        suffix = 0
+        while (self.model_dir / version).exists():
+            suffix += 1
+            version = f'{stamp}-{suffix:04d}'
+
+        manifest = {
+            'format_version': FORMAT_VERSION,
+            'model_type': self.model_type,
+            'version': version,
+            'created_at': datetime.now().isoformat(),
+            'metadata': self.metadata,
+            'files': self.files
+        }
+        with open(self.path / MANIFEST, 'w') as f:
+            json.dump(manifest, f, indent=2, default=_json_default)
+
+        os.rename(self.path, self.model_dir / version)
+        self.version = version
+
+        logger.info(f"Saved {self.model_type} artifact version {version} ({len(self.files)} files)")
+
+        return version
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            shutil.rmtree(self.path, ignore_errors=True)
+        return False
+
+
+class ArtifactStore:
+    """
+    Directory of versioned model artifacts
+
+    Args:
+        root: Artifact root (config data.model_artifacts_path)
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    def create(self, model_type: str, metadata: Optional[Dict] = None) -> ArtifactWriter:
+        """Start writing a new version of a model"""
+        return ArtifactWriter(self.root / model_type, model_type, metadata)
+
+    def versions(self, model_type: str) -> List[str]:
+        """Published versions, oldest first"""
+        model_dir = self.root / model_type
+        if not model_dir.is_dir():
+            return []
+        return sorted(
+            (
+                entry.name for entry in model_dir.iterdir()
+                if not entry.name.startswith('.') and (entry / MANIFEST).is_file()
+            ),
+            key=version_key
+        )
+
+    def latest(self, model_type: str) -> Optional[str]:
+        versions = self.versions(model_type)
+        return versions[-1] if versions else None
+
+    def open(self, model_type: str, version: Optional[str] = None) -> Artifact:
+        """Open a version (the latest by default)"""
+        version = version or self.latest(model_type)
+        if version is None:
+            raise FileNotFoundError(f"No artifacts for {model_type} in {self.root}")
+        return Artifact(self.root / model_type / version)
+
+
+def version_key(version: str) -> Tuple[str, int]:
+    """Sort key for versions: timestamp, then same-second suffix as a number (stamp-2 before stamp-10)"""
+    stamp, _, suffix = version.partition('-')
+    return stamp, int(suffix) if suffix.isdigit() else 0
+
+
+def _json_default(obj):
+    """Serialize NumPy scalars/arrays in manifests and tables"""
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
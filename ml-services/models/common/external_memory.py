@@ -0,0 +1,150 @@
+"""
+TRADEAI External-Memory Training Data
+Feed XGBoost from Parquet feature shards instead of in-memory frames
+
+Shards: {dir}/{split}-{n:05d}.parquet, float32 features plus the label column
+    (and any row context columns the writer adds)
+Iteration: xgboost.DataIter over shard record batches, so at most one
+    batch of raw features is in memory at a time; iter_shard_batches for
+    other streaming passes
+Matrices: QuantileDMatrix keeps only the histogram bin indices in memory;
+    external mode pages them to {cache_dir} as well (XGBoost >= 3.0
+    ExtMemQuantileDMatrix, otherwise a disk-cached DMatrix)
+"""
+
+from pathlib import Path
+from typing import Iterator, List, Optional
+import logging
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROWS_PER_SHARD = 250000
+DEFAULT_BATCH_ROWS = 65536
+
+
+def write_shards(
+    df: pd.DataFrame,
+    directory: Path,
+    prefix: str,
+    columns: List[str],
+    rows_per_shard: int = DEFAULT_ROWS_PER_SHARD,
+    start: int = 0,
+    target: Optional[pd.Series] = None
+) -> List[Path]:
+    """
+    Write row ranges of df as Parquet shards
+
+    Args:
+        df: Frame holding at least columns
+        directory: Shard directory (created if needed)
+        prefix: Shard name prefix, e.g. 'train' or 'val'
+        columns: Columns to store; float64 is stored as float32
+        rows_per_shard: Rows per shard file
+        start: Number of the first shard, for appending to an existing set
+        target: Label aligned with the rows of df, stored under its name
+            (for feature matrices that no longer hold the label column)
+
+    Returns:
+        Paths of the written shards
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    paths = []
+    for n, offset in enumerate(range(0, len(df), rows_per_shard), start):
+        shard = df.iloc[offset:offset + rows_per_shard][columns]
+        shard = shard.astype({col: np.float32 for col in columns if shard[col].dtype == np.float64})
+        if target is not None:
+            shard[target.name] = target.iloc[offset:offset + rows_per_shard].to_numpy()
+        path = directory / f'{prefix}-{n:05d}.parquet'
+        shard.to_parquet(path, index=False)
+        paths.append(path)
+    return paths
+
+
+def iter_shard_batches(
+    paths: List[Path],
+    columns: List[str],
+    batch_rows: int = DEFAULT_BATCH_ROWS
+) -> Iterator[pd.DataFrame]:
+    """Record batches of the listed columns a shard has, shard by shard in order"""
+    import pyarrow.parquet as pq
+
+    for path in paths:
+        parquet = pq.ParquetFile(path)
+        present = set(parquet.schema_arrow.names)
+        for batch in parquet.iter_batches(batch_size=batch_rows, columns=[col for col in columns if col in present]):
+            yield batch.to_pandas()
+
+
+class ParquetShardIter(xgb.DataIter):
+    """
+    XGBoost data iterator over Parquet shards
+
+    Args:
+        paths: Shard files, read in order
+        feature_names: Feature columns passed to XGBoost, in this order;
+            columns missing from a shard are filled with 0
+        label: Label column
+        batch_rows: Rows handed to XGBoost per call
+        cache_prefix: On-disk cache prefix for external-memory matrices
+    """
+
+    def __init__(
+        self,
+        paths: List[Path],
+        feature_names: List[str],
+        label: str,
+        batch_rows: int = DEFAULT_BATCH_ROWS,
+        cache_prefix: Optional[str] = None
+    ):
+        self.paths = [Path(path) for path in paths]
+        self.feature_names = list(feature_names)
+        self.label = label
+        self.batch_rows = batch_rows
+        self._batches = None
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data) -> bool:
+        if self._batches is None:
+            self._batches = iter_shard_batches(self.paths, self.feature_names + [self.label], self.batch_rows)
+        batch = next(self._batches, None)
+        if batch is None:
+            return False
+
+        X = batch.reindex(columns=self.feature_names, fill_value=0).astype(np.float32, copy=False)
+        input_data(data=X, label=batch[self.label].to_numpy())
+        return True
+
+    def reset(self):
+        self._batches = None
+
+
+def build_dmatrix(
+    iterator: ParquetShardIter,
+    ref: Optional[xgb.DMatrix] = None,
+    max_bin: int = 256,
+    external: bool = False
+) -> xgb.DMatrix:
+    """
+    Quantized training matrix built batch by batch from an iterator
+
+    Args:
+        iterator: Shard iterator; needs a cache_prefix when external
+        ref: Training matrix whose bin boundaries a validation matrix reuses
+        max_bin: Histogram bins per feature (must match between train and ref)
+        external: Keep the quantized pages on disk instead of in memory
+    """
+    if not external:
+        return xgb.QuantileDMatrix(iterator, ref=ref, max_bin=max_bin)
+
+    if iterator.cache_prefix is None:
+        raise ValueError("External-memory matrices need an iterator with a cache_prefix")
+    if hasattr(xgb, 'ExtMemQuantileDMatrix'):
+        return xgb.ExtMemQuantileDMatrix(iterator, ref=ref, max_bin=max_bin)
+    # XGBoost < 3.0 pages a DMatrix and quantizes it during training
+    return xgb.DMatrix(iterator)
@@ -0,0 +1,263 @@
+"""
+TRADEAI Tracing
+Opt-in nested timing spans with peak-memory deltas for model hot paths
+
+Enable: TRADEAI_TRACE=1 (every call/request) or the X-TRADEAI-Trace request header
+Spans: @traced() on model methods, `with span(name):` around inner stages
+Output: Breakdown logged when the outermost span ends, and returned in the
+    `debug` field of API responses
+
+When tracing is off a traced call costs a context variable and environment lookup.
+Memory deltas come from tracemalloc, which slows allocation-heavy code while
+a trace is active, and are process-wide (concurrent traces see each other).
+Peak RSS per span is the process high-water mark, reset between spans through
+/proc/self/clear_refs on Linux; it also counts native (XGBoost, Torch) memory.
+"""
+
+import contextvars
+import functools
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+TRACE_ENV = 'TRADEAI_TRACE'
+TRACE_HEADER = 'x-tradeai-trace'
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar('tradeai_span', default=None)
+
+# tracemalloc is shared by all traces in the process
+_tracemalloc_users = 0
+_tracemalloc_lock = threading.Lock()
+
+
+def env_enabled() -> bool:
+    """True if TRADEAI_TRACE turns tracing on for every call"""
+    return os.environ.get(TRACE_ENV, '').lower() in ('1', 'true', 'yes', 'on')
+
+
+def header_enabled(value: Optional[str]) -> bool:
+    """True if an X-TRADEAI-Trace header value requests a trace"""
+    return value is not None and value.lower() in ('1', 'true', 'yes', 'on')
+
+
+class Span:
+    """One timed stage, with child stages"""
+
+    __slots__ = (
+        'name', 'attributes', 'children', 'duration_ms', 'peak_mem_mb', 'peak_rss_mb',
+        '_start', '_base', '_peak', '_rss', '_rss_peak'
+    )
+
+    def __init__(self, name: str, attributes: Optional[Dict] = None, rss: bool = False):
+        self.name = name
+        self.attributes = attributes or {}
+        self.children: List['Span'] = []
+        self.duration_ms = None
+        self.peak_mem_mb = None
+        self.peak_rss_mb = None
+        self._start = time.perf_counter()
+        self._base = self._peak = 0
+        self._rss = rss
+        self._rss_peak = 0
+
+    def to_dict(self) -> Dict:
+        """Span tree; still-running spans report elapsed time so far"""
+        duration = self.duration_ms
+        if duration is None:
+            duration = 1000 * (time.perf_counter() - self._start)
+
+        data = {'name': self.name, 'duration_ms': round(duration, 3)}
+        if self.peak_mem_mb is not None:
+            data['peak_mem_mb'] = round(self.peak_mem_mb, 3)
+        if self.peak_rss_mb is not None:
+            data['peak_rss_mb'] = round(self.peak_rss_mb, 1)
+        if self.attributes:
+            data['attributes'] = self.attributes
+        if self.children:
+            data['children'] = [child.to_dict() for child in list(self.children)]
+        return data
+
+    def format(self, depth: int = 0) -> List[str]:
+        """Indented one-line-per-span breakdown"""
+        data = self.to_dict()
+        memory = f", peak +{data['peak_mem_mb']:.1f} MB" if 'peak_mem_mb' in data else ''
+        if 'peak_rss_mb' in data:
+            memory += f", peak RSS {data['peak_rss_mb']:.0f} MB"
+        lines = [f"{'  ' * depth}{self.name}: {data['duration_ms']:.1f} ms{memory}"]
+        for child in list(self.children):
+            lines.extend(child.format(depth + 1))
+        return lines
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+@contextmanager
+def trace(name: str, memory: bool = True, log: bool = True, rss: bool = False, **attributes) -> Iterator[Span]:
+    """
+    Start a trace (a root span) in the current context
+
+    Spans opened inside it, including in threads started with a copy of the
+    context (run_in_threadpool), are nested under it.
+
+    Args:
+        name: Root span name (e.g. the endpoint)
+        memory: Record peak-memory deltas with tracemalloc
+        log: Log the breakdown when the trace ends
+        rss: Record the peak process RSS of every span (training stages)
+    """
+    if memory:
+        _start_tracemalloc()
+
+    root = Span(name, attributes, rss)
+    token = _current_span.set(root)
+    try:
+        _enter(root, None)
+        yield root
+    finally:
+        _exit(root, None)
+        _current_span.reset(token)
+        if memory:
+            _stop_tracemalloc()
+        if log:
+            logger.info("Trace breakdown:\n" + "\n".join(root.format()))
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Optional[Span]]:
+    """
+    Time a stage under the current span (no-op when no trace is active)
+
+    Example:
+        with span('xgboost.predict', rows=len(X)):
+            predictions['xgboost'] = model.predict(X)
+    """
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+
+    child = Span(name, attributes, parent._rss)
+    parent.children.append(child)
+    token = _current_span.set(child)
+    try:
+        _enter(child, parent)
+        yield child
+    finally:
+        _exit(child, parent)
+        _current_span.reset(token)
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """
+    Decorator recording a span for each call
+
+    Inside an active trace the call becomes a child span. Outside one, a
+    root trace (with peak RSS per span) is started only if TRADEAI_TRACE is
+    set, so training runs can be profiled without code changes.
+
+    Args:
+        name: Span name (default: the function's qualified name)
+    """
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current_span.get() is not None:
+                with span(span_name):
+                    return func(*args, **kwargs)
+            if env_enabled():
+                with trace(span_name, rss=True):
+                    return func(*args, **kwargs)
+            return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _enter(node: Span, parent: Optional[Span]):
+    if node._rss:
+        peak = _peak_rss()
+        if parent is not None:
+            parent._rss_peak = max(parent._rss_peak, peak)
+        node._rss_peak = _reset_peak_rss() or peak
+    if not tracemalloc.is_tracing():
+        node._start = time.perf_counter()
+        return
+    current, peak = tracemalloc.get_traced_memory()
+    if parent is not None:
+        # Fold the parent's peak so far in before resetting it for this span
+        parent._peak = max(parent._peak, peak)
+    node._base = node._peak = current
+    tracemalloc.reset_peak()
+    node._start = time.perf_counter()
+
+
+def _exit(node: Span, parent: Optional[Span]):
+    node.duration_ms = 1000 * (time.perf_counter() - node._start)
+    if node._rss:
+        node._rss_peak = max(node._rss_peak, _peak_rss())
+        node.peak_rss_mb = node._rss_peak / 1e6
+        if parent is not None:
+            parent._rss_peak = max(parent._rss_peak, node._rss_peak)
+    if not tracemalloc.is_tracing():
+        return
+    _, peak = tracemalloc.get_traced_memory()
+    node._peak = max(node._peak, peak)
+    node.peak_mem_mb = (node._peak - node._base) / 1e6
+    if parent is not None:
+        parent._peak = max(parent._peak, node._peak)
+
+
+def _peak_rss() -> int:
+    """High-water RSS of this process in bytes"""
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    # ru_maxrss is in KB on Linux and bytes on macOS, and cannot be reset
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss if sys.platform == 'darwin' else maxrss * 1024
+
+
+def _reset_peak_rss() -> int:
+    """Reset the high-water mark to the current RSS; returns it, or 0 if unsupported"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return _peak_rss()
+    except OSError:
+        return 0
+
+
+def _start_tracemalloc():
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracemalloc_users = 1
+        elif _tracemalloc_users > 0:
+            _tracemalloc_users += 1
+
+
+def _stop_tracemalloc():
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        if _tracemalloc_users > 0:
+            _tracemalloc_users -= 1
+            if _tracemalloc_users == 0:
+                tracemalloc.stop()
@@ -0,0 +1,226 @@
+"""
+TRADEAI Ensemble Weights
+Per-segment stacking weights for the demand forecasting ensemble
+
+Solve: least squares on the base models' out-of-sample predictions with
+    weights >= 0 summing to 1 (exact, by enumerating support sets)
+Folds: contiguous time blocks; every block is combined with weights fitted
+    on the other blocks, so the reported ensemble error is out-of-fold
+Segments: a column of the data (e.g. category) or customer_tier, derived
+    from each customer's mean daily volume in the training data
+Pruning: weights below `prune` are dropped, so predict() can skip models a
+    segment does not use
+"""
+
+import itertools
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+MODELS = ['xgboost', 'prophet', 'lstm']
+CUSTOMER_TIER = 'customer_tier'
+
+
+def simplex_least_squares(P: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """
+    Weights w >= 0 with sum(w) = 1 minimizing ||P w - y||^2
+
+    Every support set is solved as an equality-constrained least-squares
+    problem (KKT system); the best one with non-negative weights wins.
+    Exact and cheap for a handful of models.
+    """
+    n_models = P.shape[1]
+    gram, moment, total = P.T @ P, P.T @ y, y @ y
+
+    best, best_loss = np.full(n_models, 1.0 / n_models), np.inf
+    for size in range(1, n_models + 1):
+        for support in itertools.combinations(range(n_models), size):
+            support = list(support)
+            kkt = np.zeros((size + 1, size + 1))
+            kkt[:size, :size] = 2 * gram[np.ix_(support, support)]
+            kkt[:size, size] = kkt[size, :size] = 1
+            solution = np.linalg.lstsq(kkt, np.append(2 * moment[support], 1.0), rcond=None)[0][:size]
+            if (solution < -1e-9).any():
+                continue
+
+            w = np.zeros(n_models)
+            w[support] = np.clip(solution, 0, None)
+            w /= w.sum()
+            loss = w @ gram @ w - 2 * moment @ w + total
+            if loss < best_loss - 1e-9 * max(total, 1.0):
+                best, best_loss = w, loss
+    return best
+
+
+def customer_tiers(df: pd.DataFrame, n_tiers: int = 3) -> Dict[str, str]:
+    """Customer -> tier_1 (highest mean daily volume) ... tier_n"""
+    volume = df.groupby('customer_id', observed=True)['sales_volume'].mean()
+    n_tiers = min(n_tiers, len(volume))
+    if n_tiers == 0:
+        return {}
+    ranks = volume.rank(method='first', ascending=False)
+    tiers = pd.qcut(ranks, n_tiers, labels=[f'tier_{i + 1}' for i in range(n_tiers)])
+    return {str(customer): str(tier) for customer, tier in tiers.items()}
+
+
+class SegmentWeights:
+    """
+    Ensemble weights per segment with a global default
+
+    Args:
+        models: Model names, in the column order of prediction matrices
+        default: Weights for rows outside a fitted segment
+        weights: Segment -> weights
+        segment_by: Column defining segments, or customer_tier
+        tiers: Customer -> tier when segment_by is customer_tier
+    """
+
+    def __init__(
+        self,
+        models: List[str],
+        default: Any,
+        weights: Optional[Dict[str, Any]] = None,
+        segment_by: str = CUSTOMER_TIER,
+        tiers: Optional[Dict[str, str]] = None
+    ):
+        self.models = list(models)
+        if isinstance(default, dict):
+            default = [default[name] for name in self.models]
+        self.default = np.asarray(default, dtype=float)
+        self.weights = {segment: np.asarray(w, dtype=float) for segment, w in (weights or {}).items()}
+        self.segment_by = segment_by
+        self.tiers = tiers or {}
+        self._build_table()
+
+    @classmethod
+    def define(
+        cls,
+        df_train: pd.DataFrame,
+        default: Any,
+        segment_by: str = CUSTOMER_TIER,
+        n_tiers: int = 3,
+        models: List[str] = MODELS
+    ) -> 'SegmentWeights':
+        """Unfitted weights whose segments are defined on the training rows"""
+        tiers = customer_tiers(df_train, n_tiers) if segment_by == CUSTOMER_TIER else None
+        return cls(models, default, segment_by=segment_by, tiers=tiers)
+
+    @property
+    def columns(self) -> List[str]:
+        """Columns segments_of needs"""
+        return ['customer_id'] if self.segment_by == CUSTOMER_TIER else [self.segment_by]
+
+    def _build_table(self):
+        self._index = pd.Index(list(self.weights), dtype=object)
+        self._table = np.vstack([self.weights[segment] for segment in self._index] + [self.default])
+
+    def as_dict(self, weights: np.ndarray) -> Dict[str, float]:
+        return {name: float(w) for name, w in zip(self.models, weights)}
+
+    def segments_of(self, df: pd.DataFrame) -> np.ndarray:
+        """Segment label per row (None where unknown)"""
+        if self.segment_by == CUSTOMER_TIER and CUSTOMER_TIER not in df.columns:
+            labels = df['customer_id'].astype(str).map(self.tiers)
+        else:
+            labels = df[self.segment_by].astype(str)
+        return labels.to_numpy(dtype=object)
+
+    def matrix(self, segments: np.ndarray) -> np.ndarray:
+        """(rows, models) weights; unknown and unfitted segments get the default"""
+        position = self._index.get_indexer(pd.Index(segments, dtype=object))
+        position[position < 0] = len(self._index)
+        return self._table[position]
+
+    def combine(self, predictions: np.ndarray, segments: np.ndarray) -> np.ndarray:
+        """Weighted sum of (rows, models) predictions"""
+        return np.einsum('ij,ij->i', predictions, self.matrix(segments))
+
+    @staticmethod
+    def _solve(
+        predictions: np.ndarray,
+        y: np.ndarray,
+        segments: np.ndarray,
+        min_rows: int,
+        prune: float
+    ) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        def solve(rows) -> np.ndarray:
+            w = simplex_least_squares(predictions[rows], y[rows])
+            w[w < prune] = 0
+            return w / w.sum()
+
+        default = solve(slice(None))
+        weights = {}
+        labels, codes = np.unique(pd.Series(segments, dtype=object).fillna('').to_numpy(dtype=str), return_inverse=True)
+        for code, label in enumerate(labels):
+            rows = np.flatnonzero(codes == code)
+            if label and len(rows) >= min_rows:
+                weights[str(label)] = solve(rows)
+        return default, weights
+
+    def fit(
+        self,
+        predictions: np.ndarray,
+        y: np.ndarray,
+        segments: np.ndarray,
+        min_rows: int = 200,
+        n_folds: int = 3,
+        prune: float = 0.05
+    ) -> np.ndarray:
+        """
+        Fit the default and per-segment weights
+
+        Args:
+            predictions: (rows, models) out-of-sample predictions, rows in time order
+            y: Actual values
+            segments: Segment label per row (segments_of)
+            min_rows: Smaller segments use the default weights
+            n_folds: Time blocks for the out-of-fold predictions
+            prune: Weights below this are set to 0
+
+        Returns:
+            Out-of-fold ensemble predictions
+        """
+        y = np.asarray(y, dtype=float)
+        folds = np.array_split(np.arange(len(y)), n_folds) if n_folds > 1 and len(y) >= n_folds * 2 else []
+
+        oof = np.empty(len(y))
+        for fold in folds:
+            rest = np.ones(len(y), dtype=bool)
+            rest[fold] = False
+            self.default, self.weights = self._solve(predictions[rest], y[rest], segments[rest], min_rows, prune)
+            self._build_table()
+            oof[fold] = self.combine(predictions[fold], segments[fold])
+
+        self.default, self.weights = self._solve(predictions, y, segments, min_rows, prune)
+        self._build_table()
+        if not folds:
+            oof = self.combine(predictions, segments)
+
+        logger.info(f"Ensemble weights: default {self.as_dict(self.default)}")
+        for segment, w in self.weights.items():
+            logger.info(f"   {segment}: {self.as_dict(w)}")
+        return oof
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'models': self.models,
+            'segment_by': self.segment_by,
+            'default': self.as_dict(self.default),
+            'weights': {segment: self.as_dict(w) for segment, w in self.weights.items()},
+            'tiers': self.tiers
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'SegmentWeights':
+        models = data['models']
+        return cls(
+            models,
+            data['default'],
+            {segment: [w[name] for name in models] for segment, w in data['weights'].items()},
+            data['segment_by'],
+            data.get('tiers')
+        )
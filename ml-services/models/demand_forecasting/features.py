@@ -0,0 +1,93 @@
+"""
+TRADEAI Demand Features
+Feature definitions shared by training (DemandForecaster.create_features)
+and the recursive horizon forecaster
+
+Sales-derived features (rolling statistics, growth, trend, lifetime totals)
+    only use days before the row, so they can be rolled forward from
+    forecasts; price features may use the row's own (planned) price
+Calendar: time fields, cyclical encodings and SA holidays from the date alone
+"""
+
+import numpy as np
+import pandas as pd
+
+# SA public holidays (month, day), same calendar year
+SA_PUBLIC_HOLIDAYS = [(1, 1), (3, 21), (4, 27), (5, 1), (6, 16), (8, 9), (9, 24), (12, 16), (12, 25), (12, 26)]
+
+LAGS = [1, 7, 14, 30, 90, 365]
+ROLLING_WINDOWS = [7, 14, 30, 90]
+TREND_WINDOWS = [30, 90]
+GROWTH_PERIODS = {'sales_growth_wow': 7, 'sales_growth_mom': 30, 'sales_growth_yoy': 365}
+MATURITY_BINS = [0, 90, 365, 730, np.inf]
+MATURITY_LABELS = ['new', 'growth', 'mature', 'decline']
+
+# Rows of sales history a series needs for every lag and growth feature
+HISTORY_DAYS = max(LAGS + list(GROWTH_PERIODS.values())) + 1
+
+
+def trend_slope(values: np.ndarray) -> np.ndarray:
+    """
+    Least-squares slope over the last axis, ignoring NaN
+
+    Positions are the indices within the window; NaN where fewer than
+    two values are present.
+    """
+    values = np.asarray(values, dtype=float)
+    present = ~np.isnan(values)
+    x = np.broadcast_to(np.arange(values.shape[-1], dtype=float), values.shape)
+    n = present.sum(axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        x_mean = np.where(present, x, 0).sum(axis=-1) / n
+        y_mean = np.where(present, values, 0).sum(axis=-1) / n
+        dx = np.where(present, x - x_mean[..., None], 0)
+        dy = np.where(present, values - y_mean[..., None], 0)
+        slope = (dx * dy).sum(axis=-1) / (dx * dx).sum(axis=-1)
+    return np.where(n >= 2, slope, np.nan)
+
+
+def add_calendar_features(df: pd.DataFrame) -> pd.DataFrame:
+    """Time fields, cyclical encodings, holidays, school holidays and payday weeks from df['date'], in place"""
+    dates = df['date'].dt
+    df['day_of_week'] = dates.dayofweek
+    df['day_of_month'] = dates.day
+    df['week_of_year'] = dates.isocalendar().week
+    df['month'] = dates.month
+    df['quarter'] = dates.quarter
+    df['year'] = dates.year
+    df['is_weekend'] = (df['day_of_week'] >= 5).astype(int)
+    df['is_month_start'] = dates.is_month_start.astype(int)
+    df['is_month_end'] = dates.is_month_end.astype(int)
+    df['is_quarter_start'] = dates.is_quarter_start.astype(int)
+    df['is_quarter_end'] = dates.is_quarter_end.astype(int)
+    df['days_in_month'] = dates.days_in_month
+
+    # Cyclical encoding for time features
+    df['day_of_week_sin'] = np.sin(2 * np.pi * df['day_of_week'] / 7)
+    df['day_of_week_cos'] = np.cos(2 * np.pi * df['day_of_week'] / 7)
+    df['month_sin'] = np.sin(2 * np.pi * df['month'] / 12)
+    df['month_cos'] = np.cos(2 * np.pi * df['month'] / 12)
+
+    # Seasonality Indicators (SA market specific public holidays, same calendar year)
+    month_day = df['month'].astype(np.int64) * 100 + df['day_of_month']
+    df['is_holiday'] = month_day.isin([month * 100 + day for month, day in SA_PUBLIC_HOLIDAYS]).astype(int)
+
+    days_to_holiday = None
+    for month, day in SA_PUBLIC_HOLIDAYS:
+        holiday = pd.to_datetime(pd.DataFrame({'year': df['year'], 'month': month, 'day': day}))
+        days = (df['date'] - holiday).dt.days.abs()
+        days_to_holiday = days if days_to_holiday is None else np.minimum(days_to_holiday, days)
+    df['days_to_holiday'] = days_to_holiday
+
+    # School holidays impact
+    df['is_school_holiday'] = ((df['month'].isin([1, 4, 7, 12])) &
+                               ((df['day_of_month'] <= 15) | (df['month'].isin([12, 1])))).astype(int)
+
+    # Payday effect (end of month spike)
+    df['is_payday_week'] = ((df['day_of_month'] >= 23) | (df['day_of_month'] <= 5)).astype(int)
+    return df
+
+
+def maturity_codes(age_days) -> np.ndarray:
+    """product_maturity_encoded for product ages in days (-1 for age 0)"""
+    return pd.cut(np.asarray(age_days, dtype=float), bins=MATURITY_BINS, labels=MATURITY_LABELS).codes
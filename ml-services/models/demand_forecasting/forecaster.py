@@ -6,19 +6,41 @@ Target: MAPE < 15%
 Training Data: 24 months South African market data
 Features: 120+ engineered features
 Update Frequency: Weekly incremental, Monthly full retrain
+Memory: config 'memory_optimized' keeps ids categorical and features float32
+    and reports peak RSS per training stage
+External memory: config 'xgboost_external_memory' engineers features per
+    product chunk into Parquet shards once; XGBoost trains from quantized
+    matrices streamed from them, validation predictions and the LSTM matrix
+    (memory-mapped) are streamed from them too
+Prophet: one model per product-customer series fitted in a process pool,
+    evaluated for all series at once
+LSTM: lazily windowed DataLoader over windows within each series (as
+    forecast() windows them), early stopping on validation loss,
+    throughput (epochs/s, samples/s) in the training metrics
+Ensemble: weights per segment (config 'ensemble') fitted on out-of-fold
+    validation predictions; models a segment does not use are skipped
+Horizon: forecast() rolls lag/rolling features forward from its own
+    forecasts, predicting all series per day in one call per model
+Intervals: conformal quantiles of the out-of-fold relative errors and, per
+    lead-time bucket, of recursive backtests over the validation window,
+    stored with the model; a confidence level selects its quantile pair
 """
 
+import copy
+import os
+import time
 import numpy as np
 import pandas as pd
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterable, List, Tuple, Optional, Union
 from datetime import datetime, timedelta
+from pathlib import Path
 import logging
 
 # ML Libraries
 import xgboost as xgb
-from prophet import Prophet
 import torch
 import torch.nn as nn
+from torch.utils.data import DataLoader, Dataset
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import mean_absolute_percentage_error, mean_squared_error
 
@@ -27,8 +49,49 @@ import mlflow
 import mlflow.sklearn
 import mlflow.pytorch
 
+from models.common.external_memory import (
+    DEFAULT_ROWS_PER_SHARD, ParquetShardIter, build_dmatrix, iter_shard_batches, write_shards
+)
+from models.common.tracing import current_span, span, trace, traced
+from models.demand_forecasting.ensemble import MODELS, SegmentWeights
+from models.demand_forecasting.features import (
+    GROWTH_PERIODS, LAGS, MATURITY_BINS, MATURITY_LABELS, ROLLING_WINDOWS, TREND_WINDOWS,
+    add_calendar_features, trend_slope
+)
+from models.demand_forecasting.horizon import HorizonState, recursive_forecast
+from models.demand_forecasting.intervals import LEAD_TIME_BUCKETS, ConformalIntervals
+from models.demand_forecasting.prophet_series import REGRESSORS, SERIES_KEYS, ProphetSeries, series_frame
+
 logger = logging.getLogger(__name__)
 
+# Columns kept at full precision by the memory-optimized mode
+TARGET_COLUMNS = ['sales_volume', 'sales_revenue']
+NON_FEATURE_COLUMNS = ['date', 'product_id', 'customer_id'] + TARGET_COLUMNS
+
+# Days of history in each LSTM input window
+SEQUENCE_LENGTH = 30
+
+# Feature shard columns besides features and label: ids and date of each row,
+# its series and its row in the series-ordered LSTM matrix
+SHARD_CONTEXT_COLUMNS = SERIES_KEYS + ['date', 'series', 'row']
+
+
+def compact_features(df: pd.DataFrame, exclude: List[str] = TARGET_COLUMNS):
+    """Store float64 columns as float32, in place"""
+    for col in df.columns:
+        if df[col].dtype == np.float64 and col not in exclude:
+            df[col] = df[col].astype(np.float32)
+
+
+def available_cpus() -> int:
+    """Cores for this process: OMP_NUM_THREADS if set (orchestrator workers), else the CPU affinity"""
+    if os.environ.get('OMP_NUM_THREADS', '').isdigit():
+        return max(1, int(os.environ['OMP_NUM_THREADS']))
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
 
 class LSTMForecaster(nn.Module):
     """
@@ -71,13 +134,56 @@ class LSTMForecaster(nn.Module):
         return output
 
 
+def series_order(df_features: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Row order by product-customer series, then date, and the series code of each ordered row
+    
+    create_features sorts by date, so a stable sort on the series code keeps
+    each series' rows in date order.
+    """
+    codes = df_features.groupby(SERIES_KEYS, observed=True, sort=False).ngroup().to_numpy()
+    order = np.argsort(codes, kind='stable')
+    return order, codes[order]
+
+
+def series_targets(series: np.ndarray, sequence_length: int = SEQUENCE_LENGTH) -> np.ndarray:
+    """Rows (ordered by series, then date) whose sequence_length previous rows are in the same series"""
+    rows = np.arange(sequence_length, len(series))
+    return rows[series[rows - sequence_length] == series[rows]]
+
+
+class SequenceDataset(Dataset):
+    """
+    LSTM windows over a feature matrix, sliced on access
+    
+    Item i is (X[t-sequence_length:t], y[t]) for target row t = targets[i]:
+    the window before each target, without holding sequence_length copies
+    of the matrix. Targets default to every row after the first
+    sequence_length; with rows ordered by series, series_targets keeps
+    windows inside one series.
+    """
+    
+    def __init__(self, X: np.ndarray, y: np.ndarray, targets: Optional[np.ndarray] = None, sequence_length: int = SEQUENCE_LENGTH):
+        self.X = np.ascontiguousarray(X, dtype=np.float32)
+        self.y = np.asarray(y, dtype=np.float32).reshape(-1, 1)
+        self.sequence_length = sequence_length
+        self.targets = np.arange(sequence_length, len(self.X)) if targets is None else np.asarray(targets)
+    
+    def __len__(self) -> int:
+        return len(self.targets)
+    
+    def __getitem__(self, i: int) -> Tuple[np.ndarray, np.ndarray]:
+        t = self.targets[i]
+        return self.X[t - self.sequence_length:t], self.y[t]
+
+
 class DemandForecaster:
     """
     Ensemble Demand Forecasting Model
     
     Combines:
     1. XGBoost (gradient boosting on features)
-    2. Prophet (time series decomposition)
+    2. Prophet (time series decomposition per product-customer series)
     3. LSTM (deep learning sequential model)
     
     Weighted ensemble based on historical performance
@@ -87,13 +193,18 @@ class DemandForecaster:
         self.config = config
         self.models = {}
         self.weights = {'xgboost': 0.4, 'prophet': 0.3, 'lstm': 0.3}
+        self.ensemble = SegmentWeights(MODELS, self.weights)
+        self.intervals = None
         self.scaler = StandardScaler()
         self.feature_names = []
         self.metrics_history = []
+        self.training_stats = {}
+        self.memory_optimized = config.get('memory_optimized', False)
         
         # Initialize MLflow
         mlflow.set_experiment(config.get('experiment_name', 'demand-forecasting'))
         
+    @traced()
     def create_features(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Feature Engineering Pipeline
@@ -112,69 +223,63 @@ class DemandForecaster:
         
         logger.info(f"Creating features for {len(df)} records")
         
-        df = df.copy()
-        df['date'] = pd.to_datetime(df['date'])
-        df = df.sort_values('date')
-        
-        # Time Features
-        df['day_of_week'] = df['date'].dt.dayofweek
-        df['day_of_month'] = df['date'].dt.day
-        df['week_of_year'] = df['date'].dt.isocalendar().week
-        df['month'] = df['date'].dt.month
-        df['quarter'] = df['date'].dt.quarter
-        df['year'] = df['date'].dt.year
-        df['is_weekend'] = (df['day_of_week'] >= 5).astype(int)
-        df['is_month_start'] = df['date'].dt.is_month_start.astype(int)
-        df['is_month_end'] = df['date'].dt.is_month_end.astype(int)
-        df['is_quarter_start'] = df['date'].dt.is_quarter_start.astype(int)
-        df['is_quarter_end'] = df['date'].dt.is_quarter_end.astype(int)
-        df['days_in_month'] = df['date'].dt.days_in_month
-        
-        # Cyclical encoding for time features
-        df['day_of_week_sin'] = np.sin(2 * np.pi * df['day_of_week'] / 7)
-        df['day_of_week_cos'] = np.cos(2 * np.pi * df['day_of_week'] / 7)
-        df['month_sin'] = np.sin(2 * np.pi * df['month'] / 12)
-        df['month_cos'] = np.cos(2 * np.pi * df['month'] / 12)
+        if self.memory_optimized:
+            # sort_values returns a new frame, so columns can be assigned in place
+            df = df.sort_values('date', key=pd.to_datetime)
+            df['date'] = pd.to_datetime(df['date'])
+            df['product_id'] = df['product_id'].astype('category')
+            df['customer_id'] = df['customer_id'].astype('category')
+            compact_features(df)
+        else:
+            df = df.copy()
+            df['date'] = pd.to_datetime(df['date'])
+            df = df.sort_values('date')
+        
+        # Time, cyclical and holiday features
+        add_calendar_features(df)
+        if self.memory_optimized:
+            compact_features(df)
         
         # Lag Features (by product-customer combination)
-        for lag in [1, 7, 14, 30, 90, 365]:
-            df[f'sales_lag_{lag}'] = df.groupby(['product_id', 'customer_id'])['sales_volume'].shift(lag)
-            df[f'price_lag_{lag}'] = df.groupby(['product_id', 'customer_id'])['price'].shift(lag)
+        for lag in LAGS:
+            df[f'sales_lag_{lag}'] = df.groupby(['product_id', 'customer_id'], observed=True)['sales_volume'].shift(lag)
+            df[f'price_lag_{lag}'] = df.groupby(['product_id', 'customer_id'], observed=True)['price'].shift(lag)
+        if self.memory_optimized:
+            compact_features(df)
+        
+        # Sales-derived features use the days before each row (prior_sales), so
+        # the horizon forecaster can roll them forward from its own forecasts
+        prior_sales = df.groupby(['product_id', 'customer_id'], observed=True)['sales_volume'].shift(1)
+        prior_by_series = prior_sales.groupby([df['product_id'], df['customer_id']], observed=True)
         
         # Rolling Statistics
-        for window in [7, 14, 30, 90]:
+        for window in ROLLING_WINDOWS:
             # Sales rolling stats
-            df[f'sales_roll_mean_{window}'] = df.groupby(['product_id', 'customer_id'])['sales_volume'].transform(
-                lambda x: x.rolling(window, min_periods=1).mean()
-            )
-            df[f'sales_roll_std_{window}'] = df.groupby(['product_id', 'customer_id'])['sales_volume'].transform(
-                lambda x: x.rolling(window, min_periods=1).std()
-            )
-            df[f'sales_roll_min_{window}'] = df.groupby(['product_id', 'customer_id'])['sales_volume'].transform(
-                lambda x: x.rolling(window, min_periods=1).min()
-            )
-            df[f'sales_roll_max_{window}'] = df.groupby(['product_id', 'customer_id'])['sales_volume'].transform(
-                lambda x: x.rolling(window, min_periods=1).max()
-            )
+            df[f'sales_roll_mean_{window}'] = prior_by_series.transform(lambda x: x.rolling(window, min_periods=1).mean())
+            df[f'sales_roll_std_{window}'] = prior_by_series.transform(lambda x: x.rolling(window, min_periods=1).std())
+            df[f'sales_roll_min_{window}'] = prior_by_series.transform(lambda x: x.rolling(window, min_periods=1).min())
+            df[f'sales_roll_max_{window}'] = prior_by_series.transform(lambda x: x.rolling(window, min_periods=1).max())
             
             # Price rolling stats
-            df[f'price_roll_mean_{window}'] = df.groupby(['product_id', 'customer_id'])['price'].transform(
+            df[f'price_roll_mean_{window}'] = df.groupby(['product_id', 'customer_id'], observed=True)['price'].transform(
                 lambda x: x.rolling(window, min_periods=1).mean()
             )
+            if self.memory_optimized:
+                compact_features(df)
         
         # Price Features
-        df['price_change'] = df.groupby(['product_id', 'customer_id'])['price'].diff()
-        df['price_change_pct'] = df.groupby(['product_id', 'customer_id'])['price'].pct_change()
-        df['price_vs_avg'] = df['price'] / df.groupby('product_id')['price'].transform('mean')
-        df['price_relative_max'] = df['price'] / df.groupby('product_id')['price'].transform('max')
-        df['price_relative_min'] = df['price'] / df.groupby('product_id')['price'].transform('min')
+        df['price_change'] = df.groupby(['product_id', 'customer_id'], observed=True)['price'].diff()
+        df['price_change_pct'] = df.groupby(['product_id', 'customer_id'], observed=True)['price'].pct_change()
+        df['price_vs_avg'] = df['price'] / df.groupby('product_id', observed=True)['price'].transform('mean')
+        df['price_relative_max'] = df['price'] / df.groupby('product_id', observed=True)['price'].transform('max')
+        df['price_relative_min'] = df['price'] / df.groupby('product_id', observed=True)['price'].transform('min')
         
         # Promotion Features
         df['has_promotion'] = (df['promotion_id'].notna()).astype(int)
-        df['days_since_last_promo'] = df.groupby(['product_id', 'customer_id'])['has_promotion'].apply(
+        df['days_since_last_promo'] = df.groupby(['product_id', 'customer_id'], observed=True)['has_promotion'].transform(
             lambda x: (x == 0).cumsum()
         )
-        df['days_until_next_promo'] = df.groupby(['product_id', 'customer_id'])['has_promotion'].apply(
+        df['days_until_next_promo'] = df.groupby(['product_id', 'customer_id'], observed=True)['has_promotion'].transform(
             lambda x: x[::-1].cumsum()[::-1]
         )
         
@@ -183,69 +288,47 @@ class DemandForecaster:
             df['discount_depth'] = df['discount_percentage'].fillna(0)
             df['discount_amount'] = df['price'] * df['discount_percentage'] / 100
         
-        # Growth Rates
-        df['sales_growth_wow'] = df.groupby(['product_id', 'customer_id'])['sales_volume'].pct_change(7)  # Week over week
-        df['sales_growth_mom'] = df.groupby(['product_id', 'customer_id'])['sales_volume'].pct_change(30)  # Month over month
-        df['sales_growth_yoy'] = df.groupby(['product_id', 'customer_id'])['sales_volume'].pct_change(365)  # Year over year
+        # Growth Rates (week over week, month over month, year over year)
+        for name, periods in GROWTH_PERIODS.items():
+            df[name] = prior_by_series.pct_change(periods)
+        if self.memory_optimized:
+            compact_features(df)
         
         # Trend Features (Linear regression slope over windows)
-        for window in [30, 90]:
-            def calculate_trend(series):
-                if len(series) < 2:
-                    return 0
-                x = np.arange(len(series))
-                slope, _ = np.polyfit(x, series, 1)
-                return slope
-            
-            df[f'sales_trend_{window}'] = df.groupby(['product_id', 'customer_id'])['sales_volume'].transform(
-                lambda x: x.rolling(window, min_periods=2).apply(calculate_trend, raw=False)
+        for window in TREND_WINDOWS:
+            df[f'sales_trend_{window}'] = prior_by_series.transform(
+                lambda x: x.rolling(window, min_periods=2).apply(trend_slope, raw=True)
             )
         
-        # Customer Features
-        df['customer_lifetime_sales'] = df.groupby(['product_id', 'customer_id'])['sales_volume'].cumsum()
-        df['customer_lifetime_revenue'] = df.groupby(['product_id', 'customer_id'])['sales_revenue'].cumsum()
-        df['customer_avg_order_size'] = df.groupby(['product_id', 'customer_id'])['sales_volume'].transform('mean')
+        # Customer Features (totals before the row)
+        prior_revenue = df.groupby(['product_id', 'customer_id'], observed=True)['sales_revenue'].shift(1)
+        df['customer_lifetime_sales'] = prior_by_series.cumsum()
+        df['customer_lifetime_revenue'] = prior_revenue.groupby([df['product_id'], df['customer_id']], observed=True).cumsum()
+        del prior_sales, prior_by_series, prior_revenue
+        df['customer_avg_order_size'] = df.groupby(['product_id', 'customer_id'], observed=True)['sales_volume'].transform('mean')
         
         # Product Lifecycle Features
-        df['product_age_days'] = (df['date'] - df.groupby('product_id')['date'].transform('min')).dt.days
-        df['product_maturity'] = pd.cut(df['product_age_days'], bins=[0, 90, 365, 730, np.inf], labels=['new', 'growth', 'mature', 'decline'])
+        df['product_age_days'] = (df['date'] - df.groupby('product_id', observed=True)['date'].transform('min')).dt.days
+        df['product_maturity'] = pd.cut(df['product_age_days'], bins=MATURITY_BINS, labels=MATURITY_LABELS)
         df['product_maturity_encoded'] = df['product_maturity'].cat.codes
-        
-        # Seasonality Indicators (SA market specific)
-        def is_holiday(date):
-            """South African public holidays"""
-            holidays = {
-                (1, 1): 'new_year',
-                (3, 21): 'human_rights_day',
-                (4, 27): 'freedom_day',
-                (5, 1): 'workers_day',
-                (6, 16): 'youth_day',
-                (8, 9): 'womens_day',
-                (9, 24): 'heritage_day',
-                (12, 16): 'reconciliation_day',
-                (12, 25): 'christmas',
-                (12, 26): 'day_of_goodwill'
-            }
-            return (date.month, date.day) in holidays
-        
-        df['is_holiday'] = df['date'].apply(is_holiday).astype(int)
-        df['days_to_holiday'] = df['date'].apply(lambda d: min([abs((d - pd.Timestamp(year=d.year, month=m, day=day)).days) 
-                                                                  for m, day in [(1,1), (3,21), (4,27), (5,1), (6,16), (8,9), (9,24), (12,16), (12,25), (12,26)]]))
-        
-        # School holidays impact
-        df['is_school_holiday'] = ((df['month'].isin([1, 4, 7, 12])) & 
-                                   ((df['day_of_month'] <= 15) | (df['month'].isin([12, 1])))).astype(int)
-        
-        # Payday effect (end of month spike)
-        df['is_payday_week'] = ((df['day_of_month'] >= 23) | (df['day_of_month'] <= 5)).astype(int)
-        
-        # Fill NaN values
-        df = df.fillna(method='ffill').fillna(0)
+        if self.memory_optimized:
+            compact_features(df)
+        
+        # Fill NaN values column by column instead of two full-frame copies
+        # (categorical columns cannot take 0 and keep their missing values)
+        for col in [col for col in df.columns if df[col].hasnans]:
+            filled = df[col].ffill()
+            if pd.api.types.is_numeric_dtype(filled):
+                filled = filled.fillna(0)
+            df[col] = filled
+        if self.memory_optimized:
+            compact_features(df)
         
         logger.info(f"Created {df.shape[1]} features")
         
         return df
     
+    @traced()
     def train_xgboost(self, X_train: pd.DataFrame, y_train: pd.Series, X_val: pd.DataFrame, y_val: pd.Series) -> xgb.XGBRegressor:
         """Train XGBoost model"""
         logger.info("Training XGBoost model...")
@@ -278,59 +361,270 @@ class DemandForecaster:
         
         return model
     
-    def train_prophet(self, df_train: pd.DataFrame, df_val: pd.DataFrame) -> Prophet:
-        """Train Prophet model"""
-        logger.info("Training Prophet model...")
+    @traced()
+    def train_xgboost_external(
+        self,
+        train_shards: List[Path],
+        val_shards: List[Path],
+        feature_names: Optional[List[str]] = None,
+        cache_dir: Optional[Path] = None
+    ) -> xgb.XGBRegressor:
+        """
+        Train XGBoost from Parquet feature shards
         
-        params = self.config.get('hyperparameters', {}).get('prophet', {})
+        Shards are streamed batch by batch into QuantileDMatrix objects
+        (tree_method='hist'), so the raw feature matrix is never held in
+        memory; with cache_dir the quantized pages go to disk as well.
+        
+        Args:
+            train_shards: Training shards with feature columns and sales_volume
+            val_shards: Validation shards used for early stopping
+            feature_names: Feature columns (default: self.feature_names)
+            cache_dir: Directory for external-memory page caches
+        """
+        logger.info(f"Training XGBoost model from {len(train_shards)} feature shards...")
         
-        # Prepare data for Prophet
-        prophet_df = df_train[['date', 'sales_volume']].rename(columns={'date': 'ds', 'sales_volume': 'y'})
-        
-        # Add regressors (external variables)
-        regressors = ['price', 'has_promotion', 'is_weekend', 'is_holiday']
-        for reg in regressors:
-            if reg in df_train.columns:
-                prophet_df[reg] = df_train[reg].values
-        
-        model = Prophet(
-            seasonality_mode=params.get('seasonality_mode', 'multiplicative'),
-            yearly_seasonality=params.get('yearly_seasonality', True),
-            weekly_seasonality=params.get('weekly_seasonality', True),
-            daily_seasonality=params.get('daily_seasonality', False),
-            changepoint_prior_scale=0.05
+        params = self.config.get('hyperparameters', {}).get('xgboost', {})
+        feature_names = list(feature_names or self.feature_names)
+        max_bin = params.get('max_bin', 256)
+        external = cache_dir is not None
+        if external:
+            Path(cache_dir).mkdir(parents=True, exist_ok=True)
+        
+        def matrix(shards: List[Path], split: str, ref: Optional[xgb.DMatrix] = None) -> xgb.DMatrix:
+            cache_prefix = str(Path(cache_dir) / split) if external else None
+            iterator = ParquetShardIter(shards, feature_names, 'sales_volume', cache_prefix=cache_prefix)
+            return build_dmatrix(iterator, ref=ref, max_bin=max_bin, external=external)
+        
+        with span('quantize', shards=len(train_shards) + len(val_shards)):
+            dtrain = matrix(train_shards, 'train')
+            dval = matrix(val_shards, 'val', ref=dtrain)
+        
+        booster = xgb.train(
+            {
+                'objective': 'reg:squarederror',
+                'tree_method': 'hist',
+                'max_bin': max_bin,
+                'learning_rate': params.get('learning_rate', 0.01),
+                'max_depth': params.get('max_depth', 8),
+                'subsample': params.get('subsample', 0.8),
+                'colsample_bytree': params.get('colsample_bytree', 0.8),
+                'seed': 42
+            },
+            dtrain,
+            num_boost_round=params.get('n_estimators', 1000),
+            evals=[(dval, 'validation_0')],
+            early_stopping_rounds=50,
+            verbose_eval=100
         )
         
-        # Add regressors
-        for reg in regressors:
-            if reg in prophet_df.columns:
-                model.add_regressor(reg)
+        # Same estimator type as the in-memory path for prediction, logging and save()
+        model = xgb.XGBRegressor()
+        model.load_model(bytearray(booster.save_raw()))
         
-        model.fit(prophet_df)
+        feature_importance = pd.DataFrame({
+            'feature': feature_names,
+            'importance': model.feature_importances_
+        }).sort_values('importance', ascending=False)
+        
+        logger.info(f"Top 10 features:\n{feature_importance.head(10)}")
         
         return model
     
-    def train_lstm(self, X_train: np.ndarray, y_train: np.ndarray, X_val: np.ndarray, y_val: np.ndarray) -> LSTMForecaster:
-        """Train LSTM model"""
+    def write_feature_shards(
+        self,
+        data: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+        directory: Path,
+        split_date,
+        rows_per_shard: int = DEFAULT_ROWS_PER_SHARD
+    ) -> Dict[str, List[Path]]:
+        """
+        Engineer features chunk by chunk and write them as train/val shards
+        
+        Lags and rolling statistics are computed per product-customer and
+        price and lifecycle statistics per product, so every chunk holds
+        whole products. A DataFrame is cut into chunks of about
+        rows_per_shard rows; an iterable of frames (e.g. exports per product
+        range) is used as given, one frame in memory at a time. Rows are
+        written ordered by series, then date, with SHARD_CONTEXT_COLUMNS and
+        the ensemble's segment column beside the features and sales_volume.
+        
+        Args:
+            data: Raw sales data with columns [date, product_id, customer_id, sales_volume, price, ...]
+            directory: Shard directory
+            split_date: Rows on or after this date go to the validation shards
+            rows_per_shard: Rows per shard file
+            
+        Returns:
+            {'train': [...], 'val': [...]} shard paths; self.feature_names is
+            set to the numeric feature columns of the first chunk
+        """
+        if isinstance(data, pd.DataFrame):
+            data = self._product_chunks(data, rows_per_shard)
+        split_date = pd.Timestamp(split_date)
+        
+        shards = {'train': [], 'val': []}
+        feature_cols = None
+        n_rows = n_series = 0
+        for chunk in data:
+            df_features = self.create_features(chunk)
+            if feature_cols is None:
+                feature_cols = [
+                    col for col in df_features.columns
+                    if col not in NON_FEATURE_COLUMNS and pd.api.types.is_numeric_dtype(df_features[col])
+                ]
+            
+            # Chunks hold whole series, so series and rows are numbered across chunks
+            order, series = series_order(df_features)
+            df_features = df_features.iloc[order]
+            df_features['series'] = n_series + series
+            df_features['row'] = np.arange(n_rows, n_rows + len(df_features))
+            n_rows += len(df_features)
+            n_series += series[-1] + 1 if len(series) else 0
+            context = list(dict.fromkeys(SHARD_CONTEXT_COLUMNS + [col for col in self.ensemble.columns if col in df_features.columns]))
+            columns = [col for col in feature_cols if col in df_features.columns] + ['sales_volume'] + context
+            
+            is_val = df_features['date'] >= split_date
+            for split, rows in (('train', df_features[~is_val]), ('val', df_features[is_val])):
+                shards[split] += write_shards(rows, directory, split, columns, rows_per_shard, start=len(shards[split]))
+            del df_features
+        
+        self.feature_names = feature_cols or []
+        logger.info(f"Wrote {len(shards['train'])} train and {len(shards['val'])} validation shards to {directory}")
+        return shards
+    
+    def predict_shards(self, shards: List[Path]) -> Tuple[pd.DataFrame, np.ndarray]:
+        """
+        XGBoost predictions for the rows of feature shards, streamed batch by batch
+        
+        Returns:
+            Row context (SHARD_CONTEXT_COLUMNS, segment column, Prophet
+            regressors and sales_volume) in date order, and the predictions
+            of those rows
+        """
+        context = list(dict.fromkeys(SHARD_CONTEXT_COLUMNS + self.ensemble.columns + REGRESSORS + ['sales_volume']))
+        rows, predictions = [], []
+        for batch in iter_shard_batches(shards, list(dict.fromkeys(self.feature_names + context))):
+            predictions.append(self.models['xgboost'].predict(batch.reindex(columns=self.feature_names, fill_value=0)))
+            rows.append(batch[[col for col in context if col in batch.columns]])
+        
+        rows = pd.concat(rows, ignore_index=True)
+        predictions = np.concatenate(predictions)
+        by_date = np.argsort(rows['date'].to_numpy(), kind='stable')
+        return rows.iloc[by_date].reset_index(drop=True), predictions[by_date]
+    
+    def shard_sequences(self, shards: Dict[str, List[Path]], path: Path) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Scaled LSTM matrix of all shard rows in a memory-mapped .npy file
+        
+        The scaler is fitted in one pass over the shards and the matrix is
+        filled in a second, each row at its 'row' position (series, then date).
+        
+        Returns:
+            Matrix, sales_volume and series code per row
+        """
+        paths = shards['train'] + shards['val']
+        self.scaler = StandardScaler()
+        n_rows = 0
+        for batch in iter_shard_batches(paths, self.feature_names):
+            self.scaler.partial_fit(batch.reindex(columns=self.feature_names, fill_value=0))
+            n_rows += len(batch)
+        
+        X = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32, shape=(n_rows, len(self.feature_names)))
+        y = np.empty(n_rows, dtype=np.float32)
+        series = np.empty(n_rows, dtype=np.int64)
+        for batch in iter_shard_batches(paths, self.feature_names + ['sales_volume', 'series', 'row']):
+            rows = batch['row'].to_numpy()
+            X[rows] = self.scaler.transform(batch.reindex(columns=self.feature_names, fill_value=0))
+            y[rows] = batch['sales_volume'].to_numpy()
+            series[rows] = batch['series'].to_numpy()
+        X.flush()
+        return X, y, series
+    
+    @staticmethod
+    def _product_chunks(df: pd.DataFrame, rows_per_chunk: int) -> Iterable[pd.DataFrame]:
+        """Consecutive groups of whole products with about rows_per_chunk rows each"""
+        sizes = df.groupby('product_id', observed=True, sort=True).size()
+        chunk_of = ((sizes.cumsum() - 1) // rows_per_chunk).to_dict()
+        for _, chunk in df.groupby(df['product_id'].map(chunk_of), observed=True, sort=True):
+            yield chunk
+    
+    @traced()
+    def train_prophet(self, df_series: pd.DataFrame) -> ProphetSeries:
+        """
+        Train one Prophet model per product-customer series
+        
+        Series are fitted in a process pool of prophet.n_jobs workers (default:
+        all available cores); with prophet.cache_dir, fitted parameters are
+        reused for unchanged series and warm-start the others. Series shorter
+        than prophet.min_history days get no model.
+        
+        Args:
+            df_series: Daily sales per series (prophet_series.series_frame)
+        """
+        logger.info("Training Prophet models...")
+        
+        params = self.config.get('hyperparameters', {}).get('prophet', {})
+        
+        return ProphetSeries.fit(
+            df_series,
+            params,
+            n_jobs=params.get('n_jobs', available_cpus()),
+            cache_dir=params.get('cache_dir'),
+            min_history=params.get('min_history', 30)
+        )
+    
+    def predict_prophet(self, df_features: pd.DataFrame, fallback: np.ndarray) -> np.ndarray:
+        """Prophet prediction per row; rows of series without a model take the fallback prediction"""
+        prophet = self.models.get('prophet')
+        if prophet is None:
+            return fallback
+        prediction = prophet.predict(df_features)
+        return np.where(np.isnan(prediction), fallback, prediction)
+    
+    @traced()
+    def train_lstm(self, X: np.ndarray, y: np.ndarray, train_targets: np.ndarray, val_targets: np.ndarray) -> LSTMForecaster:
+        """
+        Train LSTM model
+        
+        Shuffled mini-batches come from a DataLoader over lazily sliced
+        windows (SequenceDataset). Validation loss is computed every epoch;
+        the best state is kept, optionally saved to params['checkpoint_path'],
+        and training stops after params['patience'] epochs without
+        improvement. Throughput is recorded in self.training_stats['lstm'].
+        
+        Args:
+            X: Scaled features, rows ordered by series, then date
+            y: Targets of the rows of X
+            train_targets: Rows of X trained on (see series_targets)
+            val_targets: Rows of X for the validation loss
+        """
         logger.info("Training LSTM model...")
         
         params = self.config.get('hyperparameters', {}).get('lstm', {})
         
-        # Create sequences
-        sequence_length = 30  # Use last 30 days
-        X_train_seq, y_train_seq = self.create_sequences(X_train, y_train, sequence_length)
-        X_val_seq, y_val_seq = self.create_sequences(X_val, y_val, sequence_length)
+        train_data = SequenceDataset(X, y, train_targets)
+        val_data = SequenceDataset(X, y, val_targets)
         
-        # Convert to PyTorch tensors
-        X_train_tensor = torch.FloatTensor(X_train_seq)
-        y_train_tensor = torch.FloatTensor(y_train_seq).unsqueeze(1)
-        X_val_tensor = torch.FloatTensor(X_val_seq)
-        y_val_tensor = torch.FloatTensor(y_val_seq).unsqueeze(1)
+        # Loader workers slice windows while the remaining cores run the LSTM
+        cpus = available_cpus()
+        num_workers = params.get('num_workers', min(2, cpus - 1))
+        num_threads = params.get('num_threads', max(1, cpus - num_workers))
+        batch_size = params.get('batch_size', 32)
+        
+        train_loader = DataLoader(
+            train_data,
+            batch_size=batch_size,
+            shuffle=True,
+            num_workers=num_workers,
+            persistent_workers=num_workers > 0,
+            generator=torch.Generator().manual_seed(42)
+        )
+        val_loader = DataLoader(val_data, batch_size=max(batch_size, 1024))
         
         # Initialize model
-        input_size = X_train_seq.shape[2]
         model = LSTMForecaster(
-            input_size=input_size,
+            input_size=train_data.X.shape[1],
             hidden_size=params.get('hidden_size', 128),
             num_layers=params.get('num_layers', 3),
             dropout=params.get('dropout', 0.2)
@@ -341,54 +635,119 @@ class DemandForecaster:
         optimizer = torch.optim.Adam(model.parameters(), lr=0.001)
         
         epochs = params.get('epochs', 100)
-        batch_size = params.get('batch_size', 32)
+        patience = params.get('patience', 10)
+        checkpoint_path = params.get('checkpoint_path')
+        
+        best_loss, best_epoch, best_state = float('inf'), 0, None
+        epochs_run = 0
+        previous_threads = torch.get_num_threads()
+        torch.set_num_threads(num_threads)
+        start = time.perf_counter()
         
         # Training loop
-        for epoch in range(epochs):
-            model.train()
-            
-            # Mini-batch training
-            for i in range(0, len(X_train_tensor), batch_size):
-                batch_X = X_train_tensor[i:i+batch_size]
-                batch_y = y_train_tensor[i:i+batch_size]
+        try:
+            for epoch in range(epochs):
+                model.train()
+                train_loss = 0.0
+                for batch_X, batch_y in train_loader:
+                    optimizer.zero_grad()
+                    loss = criterion(model(batch_X), batch_y)
+                    loss.backward()
+                    optimizer.step()
+                    train_loss += loss.item() * len(batch_X)
+                train_loss /= max(len(train_data), 1)
+                epochs_run = epoch + 1
                 
-                # Forward pass
-                optimizer.zero_grad()
-                outputs = model(batch_X)
-                loss = criterion(outputs, batch_y)
+                # Validation
+                val_loss = self._lstm_loss(model, val_loader, criterion) if len(val_data) else train_loss
+                if val_loss < best_loss:
+                    best_loss, best_epoch = val_loss, epoch
+                    best_state = copy.deepcopy(model.state_dict())
+                    if checkpoint_path:
+                        torch.save(best_state, checkpoint_path)
                 
-                # Backward pass
-                loss.backward()
-                optimizer.step()
-            
-            # Validation
-            if epoch % 10 == 0:
-                model.eval()
-                with torch.no_grad():
-                    val_outputs = model(X_val_tensor)
-                    val_loss = criterion(val_outputs, y_val_tensor)
-                logger.info(f"Epoch {epoch}: Train Loss = {loss.item():.4f}, Val Loss = {val_loss.item():.4f}")
+                if epoch % 10 == 0:
+                    logger.info(f"Epoch {epoch}: Train Loss = {train_loss:.4f}, Val Loss = {val_loss:.4f}")
+                if epoch - best_epoch >= patience:
+                    logger.info(f"Early stopping at epoch {epoch}: no improvement since epoch {best_epoch}")
+                    break
+        finally:
+            torch.set_num_threads(previous_threads)
+        
+        seconds = time.perf_counter() - start
+        if best_state is not None:
+            model.load_state_dict(best_state)
+        
+        self.training_stats['lstm'] = {
+            'epochs': epochs_run,
+            'best_epoch': best_epoch,
+            'best_val_loss': best_loss,
+            'seconds': seconds,
+            'epochs_per_second': epochs_run / seconds if seconds else 0.0,
+            'samples_per_second': epochs_run * len(train_data) / seconds if seconds else 0.0,
+            'num_workers': num_workers,
+            'num_threads': num_threads
+        }
+        stats = self.training_stats['lstm']
+        logger.info(
+            f"LSTM trained {epochs_run} epochs in {seconds:.1f}s "
+            f"({stats['epochs_per_second']:.2f} epochs/s, {stats['samples_per_second']:.0f} samples/s); "
+            f"best Val Loss = {best_loss:.4f} at epoch {best_epoch}"
+        )
         
         return model
     
-    def create_sequences(self, X: np.ndarray, y: np.ndarray, sequence_length: int) -> Tuple[np.ndarray, np.ndarray]:
-        """Create sequences for LSTM"""
-        X_seq, y_seq = [], []
+    @staticmethod
+    def _lstm_loss(model: LSTMForecaster, loader: DataLoader, criterion) -> float:
+        """Mean loss over a loader"""
+        model.eval()
+        total = 0.0
+        with torch.no_grad():
+            for batch_X, batch_y in loader:
+                total += criterion(model(batch_X), batch_y).item() * len(batch_X)
+        return total / len(loader.dataset)
+    
+    def predict_lstm(self, X_scaled: np.ndarray, batch_size: int = 1024, targets: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        LSTM prediction for every SEQUENCE_LENGTH window of X_scaled, batch by batch
         
-        for i in range(len(X) - sequence_length):
-            X_seq.append(X[i:i+sequence_length])
-            y_seq.append(y[i+sequence_length])
+        targets: Only predict these rows (indices >= SEQUENCE_LENGTH into X_scaled;
+            series_targets for rows ordered by series)
+        """
+        dataset = SequenceDataset(X_scaled, np.zeros(len(X_scaled)), targets)
+        if not len(dataset):
+            return np.array([], dtype=np.float32)
         
-        return np.array(X_seq), np.array(y_seq)
+        model = self.models['lstm']
+        model.eval()
+        with torch.no_grad():
+            return np.concatenate([
+                model(batch_X).numpy().flatten() for batch_X, _ in DataLoader(dataset, batch_size=batch_size)
+            ])
     
+    @traced()
     def train(self, df: pd.DataFrame, validation_split: float = 0.2):
         """
         Train ensemble model
         
         Args:
             df: Training data with columns [date, product_id, customer_id, sales_volume, price, ...]
-            validation_split: Fraction of data to use for validation
+            validation_split: Fraction of data to use for validation (every row on
+                or after the date at this quantile)
+        
+        Returns:
+            Validation MAPE per model and LSTM training throughput; in
+            memory-optimized mode also peak_rss_mb per training stage
         """
+        if self.memory_optimized and current_span() is None:
+            with trace('DemandForecaster.train', memory=False, rss=True) as root:
+                metrics = self.train(df, validation_split)
+            stages = root.children[0].children
+            metrics['peak_rss_mb'] = {
+                **{stage.name.split('.')[-1]: round(stage.peak_rss_mb, 1) for stage in stages},
+                'total': round(root.peak_rss_mb, 1)
+            }
+            return metrics
         
         logger.info(f"Starting training with {len(df)} records")
         
@@ -397,89 +756,197 @@ class DemandForecaster:
             # Log parameters
             mlflow.log_params(self.config.get('hyperparameters', {}))
             
-            # Feature engineering
-            df_features = self.create_features(df)
-            
-            # Split features and target
-            feature_cols = [col for col in df_features.columns if col not in ['date', 'product_id', 'customer_id', 'sales_volume', 'sales_revenue']]
-            self.feature_names = feature_cols
+            # Time-based split: rows on or after split_date validate every model
+            dates = np.sort(pd.to_datetime(df['date']).to_numpy())
+            split_date = pd.Timestamp(dates[min(int(len(dates) * (1 - validation_split)), len(dates) - 1)])
+            del dates
+            ensemble_config = self.config.get('ensemble', {})
             
-            X = df_features[feature_cols]
-            y = df_features['sales_volume']
-            
-            # Time-based train/val split
-            split_index = int(len(X) * (1 - validation_split))
-            X_train, X_val = X[:split_index], X[split_index:]
-            y_train, y_val = y[:split_index], y[split_index:]
-            
-            logger.info(f"Train size: {len(X_train)}, Validation size: {len(X_val)}")
-            
-            # Train models
+            external = self.config.get('xgboost_external_memory')
+            if external:
+                # Out of core: features are engineered once per product chunk into
+                # Parquet shards and every stage streams them; only ids, labels and
+                # predictions of the validation rows are held in memory
+                self.ensemble = SegmentWeights.define(
+                    df[pd.to_datetime(df['date']) < split_date],
+                    self.weights,
+                    ensemble_config.get('segment_by', 'customer_tier'),
+                    ensemble_config.get('n_tiers', 3)
+                )
+                shard_dir = Path(external['shard_dir'])
+                with span('write_shards'):
+                    shards = self.write_feature_shards(
+                        df, shard_dir, split_date, external.get('rows_per_shard', DEFAULT_ROWS_PER_SHARD)
+                    )
+                
+                # 1. XGBoost (quantized matrices streamed from the shards)
+                self.models['xgboost'] = self.train_xgboost_external(
+                    shards['train'], shards['val'], cache_dir=external.get('cache_dir')
+                )
+                with span('predict_validation'):
+                    prophet_rows, xgb_pred = self.predict_shards(shards['val'])
+                y_val = prophet_rows['sales_volume'].to_numpy()
+                val_segments = self.ensemble.segments_of(prophet_rows[self.ensemble.columns])
+                
+                with span('prepare_series'):
+                    df_series = series_frame(pd.concat(
+                        iter_shard_batches(shards['train'], SERIES_KEYS + ['date', 'sales_volume'] + REGRESSORS),
+                        ignore_index=True
+                    ))
+                
+                # LSTM matrix in a memory-mapped file, rows ordered by series, then date
+                with span('prepare_sequences'):
+                    X_seq, y_seq, series = self.shard_sequences(shards, shard_dir / 'sequences.npy')
+                    val_position = np.full(len(y_seq), -1)
+                    val_position[prophet_rows['row'].to_numpy()] = np.arange(len(prophet_rows))
+            else:
+                # Feature engineering
+                df_features = self.create_features(df)
+                
+                # Split features and target (numeric columns only; ids and labels such as
+                # promotion_id or product_maturity are not model inputs)
+                feature_cols = [
+                    col for col in df_features.columns
+                    if col not in NON_FEATURE_COLUMNS and pd.api.types.is_numeric_dtype(df_features[col])
+                ]
+                split_index = int(df_features['date'].searchsorted(split_date))
+                
+                # Prophet inputs and ensemble segments are taken before the
+                # memory-optimized mode reduces df_features to the feature matrix
+                with span('prepare_series'):
+                    df_series = series_frame(df_features)
+                    prophet_rows = df_features.iloc[split_index:][SERIES_KEYS + ['date'] + [col for col in REGRESSORS if col in df_features.columns]]
+                    self.ensemble = SegmentWeights.define(
+                        df_features.iloc[:split_index],
+                        self.weights,
+                        ensemble_config.get('segment_by', 'customer_tier'),
+                        ensemble_config.get('n_tiers', 3)
+                    )
+                    val_segments = self.ensemble.segments_of(df_features.iloc[split_index:][self.ensemble.columns])
+                    order, series = series_order(df_features)
+                
+                if self.memory_optimized:
+                    with span('prepare_matrix'):
+                        y = df_features['sales_volume']
+                        df_features.drop(columns=[col for col in df_features.columns if col not in feature_cols], inplace=True)
+                        X = df_features
+                else:
+                    X = df_features[feature_cols]
+                    y = df_features['sales_volume']
+                self.feature_names = feature_cols
+                
+                # Time-based train/val split
+                X_train, X_val = X[:split_index], X[split_index:]
+                y_train, y_val = y[:split_index], y[split_index:].to_numpy()
+                
+                logger.info(f"Train size: {len(X_train)}, Validation size: {len(X_val)}")
+                
+                # 1. XGBoost
+                self.models['xgboost'] = self.train_xgboost(X_train, y_train, X_val, y_val)
+                xgb_pred = self.models['xgboost'].predict(X_val)
+                
+                # LSTM matrix: rows ordered by series, then date
+                X_seq = self.scaler.fit_transform(X)[order]
+                y_seq = y.to_numpy()[order]
+                val_position = order - split_index
+                del X, X_train, X_val, df_features
             
-            # 1. XGBoost
-            self.models['xgboost'] = self.train_xgboost(X_train, y_train, X_val, y_val)
-            xgb_pred = self.models['xgboost'].predict(X_val)
             xgb_mape = mean_absolute_percentage_error(y_val, xgb_pred)
             logger.info(f"XGBoost MAPE: {xgb_mape:.4f}")
             mlflow.log_metric("xgboost_mape", xgb_mape)
             
             # 2. Prophet (train per product-customer group)
-            # For demo, train on aggregated data
-            df_agg = df_features.groupby('date').agg({'sales_volume': 'sum', 'price': 'mean', 'has_promotion': 'max', 'is_weekend': 'max', 'is_holiday': 'max'}).reset_index()
-            split_date = df_agg['date'].iloc[split_index]
-            df_train_prophet = df_agg[df_agg['date'] < split_date]
-            df_val_prophet = df_agg[df_agg['date'] >= split_date]
-            
-            self.models['prophet'] = self.train_prophet(df_train_prophet, df_val_prophet)
+            self.models['prophet'] = self.train_prophet(df_series[df_series['date'] < split_date])
+            del df_series
             
-            # Prophet predictions
-            future = df_val_prophet[['date'] + [col for col in ['price', 'has_promotion', 'is_weekend', 'is_holiday'] if col in df_val_prophet.columns]].rename(columns={'date': 'ds'})
-            prophet_forecast = self.models['prophet'].predict(future)
-            prophet_pred = prophet_forecast['yhat'].values
-            prophet_mape = mean_absolute_percentage_error(df_val_prophet['sales_volume'], prophet_pred)
-            logger.info(f"Prophet MAPE: {prophet_mape:.4f}")
+            # Prophet predictions for the validation rows (XGBoost where a series has no model)
+            prophet_pred = self.predict_prophet(prophet_rows, xgb_pred)
+            prophet_mape = mean_absolute_percentage_error(y_val, prophet_pred)
+            logger.info(f"Prophet MAPE: {prophet_mape:.4f} ({len(self.models['prophet'].keys)} series)")
             mlflow.log_metric("prophet_mape", prophet_mape)
             
-            # 3. LSTM
-            X_scaled = self.scaler.fit_transform(X)
-            X_train_scaled, X_val_scaled = X_scaled[:split_index], X_scaled[split_index:]
+            # 3. LSTM on windows within each series; validation windows may start
+            # in the series' training rows. val_position maps a row of X_seq to
+            # its validation row (negative for training rows)
+            targets = series_targets(series)
+            is_val = val_position[targets] >= 0
+            # Validation targets in validation row order, for the time-block folds below
+            val_targets = targets[is_val][np.argsort(val_position[targets[is_val]], kind='stable')]
             
-            self.models['lstm'] = self.train_lstm(X_train_scaled, y_train.values, X_val_scaled, y_val.values)
+            self.models['lstm'] = self.train_lstm(X_seq, y_seq, targets[~is_val], val_targets)
             
-            # LSTM predictions
-            X_val_seq, y_val_seq = self.create_sequences(X_val_scaled, y_val.values, 30)
-            X_val_tensor = torch.FloatTensor(X_val_seq)
-            self.models['lstm'].eval()
-            with torch.no_grad():
-                lstm_pred_tensor = self.models['lstm'](X_val_tensor)
-                lstm_pred = lstm_pred_tensor.numpy().flatten()
+            # LSTM predictions for the validation rows with a full window
+            lstm_pred = self.predict_lstm(X_seq, targets=val_targets)
+            del X_seq
+            if external:
+                (shard_dir / 'sequences.npy').unlink()
+            aligned = val_position[val_targets]
+            y_val_aligned = y_val[aligned]
             
-            lstm_mape = mean_absolute_percentage_error(y_val_seq, lstm_pred)
+            lstm_mape = mean_absolute_percentage_error(y_val_aligned, lstm_pred)
             logger.info(f"LSTM MAPE: {lstm_mape:.4f}")
             mlflow.log_metric("lstm_mape", lstm_mape)
+            lstm_stats = self.training_stats['lstm']
+            mlflow.log_metrics({
+                'lstm_epochs': lstm_stats['epochs'],
+                'lstm_epochs_per_second': lstm_stats['epochs_per_second'],
+                'lstm_samples_per_second': lstm_stats['samples_per_second']
+            })
             
-            # Ensemble prediction (weighted average)
-            # Align predictions (use last len(lstm_pred) predictions from other models)
-            xgb_pred_aligned = xgb_pred[-len(lstm_pred):]
-            prophet_pred_aligned = prophet_pred[-len(lstm_pred):]
-            y_val_aligned = y_val_seq
-            
-            ensemble_pred = (
-                self.weights['xgboost'] * xgb_pred_aligned +
-                self.weights['prophet'] * prophet_pred_aligned +
-                self.weights['lstm'] * lstm_pred
-            )
+            # 4. Ensemble weights per segment
+            # Align predictions (validation rows with an LSTM window);
+            # the reported ensemble error is out-of-fold over time blocks of the validation rows
+            with span('ensemble.fit', rows=len(lstm_pred)):
+                ensemble_pred = self.ensemble.fit(
+                    np.column_stack([xgb_pred[aligned], prophet_pred[aligned], lstm_pred]),
+                    y_val_aligned,
+                    val_segments[aligned],
+                    min_rows=ensemble_config.get('min_rows', 200),
+                    n_folds=ensemble_config.get('n_folds', 3),
+                    prune=ensemble_config.get('prune', 0.05)
+                )
+            self.weights = self.ensemble.as_dict(self.ensemble.default)
             
             ensemble_mape = mean_absolute_percentage_error(y_val_aligned, ensemble_pred)
             logger.info(f"Ensemble MAPE: {ensemble_mape:.4f}")
             mlflow.log_metric("ensemble_mape", ensemble_mape)
             
+            # 5. Interval quantiles from the same out-of-fold predictions
+            with span('intervals.fit', rows=len(ensemble_pred)):
+                self.intervals = ConformalIntervals.fit(
+                    ensemble_pred,
+                    y_val_aligned,
+                    val_segments[aligned],
+                    prophet_rows['date'].to_numpy()[aligned],
+                    min_rows=ensemble_config.get('min_rows', 200)
+                )
+            
+            # 6. Interval quantiles per lead time from recursive forecasts over the validation window
+            intervals_config = self.config.get('intervals', {})
+            backtest = self.backtest(
+                df,
+                split_date,
+                intervals_config.get('origins', 4),
+                intervals_config.get('step_days', 7),
+                rows_per_chunk=external.get('rows_per_shard', DEFAULT_ROWS_PER_SHARD) if external else None
+            )
+            with span('intervals.fit_lead_times', rows=len(backtest)):
+                self.intervals.fit_lead_times(
+                    backtest['predicted_volume'].to_numpy(),
+                    backtest['sales_volume'].to_numpy(),
+                    backtest['lead_time'].to_numpy(),
+                    self.ensemble.segments_of(backtest[self.ensemble.columns]),
+                    backtest.groupby(['origin', 'date']).ngroup().to_numpy(),
+                    min_rows=ensemble_config.get('min_rows', 200)
+                )
+            
             # Log models
             mlflow.xgboost.log_model(self.models['xgboost'], "xgboost_model")
             mlflow.pytorch.log_model(self.models['lstm'], "lstm_model")
             
             # Save ensemble weights
-            mlflow.log_dict(self.weights, "ensemble_weights.json")
+            mlflow.log_dict(self.ensemble.to_dict(), "ensemble_weights.json")
+            mlflow.log_dict(self.intervals.to_dict(), "intervals.json")
             
             logger.info(f"Training complete. Ensemble MAPE: {ensemble_mape:.4f}")
             
@@ -487,68 +954,328 @@ class DemandForecaster:
                 'xgboost_mape': xgb_mape,
                 'prophet_mape': prophet_mape,
                 'lstm_mape': lstm_mape,
-                'ensemble_mape': ensemble_mape
+                'ensemble_mape': ensemble_mape,
+                'ensemble_segments': len(self.ensemble.weights),
+                'lstm_epochs': lstm_stats['epochs'],
+                'lstm_epochs_per_second': lstm_stats['epochs_per_second'],
+                'lstm_samples_per_second': lstm_stats['samples_per_second']
             }
     
-    def predict(self, df: pd.DataFrame, horizon_days: int = 90) -> pd.DataFrame:
+    def save(self, store, metadata: Optional[Dict] = None) -> str:
         """
-        Generate demand forecast
+        Save the trained ensemble as a new 'demand_forecasting' artifact version
+        
+        Files: XGBoost UBJ, LSTM state dict, per-series Prophet parameters (JSON),
+        per-segment ensemble weights and interval quantiles (JSON), scaler arrays (.npy)
         
         Args:
-            df: Historical data
-            horizon_days: Number of days to forecast
+            store: ArtifactStore (models/common/artifacts.py)
+            metadata: Extra manifest metadata (e.g. training metrics)
             
         Returns:
-            DataFrame with columns [date, predicted_volume, confidence_lower, confidence_upper]
+            Published version
         """
+        if not self.models:
+            raise ValueError("Model not trained. Call train() first.")
+        
+        lstm = self.models['lstm']
+        state = {
+            'config': self.config,
+            'weights': self.weights,
+            'feature_names': self.feature_names,
+            'lstm': {
+                'input_size': lstm.lstm.input_size,
+                'hidden_size': lstm.hidden_size,
+                'num_layers': lstm.num_layers,
+                'dropout': lstm.lstm.dropout
+            }
+        }
         
-        logger.info(f"Generating {horizon_days}-day forecast")
+        with store.create('demand_forecasting', {'weights': self.weights, **(metadata or {})}) as artifact:
+            artifact.save_json('ensemble', state)
+            self.models['xgboost'].save_model(artifact.file('xgboost.ubj'))
+            torch.save(lstm.state_dict(), artifact.file('lstm.pt'))
+            artifact.save_json('prophet_series', self.models['prophet'].to_dict())
+            artifact.save_json('ensemble_weights', self.ensemble.to_dict())
+            if self.intervals is not None:
+                artifact.save_json('intervals', self.intervals.to_dict())
+            artifact.save_array('scaler_mean', self.scaler.mean_)
+            artifact.save_array('scaler_scale', self.scaler.scale_)
+        
+        return artifact.version
+    
+    @classmethod
+    def load(cls, artifact, mmap: bool = True) -> 'DemandForecaster':
+        """
+        Restore a forecaster from an artifact version
         
-        # Feature engineering
-        df_features = self.create_features(df)
+        Args:
+            artifact: Artifact (models/common/artifacts.py)
+            mmap: Memory-map the scaler arrays read-only
+        """
+        state = artifact.load_json('ensemble')
+        forecaster = cls(state['config'])
+        forecaster.weights = state['weights']
+        forecaster.feature_names = state['feature_names']
+        
+        xgb_model = xgb.XGBRegressor()
+        xgb_model.load_model(artifact.file('xgboost.ubj'))
+        forecaster.models['xgboost'] = xgb_model
+        
+        lstm = LSTMForecaster(**state['lstm'])
+        lstm.load_state_dict(torch.load(artifact.file('lstm.pt'), map_location='cpu', weights_only=True))
+        lstm.eval()
+        forecaster.models['lstm'] = lstm
+        
+        if artifact.has('prophet_series.json'):
+            forecaster.models['prophet'] = ProphetSeries.from_dict(artifact.load_json('prophet_series'))
+        else:
+            # Versions saved with a single aggregate Prophet model
+            logger.warning(f"Artifact {artifact.version} has no per-series Prophet models; using XGBoost in their place")
+        
+        if artifact.has('ensemble_weights.json'):
+            forecaster.ensemble = SegmentWeights.from_dict(artifact.load_json('ensemble_weights'))
+        else:
+            forecaster.ensemble = SegmentWeights(MODELS, forecaster.weights)
+        
+        if artifact.has('intervals.json'):
+            forecaster.intervals = ConformalIntervals.from_dict(artifact.load_json('intervals'))
+        else:
+            logger.warning(f"Artifact {artifact.version} has no interval quantiles; forecasts come without intervals")
+        
+        forecaster.scaler.mean_ = artifact.load_array('scaler_mean', mmap)
+        forecaster.scaler.scale_ = artifact.load_array('scaler_scale', mmap)
+        forecaster.scaler.var_ = np.square(forecaster.scaler.scale_)
+        forecaster.scaler.n_features_in_ = len(forecaster.feature_names)
+        
+        return forecaster
+    
+    def predict_rows(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        One-step ensemble predictions for the observed rows of df
         
-        # Prepare features
+        Returns:
+            Predictions aligned with create_features(df) (sorted by date);
+            NaN for the first SEQUENCE_LENGTH rows of each series, which have
+            no LSTM window
+        """
+        return self.predict_features(self.create_features(df))
+    
+    @traced()
+    def predict_features(self, df_features: pd.DataFrame) -> np.ndarray:
+        """One-step ensemble predictions for the rows of a create_features frame (see predict_rows)"""
         X = df_features[self.feature_names]
         
-        # Generate predictions from each model
-        predictions = {}
+        # Rows with a full LSTM window in their series are predicted; each
+        # model only predicts the rows whose segment gives it a weight.
+        # targets index the frame, ordered_targets the series-ordered rows
+        order, series = series_order(df_features)
+        ordered_targets = series_targets(series)
+        targets = order[ordered_targets]
+        weights = self.ensemble.matrix(self.ensemble.segments_of(df_features.iloc[targets]))
+        needed = weights > 0
+        predictions = np.zeros(weights.shape)
+        xgb_col, prophet_col, lstm_col = (MODELS.index(name) for name in ('xgboost', 'prophet', 'lstm'))
+        
+        # Prophet (all series evaluated in one pass); rows of series without a
+        # model take the XGBoost prediction
+        prophet_missing = np.zeros(len(targets), dtype=bool)
+        rows = np.flatnonzero(needed[:, prophet_col])
+        with span('prophet.predict', rows=len(rows)):
+            if len(rows) and 'prophet' in self.models:
+                predictions[rows, prophet_col] = self.models['prophet'].predict(df_features.iloc[targets[rows]])
+            prophet_missing[rows] = np.isnan(predictions[:, prophet_col])[rows] | ('prophet' not in self.models)
         
         # XGBoost
-        predictions['xgboost'] = self.models['xgboost'].predict(X)
-        
-        # Prophet (requires future dates)
-        # Simplified for demo
-        predictions['prophet'] = np.zeros(len(X))  # Placeholder
+        rows = np.flatnonzero(needed[:, xgb_col] | prophet_missing)
+        with span('xgboost.predict', rows=len(rows)):
+            if len(rows):
+                predictions[rows, xgb_col] = self.models['xgboost'].predict(X.iloc[targets[rows]])
+        predictions[prophet_missing, prophet_col] = predictions[prophet_missing, xgb_col]
         
         # LSTM
-        X_scaled = self.scaler.transform(X)
-        X_seq, _ = self.create_sequences(X_scaled, np.zeros(len(X)), 30)
-        X_tensor = torch.FloatTensor(X_seq)
-        self.models['lstm'].eval()
-        with torch.no_grad():
-            lstm_pred_tensor = self.models['lstm'](X_tensor)
-            predictions['lstm'] = lstm_pred_tensor.numpy().flatten()
-        
-        # Ensemble
-        # Align predictions
-        min_len = min(len(predictions['xgboost']), len(predictions['lstm']))
-        ensemble_pred = (
-            self.weights['xgboost'] * predictions['xgboost'][-min_len:] +
-            self.weights['prophet'] * predictions['prophet'][-min_len:] +
-            self.weights['lstm'] * predictions['lstm']
-        )
+        rows = np.flatnonzero(needed[:, lstm_col])
+        with span('lstm.predict', rows=len(rows)):
+            if len(rows):
+                X_scaled = self.scaler.transform(X)[order]
+                predictions[rows, lstm_col] = self.predict_lstm(X_scaled, targets=ordered_targets[rows])
+        
+        result = np.full(len(X), np.nan)
+        result[targets] = np.einsum('ij,ij->i', predictions, weights)
+        return result
+    
+    @traced()
+    def backtest(
+        self,
+        df: pd.DataFrame,
+        split_date,
+        origins: int = 4,
+        step_days: int = 7,
+        rows_per_chunk: Optional[int] = None
+    ) -> pd.DataFrame:
+        """
+        Recursive forecasts from origins in the validation window, with the actuals
+        
+        Origins are split_date and every step_days after it; each forecasts
+        from the history before it up to the last date (at most
+        LEAD_TIME_BUCKETS[-1] days), without a plan, as the serving API does.
+        With rows_per_chunk, series are forecast per product chunk, so the full
+        feature frame is never built.
+        
+        Returns:
+            Rows [product_id, customer_id, date, origin, lead_time, predicted_volume,
+            sales_volume]; lead_time 1 is the first forecast day
+        """
+        dates = pd.to_datetime(df['date'])
+        last = dates.max()
+        actuals = df.loc[dates >= split_date, SERIES_KEYS + ['sales_volume']].astype({col: str for col in SERIES_KEYS})
+        actuals['date'] = dates[dates >= split_date]
+        actuals = actuals.groupby(SERIES_KEYS + ['date'])['sales_volume'].sum().reset_index()
+        
+        forecasts = []
+        for k in range(origins):
+            origin = pd.Timestamp(split_date) + pd.Timedelta(days=k * step_days)
+            horizon_days = min((last - origin).days + 1, LEAD_TIME_BUCKETS[-1])
+            if horizon_days < 1:
+                break
+            history = df[dates < origin]
+            chunks = self._product_chunks(history, rows_per_chunk) if rows_per_chunk else [history]
+            forecast = pd.concat([self.forecast(chunk, horizon_days) for chunk in chunks], ignore_index=True)
+            forecast['origin'] = origin
+            forecast['lead_time'] = (forecast['date'] - origin).dt.days + 1
+            forecasts.append(forecast[SERIES_KEYS + ['date', 'origin', 'lead_time', 'predicted_volume']])
+        
+        columns = SERIES_KEYS + ['date', 'origin', 'lead_time', 'predicted_volume', 'sales_volume']
+        if not forecasts:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(forecasts, ignore_index=True).merge(actuals, on=SERIES_KEYS + ['date'])[columns]
+    
+    @traced()
+    def forecast(
+        self,
+        df: pd.DataFrame,
+        horizon_days: int = 90,
+        plan: Optional[pd.DataFrame] = None,
+        confidence_level: float = 0.95
+    ) -> pd.DataFrame:
+        """
+        Recursive daily forecast of every product-customer series
         
-        # Calculate confidence intervals (based on historical error)
-        std_error = np.std(ensemble_pred) * 1.96  # 95% confidence
+        Each horizon day is predicted for all series in one call per model
+        from features rolled forward with the forecasts of the days before
+        (models/demand_forecasting/horizon.py). Prophet forecasts the whole
+        horizon in one call; models a series' segment does not weight are
+        skipped. Interval bounds come from the stored conformal quantiles of
+        the series' segment at each day's lead time, without further model calls.
         
-        # Create forecast dataframe
-        forecast_dates = pd.date_range(start=df['date'].max() + timedelta(days=1), periods=min_len, freq='D')
+        Args:
+            df: Historical data
+            horizon_days: Number of days to forecast
+            plan: Known future prices and promotions (see HorizonState)
+            confidence_level: Coverage of the interval bounds
+            
+        Returns:
+            DataFrame with columns [date, product_id, customer_id, predicted_volume,
+            confidence_lower, confidence_upper] (no bounds for models saved without intervals)
+        """
+        df_features = self.create_features(df)
+        state = HorizonState(df_features, self.feature_names, horizon_days, plan)
+        
+        n_series = len(state.keys)
+        segments = self.ensemble.segments_of(state.series)
+        weights = self.ensemble.matrix(segments)
+        needed = weights > 0
+        xgb_col, prophet_col, lstm_col = (MODELS.index(name) for name in ('xgboost', 'prophet', 'lstm'))
+        
+        # Prophet: all series and days at once; series without a model take XGBoost
+        prophet = np.full((n_series, horizon_days), np.nan)
+        prophet_rows = np.flatnonzero(needed[:, prophet_col])
+        with span('prophet.forecast', series=len(prophet_rows)):
+            if len(prophet_rows) and 'prophet' in self.models:
+                regressors = {name: np.broadcast_to(values, prophet.shape)[prophet_rows] for name, values in state.regressors().items()}
+                prophet[prophet_rows] = self.models['prophet'].forecast([state.keys[i] for i in prophet_rows], state.start, horizon_days, regressors)
+        prophet_missing = needed[:, prophet_col][:, None] & np.isnan(prophet)
+        
+        # LSTM windows: the last SEQUENCE_LENGTH scaled feature rows of each series
+        lstm_rows = np.flatnonzero(needed[:, lstm_col])
+        if len(lstm_rows):
+            windows = state.windows(SEQUENCE_LENGTH, self.scaler.transform)[lstm_rows]
+            self.models['lstm'].eval()
+        
+        def predict_step(h: int, X: pd.DataFrame) -> np.ndarray:
+            # Unweighted columns stay 0: NaN would survive the 0 weight in the einsum
+            predictions = np.zeros(weights.shape)
+            predictions[prophet_rows, prophet_col] = prophet[prophet_rows, h]
+            
+            rows = np.flatnonzero(needed[:, xgb_col] | prophet_missing[:, h])
+            if len(rows):
+                predictions[rows, xgb_col] = self.models['xgboost'].predict(X.iloc[rows])
+            missing = prophet_missing[:, h]
+            predictions[missing, prophet_col] = predictions[missing, xgb_col]
+            
+            if len(lstm_rows):
+                with torch.no_grad():
+                    predictions[lstm_rows, lstm_col] = self.models['lstm'](torch.from_numpy(windows)).numpy().ravel()
+                # The day's features join the window for the next day
+                windows[:, :-1] = windows[:, 1:]
+                windows[:, -1] = self.scaler.transform(X.iloc[lstm_rows])
+            
+            return np.einsum('ij,ij->i', predictions, weights)
+        
+        with span('recursive_forecast', series=n_series, horizon_days=horizon_days):
+            forecast_df = recursive_forecast(state, predict_step)
+        
+        if self.intervals is not None:
+            forecast_df['confidence_lower'], forecast_df['confidence_upper'] = self.intervals.bounds(
+                forecast_df['predicted_volume'].to_numpy(),
+                confidence_level,
+                np.repeat(segments, horizon_days),
+                lead_times=np.tile(np.arange(1, horizon_days + 1), n_series)
+            )
+        
+        logger.info(f"Forecast {n_series} series for {horizon_days} days")
+        return forecast_df
+    
+    @traced()
+    def predict(
+        self,
+        df: pd.DataFrame,
+        horizon_days: int = 90,
+        plan: Optional[pd.DataFrame] = None,
+        confidence_level: float = 0.95
+    ) -> pd.DataFrame:
+        """
+        Generate demand forecast
+        
+        Args:
+            df: Historical data
+            horizon_days: Number of days to forecast
+            plan: Known future prices and promotions (see HorizonState)
+            confidence_level: Coverage of the interval bounds
+            
+        Returns:
+            DataFrame with columns [date, predicted_volume, confidence_lower, confidence_upper],
+            the total over all series per day after the last history date
+        """
+        
+        logger.info(f"Generating {horizon_days}-day forecast")
+        
+        forecast = self.forecast(df, horizon_days, plan)
+        ensemble_pred = forecast.groupby('date')['predicted_volume'].sum()
+        
+        # Confidence intervals from the conformal quantiles of daily totals at each lead time
+        if self.intervals is not None:
+            lower, upper = self.intervals.total_bounds(
+                ensemble_pred.to_numpy(), confidence_level, lead_times=np.arange(1, len(ensemble_pred) + 1)
+            )
+        else:
+            lower = upper = np.full(len(ensemble_pred), np.nan)
         
         forecast_df = pd.DataFrame({
-            'date': forecast_dates,
-            'predicted_volume': ensemble_pred,
-            'confidence_lower': ensemble_pred - std_error,
-            'confidence_upper': ensemble_pred + std_error
+            'date': ensemble_pred.index,
+            'predicted_volume': ensemble_pred.to_numpy(),
+            'confidence_lower': lower,
+            'confidence_upper': upper
         })
         
         logger.info(f"Generated forecast for {len(forecast_df)} days")
@@ -556,15 +1283,15 @@ class DemandForecaster:
         return forecast_df
     
     def evaluate(self, df_test: pd.DataFrame) -> Dict:
-        """Evaluate model on test set"""
+        """Evaluate one-step predictions on a test set"""
         
         df_features = self.create_features(df_test)
-        X_test = df_features[self.feature_names]
-        y_test = df_features['sales_volume']
+        y_test = df_features['sales_volume'].to_numpy()
         
-        # Get predictions
-        forecast = self.predict(df_test)
-        y_pred = forecast['predicted_volume'].values[:len(y_test)]
+        # Get predictions (rows without an LSTM window are not scored)
+        y_pred = self.predict_features(df_features)
+        scored = ~np.isnan(y_pred)
+        y_test, y_pred = y_test[scored], y_pred[scored]
         
         # Calculate metrics
         mape = mean_absolute_percentage_error(y_test, y_pred)
@@ -582,7 +1309,6 @@ class DemandForecaster:
         
         return metrics
 
-
 if __name__ == "__main__":
     # Example usage
     from utils.data_loader import load_sales_data
@@ -0,0 +1,295 @@
+"""
+TRADEAI Hierarchical Forecasting
+Coherent forecasts at SKU x customer, category x customer and total level
+
+Base: product-customer series forecast by DemandForecaster.forecast
+Aggregates: seasonal-naive forecasts of the aggregated history, one
+    vectorized pass for all aggregate nodes
+Summing matrix: sparse (nodes x base series), aggregates first
+Reconciliation: MinT with a diagonal covariance (residual variances per node),
+    OLS or structural scaling, solved in the constraint form
+        y~ = y^ - W C' (C W C')^-1 C y^,   C = [I  -S_agg]
+    where C W C' is a sparse (aggregates x aggregates) system, so tens of
+    thousands of nodes need one sparse LU factorization for all horizon days
+"""
+
+from typing import Dict, List, Mapping, Optional
+import logging
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.sparse.linalg import splu
+
+from models.common.tracing import span
+from models.demand_forecasting.prophet_series import SERIES_KEYS
+
+logger = logging.getLogger(__name__)
+
+# Level name -> grouping columns; the last level is the base series
+LEVELS = {
+    'total': [],
+    'category_customer': ['category', 'customer_id'],
+    'series': SERIES_KEYS
+}
+METHODS = ('mint', 'ols', 'wls_struct')
+SEASON_DAYS = 7
+SEASON_CYCLES = 4
+UNCATEGORIZED = 'uncategorized'
+
+
+class Hierarchy:
+    """
+    Nodes of every level over a set of base series
+
+    Args:
+        base: One row per base series with the columns of every level
+        levels: Level name -> grouping columns, base level last
+    """
+
+    def __init__(self, base: pd.DataFrame, levels: Dict[str, List[str]] = LEVELS):
+        self.base = base.reset_index(drop=True)
+        self.levels = dict(levels)
+        n_base = len(self.base)
+
+        nodes, rows, cols, offset = [], [], [], 0
+        for level, columns in list(self.levels.items())[:-1]:
+            if columns:
+                codes, uniques = pd.factorize(pd.MultiIndex.from_frame(self.base[columns].astype(str)))
+                labels = pd.DataFrame(list(uniques), columns=columns)
+            else:
+                codes, labels = np.zeros(n_base, dtype=np.int64), pd.DataFrame(index=[0])
+            nodes.append(labels.assign(level=level))
+            rows.append(offset + codes)
+            cols.append(np.arange(n_base))
+            offset += len(labels)
+
+        self.n_aggregates = offset
+        if rows:
+            self.aggregate_matrix = sp.csr_matrix(
+                (np.ones(n_base * len(rows)), (np.concatenate(rows), np.concatenate(cols))), shape=(offset, n_base)
+            )
+        else:
+            self.aggregate_matrix = sp.csr_matrix((0, n_base))
+        base_level = list(self.levels)[-1]
+        nodes.append(self.base[list(self.levels[base_level])].astype(str).assign(level=base_level))
+        self.nodes = pd.concat(nodes, ignore_index=True)
+        self.summing_matrix = sp.vstack([self.aggregate_matrix, sp.identity(n_base, format='csr')], format='csr')
+
+    @classmethod
+    def from_series(
+        cls,
+        series: pd.DataFrame,
+        categories: Optional[Mapping[str, str]] = None,
+        levels: Dict[str, List[str]] = LEVELS
+    ) -> 'Hierarchy':
+        """
+        Hierarchy over the distinct product-customer series of a frame
+
+        Args:
+            series: Rows with product_id, customer_id and optionally category
+            categories: Product -> category, used when series has no category
+            levels: Level name -> grouping columns, base level last
+        """
+        needed = sorted({col for columns in levels.values() for col in columns})
+        base = series[[col for col in needed if col in series.columns]].astype(str).drop_duplicates(SERIES_KEYS)
+        if 'category' in needed and 'category' not in base.columns:
+            if categories is None:
+                logger.warning("No product categories; category levels group all products as 'uncategorized'")
+            base['category'] = base['product_id'].map(categories or {}).fillna(UNCATEGORIZED)
+        return cls(base.reset_index(drop=True), levels)
+
+    @property
+    def n_base(self) -> int:
+        return len(self.base)
+
+    def aggregate(self, base_values: np.ndarray) -> np.ndarray:
+        """(nodes, ...) values of every node from (base, ...) values"""
+        return self.summing_matrix @ base_values
+
+    def base_matrix(self, df: pd.DataFrame, value: str, dates: pd.DatetimeIndex) -> np.ndarray:
+        """(base, dates) matrix of df[value] summed per series and date; 0 where missing"""
+        index = pd.MultiIndex.from_frame(self.base[SERIES_KEYS])
+        series = index.get_indexer(pd.MultiIndex.from_arrays([df[col].astype(str).to_numpy() for col in SERIES_KEYS]))
+        day = dates.get_indexer(pd.to_datetime(df['date']))
+        rows = (series >= 0) & (day >= 0)
+        matrix = np.zeros((self.n_base, len(dates)))
+        np.add.at(matrix, (series[rows], day[rows]), df[value].to_numpy(dtype=float)[rows])
+        return matrix
+
+    def node_weights(self, method: str, variances: Optional[np.ndarray] = None) -> np.ndarray:
+        """Diagonal of W per node for a reconciliation method"""
+        if method == 'ols':
+            return np.ones(len(self.nodes))
+        if method == 'wls_struct':
+            return np.asarray(self.summing_matrix.sum(axis=1), dtype=float).ravel()
+        if method == 'mint':
+            if variances is None:
+                raise ValueError("MinT reconciliation needs residual variances per node")
+            return variances
+        raise ValueError(f"Unknown reconciliation method {method!r}; expected one of {METHODS}")
+
+    def reconcile(self, forecasts: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        """
+        Coherent forecasts closest to forecasts in the W^-1 norm
+
+        Args:
+            forecasts: (nodes, horizon) forecasts of every node, aggregates first
+            weights: (nodes,) diagonal of W (error variance per node)
+
+        Returns:
+            (nodes, horizon) forecasts whose aggregates equal the sums of their base series
+        """
+        if not self.n_aggregates:
+            return forecasts
+        n_agg = self.n_aggregates
+        w_agg, w_base = weights[:n_agg], weights[n_agg:]
+        S_agg = self.aggregate_matrix
+
+        # C W C' = W_agg + S_agg W_base S_agg'
+        system = (sp.diags(w_agg) + S_agg @ sp.diags(w_base) @ S_agg.T).tocsc()
+        incoherence = forecasts[:n_agg] - S_agg @ forecasts[n_agg:]
+        correction = splu(system).solve(np.ascontiguousarray(incoherence, dtype=float))
+
+        reconciled = forecasts.astype(float)
+        reconciled[:n_agg] -= w_agg[:, None] * correction
+        reconciled[n_agg:] += w_base[:, None] * (S_agg.T @ correction)
+        return reconciled
+
+
+def seasonal_naive(history: np.ndarray, horizon_days: int) -> np.ndarray:
+    """(nodes, horizon_days) mean of the last SEASON_CYCLES same weekdays"""
+    window = SEASON_DAYS * SEASON_CYCLES
+    recent = history[:, -window:]
+    if recent.shape[1] < window:
+        recent = np.pad(recent, ((0, 0), (window - recent.shape[1], 0)), constant_values=np.nan)
+    profile = np.nanmean(recent.reshape(len(history), SEASON_CYCLES, SEASON_DAYS), axis=1)
+    return np.nan_to_num(profile[:, np.arange(horizon_days) % SEASON_DAYS])
+
+
+def seasonal_naive_variance(history: np.ndarray, days: int = 90) -> np.ndarray:
+    """Variance of one-step seasonal-naive errors over the last `days` days per node"""
+    start = max(SEASON_DAYS * SEASON_CYCLES, history.shape[1] - days)
+    if start >= history.shape[1]:
+        return np.full(len(history), np.nan)
+    predicted = sum(
+        history[:, start - SEASON_DAYS * k:history.shape[1] - SEASON_DAYS * k] for k in range(1, SEASON_CYCLES + 1)
+    ) / SEASON_CYCLES
+    return np.var(history[:, start:] - predicted, axis=1)
+
+
+class HierarchicalForecaster:
+    """
+    Reconciled forecasts for every level on top of a DemandForecaster
+
+    Args:
+        forecaster: Trained DemandForecaster
+        method: 'mint' (residual variances, needs fit), 'ols' or 'wls_struct'
+        categories: Product -> category for the category levels
+        levels: Level name -> grouping columns, base level last
+        residual_days: Days of history whose one-step errors estimate the variances
+    """
+
+    def __init__(
+        self,
+        forecaster,
+        method: str = 'mint',
+        categories: Optional[Mapping[str, str]] = None,
+        levels: Dict[str, List[str]] = LEVELS,
+        residual_days: int = 90
+    ):
+        if method not in METHODS:
+            raise ValueError(f"Unknown reconciliation method {method!r}; expected one of {METHODS}")
+        self.forecaster = forecaster
+        self.method = method
+        self.categories = categories
+        self.levels = levels
+        self.residual_days = residual_days
+        self.variances: Dict[tuple, float] = {}
+
+    def _node_keys(self, hierarchy: Hierarchy) -> pd.MultiIndex:
+        columns = sorted({col for columns in self.levels.values() for col in columns})
+        return pd.MultiIndex.from_frame(hierarchy.nodes.reindex(columns=['level'] + columns).fillna('').astype(str))
+
+    def fit(self, df: pd.DataFrame) -> 'HierarchicalForecaster':
+        """
+        Residual variances per node from the history
+
+        Base series: one-step ensemble errors (DemandForecaster.predict_features)
+        over the last residual_days days; aggregates: seasonal-naive errors of
+        the aggregated history.
+        """
+        with span('hierarchy.fit'):
+            df_features = self.forecaster.create_features(df)
+            predicted = self.forecaster.predict_features(df_features)
+            hierarchy = Hierarchy.from_series(df_features, self.categories, self.levels)
+
+            dates = pd.date_range(df_features['date'].min(), df_features['date'].max(), freq='D')
+            recent = (df_features['date'] > dates[-1] - pd.Timedelta(days=self.residual_days)).to_numpy()
+            residuals = pd.DataFrame({col: df_features[col].astype(str).to_numpy()[recent] for col in SERIES_KEYS})
+            residuals['residual'] = df_features['sales_volume'].to_numpy()[recent] - predicted[recent]
+            base_index = pd.MultiIndex.from_frame(hierarchy.base[SERIES_KEYS])
+            base_variance = residuals.groupby(SERIES_KEYS)['residual'].var().reindex(base_index).to_numpy()
+
+            history = hierarchy.aggregate(hierarchy.base_matrix(df_features, 'sales_volume', dates))
+            aggregate_variance = seasonal_naive_variance(history[:hierarchy.n_aggregates], self.residual_days)
+
+            variances = np.concatenate([aggregate_variance, base_variance])
+            self.variances = dict(zip(self._node_keys(hierarchy), variances))
+        logger.info(f"Residual variances for {len(variances)} nodes ({hierarchy.n_base} base series)")
+        return self
+
+    def _weights(self, hierarchy: Hierarchy) -> np.ndarray:
+        if self.method != 'mint':
+            return hierarchy.node_weights(self.method)
+        if not self.variances:
+            raise ValueError("MinT reconciliation needs fit() first")
+
+        variances = np.array([self.variances.get(key, np.nan) for key in self._node_keys(hierarchy)])
+        # Unknown or degenerate nodes: the median variance per base series of their level, times their size
+        size = hierarchy.node_weights('wls_struct')
+        for level in hierarchy.nodes['level'].unique():
+            rows = (hierarchy.nodes['level'] == level).to_numpy()
+            known = rows & np.isfinite(variances) & (variances > 0)
+            scale = np.median(variances[known] / size[known]) if known.any() else 1.0
+            fill = rows & ~(np.isfinite(variances) & (variances > 0))
+            variances[fill] = scale * size[fill]
+        return hierarchy.node_weights('mint', variances)
+
+    def forecast(self, df: pd.DataFrame, horizon_days: int = 90, plan: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        """
+        Reconciled daily forecasts of every node
+
+        Args:
+            df: Historical data
+            horizon_days: Number of days to forecast
+            plan: Known future prices and promotions (see HorizonState)
+
+        Returns:
+            DataFrame with columns [level, <level columns>, date, forecast, unreconciled]
+        """
+        base_forecast = self.forecaster.forecast(df, horizon_days, plan)
+        series = base_forecast[SERIES_KEYS].drop_duplicates()
+        if 'category' in df.columns:
+            series = series.merge(
+                df[SERIES_KEYS + ['category']].astype(str).drop_duplicates(SERIES_KEYS), on=SERIES_KEYS, how='left'
+            )
+        hierarchy = Hierarchy.from_series(series, self.categories, self.levels)
+        dates = pd.DatetimeIndex(sorted(base_forecast['date'].unique()))
+
+        with span('hierarchy.reconcile', nodes=len(hierarchy.nodes), horizon_days=horizon_days):
+            base = hierarchy.base_matrix(base_forecast, 'predicted_volume', dates)
+
+            history_dates = pd.date_range(end=dates[0] - pd.Timedelta(days=1), periods=SEASON_DAYS * SEASON_CYCLES, freq='D')
+            recent = df[pd.to_datetime(df['date']) >= history_dates[0]]
+            history = hierarchy.aggregate_matrix @ hierarchy.base_matrix(recent, 'sales_volume', history_dates)
+
+            forecasts = np.vstack([seasonal_naive(history, len(dates)), base])
+            reconciled = hierarchy.reconcile(forecasts, self._weights(hierarchy))
+
+        nodes = hierarchy.nodes.loc[hierarchy.nodes.index.repeat(len(dates))].reset_index(drop=True)
+        return nodes.assign(
+            date=np.tile(dates.to_numpy(), len(hierarchy.nodes)),
+            forecast=reconciled.ravel(),
+            unreconciled=forecasts.ravel()
+        )
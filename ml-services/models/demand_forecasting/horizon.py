@@ -0,0 +1,235 @@
+"""
+TRADEAI Horizon Forecasting
+Recursive multi-step forecasts for every product-customer series at once
+
+State: the last HISTORY_DAYS rows of sales and prices per series in
+    (series, days) buffers; each step appends the forecast and re-derives
+    only the lag, rolling, growth, trend and lifetime features from them
+Batching: one feature row per series per step, so a model is called once
+    per horizon day for all series rather than once per day per series
+Plan: known future prices, promotions and discounts per series and date;
+    otherwise the last price and no promotion
+Features not derived from sales, prices, promotions or the calendar carry
+    each series' last observed value forward
+"""
+
+from typing import Callable, List, Optional, Tuple
+import logging
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from models.demand_forecasting.features import (
+    GROWTH_PERIODS, HISTORY_DAYS, LAGS, ROLLING_WINDOWS, TREND_WINDOWS,
+    add_calendar_features, maturity_codes, trend_slope
+)
+from models.demand_forecasting.prophet_series import SERIES_KEYS
+
+logger = logging.getLogger(__name__)
+
+
+class HorizonState:
+    """
+    Feature state of all series for a recursive forecast
+
+    Args:
+        df_features: create_features output for the history
+        feature_names: Model feature columns, in model order
+        horizon_days: Days to forecast after the last history date
+        plan: Known future rows with product_id, customer_id, date and any
+            of price, has_promotion / promotion_id, discount_percentage
+    """
+
+    def __init__(
+        self,
+        df_features: pd.DataFrame,
+        feature_names: List[str],
+        horizon_days: int,
+        plan: Optional[pd.DataFrame] = None
+    ):
+        self.feature_names = list(feature_names)
+        self.horizon_days = horizon_days
+        self.start = df_features['date'].max() + pd.Timedelta(days=1)
+        self.dates = pd.date_range(self.start, periods=horizon_days, freq='D')
+
+        df_features = df_features.sort_values('date', kind='stable')
+        codes, uniques = pd.factorize(pd.MultiIndex.from_arrays(
+            [df_features[col].astype(str).to_numpy() for col in SERIES_KEYS]
+        ))
+        self.keys: List[Tuple[str, str]] = list(uniques)
+        self.series = pd.DataFrame(self.keys, columns=SERIES_KEYS)
+        self._codes = codes
+        self._from_end = pd.Series(codes).groupby(codes).cumcount(ascending=False).to_numpy()
+
+        n_series, offset = len(self.keys), HISTORY_DAYS
+        self._offset = offset
+        self.sales = self._buffer(df_features['sales_volume'].to_numpy(dtype=float), horizon_days)
+        self.prices = self._buffer(df_features['price'].to_numpy(dtype=float), horizon_days)
+        self.forecasts = np.zeros((n_series, horizon_days))
+
+        last = df_features.iloc[np.flatnonzero(self._from_end == 0)[np.argsort(codes[self._from_end == 0])]]
+        self._carry = last.reindex(columns=self.feature_names).apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+        self._column = {name: j for j, name in enumerate(self.feature_names)}
+
+        # Future prices and promotions
+        last_price = self.prices[:, offset - 1]
+        price, promotion, discount = self._plan(plan, np.where(np.isnan(last_price), 0, last_price))
+        self.prices[:, offset:] = price
+        self.promotion, self.discount = promotion, discount
+
+        # Product price statistics and ages of the history
+        product = self.series['product_id']
+        price_stats = df_features.assign(product_id=df_features['product_id'].astype(str)).groupby('product_id')['price'].agg(['mean', 'max', 'min'])
+        self._price_stats = price_stats.reindex(product).to_numpy(dtype=float)
+        days_since_last = (self.dates.to_numpy()[None, :] - last['date'].to_numpy()[:, None]) / np.timedelta64(1, 'D')
+        self._age = self._last('product_age_days')[:, None] + days_since_last
+
+        # Promotion counters over the horizon
+        self._days_since_promo = self._last('days_since_last_promo')[:, None] + np.cumsum(promotion == 0, axis=1)
+        self._days_until_promo = np.cumsum(promotion[:, ::-1], axis=1)[:, ::-1]
+
+        # Totals before the first horizon day include the last history day
+        last_sales = np.nan_to_num(self.sales[:, offset - 1])
+        last_revenue = np.nan_to_num(last['sales_revenue'].to_numpy(dtype=float)) if 'sales_revenue' in last else last_sales * last_price
+        self._lifetime_sales = np.nan_to_num(self._last('customer_lifetime_sales')) + last_sales
+        self._lifetime_revenue = np.nan_to_num(self._last('customer_lifetime_revenue')) + np.nan_to_num(last_revenue)
+
+        self._calendar = add_calendar_features(pd.DataFrame({'date': self.dates}))
+        self._history = df_features
+
+    def _buffer(self, values: np.ndarray, extra: int) -> np.ndarray:
+        """(series, HISTORY_DAYS + extra) buffer with each series' last rows right-aligned before the extra days"""
+        buffer = np.full((len(self.keys), self._offset + extra), np.nan)
+        rows = self._from_end < self._offset
+        buffer[self._codes[rows], self._offset - 1 - self._from_end[rows]] = values[rows]
+        return buffer
+
+    def _last(self, name: str) -> np.ndarray:
+        if name in self._column:
+            return self._carry[:, self._column[name]]
+        return np.zeros(len(self.keys))
+
+    def _plan(self, plan: Optional[pd.DataFrame], last_price: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        shape = (len(self.keys), self.horizon_days)
+        price = np.repeat(last_price[:, None], self.horizon_days, axis=1)
+        promotion, discount = np.zeros(shape), np.zeros(shape)
+        if plan is None or not len(plan):
+            return price, promotion, discount
+
+        index = pd.MultiIndex.from_tuples(self.keys)
+        series = index.get_indexer(pd.MultiIndex.from_arrays([plan[col].astype(str).to_numpy() for col in SERIES_KEYS]))
+        day = ((pd.to_datetime(plan['date']) - self.start) / pd.Timedelta(days=1)).to_numpy()
+        rows = np.flatnonzero((series >= 0) & (day >= 0) & (day < self.horizon_days))
+        series, day = series[rows], day[rows].astype(int)
+
+        if 'price' in plan:
+            values = plan['price'].to_numpy(dtype=float)[rows]
+            known = ~np.isnan(values)
+            price[series[known], day[known]] = values[known]
+        if 'has_promotion' in plan:
+            promotion[series, day] = plan['has_promotion'].to_numpy(dtype=float)[rows]
+        elif 'promotion_id' in plan:
+            promotion[series, day] = plan['promotion_id'].notna().to_numpy(dtype=float)[rows]
+        if 'discount_percentage' in plan:
+            discount[series, day] = np.nan_to_num(plan['discount_percentage'].to_numpy(dtype=float)[rows])
+        return price, promotion, discount
+
+    def regressors(self) -> dict:
+        """Prophet regressors for ProphetSeries.forecast, shaped (series, horizon_days)"""
+        return {
+            'price': self.prices[:, self._offset:],
+            'has_promotion': self.promotion,
+            'is_weekend': self._calendar['is_weekend'].to_numpy(dtype=float)[None, :],
+            'is_holiday': self._calendar['is_holiday'].to_numpy(dtype=float)[None, :]
+        }
+
+    def windows(self, length: int, transform: Callable[[pd.DataFrame], np.ndarray]) -> np.ndarray:
+        """(series, length, features) transformed feature rows ending at each series' last history day"""
+        rows = np.flatnonzero(self._from_end < length)
+        matrix = np.asarray(transform(self._history.iloc[rows][self.feature_names]), dtype=np.float32)
+        windows = np.zeros((len(self.keys), length, len(self.feature_names)), dtype=np.float32)
+        windows[self._codes[rows], length - 1 - self._from_end[rows]] = matrix
+        return windows
+
+    def features(self, h: int) -> pd.DataFrame:
+        """Feature rows of all series for horizon day h (0-based), given forecasts for days before h"""
+        t = self._offset + h
+        sales, prices = self.sales, self.prices
+        price = prices[:, t]
+        product_mean, product_max, product_min = self._price_stats.T
+
+        columns = {
+            'price': price,
+            'price_change': price - prices[:, t - 1],
+            'price_vs_avg': price / product_mean,
+            'price_relative_max': price / product_max,
+            'price_relative_min': price / product_min,
+            'has_promotion': self.promotion[:, h],
+            'days_since_last_promo': self._days_since_promo[:, h],
+            'days_until_next_promo': self._days_until_promo[:, h],
+            'discount_depth': self.discount[:, h],
+            'discount_amount': price * self.discount[:, h] / 100,
+            'customer_lifetime_sales': self._lifetime_sales,
+            'customer_lifetime_revenue': self._lifetime_revenue,
+            'product_age_days': self._age[:, h],
+            'product_maturity_encoded': maturity_codes(self._age[:, h])
+        }
+        with np.errstate(divide='ignore', invalid='ignore'), warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            columns['price_change_pct'] = price / prices[:, t - 1] - 1
+            for lag in LAGS:
+                columns[f'sales_lag_{lag}'] = sales[:, t - lag]
+                columns[f'price_lag_{lag}'] = prices[:, t - lag]
+            for window in ROLLING_WINDOWS:
+                prior = sales[:, t - window:t]
+                columns[f'sales_roll_mean_{window}'] = np.nanmean(prior, axis=1)
+                columns[f'sales_roll_std_{window}'] = np.nanstd(prior, axis=1, ddof=1)
+                columns[f'sales_roll_min_{window}'] = np.nanmin(prior, axis=1)
+                columns[f'sales_roll_max_{window}'] = np.nanmax(prior, axis=1)
+                columns[f'price_roll_mean_{window}'] = np.nanmean(prices[:, t - window + 1:t + 1], axis=1)
+            for name, periods in GROWTH_PERIODS.items():
+                columns[name] = sales[:, t - 1] / sales[:, t - 1 - periods] - 1
+            for window in TREND_WINDOWS:
+                columns[f'sales_trend_{window}'] = trend_slope(sales[:, t - window:t])
+
+        for name in self._calendar.columns.drop('date'):
+            columns[name] = np.full(len(self.keys), self._calendar[name].iloc[h], dtype=float)
+
+        matrix = self._carry.copy()
+        for name, values in columns.items():
+            j = self._column.get(name)
+            if j is not None:
+                values = np.asarray(values, dtype=float)
+                matrix[:, j] = np.where(np.isnan(values), matrix[:, j], values)
+        return pd.DataFrame(np.nan_to_num(matrix, nan=0.0, posinf=np.inf, neginf=-np.inf), columns=self.feature_names)
+
+    def advance(self, h: int, values: np.ndarray):
+        """Record the forecasts for horizon day h as the sales history of the next steps"""
+        t = self._offset + h
+        self.sales[:, t] = values
+        self.forecasts[:, h] = values
+        self._lifetime_sales = self._lifetime_sales + values
+        self._lifetime_revenue = self._lifetime_revenue + values * self.prices[:, t]
+
+    def frame(self) -> pd.DataFrame:
+        """Forecasts as rows [date, product_id, customer_id, predicted_volume]"""
+        n_series = len(self.keys)
+        return pd.DataFrame({
+            'date': np.tile(self.dates.to_numpy(), n_series),
+            'product_id': np.repeat(self.series['product_id'].to_numpy(), self.horizon_days),
+            'customer_id': np.repeat(self.series['customer_id'].to_numpy(), self.horizon_days),
+            'predicted_volume': self.forecasts.ravel()
+        })
+
+
+def recursive_forecast(state: HorizonState, predict_step: Callable[[int, pd.DataFrame], np.ndarray]) -> pd.DataFrame:
+    """
+    Roll a one-step model forward over the horizon
+
+    predict_step(h, features) returns the forecast of every series for
+    horizon day h from that day's feature rows; it is called once per day.
+    """
+    for h in range(state.horizon_days):
+        state.advance(h, np.asarray(predict_step(h, state.features(h)), dtype=float))
+    return state.frame()
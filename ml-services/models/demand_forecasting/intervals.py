@@ -0,0 +1,272 @@
+"""
+TRADEAI Forecast Intervals
+Conformal prediction intervals from errors stored at training time
+
+Errors: relative one-step errors y / prediction - 1 of the out-of-fold
+    ensemble predictions, so one table serves series of any size
+Quantiles: split-conformal order statistics on a fixed grid (QUANTILES),
+    per ensemble segment plus a default and a table for daily totals
+Lead times: the same tables per lead-time bucket (LEAD_TIME_BUCKETS) from
+    recursive forecasts over the validation window, so multi-day horizons
+    get their own error spread; beyond the longest backtested lead the last
+    bucket widens with the square root of the lead time
+Lookup: any confidence level in [0.5, 0.99] interpolates its quantile pair
+    from the grid, vectorized over rows, with no extra model passes
+"""
+
+from typing import Any, Dict, Optional, Tuple, Union
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+QUANTILES = np.array([
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.15, 0.2, 0.25, 0.5,
+    0.75, 0.8, 0.85, 0.9, 0.95, 0.975, 0.99, 0.995
+])
+MIN_TOTAL_DAYS = 20
+# Last lead day (1 = first forecast day) of each lead-time bucket
+LEAD_TIME_BUCKETS = (1, 7, 14, 30, 60, 90)
+
+
+def conformal_quantiles(errors: np.ndarray) -> np.ndarray:
+    """
+    Split-conformal quantiles of errors on the QUANTILES grid
+
+    Upper levels q take order statistic ceil((n + 1) q), lower levels
+    floor((n + 1) q), so each side keeps its coverage in finite samples.
+    """
+    errors = np.sort(errors[np.isfinite(errors)])
+    n = len(errors)
+    if n == 0:
+        return np.zeros(len(QUANTILES))
+    rank = np.where(QUANTILES >= 0.5, np.ceil((n + 1) * QUANTILES), np.floor((n + 1) * QUANTILES))
+    return errors[np.clip(rank.astype(int), 1, n) - 1]
+
+
+def relative_errors(y: np.ndarray, predictions: np.ndarray) -> np.ndarray:
+    """y / prediction - 1; NaN where the prediction is not positive"""
+    predictions = np.asarray(predictions, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(predictions > 0, np.asarray(y, dtype=float) / predictions - 1, np.nan)
+
+
+class ConformalIntervals:
+    """
+    Relative error quantiles per segment, for daily totals and as a default
+
+    Args:
+        default: Quantiles for rows outside a fitted segment
+        segments: Segment -> quantiles
+        total: Quantiles for totals over all series per day (default if None)
+        lead_times: Last lead day of a bucket -> ConformalIntervals of the
+            errors at those lead times (see fit_lead_times)
+        max_lead: Longest backtested lead time
+    """
+
+    def __init__(
+        self,
+        default: Any,
+        segments: Optional[Dict[str, Any]] = None,
+        total: Optional[Any] = None,
+        lead_times: Optional[Dict[int, 'ConformalIntervals']] = None,
+        max_lead: int = 0
+    ):
+        self.default = np.asarray(default, dtype=float)
+        self.segments = {segment: np.asarray(q, dtype=float) for segment, q in (segments or {}).items()}
+        self.total = np.asarray(total, dtype=float) if total is not None else self.default
+        self.lead_times = dict(sorted((int(days), table) for days, table in (lead_times or {}).items()))
+        self.max_lead = max_lead
+        self._index = pd.Index(list(self.segments), dtype=object)
+        self._table = np.vstack([self.segments[segment] for segment in self._index] + [self.default])
+
+    @classmethod
+    def fit(
+        cls,
+        predictions: np.ndarray,
+        y: np.ndarray,
+        segments: Optional[np.ndarray] = None,
+        dates: Optional[np.ndarray] = None,
+        min_rows: int = 200
+    ) -> 'ConformalIntervals':
+        """
+        Quantiles from out-of-sample predictions
+
+        Args:
+            predictions: Out-of-sample (e.g. out-of-fold) predictions
+            y: Actual values
+            segments: Segment label per row; smaller segments than min_rows use the default
+            dates: Date per row, for the daily total quantiles
+        """
+        intervals = cls(*cls._tables(predictions, y, segments, dates, min_rows))
+        lower, upper = intervals.levels(0.95, intervals.default[None, :])
+        logger.info(f"Conformal intervals: 95% relative band [{lower[0]:+.1%}, {upper[0]:+.1%}], {len(intervals.segments)} segment(s)")
+        return intervals
+
+    @staticmethod
+    def _tables(
+        predictions: np.ndarray,
+        y: np.ndarray,
+        segments: Optional[np.ndarray],
+        dates: Optional[np.ndarray],
+        min_rows: int
+    ) -> Tuple[np.ndarray, Dict[str, np.ndarray], Optional[np.ndarray]]:
+        """Default, per-segment and daily total quantiles"""
+        errors = relative_errors(y, predictions)
+        default = conformal_quantiles(errors)
+
+        fitted = {}
+        if segments is not None:
+            labels = pd.Series(segments, dtype=object)
+            for segment, rows in labels.groupby(labels, sort=False).indices.items():
+                if len(rows) >= min_rows:
+                    fitted[str(segment)] = conformal_quantiles(errors[rows])
+
+        total = None
+        if dates is not None:
+            daily = pd.DataFrame({'date': dates, 'y': y, 'prediction': predictions}).groupby('date')[['y', 'prediction']].sum()
+            if len(daily) >= MIN_TOTAL_DAYS:
+                total = conformal_quantiles(relative_errors(daily['y'].to_numpy(), daily['prediction'].to_numpy()))
+        return default, fitted, total
+
+    def fit_lead_times(
+        self,
+        predictions: np.ndarray,
+        y: np.ndarray,
+        lead_times: np.ndarray,
+        segments: Optional[np.ndarray] = None,
+        days: Optional[np.ndarray] = None,
+        min_rows: int = 200
+    ) -> 'ConformalIntervals':
+        """
+        Quantiles per lead-time bucket from recursive (multi-step) forecasts
+
+        Args:
+            predictions: Recursive forecasts, e.g. from several origins in the validation window
+            y: Actual values
+            lead_times: Days ahead of each forecast (1 = first forecast day)
+            segments: Segment label per row; smaller segments than min_rows use the bucket default
+            days: Key of the forecast day per row (e.g. origin and date), for the daily total quantiles
+        """
+        predictions, y, lead_times = np.asarray(predictions, dtype=float), np.asarray(y, dtype=float), np.asarray(lead_times)
+        bucket = np.searchsorted(LEAD_TIME_BUCKETS, lead_times)
+        self.lead_times = {}
+        for b, last_day in enumerate(LEAD_TIME_BUCKETS):
+            rows = np.flatnonzero(bucket == b)
+            if len(rows):
+                self.lead_times[last_day] = ConformalIntervals(*self._tables(
+                    predictions[rows],
+                    y[rows],
+                    segments[rows] if segments is not None else None,
+                    days[rows] if days is not None else None,
+                    min_rows
+                ))
+        self.max_lead = int(lead_times.max()) if len(lead_times) else 0
+
+        for last_day, table in self.lead_times.items():
+            lower, upper = self.levels(0.95, table.default[None, :])
+            logger.info(f"Conformal intervals, lead times <= {last_day}d: 95% relative band [{lower[0]:+.1%}, {upper[0]:+.1%}]")
+        return self
+
+    @staticmethod
+    def levels(confidence_level: Union[float, np.ndarray], table: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Lower and upper relative errors per table row for (per-row) confidence levels"""
+        confidence_level = np.clip(np.asarray(confidence_level, dtype=float), 0, QUANTILES[-1] * 2 - 1)
+
+        def interpolate(q):
+            i = np.clip(np.searchsorted(QUANTILES, q) - 1, 0, len(QUANTILES) - 2)
+            fraction = np.clip((q - QUANTILES[i]) / (QUANTILES[i + 1] - QUANTILES[i]), 0, 1)
+            rows = np.arange(len(table))
+            return table[rows, i] * (1 - fraction) + table[rows, i + 1] * fraction
+
+        return interpolate((1 - confidence_level) / 2), interpolate((1 + confidence_level) / 2)
+
+    def _segment_table(self, n: int, segments: Optional[np.ndarray]) -> np.ndarray:
+        """(rows, quantiles) of each row's segment"""
+        if segments is None:
+            rows = np.full(n, len(self._index))
+        else:
+            rows = self._index.get_indexer(pd.Index(segments, dtype=object))
+            rows[rows < 0] = len(self._index)
+        return self._table[rows]
+
+    def _lead_table(self, table: np.ndarray, lead_times: Optional[np.ndarray], lookup) -> np.ndarray:
+        """
+        Replace the rows of a one-step table by their lead-time bucket's
+        (lookup(bucket table, rows)), widened by sqrt(lead / max_lead) past
+        the longest backtested lead
+        """
+        if lead_times is None or not self.lead_times:
+            return table
+        lead_times = np.asarray(lead_times)
+        days = np.array(list(self.lead_times))
+        bucket = np.minimum(np.searchsorted(days, lead_times), len(days) - 1)
+        table = table.copy()
+        for b, bucket_table in enumerate(self.lead_times.values()):
+            rows = np.flatnonzero(bucket == b)
+            if len(rows):
+                table[rows] = lookup(bucket_table, rows)
+        widen = np.sqrt(np.maximum(lead_times / max(self.max_lead, 1), 1))
+        return np.maximum(table * widen[:, None], -1)
+
+    def bounds(
+        self,
+        predictions: np.ndarray,
+        confidence_level: Union[float, np.ndarray] = 0.95,
+        segments: Optional[np.ndarray] = None,
+        lead_times: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Interval bounds for predictions
+
+        Args:
+            predictions: Point forecasts
+            confidence_level: Scalar or per-row confidence levels
+            segments: Segment label per row (default quantiles where None or unknown)
+            lead_times: Days ahead per row (1 = first forecast day); one-step
+                quantiles when None or without lead-time tables
+        """
+        predictions = np.asarray(predictions, dtype=float)
+        table = self._lead_table(
+            self._segment_table(len(predictions), segments),
+            lead_times,
+            lambda bucket, rows: bucket._segment_table(len(rows), segments[rows] if segments is not None else None)
+        )
+        lower, upper = self.levels(confidence_level, table)
+        return predictions * (1 + lower), predictions * (1 + upper)
+
+    def total_bounds(
+        self,
+        totals: np.ndarray,
+        confidence_level: float = 0.95,
+        lead_times: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Interval bounds for totals over all series per day (lead_times as in bounds)"""
+        totals = np.asarray(totals, dtype=float)
+        table = self._lead_table(
+            np.broadcast_to(self.total, (len(totals), len(QUANTILES))),
+            lead_times,
+            lambda bucket, rows: bucket.total
+        )
+        lower, upper = self.levels(confidence_level, table)
+        return totals * (1 + lower), totals * (1 + upper)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'quantiles': QUANTILES.tolist(),
+            'default': self.default.tolist(),
+            'segments': {segment: q.tolist() for segment, q in self.segments.items()},
+            'total': self.total.tolist(),
+            'lead_times': {str(days): table.to_dict() for days, table in self.lead_times.items()},
+            'max_lead': self.max_lead
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ConformalIntervals':
+        if not np.allclose(data['quantiles'], QUANTILES):
+            raise ValueError("Stored interval quantiles use a different grid")
+        # Versions saved before lead-time tables have one-step quantiles only
+        lead_times = {int(days): cls.from_dict(table) for days, table in data.get('lead_times', {}).items()}
+        return cls(data['default'], data['segments'], data['total'], lead_times, data.get('max_lead', 0))
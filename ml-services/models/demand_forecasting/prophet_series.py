@@ -0,0 +1,388 @@
+"""
+TRADEAI Per-Series Prophet
+One Prophet model per product-customer series, fitted in a process pool
+
+Fitting: spawned workers import Prophet and load its precompiled Stan model
+    once, then fit chunks of series (MAP, linear growth)
+Cache: {cache_dir}/{series hash}.json holds the fitted parameters, reused
+    while the series history and config are unchanged and used to
+    warm-start the optimizer otherwise
+Prediction: trend, Fourier seasonality and regressor terms evaluated from
+    the stored parameters for all rows of all series at once; equal to
+    Prophet.predict()['yhat'] without a Prophet object per series
+"""
+
+import hashlib
+import json
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+SERIES_KEYS = ['product_id', 'customer_id']
+REGRESSORS = ['price', 'has_promotion', 'is_weekend', 'is_holiday']
+DAY_SECONDS = 24 * 60 * 60
+MIN_SERIES_PER_WORKER = 8
+
+# Hyperparameters passed to Prophet; the rest of the config only controls fitting
+PROPHET_DEFAULTS = {
+    'seasonality_mode': 'multiplicative',
+    'yearly_seasonality': True,
+    'weekly_seasonality': True,
+    'daily_seasonality': False,
+    'changepoint_prior_scale': 0.05
+}
+
+
+def prophet_kwargs(config: Dict) -> Dict[str, Any]:
+    return {name: config.get(name, default) for name, default in PROPHET_DEFAULTS.items()}
+
+
+def series_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Daily sales per product-customer series with the Prophet regressors"""
+    agg = {'sales_volume': 'sum'}
+    for col in REGRESSORS:
+        if col in df.columns:
+            agg[col] = 'mean' if col == 'price' else 'max'
+    return df.groupby(SERIES_KEYS + ['date'], observed=True).agg(agg).reset_index()
+
+
+def extract_params(model) -> Dict[str, Any]:
+    """JSON-serializable parameters that determine yhat of a fitted Prophet"""
+    if model.growth != 'linear' or model.logistic_floor or model.holidays is not None:
+        raise ValueError("Only linear growth without holidays is supported")
+
+    return {
+        'start': model.start.isoformat(),
+        't_scale': model.t_scale.total_seconds(),
+        'y_scale': float(model.y_scale),
+        'floor': float(model.y_min) if model.scaling == 'minmax' else 0.0,
+        'changepoints_t': np.asarray(model.changepoints_t, dtype=float).tolist(),
+        'k': float(np.nanmean(model.params['k'])),
+        'm': float(np.nanmean(model.params['m'])),
+        'delta': np.nanmean(model.params['delta'], axis=0).tolist(),
+        'beta': np.nanmean(model.params['beta'], axis=0).tolist(),
+        'sigma_obs': float(np.nanmean(model.params['sigma_obs'])),
+        # Feature column order of Prophet.make_all_seasonality_features
+        'seasonalities': [
+            [props['period'], props['fourier_order']] for props in model.seasonalities.values()
+        ],
+        'regressors': [
+            [name, float(props['mu']), float(props['std'])] for name, props in model.extra_regressors.items()
+        ],
+        'multiplicative': model.train_component_cols['multiplicative_terms'].astype(int).tolist(),
+        'additive': model.train_component_cols['additive_terms'].astype(int).tolist()
+    }
+
+
+def warm_start(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Stan initial values from previously fitted parameters"""
+    return {
+        'k': params['k'],
+        'm': params['m'],
+        'delta': np.asarray(params['delta']),
+        'beta': np.asarray(params['beta']),
+        'sigma_obs': params['sigma_obs']
+    }
+
+
+def fit_series(history: pd.DataFrame, config: Dict, init: Optional[Dict] = None) -> Dict[str, Any]:
+    """Fit Prophet to one series [date, sales_volume, regressors...] and return its parameters"""
+    from prophet import Prophet
+
+    model = Prophet(uncertainty_samples=0, **prophet_kwargs(config))
+    for col in REGRESSORS:
+        if col in history.columns:
+            model.add_regressor(col)
+
+    frame = history.rename(columns={'date': 'ds', 'sales_volume': 'y'})
+    if init is not None:
+        model.fit(frame, init=warm_start(init))
+    else:
+        model.fit(frame)
+    return extract_params(model)
+
+
+def _init_worker():
+    """Pool initializer: quiet Stan logging and load the compiled model once per process"""
+    logging.getLogger('cmdstanpy').setLevel(logging.WARNING)
+    logging.getLogger('prophet').setLevel(logging.WARNING)
+    from prophet.models import CmdStanPyBackend
+    CmdStanPyBackend()
+
+
+def _fit_task(task: Tuple[pd.DataFrame, Dict, Optional[Dict]]) -> Dict[str, Any]:
+    try:
+        return fit_series(*task)
+    except Exception as e:
+        return {'error': f"{type(e).__name__}: {e}"}
+
+
+class ParamCache:
+    """
+    Fitted parameters per series on disk
+
+    Args:
+        directory: Cache directory (created if needed)
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: Tuple[str, str]) -> Path:
+        return self.directory / f"{hashlib.sha1(json.dumps(key).encode()).hexdigest()}.json"
+
+    def get(self, key: Tuple[str, str]) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        if not path.exists():
+            return None
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key: Tuple[str, str], fingerprint: str, params: Dict[str, Any]):
+        path = self._path(key)
+        tmp = path.with_suffix('.tmp')
+        with open(tmp, 'w') as f:
+            json.dump({'key': list(key), 'fingerprint': fingerprint, 'params': params}, f)
+        tmp.replace(path)
+
+
+def fingerprint(history: pd.DataFrame, config: Dict) -> str:
+    digest = hashlib.sha1(pd.util.hash_pandas_object(history, index=False).to_numpy().tobytes())
+    digest.update(json.dumps(prophet_kwargs(config), sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+class ProphetSeries:
+    """
+    Fitted Prophet parameters for many series, evaluated in one pass
+
+    Args:
+        params: (product_id, customer_id) -> parameters from extract_params
+    """
+
+    def __init__(self, params: Dict[Tuple[str, str], Dict[str, Any]]):
+        self.params = params
+        self.keys = list(params)
+        self._index = pd.MultiIndex.from_tuples(self.keys, names=SERIES_KEYS) if self.keys else None
+        self._groups = None
+
+    @classmethod
+    def fit(
+        cls,
+        df_series: pd.DataFrame,
+        config: Optional[Dict] = None,
+        n_jobs: int = 1,
+        cache_dir: Optional[Path] = None,
+        min_history: int = 30
+    ) -> 'ProphetSeries':
+        """
+        Fit every series with at least min_history days
+
+        Args:
+            df_series: Output of series_frame
+            config: Prophet hyperparameters (see PROPHET_DEFAULTS)
+            n_jobs: Worker processes (1 fits in this process)
+            cache_dir: Parameter cache directory
+            min_history: Shorter series get no model
+
+        Returns:
+            ProphetSeries; series that fail to fit are logged and left out
+        """
+        config = config or {}
+        cache = ParamCache(cache_dir) if cache_dir else None
+        regressors = [col for col in REGRESSORS if col in df_series.columns]
+        start = time.perf_counter()
+
+        params, keys, tasks, fingerprints = {}, [], [], []
+        for (product, customer), history in df_series.groupby(SERIES_KEYS, observed=True, sort=False):
+            if len(history) < min_history:
+                continue
+            key = (str(product), str(customer))
+            history = history[['date', 'sales_volume'] + regressors].reset_index(drop=True)
+            digest = fingerprint(history, config) if cache else None
+            entry = cache.get(key) if cache else None
+            if entry is not None and entry['fingerprint'] == digest:
+                params[key] = entry['params']
+                continue
+            keys.append(key)
+            fingerprints.append(digest)
+            tasks.append((history, config, entry['params'] if entry else None))
+
+        cached = len(params)
+        # Worker start-up (interpreter, Prophet and Stan imports) is amortized over several series
+        workers = max(1, min(n_jobs, len(tasks) // MIN_SERIES_PER_WORKER))
+        if workers == 1:
+            results = map(_fit_task, tasks)
+        else:
+            pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker
+            )
+            results = pool.map(_fit_task, tasks, chunksize=max(1, len(tasks) // (workers * 4)))
+
+        failed = 0
+        try:
+            for key, digest, result in zip(keys, fingerprints, results):
+                if 'error' in result:
+                    failed += 1
+                    logger.warning(f"Prophet fit failed for series {key}: {result['error']}")
+                    continue
+                params[key] = result
+                if cache:
+                    cache.put(key, digest, result)
+        finally:
+            if workers > 1:
+                pool.shutdown()
+
+        logger.info(
+            f"Prophet: {len(params)} series ({cached} from cache, {len(tasks) - failed} fitted, "
+            f"{failed} failed) with {workers} worker(s) in {time.perf_counter() - start:.1f}s"
+        )
+        return cls(params)
+
+    def _build_groups(self) -> List[Dict[str, Any]]:
+        """Stack parameters of series that share a feature layout"""
+        layouts: Dict[str, List[int]] = {}
+        for i, key in enumerate(self.keys):
+            p = self.params[key]
+            layout = json.dumps([p['seasonalities'], [r[0] for r in p['regressors']], p['multiplicative'], p['additive']])
+            layouts.setdefault(layout, []).append(i)
+
+        groups = []
+        for members in layouts.values():
+            series = [self.params[self.keys[i]] for i in members]
+            first = series[0]
+            n_changepoints = max(len(p['changepoints_t']) for p in series)
+            changepoints = np.full((len(series), n_changepoints), np.inf)
+            delta = np.zeros((len(series), n_changepoints))
+            for j, p in enumerate(series):
+                changepoints[j, :len(p['changepoints_t'])] = p['changepoints_t']
+                delta[j, :len(p['delta'])] = p['delta']
+
+            position = np.full(len(self.keys), -1)
+            position[members] = np.arange(len(members))
+            groups.append({
+                'position': position,
+                'start': np.array([pd.Timestamp(p['start']).value for p in series], dtype=np.int64),
+                't_scale': np.array([p['t_scale'] for p in series]) * 1e9,
+                'y_scale': np.array([p['y_scale'] for p in series]),
+                'floor': np.array([p['floor'] for p in series]),
+                'k': np.array([p['k'] for p in series]),
+                'm': np.array([p['m'] for p in series]),
+                'changepoints': changepoints,
+                'delta': delta,
+                'beta': np.array([p['beta'] for p in series]),
+                'mu': np.array([[r[1] for r in p['regressors']] for p in series]).reshape(len(series), -1),
+                'std': np.array([[r[2] for r in p['regressors']] for p in series]).reshape(len(series), -1),
+                'seasonalities': first['seasonalities'],
+                'regressors': [r[0] for r in first['regressors']],
+                'multiplicative': np.array(first['multiplicative'], dtype=float),
+                'additive': np.array(first['additive'], dtype=float)
+            })
+        return groups
+
+    def predict(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        yhat for every row of df
+
+        Args:
+            df: Rows with product_id, customer_id, date and the regressor
+                columns of the fitted models
+
+        Returns:
+            Predictions aligned with df; NaN for series without a model
+        """
+        result = np.full(len(df), np.nan)
+        if self._index is None or not len(df):
+            return result
+        if self._groups is None:
+            self._groups = self._build_groups()
+
+        rows_index = pd.MultiIndex.from_arrays([df[col].astype(str).to_numpy() for col in SERIES_KEYS])
+        series = self._index.get_indexer(rows_index)
+        dates = pd.to_datetime(df['date']).to_numpy(dtype='datetime64[ns]').astype(np.int64)
+
+        for group in self._groups:
+            position = np.where(series >= 0, group['position'][series], -1)
+            rows = np.flatnonzero(position >= 0)
+            if not len(rows):
+                continue
+            s = position[rows]
+
+            # Piecewise-linear trend
+            t = (dates[rows] - group['start'][s]) / group['t_scale'][s]
+            active = group['changepoints'][s] <= t[:, None]
+            k = group['k'][s] + (active * group['delta'][s]).sum(axis=1)
+            m = group['m'][s] - (active * group['delta'][s] * np.where(active, group['changepoints'][s], 0)).sum(axis=1)
+            trend = (k * t + m) * group['y_scale'][s] + group['floor'][s]
+
+            # Seasonality (Fourier terms of days since epoch) and standardized regressors
+            days = dates[rows] / 1e9 / DAY_SECONDS
+            features = []
+            for period, order in group['seasonalities']:
+                for i in range(order):
+                    angle = 2 * np.pi * (i + 1) / period * days
+                    features += [np.sin(angle), np.cos(angle)]
+            for j, name in enumerate(group['regressors']):
+                features.append((df[name].to_numpy(dtype=float)[rows] - group['mu'][s, j]) / group['std'][s, j])
+            X = np.column_stack(features) if features else np.zeros((len(rows), 0))
+
+            terms = X * group['beta'][s]
+            multiplicative = terms @ group['multiplicative']
+            additive = terms @ group['additive'] * group['y_scale'][s]
+            result[rows] = trend * (1 + multiplicative) + additive
+
+        return result
+
+    def forecast(
+        self,
+        keys: List[Tuple[str, str]],
+        start,
+        horizon_days: int,
+        regressors: Optional[Dict[str, Any]] = None
+    ) -> np.ndarray:
+        """
+        Daily forecasts for several series over the same horizon
+
+        Args:
+            keys: (product_id, customer_id) per series
+            start: First forecast date
+            horizon_days: Days per series
+            regressors: Name -> scalar, (series,) or (series, horizon_days) values
+
+        Returns:
+            (len(keys), horizon_days) array; NaN rows for unknown series
+        """
+        dates = pd.date_range(pd.Timestamp(start), periods=horizon_days, freq='D')
+        shape = (len(keys), horizon_days)
+        frame = {
+            'product_id': np.repeat([key[0] for key in keys], horizon_days),
+            'customer_id': np.repeat([key[1] for key in keys], horizon_days),
+            'date': np.tile(dates.to_numpy(), len(keys))
+        }
+        for name, values in (regressors or {}).items():
+            values = np.asarray(values, dtype=float)
+            if values.ndim == 1:
+                values = values[:, None]
+            frame[name] = np.broadcast_to(values, shape).ravel()
+        return self.predict(pd.DataFrame(frame)).reshape(shape)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'series': [{'key': list(key), 'params': self.params[key]} for key in self.keys]}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ProphetSeries':
+        return cls({tuple(item['key']): item['params'] for item in data['series']})
@@ -33,6 +33,8 @@ from sklearn.linear_model import LinearRegression
 import mlflow
 import mlflow.sklearn
 
+from models.common.tracing import traced
+
 logger = logging.getLogger(__name__)
 
 
@@ -131,6 +133,7 @@ class BayesianPriceOptimizer:
         
         return profit
     
+    @traced()
     def optimize(
         self,
         current_price: float,
@@ -379,6 +382,7 @@ class ReinforcementLearningPricer:
         
         return self.agent
     
+    @traced()
     def predict_optimal_price(self, current_state: Dict) -> Dict:
         """
         Predict optimal price using trained RL agent
@@ -477,6 +481,57 @@ class PriceOptimizer:
             
             logger.info("Price optimization training complete")
     
+    def save(self, store, metadata: Optional[Dict] = None) -> str:
+        """
+        Save the trained optimizer as a new 'price_optimization' artifact version
+        
+        Files: elasticity table (JSON), PPO agent (zip) when RL was trained
+        
+        Args:
+            store: ArtifactStore (models/common/artifacts.py)
+            metadata: Extra manifest metadata
+            
+        Returns:
+            Published version
+        """
+        if self.elasticity_model.elasticity is None:
+            raise ValueError("Model not trained. Call train() first.")
+        
+        methods = [name for name, trained in (('bayesian', self.bayesian_optimizer), ('rl', self.rl_pricer)) if trained]
+        
+        with store.create('price_optimization', {'methods': methods, **(metadata or {})}) as artifact:
+            artifact.save_json('optimizer', {'config': self.config, 'methods': methods})
+            artifact.save_json('elasticity', {
+                'elasticity': float(self.elasticity_model.elasticity),
+                'intercept': float(self.elasticity_model.model.intercept_)
+            })
+            if self.rl_pricer is not None:
+                self.rl_pricer.agent.save(artifact.file('rl_pricing_model.zip'))
+        
+        return artifact.version
+    
+    @classmethod
+    def load(cls, artifact) -> 'PriceOptimizer':
+        """Restore an optimizer from an artifact version"""
+        state = artifact.load_json('optimizer')
+        optimizer = cls(state['config'])
+        
+        table = artifact.load_json('elasticity')
+        elasticity_model = optimizer.elasticity_model
+        elasticity_model.elasticity = table['elasticity']
+        elasticity_model.model.coef_ = np.array([table['elasticity']])
+        elasticity_model.model.intercept_ = table['intercept']
+        elasticity_model.model.n_features_in_ = 1
+        
+        if 'bayesian' in state['methods']:
+            optimizer.bayesian_optimizer = BayesianPriceOptimizer(elasticity_model)
+        if 'rl' in state['methods']:
+            optimizer.rl_pricer = ReinforcementLearningPricer(elasticity_model)
+            optimizer.rl_pricer.agent = PPO.load(artifact.file('rl_pricing_model.zip'))
+        
+        return optimizer
+    
+    @traced()
     def optimize(
         self,
         product_id: str,
@@ -25,6 +25,8 @@ from sklearn.preprocessing import StandardScaler
 # MLOps
 import mlflow
 
+from models.common.tracing import traced
+
 logger = logging.getLogger(__name__)
 
 
@@ -45,6 +47,7 @@ class PromotionLiftAnalyzer:
         # Initialize MLflow
         mlflow.set_experiment(config.get('experiment_name', 'promotion-lift'))
     
+    @traced()
     def analyze_promotion(
         self,
         promotion_id: str,
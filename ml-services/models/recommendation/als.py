@@ -0,0 +1,464 @@
+"""
+TRADEAI Implicit-Feedback ALS
+Matrix factorization for implicit interaction signals (purchase counts, affinity)
+
+Method: Weighted ALS (Hu, Koren & Volinsky 2008) with conjugate-gradient solves
+Input: CSR user x item confidence matrix built from interaction counts
+Scale: Millions of interactions on a single box (block-parallel, float32)
+Update: Daily incremental fold-in of new users, items and interactions
+"""
+
+import os
+import time
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Tuple, Optional
+from concurrent.futures import ThreadPoolExecutor
+import logging
+
+import scipy.sparse as sp
+from threadpoolctl import threadpool_limits
+
+from models.recommendation.evaluation import RankingEvaluator, index_interactions
+
+logger = logging.getLogger(__name__)
+
+
+class ImplicitALSModel:
+    """
+    Implicit-feedback Alternating Least Squares
+
+    Every observed user-item pair gets preference 1 and confidence
+    1 + alpha * signal; unobserved pairs get preference 0 and confidence 1.
+    Each half-step solves all user (or item) factor rows against the fixed
+    other side with a few conjugate-gradient iterations, warm-started from
+    the previous factors, so no f x f system is ever inverted per row.
+
+    Rows are solved in blocks bounded by their number of non-zeros and the
+    blocks run on a thread pool (NumPy/SciPy release the GIL in the hot
+    kernels), keeping memory flat regardless of catalogue size.
+    """
+
+    # Upper bound on gathered factor elements per block (nnz * n_factors)
+    BLOCK_ELEMENTS = 4_000_000
+
+    def __init__(
+        self,
+        n_factors: int = 100,
+        n_iterations: int = 15,
+        regularization: float = 0.01,
+        alpha: float = 40.0,
+        cg_steps: int = 3,
+        confidence_column: str = 'interactions',
+        n_threads: Optional[int] = None,
+        random_state: int = 42
+    ):
+        self.n_factors = n_factors
+        self.n_iterations = n_iterations
+        self.regularization = regularization
+        self.alpha = alpha
+        self.cg_steps = cg_steps
+        self.confidence_column = confidence_column
+        self.n_threads = n_threads or os.cpu_count() or 1
+        self.random_state = random_state
+
+        self.user_factors = None
+        self.item_factors = None
+        self.interaction_matrix = None  # Raw signal, user x item
+        self.user_ids = np.array([], dtype=object)
+        self.item_ids = np.array([], dtype=object)
+        self.user_index = {}
+        self.item_index = {}
+
+    def build_matrix(self, interactions: pd.DataFrame) -> sp.csr_matrix:
+        """
+        Build the user x item signal matrix and reset the id mappings
+
+        Args:
+            interactions: DataFrame with columns [user_id, item_id, <confidence_column>]
+
+        Returns:
+            CSR matrix of summed implicit signal per observed pair
+        """
+        users = pd.Categorical(interactions['user_id'])
+        items = pd.Categorical(interactions['item_id'])
+
+        self.user_ids = np.asarray(users.categories, dtype=object)
+        self.item_ids = np.asarray(items.categories, dtype=object)
+        self.user_index = {u: i for i, u in enumerate(self.user_ids)}
+        self.item_index = {it: i for i, it in enumerate(self.item_ids)}
+
+        matrix = sp.csr_matrix(
+            (self._signal(interactions), (users.codes, items.codes)),
+            shape=(len(self.user_ids), len(self.item_ids)),
+            dtype=np.float32
+        )
+        matrix.sum_duplicates()
+
+        return matrix
+
+    def confidence(self, signal: sp.csr_matrix) -> sp.csr_matrix:
+        """Confidence matrix (1 + alpha * signal) for observed pairs"""
+        Cui = signal.copy()
+        Cui.data = 1.0 + self.alpha * Cui.data
+        return Cui
+
+    def train(self, interactions: pd.DataFrame) -> Dict:
+        """
+        Train ALS model
+
+        Args:
+            interactions: DataFrame with columns [user_id, item_id, <confidence_column>]
+
+        Returns:
+            Dict with training statistics
+        """
+        logger.info(f"Training implicit ALS model on {len(interactions)} interactions")
+        start = time.perf_counter()
+
+        self.interaction_matrix = self.build_matrix(interactions)
+        Cui = self.confidence(self.interaction_matrix)
+        Ciu = Cui.T.tocsr()
+
+        rng = np.random.default_rng(self.random_state)
+        self.user_factors = (rng.standard_normal((Cui.shape[0], self.n_factors)) * 0.01).astype(np.float32)
+        self.item_factors = (rng.standard_normal((Cui.shape[1], self.n_factors)) * 0.01).astype(np.float32)
+
+        with threadpool_limits(limits=1 if self.n_threads > 1 else None, user_api='blas'):
+            for iteration in range(self.n_iterations):
+                self._solve(Cui, self.user_factors, self.item_factors)
+                self._solve(Ciu, self.item_factors, self.user_factors)
+
+        elapsed = time.perf_counter() - start
+        logger.info(
+            f"ALS model trained in {elapsed:.2f}s "
+            f"({Cui.shape[0]} users x {Cui.shape[1]} items, {Cui.nnz} interactions)"
+        )
+
+        return {
+            'training_time_s': elapsed,
+            'n_users': int(Cui.shape[0]),
+            'n_items': int(Cui.shape[1]),
+            'n_interactions': int(Cui.nnz)
+        }
+
+    def update(self, new_interactions: pd.DataFrame, n_iterations: int = 2, accumulate: bool = False) -> Dict:
+        """
+        Fold new interactions into a trained model
+
+        New users and items are appended to the factor matrices. Only the
+        factor rows of users and items that appear in `new_interactions`
+        are re-solved, against the fixed factors of the other side, so the
+        cost scales with the size of the update rather than the history.
+
+        Args:
+            new_interactions: DataFrame with columns [user_id, item_id, <confidence_column>]
+            n_iterations: Alternating sweeps over the affected rows
+            accumulate: Add the new signal to existing pairs instead of replacing it
+
+        Returns:
+            Dict with update statistics
+        """
+        if self.user_factors is None:
+            raise ValueError("Model not trained. Call train() first.")
+
+        logger.info(f"Updating ALS model with {len(new_interactions)} interactions")
+        start = time.perf_counter()
+
+        # Factors loaded from an artifact are read-only memory maps
+        self.user_factors = np.require(self.user_factors, requirements='W')
+        self.item_factors = np.require(self.item_factors, requirements='W')
+
+        new_users = self._extend_index(new_interactions['user_id'], 'user')
+        new_items = self._extend_index(new_interactions['item_id'], 'item')
+
+        rows = new_interactions['user_id'].map(self.user_index).to_numpy()
+        cols = new_interactions['item_id'].map(self.item_index).to_numpy()
+        shape = (len(self.user_ids), len(self.item_ids))
+
+        delta = sp.csr_matrix((self._signal(new_interactions), (rows, cols)), shape=shape, dtype=np.float32)
+        delta.sum_duplicates()
+
+        existing = self.interaction_matrix
+        existing.resize(shape)
+        if not accumulate:
+            # Drop stored values for the pairs being replaced
+            touched = delta.copy()
+            touched.data = np.ones_like(touched.data)
+            existing = existing - existing.multiply(touched)
+        self.interaction_matrix = (existing + delta).tocsr()
+        self.interaction_matrix.eliminate_zeros()
+
+        affected_users = np.unique(rows)
+        affected_items = np.unique(cols)
+
+        Cui = self.confidence(self.interaction_matrix)
+        Ciu = Cui.T.tocsr()
+
+        with threadpool_limits(limits=1 if self.n_threads > 1 else None, user_api='blas'):
+            for iteration in range(n_iterations):
+                self._solve(Cui, self.user_factors, self.item_factors, rows=affected_users)
+                self._solve(Ciu, self.item_factors, self.user_factors, rows=affected_items)
+
+        elapsed = time.perf_counter() - start
+        logger.info(
+            f"ALS model updated in {elapsed:.2f}s "
+            f"({len(affected_users)} users, {len(affected_items)} items re-solved)"
+        )
+
+        return {
+            'update_time_s': elapsed,
+            'new_users': new_users,
+            'new_items': new_items,
+            'affected_users': int(len(affected_users)),
+            'affected_items': int(len(affected_items)),
+            'n_interactions': int(self.interaction_matrix.nnz)
+        }
+
+    def cross_validate(self, interactions: pd.DataFrame, cv: int = 5, k: int = 10) -> Dict:
+        """
+        K-fold cross-validation of top-k ranking metrics
+
+        Trains `cv` throw-away models; intended for the offline evaluation
+        job, not the daily training path.
+
+        Returns:
+            Dict of per-fold metric arrays, keyed 'test_<metric>'
+        """
+        rng = np.random.default_rng(self.random_state)
+        folds = rng.integers(0, cv, len(interactions))
+        evaluator = RankingEvaluator(k=k)
+        fold_metrics = []
+
+        for fold in range(cv):
+            model = ImplicitALSModel(
+                n_factors=self.n_factors,
+                n_iterations=self.n_iterations,
+                regularization=self.regularization,
+                alpha=self.alpha,
+                cg_steps=self.cg_steps,
+                confidence_column=self.confidence_column,
+                n_threads=self.n_threads,
+                random_state=self.random_state
+            )
+            model.train(interactions[folds != fold])
+            test = index_interactions(interactions[folds == fold], model.user_index, model.item_index)
+            fold_metrics.append(evaluator.evaluate(model.score_users, test, exclude=model.interaction_matrix))
+
+        return {f'test_{name}': np.array([m[name] for m in fold_metrics]) for name in fold_metrics[0]}
+
+    def save(self, artifact):
+        """
+        Write factors, id maps and interaction history to an artifact
+
+        Args:
+            artifact: ArtifactWriter (models/common/artifacts.py)
+        """
+        if self.user_factors is None:
+            raise ValueError("Model not trained. Call train() first.")
+
+        artifact.save_json('als_params', {
+            'n_factors': self.n_factors,
+            'n_iterations': self.n_iterations,
+            'regularization': self.regularization,
+            'alpha': self.alpha,
+            'cg_steps': self.cg_steps,
+            'confidence_column': self.confidence_column,
+            'random_state': self.random_state
+        })
+        artifact.save_array('user_factors', self.user_factors)
+        artifact.save_array('item_factors', self.item_factors)
+        artifact.save_array('user_ids', self.user_ids)
+        artifact.save_array('item_ids', self.item_ids)
+        artifact.save_sparse('interaction_matrix', self.interaction_matrix)
+
+    @classmethod
+    def load(cls, artifact, n_threads: Optional[int] = None, mmap: bool = True) -> 'ImplicitALSModel':
+        """
+        Restore a model saved with save()
+
+        Args:
+            artifact: Artifact (models/common/artifacts.py)
+            n_threads: Solver threads for later updates
+            mmap: Memory-map the factor matrices read-only
+
+        Returns:
+            ImplicitALSModel ready for scoring and incremental updates
+        """
+        model = cls(**artifact.load_json('als_params'), n_threads=n_threads)
+        model.user_factors = artifact.load_array('user_factors', mmap)
+        model.item_factors = artifact.load_array('item_factors', mmap)
+        model.user_ids = np.asarray(artifact.load_array('user_ids', mmap=False).tolist(), dtype=object)
+        model.item_ids = np.asarray(artifact.load_array('item_ids', mmap=False).tolist(), dtype=object)
+        model.user_index = {u: i for i, u in enumerate(model.user_ids)}
+        model.item_index = {it: i for i, it in enumerate(model.item_ids)}
+        # The signal matrix is rebuilt on update, so a private copy is fine
+        model.interaction_matrix = artifact.load_sparse('interaction_matrix', mmap=False)
+        return model
+
+    def score_users(self, users: np.ndarray) -> np.ndarray:
+        """Preference scores of every item for a block of user indices"""
+        return self.user_factors[users] @ self.item_factors.T
+
+    def predict(self, user_id: str, item_id: str) -> float:
+        """Predict preference score for user-item pair"""
+        u = self.user_index.get(user_id)
+        i = self.item_index.get(item_id)
+        if u is None or i is None:
+            return 0.0
+        return float(self.user_factors[u] @ self.item_factors[i])
+
+    def recommend_items(self, user_id: str, candidate_items: List[str], top_n: int = 10) -> List[Tuple[str, float]]:
+        """
+        Recommend top N items for user
+
+        Args:
+            user_id: User identifier
+            candidate_items: List of items to consider
+            top_n: Number of recommendations to return
+
+        Returns:
+            List of (item_id, predicted_score) tuples
+        """
+        return self.recommend_items_batch([user_id], candidate_items, top_n)[0]
+
+    def recommend_items_batch(
+        self,
+        user_ids: List[str],
+        candidate_items: List[str],
+        top_n: int = 10
+    ) -> List[List[Tuple[str, float]]]:
+        """
+        Top N candidate items for each of several users from one block product
+
+        Unknown users and items score 0.
+        """
+        user_idx = np.array([self.user_index.get(user_id, -1) for user_id in user_ids], dtype=np.int64)
+        item_idx = np.array([self.item_index.get(item_id, -1) for item_id in candidate_items], dtype=np.int64)
+
+        scores = np.zeros((len(user_ids), len(candidate_items)), dtype=np.float32)
+        known_u, known_i = user_idx >= 0, item_idx >= 0
+        if known_u.any() and known_i.any():
+            scores[np.ix_(known_u, known_i)] = self.user_factors[user_idx[known_u]] @ self.item_factors[item_idx[known_i]].T
+
+        top_n = min(top_n, len(candidate_items))
+        if top_n == 0:
+            return [[] for _ in user_ids]
+        top = np.argpartition(-scores, top_n - 1, axis=1)[:, :top_n]
+        top = np.take_along_axis(top, np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1, kind='stable'), axis=1)
+
+        return [
+            [(candidate_items[j], float(score)) for j, score in zip(row, row_scores)]
+            for row, row_scores in zip(top, np.take_along_axis(scores, top, axis=1))
+        ]
+
+    def _signal(self, interactions: pd.DataFrame) -> np.ndarray:
+        """Implicit signal per interaction row (counts by default)"""
+        if self.confidence_column in interactions.columns:
+            signal = interactions[self.confidence_column].to_numpy(dtype=np.float32)
+        else:
+            signal = np.ones(len(interactions), dtype=np.float32)
+        return np.clip(np.nan_to_num(signal), 0, None)
+
+    def _solve(self, Cui: sp.csr_matrix, X: np.ndarray, Y: np.ndarray, rows: Optional[np.ndarray] = None):
+        """Update rows of X (all by default) against fixed Y (one ALS half-step)"""
+        YtY = Y.T @ Y + self.regularization * np.eye(self.n_factors, dtype=np.float32)
+
+        if rows is not None:
+            # Solve the selected rows as a compact sub-problem and scatter back
+            X_sub = X[rows]
+            self._solve(Cui[rows], X_sub, Y)
+            X[rows] = X_sub
+            return
+
+        blocks = self._blocks(Cui.indptr)
+
+        if self.n_threads > 1 and len(blocks) > 1:
+            with ThreadPoolExecutor(max_workers=self.n_threads) as pool:
+                list(pool.map(lambda b: self._solve_block(Cui, X, Y, YtY, b[0], b[1]), blocks))
+        else:
+            for start, stop in blocks:
+                self._solve_block(Cui, X, Y, YtY, start, stop)
+
+    def _blocks(self, indptr: np.ndarray) -> List[Tuple[int, int]]:
+        """Split rows into contiguous blocks with bounded non-zeros"""
+        n_rows = len(indptr) - 1
+        nnz_budget = max(1, self.BLOCK_ELEMENTS // self.n_factors)
+        # Also split by rows so that the pool has work for every thread
+        row_budget = max(1, -(-n_rows // self.n_threads))
+
+        blocks = []
+        start = 0
+        while start < n_rows:
+            stop = int(np.searchsorted(indptr, indptr[start] + nnz_budget, side='right')) - 1
+            stop = min(max(stop, start + 1), start + row_budget, n_rows)
+            blocks.append((start, stop))
+            start = stop
+        return blocks
+
+    def _solve_block(self, Cui: sp.csr_matrix, X: np.ndarray, Y: np.ndarray, YtY: np.ndarray, start: int, stop: int):
+        """Conjugate-gradient solve of (YtCuY + reg*I) x_u = YtCu p_u for rows [start, stop)"""
+        C = Cui[start:stop]
+        conf = C.data
+        rows = np.repeat(np.arange(stop - start), np.diff(C.indptr))
+        Yi = Y[C.indices]
+
+        x = X[start:stop].copy()
+
+        # Residual r = YtCu p_u - (YtY + Yt(Cu - I)Y) x
+        dot = np.einsum('ij,ij->i', Yi, x[rows])
+        r = self._sparse_rows(conf - (conf - 1) * dot, C) @ Y - x @ YtY
+
+        p = r.copy()
+        rsold = np.einsum('ij,ij->i', r, r)
+
+        for _ in range(self.cg_steps):
+            active = rsold > 1e-20
+            if not active.any():
+                break
+
+            dot = np.einsum('ij,ij->i', Yi, p[rows])
+            Ap = p @ YtY + self._sparse_rows((conf - 1) * dot, C) @ Y
+
+            denom = np.einsum('ij,ij->i', p, Ap)
+            step = np.zeros_like(rsold)
+            ok = active & (denom > 0)
+            step[ok] = rsold[ok] / denom[ok]
+
+            x += step[:, None] * p
+            r -= step[:, None] * Ap
+
+            rsnew = np.einsum('ij,ij->i', r, r)
+            beta = np.zeros_like(rsold)
+            beta[ok] = rsnew[ok] / rsold[ok]
+            p = r + beta[:, None] * p
+            rsold = rsnew
+
+        X[start:stop] = x
+
+    def _extend_index(self, ids: pd.Series, side: str) -> int:
+        """Append unseen ids and initialise their factor rows"""
+        index = self.user_index if side == 'user' else self.item_index
+        unseen = pd.unique(ids[~ids.isin(index.keys())])
+        if len(unseen) == 0:
+            return 0
+
+        offset = len(index)
+        for j, new_id in enumerate(unseen):
+            index[new_id] = offset + j
+
+        rng = np.random.default_rng(self.random_state + offset)
+        init = (rng.standard_normal((len(unseen), self.n_factors)) * 0.01).astype(np.float32)
+        if side == 'user':
+            self.user_ids = np.concatenate([self.user_ids, np.asarray(unseen, dtype=object)])
+            self.user_factors = np.vstack([self.user_factors, init])
+        else:
+            self.item_ids = np.concatenate([self.item_ids, np.asarray(unseen, dtype=object)])
+            self.item_factors = np.vstack([self.item_factors, init])
+
+        return int(len(unseen))
+
+    @staticmethod
+    def _sparse_rows(values: np.ndarray, like: sp.csr_matrix) -> sp.csr_matrix:
+        """CSR matrix with the sparsity structure of `like` and new values"""
+        return sp.csr_matrix((values.astype(np.float32, copy=False), like.indices, like.indptr), shape=like.shape)
@@ -0,0 +1,140 @@
+"""
+TRADEAI Recommendation Evaluation
+Offline top-k ranking metrics for recommendation models
+
+Metrics: Precision@K, Recall@K, NDCG@K, MAP@K, catalogue coverage
+Input: Held-out user x item interaction matrix (CSR) + a block scoring function
+Scale: 50k customers x 20k items evaluated block-wise in seconds
+"""
+
+import time
+import numpy as np
+import pandas as pd
+from typing import Callable, Dict, Optional
+import logging
+
+import scipy.sparse as sp
+
+logger = logging.getLogger(__name__)
+
+
+class RankingEvaluator:
+    """
+    Vectorized top-k evaluator
+
+    Scores users in blocks (block_size x n_items at a time), masks items
+    already seen in training, selects each user's top-k with argpartition
+    and accumulates the metrics from the hit matrix, so memory stays
+    bounded by the block regardless of the number of users.
+    """
+
+    def __init__(self, k: int = 10, block_size: int = 1024):
+        self.k = k
+        self.block_size = block_size
+
+    def evaluate(
+        self,
+        score_users: Callable[[np.ndarray], np.ndarray],
+        test: sp.csr_matrix,
+        exclude: Optional[sp.csr_matrix] = None
+    ) -> Dict:
+        """
+        Evaluate top-k recommendations against held-out interactions
+
+        Args:
+            score_users: Maps an array of user indices to a (len(users), n_items) score matrix
+            test: Held-out user x item matrix; non-zeros are relevant items
+            exclude: Optional user x item matrix of training interactions to mask out
+
+        Returns:
+            Dict with ranking metrics and timing
+        """
+        start = time.perf_counter()
+        test = sp.csr_matrix(test)
+        n_items = test.shape[1]
+        k = min(self.k, n_items)
+
+        users = np.flatnonzero(np.diff(test.indptr))
+        discounts = 1.0 / np.log2(np.arange(2, k + 2))
+        ideal_dcg = np.cumsum(discounts)
+        ranks = np.arange(1, k + 1)
+
+        totals = {'precision': 0.0, 'recall': 0.0, 'ndcg': 0.0, 'map': 0.0}
+        recommended = np.zeros(n_items, dtype=bool)
+        scoring_time = 0.0
+
+        for block_start in range(0, len(users), self.block_size):
+            block = users[block_start:block_start + self.block_size]
+            rows = np.arange(len(block))
+
+            t0 = time.perf_counter()
+            scores = np.array(score_users(block), dtype=np.float32, copy=True)
+            scoring_time += time.perf_counter() - t0
+
+            if exclude is not None:
+                seen = exclude[block]
+                scores[np.repeat(rows, np.diff(seen.indptr)), seen.indices] = -np.inf
+
+            # Top-k per user, ordered by score
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1, kind='stable')
+            top = np.take_along_axis(top, order, axis=1)
+            valid = np.isfinite(np.take_along_axis(top_scores, order, axis=1))
+
+            held_out = test[block]
+            n_relevant = np.diff(held_out.indptr)
+            relevant = np.zeros((len(block), n_items), dtype=bool)
+            relevant[np.repeat(rows, n_relevant), held_out.indices] = True
+            hits = np.take_along_axis(relevant, top, axis=1) & valid
+
+            n_hits = hits.sum(axis=1)
+            capped = np.minimum(n_relevant, k)
+
+            totals['precision'] += (n_hits / k).sum()
+            totals['recall'] += (n_hits / n_relevant).sum()
+            totals['ndcg'] += ((hits @ discounts) / ideal_dcg[capped - 1]).sum()
+            totals['map'] += (((np.cumsum(hits, axis=1) / ranks) * hits).sum(axis=1) / capped).sum()
+
+            recommended[top[valid]] = True
+
+        elapsed = time.perf_counter() - start
+        n_users = max(len(users), 1)
+
+        metrics = {
+            f'precision_at_{k}': float(totals['precision'] / n_users),
+            f'recall_at_{k}': float(totals['recall'] / n_users),
+            f'ndcg_at_{k}': float(totals['ndcg'] / n_users),
+            f'map_at_{k}': float(totals['map'] / n_users),
+            'coverage': float(recommended.mean()) if n_items else 0.0,
+            'users_evaluated': int(len(users)),
+            'evaluation_time_s': elapsed,
+            'scoring_time_s': scoring_time,
+            'users_per_second': len(users) / elapsed if elapsed > 0 else 0.0
+        }
+
+        logger.info(
+            f"Evaluated {len(users)} users x {n_items} items in {elapsed:.2f}s "
+            f"(recall@{k}={metrics[f'recall_at_{k}']:.4f}, ndcg@{k}={metrics[f'ndcg_at_{k}']:.4f})"
+        )
+
+        return metrics
+
+
+def index_interactions(interactions: pd.DataFrame, user_index: Dict, item_index: Dict) -> sp.csr_matrix:
+    """
+    Binary user x item matrix of interactions in a model's index space
+
+    Pairs with users or items unknown to the model are dropped.
+    """
+    rows = interactions['user_id'].map(user_index)
+    cols = interactions['item_id'].map(item_index)
+    known = rows.notna() & cols.notna()
+
+    matrix = sp.csr_matrix(
+        (np.ones(int(known.sum()), dtype=np.float32), (rows[known].astype(np.int64), cols[known].astype(np.int64))),
+        shape=(len(user_index), len(item_index))
+    )
+    matrix.sum_duplicates()
+    matrix.data[:] = 1.0
+    return matrix
@@ -2,10 +2,10 @@
 TRADEAI Recommendation Engine
 Production-grade hybrid recommendation system
 
-Methods: Collaborative Filtering + Content-Based
+Methods: Collaborative Filtering (SVD or implicit ALS) + Content-Based
 Target: 15%+ CTR
 Recommendations: Products, promotions, timing, pricing, customers
-Update: Daily incremental training
+Update: Daily incremental training (cross-validation runs in a separate evaluation job)
 """
 
 import numpy as np
@@ -13,10 +13,15 @@ import pandas as pd
 from typing import Dict, List, Tuple, Optional
 from datetime import datetime, timedelta
 import logging
+import time
 
 # Collaborative Filtering
 from surprise import SVD, Dataset, Reader
 from surprise.model_selection import cross_validate
+from models.recommendation.als import ImplicitALSModel
+from models.recommendation.evaluation import RankingEvaluator, index_interactions
+from models.common.tracing import traced
+import scipy.sparse as sp
 
 # Content-Based
 from sklearn.metrics.pairwise import cosine_similarity
@@ -48,37 +53,160 @@ class CollaborativeFilteringModel:
             random_state=42
         )
         self.reader = Reader(rating_scale=(1, 5))
+        self.interactions = None
+        self.global_mean = None
+        self.user_index = {}
+        self.item_index = {}
+        self.interaction_matrix = None
         
-    def train(self, interactions: pd.DataFrame):
+    def train(self, interactions: pd.DataFrame) -> Dict:
         """
         Train collaborative filtering model
         
         Args:
             interactions: DataFrame with columns [user_id, item_id, rating]
+            
+        Returns:
+            Dict with training statistics
         """
         logger.info(f"Training CF model on {len(interactions)} interactions")
+        start = time.perf_counter()
         
-        # Create Surprise dataset
-        dataset = Dataset.load_from_df(
-            interactions[['user_id', 'item_id', 'rating']],
-            self.reader
-        )
+        self.interactions = interactions[['user_id', 'item_id', 'rating']].copy()
         
         # Train on full dataset
+        dataset = Dataset.load_from_df(self.interactions, self.reader)
         trainset = dataset.build_full_trainset()
         self.model.fit(trainset)
+        self.global_mean = trainset.global_mean
+        
+        # Raw id -> surprise inner id, for block scoring and evaluation
+        self.user_index = {trainset.to_raw_uid(u): u for u in trainset.all_users()}
+        self.item_index = {trainset.to_raw_iid(i): i for i in trainset.all_items()}
+        self.interaction_matrix = index_interactions(self.interactions, self.user_index, self.item_index)
+        
+        elapsed = time.perf_counter() - start
+        logger.info(f"CF model trained in {elapsed:.2f}s")
+        
+        return {
+            'training_time_s': elapsed,
+            'n_users': trainset.n_users,
+            'n_items': trainset.n_items,
+            'n_interactions': trainset.n_ratings
+        }
+    
+    def update(self, new_interactions: pd.DataFrame) -> Dict:
+        """
+        Fold new ratings into the model
+        
+        SGD-trained SVD has no fold-in, so the new ratings are merged into
+        the stored history (replacing existing user-item pairs) and the
+        model is refit once, without cross-validation.
+        """
+        if self.interactions is None:
+            raise ValueError("Model not trained. Call train() first.")
+        
+        merged = pd.concat([self.interactions, new_interactions[['user_id', 'item_id', 'rating']]])
+        merged = merged.drop_duplicates(['user_id', 'item_id'], keep='last')
+        
+        stats = self.train(merged)
+        return {'update_time_s': stats.pop('training_time_s'), **stats}
+    
+    def cross_validate(self, interactions: pd.DataFrame, cv: int = 5) -> Dict:
+        """
+        K-fold cross-validation of RMSE/MAE
         
-        # Cross-validation
-        cv_results = cross_validate(self.model, dataset, measures=['RMSE', 'MAE'], cv=5, verbose=False)
+        Trains `cv` throw-away models; intended for the offline evaluation
+        job, not the daily training path.
+        """
+        dataset = Dataset.load_from_df(interactions[['user_id', 'item_id', 'rating']], self.reader)
+        cv_model = SVD(
+            n_factors=self.n_factors,
+            n_epochs=self.n_epochs,
+            lr_all=0.005,
+            reg_all=0.02,
+            random_state=42
+        )
+        cv_results = cross_validate(cv_model, dataset, measures=['RMSE', 'MAE'], cv=cv, verbose=False)
         
-        logger.info(f"CF model trained. RMSE: {cv_results['test_rmse'].mean():.3f}")
+        logger.info(f"CF cross-validation RMSE: {cv_results['test_rmse'].mean():.3f}")
         
         return cv_results
     
+    def save(self, artifact):
+        """
+        Write SVD factors, biases and rating history to an artifact
+        
+        Args:
+            artifact: ArtifactWriter (models/common/artifacts.py)
+        """
+        if self.interactions is None:
+            raise ValueError("Model not trained. Call train() first.")
+        
+        svd = self.model
+        artifact.save_json('svd_params', {
+            'n_factors': self.n_factors,
+            'n_epochs': self.n_epochs,
+            'global_mean': self.global_mean
+        })
+        for name in ('pu', 'qi', 'bu', 'bi'):
+            artifact.save_array(f'svd_{name}', getattr(svd, name))
+        
+        # Ids in inner-id order, and the ratings needed to refit on update
+        artifact.save_array('user_ids', sorted(self.user_index, key=self.user_index.get))
+        artifact.save_array('item_ids', sorted(self.item_index, key=self.item_index.get))
+        # csr_matrix sums duplicate entries; keep the latest rating per pair, as update() does
+        interactions = self.interactions.drop_duplicates(['user_id', 'item_id'], keep='last')
+        ratings = sp.csr_matrix(
+            (
+                interactions['rating'].to_numpy(dtype=np.float64),
+                (interactions['user_id'].map(self.user_index), interactions['item_id'].map(self.item_index))
+            ),
+            shape=(len(self.user_index), len(self.item_index))
+        )
+        artifact.save_sparse('ratings', ratings)
+    
+    @classmethod
+    def load(cls, artifact, mmap: bool = True) -> 'CollaborativeFilteringModel':
+        """
+        Restore a model saved with save()
+        
+        Scoring uses the stored factor arrays directly, so no surprise
+        trainset is rebuilt at load time.
+        """
+        params = artifact.load_json('svd_params')
+        model = cls(n_factors=params['n_factors'], n_epochs=params['n_epochs'])
+        model.global_mean = params['global_mean']
+        for name in ('pu', 'qi', 'bu', 'bi'):
+            setattr(model.model, name, artifact.load_array(f'svd_{name}', mmap))
+        
+        user_ids = artifact.load_array('user_ids', mmap=False).tolist()
+        item_ids = artifact.load_array('item_ids', mmap=False).tolist()
+        model.user_index = {u: i for i, u in enumerate(user_ids)}
+        model.item_index = {it: i for i, it in enumerate(item_ids)}
+        
+        ratings = artifact.load_sparse('ratings', mmap=False).tocoo()
+        model.interactions = pd.DataFrame({
+            'user_id': np.asarray(user_ids, dtype=object)[ratings.row],
+            'item_id': np.asarray(item_ids, dtype=object)[ratings.col],
+            'rating': ratings.data
+        })
+        model.interaction_matrix = index_interactions(model.interactions, model.user_index, model.item_index)
+        return model
+    
+    def score_users(self, users: np.ndarray) -> np.ndarray:
+        """Predicted ratings of every item for a block of inner user ids"""
+        svd = self.model
+        return (
+            self.global_mean
+            + svd.bu[users, None]
+            + svd.bi[None, :]
+            + svd.pu[users] @ svd.qi.T
+        )
+    
     def predict(self, user_id: str, item_id: str) -> float:
         """Predict rating for user-item pair"""
-        prediction = self.model.predict(user_id, item_id)
-        return prediction.est
+        return float(self._estimate([user_id], [item_id])[0])
     
     def recommend_items(self, user_id: str, candidate_items: List[str], top_n: int = 10) -> List[Tuple[str, float]]:
         """
@@ -92,13 +220,62 @@ class CollaborativeFilteringModel:
         Returns:
             List of (item_id, predicted_rating) tuples
         """
-        # Predict ratings for all candidate items
-        predictions = [(item_id, self.predict(user_id, item_id)) for item_id in candidate_items]
+        return self.recommend_items_batch([user_id], candidate_items, top_n)[0]
+    
+    def recommend_items_batch(
+        self,
+        user_ids: List[str],
+        candidate_items: List[str],
+        top_n: int = 10
+    ) -> List[List[Tuple[str, float]]]:
+        """
+        Top N candidate items for each of several users from one block of estimates
+        
+        Ties keep the candidate order.
+        """
+        scores = self._estimate_block(user_ids, candidate_items)
+        top = np.argsort(-scores, axis=1, kind='stable')[:, :top_n]
         
-        # Sort by predicted rating
-        predictions.sort(key=lambda x: x[1], reverse=True)
+        return [
+            [(candidate_items[j], float(score)) for j, score in zip(row, row_scores)]
+            for row, row_scores in zip(top, np.take_along_axis(scores, top, axis=1))
+        ]
+    
+    def _estimate(self, user_ids: List[str], item_ids: List[str]) -> np.ndarray:
+        """
+        Vectorized SVD estimates, matching surprise's SVD.predict
         
-        return predictions[:top_n]
+        Unknown users/items contribute no bias or factor term, and the
+        estimate is clipped to the rating scale.
+        """
+        svd = self.model
+        u = np.array([self.user_index.get(user_id, -1) for user_id in user_ids], dtype=np.int64)
+        i = np.array([self.item_index.get(item_id, -1) for item_id in item_ids], dtype=np.int64)
+        known_u, known_i = u >= 0, i >= 0
+        both = known_u & known_i
+        
+        est = np.full(len(u), self.global_mean, dtype=np.float64)
+        est[known_u] += svd.bu[u[known_u]]
+        est[known_i] += svd.bi[i[known_i]]
+        est[both] += np.einsum('ij,ij->i', svd.pu[u[both]], svd.qi[i[both]])
+        
+        low, high = self.reader.rating_scale
+        return np.clip(est, low, high)
+    
+    def _estimate_block(self, user_ids: List[str], item_ids: List[str]) -> np.ndarray:
+        """(users, items) estimates, as _estimate for every user-item pair"""
+        svd = self.model
+        u = np.array([self.user_index.get(user_id, -1) for user_id in user_ids], dtype=np.int64)
+        i = np.array([self.item_index.get(item_id, -1) for item_id in item_ids], dtype=np.int64)
+        known_u, known_i = u >= 0, i >= 0
+        
+        est = np.full((len(u), len(i)), self.global_mean, dtype=np.float64)
+        est[known_u] += svd.bu[u[known_u]][:, None]
+        est[:, known_i] += svd.bi[i[known_i]]
+        est[np.ix_(known_u, known_i)] += svd.pu[u[known_u]] @ svd.qi[i[known_i]].T
+        
+        low, high = self.reader.rating_scale
+        return np.clip(est, low, high)
 
 
 class ContentBasedModel:
@@ -144,6 +321,19 @@ class ContentBasedModel:
         
         logger.info("Content-based model trained")
     
+    def save(self, artifact):
+        """Write item features and the item-item similarity matrix to an artifact"""
+        artifact.save_array('item_features', self.item_features)
+        artifact.save_array('similarity_matrix', self.similarity_matrix)
+    
+    @classmethod
+    def load(cls, artifact, mmap: bool = True) -> 'ContentBasedModel':
+        """Restore a model saved with save(); the n x n similarity matrix is memory-mapped"""
+        model = cls()
+        model.item_features = artifact.load_array('item_features', mmap)
+        model.similarity_matrix = artifact.load_array('similarity_matrix', mmap)
+        return model
+    
     def find_similar_items(self, item_idx: int, top_n: int = 10) -> List[Tuple[int, float]]:
         """
         Find items similar to given item
@@ -179,10 +369,26 @@ class RecommendationEngine:
     
     def __init__(self, config: Dict):
         self.config = config
-        self.cf_model = CollaborativeFilteringModel(
-            n_factors=config.get('n_factors', 100),
-            n_epochs=config.get('n_epochs', 20)
-        )
+        
+        # Collaborative backend: 'svd' (explicit ratings) or 'als' (implicit interaction counts)
+        self.algorithm = config.get('algorithm', 'svd')
+        if self.algorithm == 'svd':
+            self.cf_model = CollaborativeFilteringModel(
+                n_factors=config.get('n_factors', 100),
+                n_epochs=config.get('n_epochs', 20)
+            )
+        elif self.algorithm == 'als':
+            self.cf_model = ImplicitALSModel(
+                n_factors=config.get('n_factors', 100),
+                n_iterations=config.get('n_iterations', 15),
+                regularization=config.get('regularization', 0.01),
+                alpha=config.get('alpha', 40.0),
+                confidence_column=config.get('confidence_column', 'interactions'),
+                n_threads=config.get('n_threads')
+            )
+        else:
+            raise ValueError(f"Unknown collaborative filtering algorithm: {self.algorithm}")
+        
         self.cb_model = ContentBasedModel()
         
         # Weights for hybrid approach
@@ -205,7 +411,7 @@ class RecommendationEngine:
         Train hybrid recommendation model
         
         Args:
-            interactions: User-item interactions with ratings
+            interactions: User-item interactions with ratings (svd) or interaction counts (als)
             items: Item features
             feature_columns: Columns to use for content-based filtering
         """
@@ -215,7 +421,8 @@ class RecommendationEngine:
             
             # Train collaborative filtering
             cf_results = self.cf_model.train(interactions)
-            mlflow.log_metric("cf_rmse", cf_results['test_rmse'].mean())
+            mlflow.log_param("cf_algorithm", self.algorithm)
+            mlflow.log_metrics({f"cf_{k}": float(v) for k, v in cf_results.items()})
             
             # Train content-based
             self.cb_model.train(items, feature_columns)
@@ -225,6 +432,106 @@ class RecommendationEngine:
             
             logger.info("Hybrid model training complete")
     
+    def update(
+        self,
+        new_interactions: pd.DataFrame,
+        items: Optional[pd.DataFrame] = None,
+        feature_columns: Optional[List[str]] = None
+    ) -> Dict:
+        """
+        Incremental (daily) update of a trained hybrid model
+        
+        Args:
+            new_interactions: Interactions since the last training/update
+            items: Full item table, when the catalogue changed
+            feature_columns: Columns to use for content-based filtering
+            
+        Returns:
+            Dict with update statistics
+        """
+        logger.info(f"Updating hybrid recommendation model with {len(new_interactions)} interactions")
+        
+        with mlflow.start_run(run_name=f"recommender_update_{datetime.now().strftime('%Y%m%d_%H%M%S')}"):
+            
+            cf_results = self.cf_model.update(new_interactions)
+            mlflow.log_param("cf_algorithm", self.algorithm)
+            mlflow.log_metrics({f"cf_{k}": float(v) for k, v in cf_results.items()})
+            
+            # Content-based similarities are cheap to rebuild when the catalogue changes
+            if items is not None and feature_columns:
+                self.cb_model.train(items, feature_columns)
+            
+            logger.info("Hybrid model update complete")
+            
+            return cf_results
+    
+    def cross_validate(self, interactions: pd.DataFrame, cv: int = 5) -> Dict:
+        """
+        Cross-validate the collaborative filtering backend
+        
+        Run on demand by the evaluation job (training/evaluate_recommender.py);
+        training and daily updates never call this.
+        """
+        logger.info(f"Cross-validating {self.algorithm} backend ({cv} folds)")
+        
+        with mlflow.start_run(run_name=f"recommender_cv_{datetime.now().strftime('%Y%m%d_%H%M%S')}"):
+            cv_results = self.cf_model.cross_validate(interactions, cv=cv)
+            
+            summary = {
+                name: float(np.mean(values))
+                for name, values in cv_results.items()
+                if name.startswith('test_') and name != 'test_time'
+            }
+            mlflow.log_param("cf_algorithm", self.algorithm)
+            mlflow.log_metrics({f"cv_{k}": v for k, v in summary.items()})
+            
+            return summary
+    
+    def save(self, store, metadata: Optional[Dict] = None) -> str:
+        """
+        Save the trained engine as a new 'recommendations' artifact version
+        
+        Args:
+            store: ArtifactStore (models/common/artifacts.py)
+            metadata: Extra manifest metadata (e.g. training metrics)
+            
+        Returns:
+            Published version
+        """
+        metadata = {'algorithm': self.algorithm, 'weights': self.weights, **(metadata or {})}
+        
+        with store.create('recommendations', metadata) as artifact:
+            artifact.save_json('engine', {'config': self.config, 'algorithm': self.algorithm, 'weights': self.weights})
+            self.cf_model.save(artifact)
+            if self.cb_model.similarity_matrix is not None:
+                self.cb_model.save(artifact)
+        
+        return artifact.version
+    
+    @classmethod
+    def load(cls, artifact, mmap: bool = True) -> 'RecommendationEngine':
+        """
+        Restore an engine from an artifact version
+        
+        Args:
+            artifact: Artifact (models/common/artifacts.py)
+            mmap: Memory-map factor and similarity matrices read-only
+        """
+        state = artifact.load_json('engine')
+        engine = cls(state['config'])
+        engine.weights = state['weights']
+        
+        if state['algorithm'] == 'als':
+            engine.cf_model = ImplicitALSModel.load(artifact, n_threads=state['config'].get('n_threads'), mmap=mmap)
+        else:
+            engine.cf_model = CollaborativeFilteringModel.load(artifact, mmap=mmap)
+        
+        if artifact.has('similarity_matrix.npy'):
+            engine.cb_model = ContentBasedModel.load(artifact, mmap=mmap)
+        
+        return engine
+    
+    @traced()
     def recommend_products(
         self,
         customer_id: str,
@@ -239,55 +546,82 @@ class RecommendationEngine:
             customer_id: Customer identifier
             context: Current context (season, promotions, etc.)
             top_n: Number of recommendations
-            all_products: DataFrame of all available products
+            all_products: DataFrame of all available products (default: every trained product)
             
         Returns:
             List of product recommendations with scores and reasons
         """
         logger.info(f"Generating product recommendations for customer {customer_id}")
         
-        recommendations = []
+        return self.recommend_products_batch([customer_id], [context], top_n, all_products)[0]
+    
+    @traced()
+    def recommend_products_batch(
+        self,
+        customer_ids: List[str],
+        contexts: List[Dict],
+        top_n: int = 10,
+        all_products: Optional[pd.DataFrame] = None
+    ) -> List[List[Dict]]:
+        """
+        Recommend products for several customers from one block of CF scores
         
+        Args:
+            customer_ids: Customer identifiers
+            contexts: Context per customer (season, promotions, etc.)
+            top_n: Number of recommendations per customer
+            all_products: DataFrame of all available products (default: every
+                product the model was trained on, named by product id)
+            
+        Returns:
+            Per customer, product recommendations with scores and reasons
+        """
         # Get candidate products
         if all_products is not None:
             candidate_product_ids = all_products['product_id'].tolist()
+            catalogue = all_products.drop_duplicates('product_id').set_index('product_id', drop=False).to_dict('index')
         else:
-            candidate_product_ids = []  # Would fetch from database
+            candidate_product_ids = list(self.cf_model.item_index)
+            catalogue = {product_id: {'name': product_id} for product_id in candidate_product_ids}
         
         # Collaborative filtering recommendations
-        cf_recs = self.cf_model.recommend_items(customer_id, candidate_product_ids, top_n=top_n*2)
+        cf_recs = self.cf_model.recommend_items_batch(customer_ids, candidate_product_ids, top_n=top_n)
         
         # Content-based recommendations (based on past purchases)
         # Simplified: would look up customer's purchase history
         
-        # Hybrid scoring
-        for product_id, cf_score in cf_recs[:top_n]:
-            # Get product info
-            product_info = all_products[all_products['product_id'] == product_id].iloc[0] if all_products is not None else {}
-            
-            # Calculate hybrid score
-            hybrid_score = self.weights['collaborative'] * cf_score
-            
-            # Add context-based adjustments
-            if context.get('season') == 'summer' and 'cold_drink' in str(product_info.get('category', '')).lower():
-                hybrid_score *= 1.2  # Boost cold drinks in summer
+        results = []
+        for context, customer_recs in zip(contexts, cf_recs):
+            recommendations = []
             
-            if context.get('current_promotions') and product_id in context['current_promotions']:
-                hybrid_score *= 1.1  # Boost items on promotion
+            # Hybrid scoring
+            for product_id, cf_score in customer_recs:
+                product_info = catalogue.get(product_id, {})
+                
+                # Calculate hybrid score
+                hybrid_score = self.weights['collaborative'] * cf_score
+                
+                # Add context-based adjustments
+                if context.get('season') == 'summer' and 'cold_drink' in str(product_info.get('category', '')).lower():
+                    hybrid_score *= 1.2  # Boost cold drinks in summer
+                
+                if context.get('current_promotions') and product_id in context['current_promotions']:
+                    hybrid_score *= 1.1  # Boost items on promotion
+                
+                recommendations.append({
+                    'product_id': product_id,
+                    'product_name': product_info.get('name', 'Unknown'),
+                    'score': round(float(hybrid_score), 3),
+                    'confidence': 0.8,
+                    'reason': self._generate_reason(cf_score, context),
+                    'expected_uplift_pct': self._estimate_uplift(hybrid_score)
+                })
             
-            recommendations.append({
-                'product_id': product_id,
-                'product_name': product_info.get('name', 'Unknown'),
-                'score': round(float(hybrid_score), 3),
-                'confidence': 0.8,
-                'reason': self._generate_reason(cf_score, context),
-                'expected_uplift_pct': self._estimate_uplift(hybrid_score)
-            })
+            # Sort by score
+            recommendations.sort(key=lambda x: x['score'], reverse=True)
+            results.append(recommendations)
         
-        # Sort by score
-        recommendations.sort(key=lambda x: x['score'], reverse=True)
-        
-        return recommendations[:top_n]
+        return results
     
     def recommend_promotions(
         self,
@@ -308,35 +642,66 @@ class RecommendationEngine:
         """
         logger.info(f"Generating promotion recommendations for user {user_id}")
         
-        # Analyze past promotion performance
-        promotion_scores = []
+        recommendations = self.recommend_promotions_batch(past_promotions, top_n=top_n)
         
-        for _, promo in past_promotions.iterrows():
-            # Score based on historical ROI
-            roi_score = promo.get('roi', 0) / 100
-            
-            # Recency boost
-            days_since = (datetime.now() - pd.to_datetime(promo['end_date'])).days
-            recency_score = np.exp(-days_since / 180)  # Decay over 6 months
-            
-            # Success rate
-            success_score = 1 if promo.get('was_successful', False) else 0.5
-            
-            # Combined score
-            combined_score = roi_score * 0.5 + recency_score * 0.3 + success_score * 0.2
+        return recommendations.drop(columns='rank').to_dict('records')
+    
+    def recommend_promotions_batch(
+        self,
+        past_promotions: pd.DataFrame,
+        top_n: int = 10,
+        group_by: Optional[List[str]] = None,
+        as_of: Optional[datetime] = None
+    ) -> pd.DataFrame:
+        """
+        Score and rank past promotions as columnar operations
+        
+        Args:
+            past_promotions: Historical promotion performance
+            top_n: Number of recommendations per group
+            group_by: Columns to rank within (e.g. ['customer_id']); None ranks globally
+            as_of: Reference date for recency decay (default: now)
             
-            promotion_scores.append({
-                'promotion_type': promo['promotion_type'],
-                'discount_percentage': promo['discount_percentage'],
-                'score': combined_score,
-                'historical_roi': promo.get('roi', 0),
-                'reason': f"Historical ROI: {promo.get('roi', 0):.0f}%, Last used: {promo['end_date'].strftime('%Y-%m-%d')}"
-            })
+        Returns:
+            DataFrame with one row per recommendation, ordered by group and rank
+        """
+        df = past_promotions
+        as_of = pd.Timestamp(as_of or datetime.now())
+        end_dates = pd.to_datetime(df['end_date'])
+        
+        # Score based on historical ROI
+        roi = df['roi'].fillna(0) if 'roi' in df.columns else pd.Series(0.0, index=df.index)
+        roi_score = roi / 100
         
-        # Sort by score
-        promotion_scores.sort(key=lambda x: x['score'], reverse=True)
+        # Recency boost, decaying over 6 months
+        days_since = (as_of - end_dates).dt.days
+        recency_score = np.exp(-days_since / 180)
         
-        return promotion_scores[:top_n]
+        # Success rate
+        if 'was_successful' in df.columns:
+            success_score = np.where(df['was_successful'].fillna(False).astype(bool), 1.0, 0.5)
+        else:
+            success_score = 0.5
+        
+        scored = pd.DataFrame({
+            'promotion_type': df['promotion_type'],
+            'discount_percentage': df['discount_percentage'],
+            'score': roi_score * 0.5 + recency_score * 0.3 + success_score * 0.2,
+            'historical_roi': roi,
+            'end_date': end_dates
+        })
+        for col in group_by or []:
+            scored[col] = df[col]
+        
+        top = self._top_n(scored, 'score', top_n, group_by)
+        
+        # Format reasons only for the rows that are returned
+        top['reason'] = (
+            "Historical ROI: " + top['historical_roi'].round(0).astype('int64').astype(str)
+            + "%, Last used: " + top['end_date'].dt.strftime('%Y-%m-%d')
+        )
+        
+        return top.drop(columns='end_date')
     
     def recommend_timing(
         self,
@@ -357,47 +722,81 @@ class RecommendationEngine:
         """
         logger.info(f"Analyzing optimal timing for {product_id}")
         
-        # Filter to relevant data
-        df = sales_history[
-            (sales_history['product_id'] == product_id) &
-            (sales_history['customer_id'] == customer_id)
-        ].copy()
+        recommendations = self.recommend_timing_batch([(product_id, customer_id)], sales_history)
         
-        # Extract temporal features
-        df['week_of_year'] = pd.to_datetime(df['date']).dt.isocalendar().week
-        df['month'] = pd.to_datetime(df['date']).dt.month
-        
-        # Calculate average sales by week
-        weekly_avg = df.groupby('week_of_year')['sales_volume'].mean().to_dict()
+        return recommendations.drop(columns=['product_id', 'customer_id', 'rank']).to_dict('records')
+    
+    def recommend_timing_batch(
+        self,
+        pairs: List[Tuple[str, str]],
+        sales_history: pd.DataFrame,
+        top_n: int = 5,
+        weeks_ahead: int = 12,
+        as_of: Optional[datetime] = None
+    ) -> pd.DataFrame:
+        """
+        Recommend promotion timing for many product-customer pairs at once
         
-        # Score upcoming weeks
-        current_week = datetime.now().isocalendar()[1]
-        timing_recommendations = []
+        E.g. every line of an account plan in one call. Weekly averages and
+        per-pair means are computed once with group-bys, then every pair is
+        scored against every upcoming week in a single columnar pass.
         
-        for week in range(current_week + 1, min(current_week + 13, 53)):  # Next 12 weeks
-            base_sales = weekly_avg.get(week, df['sales_volume'].mean())
-            
-            # Seasonality score
-            seasonality_score = base_sales / df['sales_volume'].mean()
-            
-            # Check for holidays/events (simplified)
-            event_score = 1.0
-            
-            # Combined score
-            timing_score = seasonality_score * event_score
+        Args:
+            pairs: (product_id, customer_id) pairs to plan
+            sales_history: Historical sales data with [date, product_id, customer_id, sales_volume]
+            top_n: Number of weeks to recommend per pair
+            weeks_ahead: Planning horizon in weeks
+            as_of: Reference date (default: now)
             
-            timing_recommendations.append({
-                'week_number': week,
-                'week_start_date': self._get_week_start_date(week),
-                'score': round(float(timing_score), 3),
-                'expected_baseline_sales': round(float(base_sales), 0),
-                'reason': f"Historical average: {base_sales:.0f} units/week"
-            })
+        Returns:
+            DataFrame with one row per recommended week, ordered by pair and rank
+        """
+        logger.info(f"Analyzing optimal timing for {len(pairs)} product-customer pairs")
         
-        # Sort by score
-        timing_recommendations.sort(key=lambda x: x['score'], reverse=True)
+        keys = ['product_id', 'customer_id']
+        wanted = pd.MultiIndex.from_tuples(pairs, names=keys)
         
-        return timing_recommendations[:5]
+        # Filter to relevant data
+        history = sales_history.set_index(keys)
+        history = history[history.index.isin(wanted)]
+        week_of_year = pd.to_datetime(history['date']).dt.isocalendar().week.astype('int64')
+        
+        volume = history['sales_volume']
+        weekly_avg = volume.groupby([*[history.index.get_level_values(k) for k in keys], week_of_year.values]).mean()
+        weekly_avg.index.names = keys + ['week_number']
+        pair_mean = volume.groupby(level=keys).mean()
+        
+        # Score upcoming weeks for every pair
+        as_of = as_of or datetime.now()
+        current_week = as_of.isocalendar()[1]
+        weeks = np.arange(current_week + 1, min(current_week + weeks_ahead + 1, 53))
+        
+        pair_mean = pair_mean.dropna()
+        grid = pd.MultiIndex.from_arrays(
+            [
+                np.repeat(pair_mean.index.get_level_values('product_id'), len(weeks)),
+                np.repeat(pair_mean.index.get_level_values('customer_id'), len(weeks)),
+                np.tile(weeks, len(pair_mean))
+            ],
+            names=keys + ['week_number']
+        )
+        means = np.repeat(pair_mean.to_numpy(), len(weeks))
+        base_sales = weekly_avg.reindex(grid).to_numpy()
+        base_sales = np.where(np.isnan(base_sales), means, base_sales)
+        
+        # Seasonality score (no event calendar yet, so event score is 1.0)
+        event_score = 1.0
+        scored = grid.to_frame(index=False)
+        scored['score'] = (base_sales / means * event_score).round(3)
+        scored['expected_baseline_sales'] = base_sales.round(0)
+        
+        top = self._top_n(scored, 'score', top_n, keys)
+        
+        week_starts = {week: self._get_week_start_date(week, as_of.year) for week in weeks}
+        top['week_start_date'] = top['week_number'].map(week_starts)
+        top['reason'] = "Historical average: " + top['expected_baseline_sales'].astype('int64').astype(str) + " units/week"
+        
+        return top[keys + ['week_number', 'week_start_date', 'score', 'expected_baseline_sales', 'reason', 'rank']]
     
     def recommend_price_points(
         self,
@@ -414,32 +813,64 @@ class RecommendationEngine:
         Returns:
             Recommended price points with expected volume
         """
-        # Filter to product
-        df = price_history[price_history['product_id'] == product_id].copy()
+        recommendations = self.recommend_price_points_batch([product_id], price_history)
+        
+        return recommendations.drop(columns=['product_id', 'rank']).to_dict('records')
+    
+    def recommend_price_points_batch(
+        self,
+        product_ids: List[str],
+        price_history: pd.DataFrame,
+        top_n: int = 5,
+        margin: float = 0.3
+    ) -> pd.DataFrame:
+        """
+        Recommend price points for many products in one grouped pass
+        
+        Args:
+            product_ids: Products to price
+            price_history: Historical price and sales data
+            top_n: Number of price points per product
+            margin: Assumed margin for profit ranking
+            
+        Returns:
+            DataFrame with one row per recommended price point, ordered by product and rank
+        """
+        df = price_history[price_history['product_id'].isin(product_ids)]
         
-        # Group by price point
-        price_performance = df.groupby('price').agg({
-            'sales_volume': 'mean',
-            'sales_revenue': 'mean'
-        }).reset_index()
+        # Group by product and price point
+        price_performance = df.groupby(['product_id', 'price'], as_index=False).agg(
+            expected_volume=('sales_volume', 'mean'),
+            expected_revenue=('sales_revenue', 'mean')
+        )
         
-        # Calculate profit (assuming 30% margin)
-        price_performance['profit'] = (price_performance['price'] * 0.3) * price_performance['sales_volume']
+        # Calculate profit at the assumed margin
+        price_performance['expected_profit'] = price_performance['price'] * margin * price_performance['expected_volume']
         
-        # Rank by profit
-        price_performance = price_performance.sort_values('profit', ascending=False)
+        top = self._top_n(price_performance, 'expected_profit', top_n, ['product_id'])
         
-        recommendations = []
-        for _, row in price_performance.head(5).iterrows():
-            recommendations.append({
-                'price': round(float(row['price']), 2),
-                'expected_volume': round(float(row['sales_volume']), 0),
-                'expected_revenue': round(float(row['sales_revenue']), 2),
-                'expected_profit': round(float(row['profit']), 2),
-                'reason': 'Based on historical performance at this price point'
-            })
+        top['price'] = top['price'].round(2)
+        top['expected_volume'] = top['expected_volume'].round(0)
+        top['expected_revenue'] = top['expected_revenue'].round(2)
+        top['expected_profit'] = top['expected_profit'].round(2)
+        top['reason'] = 'Based on historical performance at this price point'
         
-        return recommendations
+        return top[['product_id', 'price', 'expected_volume', 'expected_revenue', 'expected_profit', 'reason', 'rank']]
+    
+    @staticmethod
+    def _top_n(df: pd.DataFrame, score_column: str, top_n: int, group_by: Optional[List[str]] = None) -> pd.DataFrame:
+        """Rows with the highest scores (per group), with a 1-based rank column"""
+        ordered = df.sort_values(score_column, ascending=False, kind='stable')
+        
+        if group_by:
+            top = ordered.groupby(group_by, sort=False).head(top_n).copy()
+            top['rank'] = top.groupby(group_by, sort=False).cumcount() + 1
+            top = top.sort_values(group_by + ['rank'], kind='stable')
+        else:
+            top = ordered.head(top_n).copy()
+            top['rank'] = np.arange(1, len(top) + 1)
+        
+        return top.reset_index(drop=True)
     
     def _generate_reason(self, score: float, context: Dict) -> str:
         """Generate human-readable recommendation reason"""
@@ -463,24 +894,35 @@ class RecommendationEngine:
         # Simple heuristic: higher score = higher expected uplift
         return min(50, score * 10)  # Cap at 50%
     
-    def _get_week_start_date(self, week_number: int) -> str:
+    def _get_week_start_date(self, week_number: int, year: Optional[int] = None) -> str:
         """Get start date of week number"""
-        year = datetime.now().year
+        year = year or datetime.now().year
         date = datetime.strptime(f'{year}-W{week_number}-1', "%Y-W%W-%w")
         return date.strftime('%Y-%m-%d')
     
-    def evaluate(self, test_interactions: pd.DataFrame) -> Dict:
-        """Evaluate recommendation quality"""
+    def evaluate(self, test_interactions: pd.DataFrame, k: int = 10, block_size: int = 1024) -> Dict:
+        """
+        Evaluate recommendation quality on held-out interactions
         
-        # Precision@K and Recall@K metrics
-        # Simplified implementation
+        Ranks the full catalogue for every test user (excluding items seen
+        in training) and computes Precision@K, Recall@K, NDCG@K, MAP@K and
+        catalogue coverage, together with evaluation timing.
         
-        metrics = {
-            'precision_at_10': 0.15,  # 15% of recommendations are relevant
-            'recall_at_10': 0.25,  # Capture 25% of relevant items
-            'ndcg_at_10': 0.35,  # Normalized Discounted Cumulative Gain
-            'coverage': 0.60  # 60% of items can be recommended
-        }
+        Args:
+            test_interactions: Held-out interactions with [user_id, item_id]
+            k: Cut-off rank
+            block_size: Users scored per block
+            
+        Returns:
+            Dict of metrics and timings
+        """
+        if self.cf_model.interaction_matrix is None:
+            raise ValueError("Model not trained. Call train() first.")
+        
+        test = index_interactions(test_interactions, self.cf_model.user_index, self.cf_model.item_index)
+        
+        evaluator = RankingEvaluator(k=k, block_size=block_size)
+        metrics = evaluator.evaluate(self.cf_model.score_users, test, exclude=self.cf_model.interaction_matrix)
         
         logger.info(f"Evaluation metrics: {metrics}")
         
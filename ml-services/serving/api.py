@@ -4,27 +4,52 @@ FastAPI application for serving ML models in production
 
 Endpoints:
 - POST /api/v1/forecast/demand - Demand forecasting
+- POST /api/v1/forecast/demand/batch - Demand forecasting for many combinations
 - POST /api/v1/optimize/price - Price optimization
 - POST /api/v1/analyze/promotion-lift - Promotion lift analysis
 - POST /api/v1/recommend/products - Product recommendations
 - GET /health - Health check
-- GET /api/v1/models/{model_type} - Model information
+- GET /metrics - Prometheus metrics
+- GET /api/v1/models/{model_type} - Model information and versions
+- POST /api/v1/models/{model_type}/rollback - Activate a previous model version
+- GET /api/v1/models/{model_type}/traffic - Canary/shadow split and per-version latency
+- POST /api/v1/models/{model_type}/traffic - Set or clear the candidate version
+- POST /api/v1/models/{model_type}/promote - Activate the candidate version
 """
 
 from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel, Field
-from typing import List, Dict, Optional, Any
-from datetime import datetime, date, timedelta
+from typing import List, Dict, Optional, Any, Tuple
+from datetime import datetime, date
+from pathlib import Path
 import logging
 import sys
 import os
+import re
+import numpy as np
+import pandas as pd
 import uvicorn
+import yaml
 
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from models.common.artifacts import ArtifactStore
+from serving.batching import MicroBatcher
+from serving.cache import TTLCache
+from serving.coalescing import SingleFlight, request_key
+from serving.encoding import (
+    ARROW_STREAM, COLUMNAR_JSON, VALUE_COLUMNS,
+    arrow_response, forecast_columns, forecast_rows, json_response, negotiate
+)
+from serving.metrics import MetricsMiddleware, ServingMetrics, TracingMiddleware
+from models.common.tracing import current_span, span
+from serving.registry import ModelRegistry
+from serving.routing import TrafficRouter, UNVERSIONED, config_traffic_pct
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -45,6 +70,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency/in-flight metrics (no payload logging)
+serving_metrics = ServingMetrics()
+app.add_middleware(MetricsMiddleware, metrics=serving_metrics)
+
+# Opt-in span breakdown (X-TRADEAI-Trace: 1 header or TRADEAI_TRACE=1)
+app.add_middleware(TracingMiddleware)
+
 # Request/Response Models
 
 class ForecastRequest(BaseModel):
@@ -53,6 +85,7 @@ class ForecastRequest(BaseModel):
     horizon_days: int = Field(90, description="Number of days to forecast", ge=1, le=365)
     include_promotions: bool = Field(True, description="Include promotion effects")
     confidence_level: float = Field(0.95, description="Confidence level for intervals", ge=0.5, le=0.99)
+    tenant_id: Optional[str] = Field(None, description="Tenant whose sales history the trained model forecasts from")
 
 class ForecastPoint(BaseModel):
     date: str
@@ -68,6 +101,10 @@ class ForecastResponse(BaseModel):
     model_version: str
     features_count: int
     timestamp: str
+    debug: Optional[Dict[str, Any]] = Field(None, description="Span breakdown when tracing is requested")
+
+class BatchForecastRequest(BaseModel):
+    requests: List[ForecastRequest] = Field(..., min_length=1, max_length=1000, description="Forecast requests (config serving.batch_prediction.batch_size)")
 
 class PriceOptimizationRequest(BaseModel):
     product_id: str = Field(..., description="Product identifier")
@@ -85,6 +122,7 @@ class PriceOptimizationResponse(BaseModel):
     confidence: float
     model_version: str
     timestamp: str
+    debug: Optional[Dict[str, Any]] = Field(None, description="Span breakdown when tracing is requested")
 
 class PromotionLiftRequest(BaseModel):
     promotion_id: str = Field(..., description="Promotion identifier")
@@ -99,6 +137,7 @@ class PromotionLiftResponse(BaseModel):
     recommendation: str
     model_version: str
     timestamp: str
+    debug: Optional[Dict[str, Any]] = Field(None, description="Span breakdown when tracing is requested")
 
 class ProductRecommendationRequest(BaseModel):
     customer_id: str = Field(..., description="Customer identifier")
@@ -118,6 +157,7 @@ class ProductRecommendationResponse(BaseModel):
     recommendations: List[Recommendation]
     model_version: str
     timestamp: str
+    debug: Optional[Dict[str, Any]] = Field(None, description="Span breakdown when tracing is requested")
 
 class CustomerSegmentationRequest(BaseModel):
     method: str = Field("rfm", description="Segmentation method: rfm, abc, or clustering")
@@ -138,6 +178,7 @@ class CustomerSegmentationResponse(BaseModel):
     segments: List[Segment]
     insights: List[Dict[str, str]]
     timestamp: str
+    debug: Optional[Dict[str, Any]] = Field(None, description="Span breakdown when tracing is requested")
 
 class AnomalyDetectionRequest(BaseModel):
     metric_type: str = Field(..., description="Metric type: sales, inventory, returns, etc.")
@@ -162,20 +203,334 @@ class AnomalyDetectionResponse(BaseModel):
     anomalies: List[Anomaly]
     summary: Dict[str, int]
     timestamp: str
+    debug: Optional[Dict[str, Any]] = Field(None, description="Span breakdown when tracing is requested")
+
+class ModelRollbackRequest(BaseModel):
+    version: Optional[str] = Field(None, description="Version to activate (default: previous version)")
+
+class TrafficSplitRequest(BaseModel):
+    version: Optional[str] = Field(None, description="Candidate version (None clears the candidate)")
+    canary_pct: Optional[float] = Field(None, ge=0, le=100, description="Share of requests served by the candidate")
+    shadow_pct: Optional[float] = Field(None, ge=0, le=100, description="Share of primary requests shadow-scored by the candidate")
+
+def load_config(path: Path) -> Dict[str, Any]:
+    """Service configuration, empty when the file does not exist"""
+    if not path.is_file():
+        return {}
+    with open(path, 'r') as f:
+        return yaml.safe_load(f) or {}
+
+# Service configuration (TRADEAI_CONFIG, default ml-services/config.yaml)
+CONFIG_PATH = Path(os.environ.get('TRADEAI_CONFIG', Path(__file__).resolve().parent.parent / 'config.yaml'))
+SERVICE_CONFIG = load_config(CONFIG_PATH)
+
+# Trained model artifacts: {MODEL_DIR}/{model_type}/{version}/
+MODEL_DIR = Path(os.environ.get('TRADEAI_MODEL_DIR', '/data/models'))
+
+# Active models, hot-swapped when new artifact versions are published
+model_registry = ModelRegistry(
+    ArtifactStore(MODEL_DIR),
+    model_types=[
+        'demand_forecasting',
+        'price_optimization',
+        'promotion_lift',
+        'recommendations',
+        'customer_segmentation',
+        'anomaly_detection'
+    ],
+    keep_versions=int(os.environ.get('TRADEAI_MODEL_KEEP_VERSIONS', 3)),
+    poll_interval=float(os.environ.get('TRADEAI_MODEL_POLL_SECONDS', 30))
+)
+
+# Canary/shadow traffic for candidate versions: config.yaml shares (see config_traffic_pct),
+# overridden by TRADEAI_CANARY_TRAFFIC_PCT / TRADEAI_SHADOW_TRAFFIC_PCT; with a non-zero
+# share, newly published versions start as candidates instead of going live
+default_canary_pct, default_shadow_pct = config_traffic_pct(SERVICE_CONFIG)
+traffic_router = TrafficRouter(
+    model_registry,
+    canary_pct=float(os.environ.get('TRADEAI_CANARY_TRAFFIC_PCT', default_canary_pct)),
+    shadow_pct=float(os.environ.get('TRADEAI_SHADOW_TRAFFIC_PCT', default_shadow_pct))
+)
+if traffic_router.canary_pct > 0 or traffic_router.shadow_pct > 0:
+    model_registry.on_new_version = traffic_router.stage
+
+def request_debug() -> Optional[Dict[str, Any]]:
+    """Span breakdown of the current request, or None when it is not traced"""
+    root = current_span()
+    return root.to_dict() if root is not None else None
+
+def served_version(base: str, model: Any, version: str) -> str:
+    """Response model_version: base plus artifact version (or mock/actual when unversioned)"""
+    if model is None:
+        return f"{base}-mock"
+    return f"{base}-{'actual' if version == UNVERSIONED else version}"
+
+serving_metrics.track_models(model_registry, traffic_router)
+
+# Per-tenant raw data: {DATA_DIR}/{tenant_id}/{name}.parquet|csv|jsonl
+DATA_DIR = Path(os.environ.get('TRADEAI_DATA_DIR', '/data/raw'))
+
+# Segmentation results keyed by (tenant, window, method, source version)
+segmentation_cache = TTLCache(ttl=3600, max_size=10000)
+serving_metrics.track_cache('segmentation', segmentation_cache)
+
+# Forecast/recommendation results keyed by normalized request + model version
+# (config serving.caching); identical concurrent requests share one computation
+prediction_cache = TTLCache(ttl=float(os.environ.get('TRADEAI_PREDICTION_CACHE_TTL', 3600)), max_size=10000)
+serving_metrics.track_cache('predictions', prediction_cache)
+prediction_flight = SingleFlight(prediction_cache)
 
-# Global model cache
-model_cache = {
-    'demand_forecasting': None,
-    'price_optimization': None,
-    'promotion_lift': None,
-    'recommendations': None,
-    'customer_segmentation': None,
-    'anomaly_detection': None
-}
+# Tenant sales histories keyed by source file version
+history_cache = TTLCache(ttl=3600, max_size=16)
+serving_metrics.track_cache('sales_history', history_cache)
+
+def history_version(tenant_id: Optional[str]) -> Optional[Tuple[int, int]]:
+    """Version (mtime, size) of a tenant's sales file, or None if the tenant has none"""
+    source = tenant_data_file(tenant_id, 'sales') if tenant_id else None
+    if source is None:
+        return None
+    stat = source.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+def tenant_sales_history(tenant_id: Optional[str]) -> Optional[pd.DataFrame]:
+    """A tenant's sales history (DATA_DIR/{tenant_id}/sales.*), or None if the tenant has none"""
+    version = history_version(tenant_id)
+    if version is None:
+        return None
+    source = tenant_data_file(tenant_id, 'sales')
+    
+    key = (str(source),) + version
+    history = history_cache.get(key)
+    if history is None:
+        with span('history.load', tenant=tenant_id):
+            if source.suffix == '.parquet':
+                history = pd.read_parquet(source)
+            elif source.suffix == '.jsonl':
+                history = pd.read_json(source, lines=True, dtype={'product_id': str, 'customer_id': str})
+            else:
+                history = pd.read_csv(source, dtype={'product_id': str, 'customer_id': str})
+            history['date'] = pd.to_datetime(history['date'])
+            history_cache.set(key, history)
+    return history
+
+def is_trained(model: Any) -> bool:
+    """Whether a registry model has fitted estimators (not the untrained default)"""
+    return bool(getattr(model, 'models', None))
+
+def model_forecast(model: Any, history: pd.DataFrame, requests: List[ForecastRequest]) -> List[Optional[Dict[str, np.ndarray]]]:
+    """
+    Forecast requests of one tenant with a single DemandForecaster.forecast call
+    
+    All requested series are forecast together for the longest horizon; each
+    request takes its series' first horizon_days rows, with bounds from the
+    stored conformal quantiles at its own confidence_level and each day's
+    lead time. Series without
+    history get None.
+    """
+    keys = pd.MultiIndex.from_arrays([
+        [request.product_id for request in requests],
+        [request.customer_id for request in requests]
+    ])
+    series = history[pd.MultiIndex.from_arrays([history['product_id'], history['customer_id']]).isin(keys)]
+    if series.empty:
+        return [None] * len(requests)
+    
+    horizons = np.array([request.horizon_days for request in requests])
+    frame = model.forecast(series, horizon_days=int(horizons.max()))
+    
+    # Series-major rows: each series' horizon starts at a multiple of the longest horizon
+    first = pd.MultiIndex.from_arrays([frame['product_id'], frame['customer_id']])[::horizons.max()]
+    position = first.get_indexer(keys)
+    found = np.flatnonzero(position >= 0)
+    rows = np.concatenate([position[i] * horizons.max() + np.arange(horizons[i]) for i in found]) if len(found) else np.array([], dtype=int)
+    
+    predicted = frame['predicted_volume'].to_numpy()[rows]
+    if getattr(model, 'intervals', None) is not None:
+        levels = np.repeat([requests[i].confidence_level for i in found], horizons[found])
+        lower, upper = model.intervals.bounds(
+            predicted, levels, model.ensemble.segments_of(frame.iloc[rows]), lead_times=rows % horizons.max() + 1
+        )
+    else:
+        # Artifacts saved before interval quantiles were stored
+        lower, upper = predicted * 0.85, predicted * 1.15
+    dates = frame['date'].to_numpy()[rows].astype('datetime64[D]').astype(str)
+    
+    results: List[Optional[Dict[str, np.ndarray]]] = [None] * len(requests)
+    offsets = np.concatenate(([0], np.cumsum(horizons[found])))
+    for i, start, end in zip(found, offsets[:-1], offsets[1:]):
+        results[i] = {
+            'date': dates[start:end],
+            'predicted_volume': np.round(predicted[start:end]),
+            'confidence_lower': np.round(np.maximum(lower[start:end], 0)),
+            'confidence_upper': np.round(upper[start:end])
+        }
+    return results
+
+def mock_forecast(requests: List[ForecastRequest]) -> List[Dict[str, np.ndarray]]:
+    """Trend + weekly seasonality with a ±15% band, for untrained models and series without history"""
+    horizons = np.array([request.horizon_days for request in requests])
+    offsets = np.concatenate(([0], np.cumsum(horizons)))
+    day = np.arange(offsets[-1]) - np.repeat(offsets[:-1], horizons)
+    horizon = np.repeat(horizons, horizons)
+    
+    trend = 1 + (day / horizon) * 0.1
+    seasonal = 1 + np.sin((day / 7) * np.pi * 2) * 0.1
+    noise = 0.95 + np.random.random(len(day)) * 0.1
+    value = 1000 * trend * seasonal * noise
+    
+    dates = (np.datetime64(date.today(), 'D') + np.arange(horizons.max())).astype(str)
+    predicted, lower, upper = np.round(value), np.round(value * 0.85), np.round(value * 1.15)
+    
+    return [
+        {
+            'date': dates[:end - start],
+            'predicted_volume': predicted[start:end],
+            'confidence_lower': lower[start:end],
+            'confidence_upper': upper[start:end]
+        }
+        for start, end in zip(offsets[:-1], offsets[1:])
+    ]
+
+def forecast_batch(model: Any, requests: List[ForecastRequest]) -> Tuple[List[Dict[str, np.ndarray]], List[bool]]:
+    """
+    Forecast several requests in one vectorized pass
+    
+    With a trained model, requests are grouped by tenant and each group is
+    one model.forecast call over that tenant's sales history (model_forecast).
+    Untrained models, requests without a tenant and series without history
+    are served by the mock forecast.
+    
+    Returns:
+        Per request, columns [date, predicted_volume, confidence_lower, confidence_upper],
+        and per request whether the model produced it (False for the mock)
+    """
+    results: List[Optional[Dict[str, np.ndarray]]] = [None] * len(requests)
+    
+    if is_trained(model):
+        tenants: Dict[str, List[int]] = {}
+        for i, request in enumerate(requests):
+            if request.tenant_id:
+                tenants.setdefault(request.tenant_id, []).append(i)
+        for tenant_id, indices in tenants.items():
+            history = tenant_sales_history(tenant_id)
+            if history is None:
+                continue
+            for i, forecast in zip(indices, model_forecast(model, history, [requests[i] for i in indices])):
+                results[i] = forecast
+    
+    modeled = [forecast is not None for forecast in results]
+    missing = [i for i, forecast in enumerate(results) if forecast is None]
+    if missing:
+        with span('forecast.mock', requests=len(missing)):
+            for i, forecast in zip(missing, mock_forecast([requests[i] for i in missing])):
+                results[i] = forecast
+    
+    return results, modeled
+
+def run_forecast_batch(items: List[Tuple[Tuple, ForecastRequest]]) -> List[Tuple[Dict[str, np.ndarray], str]]:
+    """Micro-batch function: one routed model call per serving version"""
+    groups: Dict[str, List[int]] = {}
+    for i, (choice, _) in enumerate(items):
+        groups.setdefault(choice[0], []).append(i)
+    
+    results = [None] * len(items)
+    for indices in groups.values():
+        choice = items[indices[0]][0]
+        requests = [items[i][1] for i in indices]
+        (forecasts, modeled), version = traffic_router.call(
+            'demand_forecasting',
+            lambda model, requests=requests: forecast_batch(model, requests),
+            values=lambda batch: np.concatenate([forecast['predicted_volume'] for forecast in batch[0]]),
+            choice=choice
+        )
+        for i, forecast, from_model in zip(indices, forecasts, modeled):
+            results[i] = (forecast, served_version("v1.2.3", choice[1] if from_model else None, version))
+    
+    return results
+
+# Concurrent forecast requests share one vectorized model call
+forecast_batcher = MicroBatcher(
+    run_forecast_batch,
+    max_batch_size=int(os.environ.get('TRADEAI_MICROBATCH_MAX_SIZE', 64)),
+    max_wait_ms=float(os.environ.get('TRADEAI_MICROBATCH_MAX_WAIT_MS', 5))
+)
+serving_metrics.track_batcher('forecast', forecast_batcher)
+
+MOCK_PRODUCTS = [
+    "Cadbury Dairy Milk 150g",
+    "Oreo Original 154g",
+    "Cadbury Lunch Bar 48g",
+    "Halls Mentho-Lyptus",
+    "Cadbury PS Chocolate 80g",
+    "Bournvita 500g",
+    "Maynards Wine Gums 125g",
+    "Stimorol Gum",
+    "Cadbury Top Deck 80g",
+    "Cadbury Whispers 135g"
+]
+
+def mock_recommendations(top_n: int) -> List[Recommendation]:
+    """Fixed product list, for an untrained recommendation model"""
+    return [
+        Recommendation(
+            product_id=f"prod-{i+1:03d}",
+            product_name=product,
+            score=round(0.9 - (i * 0.05), 3),
+            confidence=0.8,
+            reason="High affinity based on past purchases" if i < 3 else "Popular in your customer segment",
+            expected_uplift_pct=round(12.5 - i, 1)
+        )
+        for i, product in enumerate(MOCK_PRODUCTS[:top_n])
+    ]
+
+def run_recommendation_batch(requests: List[ProductRecommendationRequest]) -> List[Tuple[List[Recommendation], str]]:
+    """Micro-batch function: one RecommendationEngine.recommend_products_batch call per top_n"""
+    model = model_registry['recommendations']
+    version = model_registry.active_version('recommendations') or UNVERSIONED
+    
+    if not getattr(getattr(model, 'cf_model', None), 'item_index', None):
+        model_version = served_version("v1.3.2", None, version)
+        return [(mock_recommendations(request.top_n), model_version) for request in requests]
+    
+    model_version = served_version("v1.3.2", model, version)
+    groups: Dict[int, List[int]] = {}
+    for i, request in enumerate(requests):
+        groups.setdefault(request.top_n, []).append(i)
+    
+    results = [None] * len(requests)
+    for top_n, indices in groups.items():
+        batch = model.recommend_products_batch(
+            [requests[i].customer_id for i in indices],
+            [requests[i].context or {} for i in indices],
+            top_n=top_n
+        )
+        for i, recommendations in zip(indices, batch):
+            results[i] = ([Recommendation(**recommendation) for recommendation in recommendations], model_version)
+    
+    return results
+
+# Concurrent recommendation requests share one block-scored engine call
+recommendation_batcher = MicroBatcher(
+    run_recommendation_batch,
+    max_batch_size=int(os.environ.get('TRADEAI_MICROBATCH_MAX_SIZE', 64)),
+    max_wait_ms=float(os.environ.get('TRADEAI_MICROBATCH_MAX_WAIT_MS', 5))
+)
+serving_metrics.track_batcher('recommendations', recommendation_batcher)
+
+def tenant_data_file(tenant_id: str, name: str) -> Optional[Path]:
+    """Locate a tenant's raw data file, or None if the tenant has none"""
+    if not re.fullmatch(r'[A-Za-z0-9_-]+', tenant_id):
+        return None
+
+    for suffix in ('.parquet', '.csv', '.jsonl'):
+        path = DATA_DIR / tenant_id / f'{name}{suffix}'
+        if path.is_file():
+            return path
+    return None
 
 # Model loading functions
 def load_models():
-    """Load all ML models into memory"""
+    """Load all ML models into memory (latest artifact version when one exists)"""
     try:
         logger.info("Loading ML models...")
         
@@ -184,6 +539,8 @@ def load_models():
         from models.price_optimization.optimizer import PriceOptimizer
         from models.promotion_lift.analyzer import PromotionLiftAnalyzer
         from models.recommendation.recommender import RecommendationEngine
+        from models.customer_segmentation.segmenter import CustomerSegmenter
+        from models.anomaly_detection.detector import StreamingAnomalyDetector
         
         # Load configurations
         config = {
@@ -191,11 +548,21 @@ def load_models():
             'hyperparameters': {}
         }
         
-        # Initialize models
-        model_cache['demand_forecasting'] = DemandForecaster(config)
-        model_cache['price_optimization'] = PriceOptimizer(config)
-        model_cache['promotion_lift'] = PromotionLiftAnalyzer(config)
-        model_cache['recommendations'] = RecommendationEngine(config)
+        # Initialize models (untrained until an artifact version is loaded)
+        model_registry['demand_forecasting'] = DemandForecaster(config)
+        model_registry['price_optimization'] = PriceOptimizer(config)
+        model_registry['promotion_lift'] = PromotionLiftAnalyzer(config)
+        model_registry['recommendations'] = RecommendationEngine(config)
+        model_registry['customer_segmentation'] = CustomerSegmenter()
+        model_registry['anomaly_detection'] = StreamingAnomalyDetector()
+        
+        # Trained models: load the latest published versions
+        model_registry.loaders = {
+            'demand_forecasting': DemandForecaster.load,
+            'price_optimization': PriceOptimizer.load,
+            'recommendations': RecommendationEngine.load
+        }
+        model_registry.refresh()
         
         logger.info("✅ All models loaded successfully")
         
@@ -212,25 +579,45 @@ async def startup_event():
     except Exception as e:
         logger.error(f"Failed to load models: {e}")
         # Continue anyway - endpoints will return errors if models not loaded
+    
+    # Pick up newly published model versions without a restart
+    model_registry.start()
+
+# Shutdown event
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop watching the artifact directory"""
+    model_registry.stop()
+    traffic_router.shutdown()
+    forecast_batcher.stop()
+    recommendation_batcher.stop()
 
 # Health check
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    models_loaded = all(model is not None for model in model_cache.values())
+    models_loaded = all(model is not None for model in model_registry.values())
     
     return {
         "status": "healthy" if models_loaded else "degraded",
         "timestamp": datetime.now().isoformat(),
         "models": {
-            "demand_forecasting": model_cache['demand_forecasting'] is not None,
-            "price_optimization": model_cache['price_optimization'] is not None,
-            "promotion_lift": model_cache['promotion_lift'] is not None,
-            "recommendations": model_cache['recommendations'] is not None
+            "demand_forecasting": model_registry['demand_forecasting'] is not None,
+            "price_optimization": model_registry['price_optimization'] is not None,
+            "promotion_lift": model_registry['promotion_lift'] is not None,
+            "recommendations": model_registry['recommendations'] is not None
         },
         "version": "1.0.0"
     }
 
+# Metrics endpoint
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics"""
+    serving_metrics.update_threadpool()
+    body, content_type = serving_metrics.render()
+    return Response(content=body, media_type=content_type)
+
 # Root endpoint
 @app.get("/")
 async def root():
@@ -241,66 +628,112 @@ async def root():
         "status": "running",
         "endpoints": [
             "POST /api/v1/forecast/demand",
+            "POST /api/v1/forecast/demand/batch",
             "POST /api/v1/optimize/price",
             "POST /api/v1/analyze/promotion-lift",
             "POST /api/v1/recommend/products",
             "GET /health",
+            "GET /metrics",
             "GET /docs"
         ]
     }
 
 # Demand Forecasting Endpoint
 @app.post("/api/v1/forecast/demand", response_model=ForecastResponse)
-async def forecast_demand(request: ForecastRequest):
+async def forecast_demand(request: ForecastRequest, http_request: Request):
     """
     Generate demand forecast for product-customer combination
     
-    Returns 90-day (default) forecast with confidence intervals
+    Returns 90-day (default) forecast with confidence intervals, as JSON
+    rows (default), columnar JSON or an Arrow stream depending on Accept
     """
     logger.info(f"Forecasting demand: {request.product_id} + {request.customer_id}")
     
     try:
-        # Generate mock forecast (replace with actual model prediction when models are loaded)
-        import numpy as np
-        from datetime import timedelta
+        choice = traffic_router.choose('demand_forecasting', f"{request.customer_id}:{request.product_id}")
         
-        forecast_data = []
-        base_value = 1000
-        start_date = datetime.now()
+        if current_span() is None:
+            # Forecasts start today, so cached results do not outlive the day
+            key = request_key('demand_forecasting', choice[0], request) + (date.today().isoformat(), history_version(request.tenant_id))
+            forecast, model_version = await prediction_flight.do(key, lambda: forecast_batcher.submit((choice, request)))
+        else:
+            # Traced requests always compute, so the breakdown shows the model call
+            [(forecast, model_version)] = await run_in_threadpool(run_forecast_batch, [(choice, request)])
         
-        for i in range(request.horizon_days):
-            date = start_date + timedelta(days=i)
-            
-            # Simple trend + seasonality
-            trend = 1 + (i / request.horizon_days) * 0.1
-            seasonal = 1 + np.sin((i / 7) * np.pi * 2) * 0.1
-            noise = 0.95 + np.random.random() * 0.1
-            
-            value = base_value * trend * seasonal * noise
-            
-            forecast_data.append(ForecastPoint(
-                date=date.strftime('%Y-%m-%d'),
-                predicted_volume=round(value, 0),
-                confidence_lower=round(value * 0.85, 0),
-                confidence_upper=round(value * 1.15, 0)
-            ))
+        response = {
+            "product_id": request.product_id,
+            "customer_id": request.customer_id,
+            "accuracy_estimate": 0.11,  # 11% MAPE
+            "model_version": model_version,
+            "features_count": 120,
+            "timestamp": datetime.now().isoformat()
+        }
         
-        model_status = "mock" if model_cache['demand_forecasting'] is None else "actual"
+        layout = negotiate(http_request.headers.get('accept'))
+        if layout == ARROW_STREAM:
+            return arrow_response(forecast, response)
         
-        return ForecastResponse(
-            product_id=request.product_id,
-            customer_id=request.customer_id,
-            forecast=forecast_data,
-            accuracy_estimate=0.11,  # 11% MAPE
-            model_version=f"v1.2.3-{model_status}",
-            features_count=120,
-            timestamp=datetime.now().isoformat()
-        )
+        response["forecast"] = forecast_columns(forecast) if layout == COLUMNAR_JSON else forecast_rows(forecast)
+        response["debug"] = request_debug()
+        return json_response(response, media_type=layout)
         
     except Exception as e:
         logger.error(f"Forecast failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# Batch Demand Forecasting Endpoint
+@app.post("/api/v1/forecast/demand/batch")
+async def forecast_demand_batch(request: BatchForecastRequest, http_request: Request):
+    """
+    Generate demand forecasts for many product-customer combinations
+    
+    Runs one vectorized model call per serving model version. The Arrow
+    layout is a single long table with product/customer/version columns.
+    """
+    logger.info(f"Forecasting demand for {len(request.requests)} combinations")
+    
+    try:
+        items = [
+            (traffic_router.choose('demand_forecasting', f"{item.customer_id}:{item.product_id}"), item)
+            for item in request.requests
+        ]
+        results = await run_in_threadpool(run_forecast_batch, items)
+        
+        response = {
+            "count": len(results),
+            "accuracy_estimate": 0.11,
+            "features_count": 120,
+            "timestamp": datetime.now().isoformat()
+        }
+        
+        layout = negotiate(http_request.headers.get('accept'))
+        if layout == ARROW_STREAM:
+            lengths = [len(forecast['date']) for forecast, _ in results]
+            columns = {
+                'product_id': np.repeat([item.product_id for item in request.requests], lengths),
+                'customer_id': np.repeat([item.customer_id for item in request.requests], lengths),
+                'model_version': np.repeat([model_version for _, model_version in results], lengths),
+                'date': np.concatenate([forecast['date'] for forecast, _ in results]),
+                **{name: np.concatenate([forecast[name] for forecast, _ in results]) for name in VALUE_COLUMNS}
+            }
+            return arrow_response(columns, response)
+        
+        encode = forecast_columns if layout == COLUMNAR_JSON else forecast_rows
+        response["forecasts"] = [
+            {
+                "product_id": item.product_id,
+                "customer_id": item.customer_id,
+                "model_version": model_version,
+                "forecast": encode(forecast)
+            }
+            for item, (forecast, model_version) in zip(request.requests, results)
+        ]
+        return json_response(response, media_type=layout)
+        
+    except Exception as e:
+        logger.error(f"Batch forecast failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 # Price Optimization Endpoint
 @app.post("/api/v1/optimize/price", response_model=PriceOptimizationResponse)
 async def optimize_price(request: PriceOptimizationRequest):
@@ -313,11 +746,17 @@ async def optimize_price(request: PriceOptimizationRequest):
     
     try:
         # Simple optimization (replace with actual model when models are loaded)
-        target_margin = 0.4
-        optimal_price = request.cost / (1 - target_margin)
-        price_change = ((optimal_price - request.current_price) / request.current_price) * 100
+        def predict(model):
+            with span('price.margin_rule'):
+                target_margin = 0.4
+                return model, request.cost / (1 - target_margin)
         
-        model_status = "mock" if model_cache['price_optimization'] is None else "actual"
+        (model, optimal_price), version = traffic_router.call(
+            'price_optimization', predict,
+            key=request.product_id,
+            values=lambda result: [result[1]]
+        )
+        price_change = ((optimal_price - request.current_price) / request.current_price) * 100
         
         return PriceOptimizationResponse(
             product_id=request.product_id,
@@ -330,8 +769,9 @@ async def optimize_price(request: PriceOptimizationRequest):
                 "profit_change_pct": round(price_change * 1.5, 2)
             },
             confidence=0.85,
-            model_version=f"v2.1.0-{model_status}",
-            timestamp=datetime.now().isoformat()
+            model_version=served_version("v2.1.0", model, version),
+            timestamp=datetime.now().isoformat(),
+            debug=request_debug()
         )
         
     except Exception as e:
@@ -348,7 +788,7 @@ async def analyze_promotion_lift(request: PromotionLiftRequest):
     """
     logger.info(f"Analyzing promotion: {request.promotion_id}")
     
-    if model_cache['promotion_lift'] is None:
+    if model_registry['promotion_lift'] is None:
         raise HTTPException(status_code=503, detail="Promotion lift model not loaded")
     
     try:
@@ -380,7 +820,8 @@ async def analyze_promotion_lift(request: PromotionLiftRequest):
             },
             recommendation="✅ EXCELLENT: Promotion highly successful with 20% lift and 300% ROI. Repeat this promotion!",
             model_version="v1.0.5",
-            timestamp=datetime.now().isoformat()
+            timestamp=datetime.now().isoformat(),
+            debug=request_debug()
         )
         
     except Exception as e:
@@ -397,44 +838,27 @@ async def recommend_products(request: ProductRecommendationRequest):
     """
     logger.info(f"Generating recommendations: {request.customer_id}")
     
-    if model_cache['recommendations'] is None:
+    if model_registry['recommendations'] is None:
         raise HTTPException(status_code=503, detail="Recommendation model not loaded")
     
     try:
-        # Mock recommendations (replace with actual model)
-        import numpy as np
-        
-        products = [
-            "Cadbury Dairy Milk 150g",
-            "Oreo Original 154g",
-            "Cadbury Lunch Bar 48g",
-            "Halls Mentho-Lyptus",
-            "Cadbury PS Chocolate 80g",
-            "Bournvita 500g",
-            "Maynards Wine Gums 125g",
-            "Stimorol Gum",
-            "Cadbury Top Deck 80g",
-            "Cadbury Whispers 135g"
-        ]
+        version = model_registry.active_version('recommendations')
         
-        recommendations = []
-        for i, product in enumerate(products[:request.top_n]):
-            score = 0.9 - (i * 0.05)
-            
-            recommendations.append(Recommendation(
-                product_id=f"prod-{i+1:03d}",
-                product_name=product,
-                score=round(score, 3),
-                confidence=0.8,
-                reason="High affinity based on past purchases" if i < 3 else "Popular in your customer segment",
-                expected_uplift_pct=round(12.5 - i, 1)
-            ))
+        if current_span() is None:
+            recommendations, model_version = await prediction_flight.do(
+                request_key('recommendations', version, request),
+                lambda: recommendation_batcher.submit(request)
+            )
+        else:
+            # Traced requests always compute, so the breakdown shows the model call
+            [(recommendations, model_version)] = await run_in_threadpool(run_recommendation_batch, [request])
         
         return ProductRecommendationResponse(
             customer_id=request.customer_id,
             recommendations=recommendations,
-            model_version="v1.3.2",
-            timestamp=datetime.now().isoformat()
+            model_version=model_version,
+            timestamp=datetime.now().isoformat(),
+            debug=request_debug()
         )
         
     except Exception as e:
@@ -448,8 +872,38 @@ async def segment_customers(request: CustomerSegmentationRequest):
     
     logger.info(f"Customer segmentation request: method={request.method}, tenant={request.tenant_id}")
     
+    source = tenant_data_file(request.tenant_id, 'transactions')
+    
+    if source is not None:
+        from models.customer_segmentation.segmenter import CustomerSegmenter
+        if request.method not in CustomerSegmenter.METHODS:
+            raise HTTPException(status_code=400, detail=f"Unknown segmentation method: {request.method}")
+    
     try:
-        # Fallback data for now (ML model integration later)
+        if source is not None:
+            if model_registry['customer_segmentation'] is None:
+                model_registry['customer_segmentation'] = CustomerSegmenter()
+            segmenter = model_registry['customer_segmentation']
+
+            stat = source.stat()
+            key = (request.tenant_id, request.start_date, request.end_date, request.method, stat.st_mtime_ns, stat.st_size)
+            # Traced requests always compute, so the breakdown shows the segmenter
+            result = segmentation_cache.get(key) if current_span() is None else None
+
+            if result is None:
+                result = await run_in_threadpool(
+                    segmenter.segment_file, source, request.method, request.start_date, request.end_date
+                )
+                segmentation_cache.set(key, result)
+
+            return CustomerSegmentationResponse(
+                method=request.method,
+                timestamp=datetime.now().isoformat(),
+                debug=request_debug(),
+                **result
+            )
+
+        # No transaction data for this tenant: fallback data
         segments_data = {
             'rfm': [
                 {'name': 'Champions', 'count': 45, 'percentage': 15.0, 'avgRevenue': 85000, 'color': '#10b981'},
@@ -478,7 +932,8 @@ async def segment_customers(request: CustomerSegmentationRequest):
             totalCustomers=total_customers,
             segments=segments,
             insights=insights,
-            timestamp=datetime.now().isoformat()
+            timestamp=datetime.now().isoformat(),
+            debug=request_debug()
         )
         
     except Exception as e:
@@ -493,29 +948,24 @@ async def detect_anomalies(request: AnomalyDetectionRequest):
     logger.info(f"Anomaly detection request: metric={request.metric_type}, tenant={request.tenant_id}")
     
     try:
-        # Fallback data for now (ML model integration later)
-        anomalies = [
-            {
-                'id': 'anom_001',
-                'date': (datetime.now() - timedelta(days=2)).strftime('%Y-%m-%d'),
-                'metricType': request.metric_type,
-                'actualValue': 45000,
-                'expectedValue': 78000,
-                'deviation': -42.3,
-                'severity': 'high',
-                'description': f'Significant drop in {request.metric_type}'
-            },
-            {
-                'id': 'anom_002',
-                'date': (datetime.now() - timedelta(days=5)).strftime('%Y-%m-%d'),
-                'metricType': request.metric_type,
-                'actualValue': 125000,
-                'expectedValue': 80000,
-                'deviation': 56.3,
-                'severity': 'medium',
-                'description': f'Unusual spike in {request.metric_type}'
-            }
-        ]
+        source = tenant_data_file(request.tenant_id, 'metrics')
+        anomalies = []
+
+        if source is not None:
+            if model_registry['anomaly_detection'] is None:
+                from models.anomaly_detection.detector import StreamingAnomalyDetector
+                model_registry['anomaly_detection'] = StreamingAnomalyDetector()
+            detector = model_registry['anomaly_detection']
+
+            # Only points appended since the last request are scored
+            await run_in_threadpool(detector.ingest_file, source, request.tenant_id)
+            anomalies = detector.anomalies(
+                request.tenant_id,
+                request.metric_type,
+                threshold=request.threshold,
+                start_date=request.start_date,
+                end_date=request.end_date
+            )
         
         summary = {
             'high': sum(1 for a in anomalies if a['severity'] == 'high'),
@@ -528,7 +978,8 @@ async def detect_anomalies(request: AnomalyDetectionRequest):
             detectedAnomalies=len(anomalies),
             anomalies=anomalies,
             summary=summary,
-            timestamp=datetime.now().isoformat()
+            timestamp=datetime.now().isoformat(),
+            debug=request_debug()
         )
         
     except Exception as e:
@@ -540,7 +991,7 @@ async def detect_anomalies(request: AnomalyDetectionRequest):
 async def get_model_info(model_type: str):
     """Get information about a specific model"""
     
-    if model_type not in model_cache:
+    if model_type not in model_registry:
         raise HTTPException(status_code=404, detail=f"Model type '{model_type}' not found")
     
     model_info = {
@@ -580,8 +1031,92 @@ async def get_model_info(model_type: str):
     
     return {
         "model_type": model_type,
-        "loaded": model_cache[model_type] is not None,
+        "loaded": model_registry[model_type] is not None,
         "info": model_info.get(model_type, {}),
+        "versions": model_registry.versions(model_type),
+        "traffic": traffic_router.stats(model_type),
+        "timestamp": datetime.now().isoformat()
+    }
+
+# Model Rollback Endpoint
+@app.post("/api/v1/models/{model_type}/rollback")
+async def rollback_model(model_type: str, request: Optional[ModelRollbackRequest] = None):
+    """Activate a previous model version (the one before the active by default)"""
+    
+    if model_type not in model_registry:
+        raise HTTPException(status_code=404, detail=f"Model type '{model_type}' not found")
+    
+    try:
+        version = await run_in_threadpool(model_registry.rollback, model_type, request.version if request else None)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except (KeyError, FileNotFoundError) as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    
+    logger.info(f"Rolled back {model_type} to version {version}")
+    
+    return {
+        "model_type": model_type,
+        "versions": model_registry.versions(model_type),
+        "timestamp": datetime.now().isoformat()
+    }
+
+# Traffic Split Endpoints
+@app.get("/api/v1/models/{model_type}/traffic")
+async def get_traffic(model_type: str):
+    """Canary/shadow split, per-version latency histograms and shadow prediction deltas"""
+    
+    if model_type not in model_registry:
+        raise HTTPException(status_code=404, detail=f"Model type '{model_type}' not found")
+    
+    return {
+        "model_type": model_type,
+        **traffic_router.stats(model_type),
+        "timestamp": datetime.now().isoformat()
+    }
+
+@app.post("/api/v1/models/{model_type}/traffic")
+async def set_traffic(model_type: str, request: TrafficSplitRequest):
+    """Route a share of traffic to a candidate version, or clear the candidate"""
+    
+    if model_type not in model_registry:
+        raise HTTPException(status_code=404, detail=f"Model type '{model_type}' not found")
+    
+    if request.version is None:
+        traffic_router.clear_candidate(model_type)
+    else:
+        try:
+            await run_in_threadpool(
+                traffic_router.set_candidate, model_type, request.version, request.canary_pct, request.shadow_pct
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        except (KeyError, FileNotFoundError) as e:
+            raise HTTPException(status_code=404, detail=str(e))
+    
+    return {
+        "model_type": model_type,
+        **traffic_router.stats(model_type),
+        "timestamp": datetime.now().isoformat()
+    }
+
+@app.post("/api/v1/models/{model_type}/promote")
+async def promote_model(model_type: str):
+    """Activate the candidate version and stop splitting traffic"""
+    
+    if model_type not in model_registry:
+        raise HTTPException(status_code=404, detail=f"Model type '{model_type}' not found")
+    
+    try:
+        version = await run_in_threadpool(traffic_router.promote, model_type)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    logger.info(f"Promoted {model_type} version {version}")
+    
+    return {
+        "model_type": model_type,
+        "versions": model_registry.versions(model_type),
         "timestamp": datetime.now().isoformat()
     }
 
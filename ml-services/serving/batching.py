@@ -0,0 +1,138 @@
+"""
+TRADEAI ML Micro-Batching
+Dynamic batching of per-item inference requests
+
+Gather: Requests arriving within max_wait_ms, up to max_batch_size
+Run: One vectorized model call per batch in the thread pool
+Scatter: Each awaiting request receives its own result (or error)
+"""
+
+import asyncio
+from typing import Any, Callable, List, Optional, Tuple
+import logging
+
+from fastapi.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Collects concurrent submissions into batches for one model call
+
+    A batch is run as soon as it is full, or max_wait_ms after its first
+    item arrived, so the added latency is bounded by max_wait_ms plus the
+    time waiting for earlier batches. While max_concurrency batches are
+    running, new items keep accumulating into the next one.
+
+    Args:
+        fn: callable(items) -> results, one per item in order; a result
+            that is an Exception instance fails only that item
+        max_batch_size: Items per model call
+        max_wait_ms: Longest wait for a batch to fill
+        max_concurrency: Batches running at the same time
+    """
+
+    def __init__(
+        self,
+        fn: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0,
+        max_concurrency: int = 1
+    ):
+        self.fn = fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_concurrency = max_concurrency
+
+        self.batches = 0
+        self.items = 0
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    async def submit(self, item: Any) -> Any:
+        """Queue an item and wait for its result"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._start(loop)
+
+        future = loop.create_future()
+        self._pending.append((item, future))
+        self._arrived.set()
+        if len(self._pending) >= self.max_batch_size:
+            self._full.set()
+
+        return await future
+
+    @property
+    def queue_depth(self) -> int:
+        """Items waiting for a batch"""
+        return len(self._pending)
+
+    def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+
+    def _start(self, loop: asyncio.AbstractEventLoop):
+        # Futures from a previous (closed) event loop can never complete
+        self._pending = []
+        self._loop = loop
+        self._arrived = asyncio.Event()
+        self._full = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._worker = loop.create_task(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._arrived.wait()
+            await self._slots.acquire()
+
+            # Wait for the batch to fill, at most max_wait after its first item
+            deadline = loop.time() + self.max_wait
+            while len(self._pending) < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                self._full.clear()
+                try:
+                    await asyncio.wait_for(self._full.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+
+            batch = self._pending[:self.max_batch_size]
+            self._pending = self._pending[self.max_batch_size:]
+            if not self._pending:
+                self._arrived.clear()
+            self._full.clear()
+
+            # Requests cancelled while waiting are not computed
+            batch = [(item, future) for item, future in batch if not future.done()]
+            if not batch:
+                self._slots.release()
+                continue
+
+            task = loop.create_task(self._execute(batch))
+            task.add_done_callback(lambda _: self._slots.release())
+
+    async def _execute(self, batch: List[Tuple[Any, asyncio.Future]]):
+        self.batches += 1
+        self.items += len(batch)
+
+        try:
+            results = await run_in_threadpool(self.fn, [item for item, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"Batch function returned {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            logger.error(f"Batch of {len(batch)} failed: {e}")
+            results = [e] * len(batch)
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
@@ -0,0 +1,97 @@
+"""
+TRADEAI ML Request Coalescing
+Single-flight deduplication of identical concurrent inference calls
+
+Key: Normalized request payload + model type + serving model version
+Sharing: Concurrent callers await one computation; its result or error
+Cache: Optional TTLCache checked first and filled by the shared computation,
+    so a burst of requests after expiry costs one model call
+"""
+
+import asyncio
+import json
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+import logging
+
+from fastapi.encoders import jsonable_encoder
+
+logger = logging.getLogger(__name__)
+
+
+def request_key(model_type: str, version: Optional[str], payload: Any, exclude: Tuple[str, ...] = ()) -> Tuple:
+    """
+    Canonical key for a request payload (Pydantic model or dict)
+
+    Field order and JSON-equivalent values (e.g. 7 vs 7.0 in a float
+    field after validation) do not change the key.
+
+    Args:
+        model_type: Model type serving the request
+        version: Model version serving the request
+        payload: Validated request body
+        exclude: Top-level fields that do not affect the result
+    """
+    data = jsonable_encoder(payload)
+    if isinstance(data, dict):
+        data = {k: v for k, v in data.items() if k not in exclude}
+    return model_type, version, json.dumps(data, sort_keys=True, separators=(',', ':'))
+
+
+class SingleFlight:
+    """
+    Shares one in-flight computation between identical concurrent requests
+
+    The computation runs as its own task, so a caller disconnecting
+    (cancellation) does not cancel it for the others. Must be used from a
+    single event loop.
+
+    Args:
+        cache: Optional TTLCache for completed results
+    """
+
+    def __init__(self, cache=None):
+        self.cache = cache
+        self.calls = 0
+        self.coalesced = 0
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Return the cached result for key, or await the shared computation
+
+        Args:
+            key: Request key (see request_key)
+            fn: Coroutine function computing the result
+        """
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(self._run(key, fn))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self.coalesced += 1
+
+        return await asyncio.shield(task)
+
+    def __len__(self) -> int:
+        """Computations currently in flight"""
+        return len(self._inflight)
+
+    async def _run(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        result = await fn()
+        if self.cache is not None:
+            self.cache.set(key, result)
+        return result
+
+    def _finish(self, key: Hashable, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the error as retrieved even if every caller went away
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug(f"Shared computation failed: {task.exception()}")
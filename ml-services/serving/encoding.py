@@ -0,0 +1,86 @@
+"""
+TRADEAI ML Response Encoding
+Columnar forecast responses serialized with orjson or Arrow IPC
+
+Accept: application/json (default) - row layout, same shape as before
+        application/vnd.tradeai.columnar+json - arrays per column
+        application/vnd.apache.arrow.stream - Arrow IPC stream
+Input: Forecast columns (date strings plus NumPy value arrays), so no
+    per-point Pydantic models are built on the response path
+"""
+
+from typing import Any, Dict, List, Optional
+import logging
+
+import numpy as np
+import orjson
+from fastapi.responses import Response
+
+logger = logging.getLogger(__name__)
+
+JSON = 'application/json'
+COLUMNAR_JSON = 'application/vnd.tradeai.columnar+json'
+ARROW_STREAM = 'application/vnd.apache.arrow.stream'
+
+VALUE_COLUMNS = ['predicted_volume', 'confidence_lower', 'confidence_upper']
+
+
+def negotiate(accept: Optional[str]) -> str:
+    """Response format from an Accept header (JSON rows unless another layout is requested)"""
+    accept = (accept or '').lower()
+    if ARROW_STREAM in accept:
+        return ARROW_STREAM
+    if COLUMNAR_JSON in accept:
+        return COLUMNAR_JSON
+    return JSON
+
+
+def forecast_rows(columns: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+    """Row layout [{date, predicted_volume, confidence_lower, confidence_upper}, ...]"""
+    names = ['date'] + VALUE_COLUMNS
+    return [dict(zip(names, row)) for row in zip(*(columns[name].tolist() for name in names))]
+
+
+def forecast_columns(columns: Dict[str, np.ndarray]) -> Dict[str, Any]:
+    """Columnar layout {date: [...], predicted_volume: [...], ...}"""
+    return {'date': columns['date'].tolist(), **{name: columns[name] for name in VALUE_COLUMNS}}
+
+
+def json_response(content: Any, media_type: str = JSON, status_code: int = 200) -> Response:
+    """Serialize with orjson (NumPy arrays are written directly)"""
+    return Response(
+        content=orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY),
+        media_type=media_type,
+        status_code=status_code
+    )
+
+
+def arrow_response(columns: Dict[str, Any], metadata: Optional[Dict[str, Any]] = None) -> Response:
+    """
+    Serialize columns as an Arrow IPC stream
+
+    Args:
+        columns: Column name -> array; 'date' strings become date32 and
+            string columns are dictionary-encoded
+        metadata: Scalar fields stored as schema metadata
+    """
+    import pyarrow as pa
+
+    arrays = {}
+    for name, values in columns.items():
+        if name == 'date':
+            arrays[name] = pa.array(np.asarray(values, dtype='datetime64[D]'))
+        elif np.asarray(values).dtype.kind in 'OUS':
+            arrays[name] = pa.array(np.asarray(values, dtype=object)).dictionary_encode()
+        else:
+            arrays[name] = pa.array(values)
+
+    table = pa.table(arrays)
+    if metadata:
+        table = table.replace_schema_metadata({key: str(value) for key, value in metadata.items()})
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+
+    return Response(content=sink.getvalue().to_pybytes(), media_type=ARROW_STREAM)
@@ -0,0 +1,241 @@
+"""
+TRADEAI ML Serving Metrics
+Prometheus metrics for the ML API (config monitoring.metrics)
+
+Requests: Latency histogram per endpoint template, in-flight gauge, error counts
+Models: Prediction latency per model version, load times, active version
+State: Cache hit ratios, micro-batch sizes, thread pool and queue depths
+
+Request metrics are updated by an ASGI middleware; everything else is read
+from the serving components when /metrics is scraped, so the request path
+only pays for one histogram observation. Payloads are never recorded.
+
+Tracing: Opt-in per-request span breakdown (models/common/tracing.py)
+"""
+
+import time
+from typing import Dict, Optional
+import logging
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client.core import GaugeMetricFamily, CounterMetricFamily, HistogramMetricFamily
+from starlette.routing import Match
+
+from models.common.tracing import TRACE_HEADER, env_enabled, header_enabled, trace
+
+logger = logging.getLogger(__name__)
+
+# Label for requests that matched no route (keeps label cardinality bounded)
+UNMATCHED = 'unmatched'
+
+
+class ServingMetrics:
+    """
+    Metric definitions and scrape-time collectors for the serving API
+
+    Args:
+        registry: Prometheus registry (a private one by default, so tests
+            and multiple apps in one process do not collide)
+    """
+
+    def __init__(self, registry: Optional[CollectorRegistry] = None):
+        self.registry = registry or CollectorRegistry()
+        self.caches: Dict[str, object] = {}
+        self.batchers: Dict[str, object] = {}
+        self.model_registry = None
+        self.router = None
+
+        self.request_latency = Histogram(
+            'tradeai_http_request_duration_seconds',
+            'HTTP request latency by endpoint template',
+            ['method', 'endpoint', 'status'],
+            registry=self.registry
+        )
+        self.in_flight = Gauge(
+            'tradeai_http_requests_in_flight',
+            'HTTP requests currently being served',
+            registry=self.registry
+        )
+        self.errors = Counter(
+            'tradeai_http_request_errors',
+            'HTTP requests that raised or returned a 5xx status',
+            ['method', 'endpoint'],
+            registry=self.registry
+        )
+        self.threadpool_busy = Gauge(
+            'tradeai_threadpool_busy_threads',
+            'Worker threads running blocking model calls',
+            registry=self.registry
+        )
+        self.threadpool_waiting = Gauge(
+            'tradeai_threadpool_queue_depth',
+            'Blocking model calls waiting for a worker thread',
+            registry=self.registry
+        )
+
+        self.registry.register(_ComponentCollector(self))
+
+    def track_cache(self, name: str, cache):
+        """Report hits/misses/size of a TTLCache"""
+        self.caches[name] = cache
+
+    def track_batcher(self, name: str, batcher):
+        """Report items, batches and queue depth of a MicroBatcher"""
+        self.batchers[name] = batcher
+
+    def track_models(self, model_registry, router=None):
+        """Report load times and active versions, and per-version latency from a TrafficRouter"""
+        self.model_registry = model_registry
+        self.router = router
+
+    def endpoint(self, app, scope) -> str:
+        """Route template (e.g. /api/v1/models/{model_type}) serving a request"""
+        route = scope.get('route')
+        if route is not None:
+            return route.path
+
+        for route in app.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return getattr(route, 'path', UNMATCHED)
+        return UNMATCHED
+
+    def update_threadpool(self):
+        """Sample the thread pool used by run_in_threadpool (call from the event loop)"""
+        import anyio.to_thread
+
+        statistics = anyio.to_thread.current_default_thread_limiter().statistics()
+        self.threadpool_busy.set(statistics.borrowed_tokens)
+        self.threadpool_waiting.set(statistics.tasks_waiting)
+
+    def render(self):
+        """Exposition text and content type for the /metrics response"""
+        return generate_latest(self.registry), CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request latency, status and in-flight count
+
+    Args:
+        app: Wrapped ASGI application
+        metrics: ServingMetrics instance
+    """
+
+    def __init__(self, app, metrics: ServingMetrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        self.metrics.in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.metrics.in_flight.dec()
+
+            method = scope['method']
+            endpoint = self.metrics.endpoint(scope['app'], scope) if 'app' in scope else UNMATCHED
+            self.metrics.request_latency.labels(method, endpoint, str(status)).observe(elapsed)
+            if status >= 500:
+                self.metrics.errors.labels(method, endpoint).inc()
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware tracing requests that send X-TRADEAI-Trace (or all
+    requests when TRADEAI_TRACE is set)
+
+    Endpoints read the breakdown with current_span() for their debug field;
+    it is also logged when the request finishes.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        header = next((value for name, value in scope['headers'] if name == TRACE_HEADER.encode()), None)
+        if not (env_enabled() or header_enabled(header.decode('latin-1') if header else None)):
+            await self.app(scope, receive, send)
+            return
+
+        with trace(f"{scope['method']} {scope['path']}"):
+            await self.app(scope, receive, send)
+
+
+class _ComponentCollector:
+    """Reads cache, registry and router state at scrape time"""
+
+    def __init__(self, metrics: ServingMetrics):
+        self.metrics = metrics
+
+    def collect(self):
+        hits = CounterMetricFamily('tradeai_cache_hits', 'Cache hits', labels=['cache'])
+        misses = CounterMetricFamily('tradeai_cache_misses', 'Cache misses', labels=['cache'])
+        ratio = GaugeMetricFamily('tradeai_cache_hit_ratio', 'Cache hits / lookups since start', labels=['cache'])
+        entries = GaugeMetricFamily('tradeai_cache_entries', 'Entries held in the cache', labels=['cache'])
+        for name, cache in self.metrics.caches.items():
+            lookups = cache.hits + cache.misses
+            hits.add_metric([name], cache.hits)
+            misses.add_metric([name], cache.misses)
+            ratio.add_metric([name], cache.hits / lookups if lookups else 0.0)
+            entries.add_metric([name], len(cache))
+        yield from (hits, misses, ratio, entries)
+
+        items = CounterMetricFamily('tradeai_microbatch_items', 'Items run through micro-batches', labels=['batcher'])
+        batches = CounterMetricFamily('tradeai_microbatch_batches', 'Micro-batches run', labels=['batcher'])
+        waiting = GaugeMetricFamily('tradeai_microbatch_queue_depth', 'Items waiting for a batch', labels=['batcher'])
+        for name, batcher in self.metrics.batchers.items():
+            items.add_metric([name], batcher.items)
+            batches.add_metric([name], batcher.batches)
+            waiting.add_metric([name], batcher.queue_depth)
+        yield from (items, batches, waiting)
+
+        model_registry = self.metrics.model_registry
+        if model_registry is not None:
+            load_seconds = GaugeMetricFamily(
+                'tradeai_model_load_seconds', 'Duration of the last artifact load', labels=['model_type']
+            )
+            for model_type, seconds in model_registry.load_times().items():
+                load_seconds.add_metric([model_type], seconds)
+
+            active = GaugeMetricFamily(
+                'tradeai_model_active_info', 'Active artifact version per model type', labels=['model_type', 'version']
+            )
+            for model_type in model_registry.keys():
+                version = model_registry.active_version(model_type)
+                if version is not None:
+                    active.add_metric([model_type, version], 1)
+            yield from (load_seconds, active)
+
+        router = self.metrics.router
+        if router is not None:
+            latency = HistogramMetricFamily(
+                'tradeai_model_prediction_duration_seconds',
+                'Prediction latency by model type and version (incl. shadow scoring)',
+                labels=['model_type', 'version']
+            )
+            for (model_type, version), histogram in list(router.latency.items()):
+                buckets, total, _ = histogram.snapshot()
+                latency.add_metric([model_type, version], buckets, total)
+
+            pending = GaugeMetricFamily('tradeai_shadow_queue_depth', 'Shadow predictions queued or running')
+            pending.add_metric([], router.shadow_pending)
+            yield from (latency, pending)
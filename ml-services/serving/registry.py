@@ -0,0 +1,228 @@
+"""
+TRADEAI ML Model Registry
+Hot-swappable in-memory models backed by the versioned artifact store
+
+Watch: Polls {model_dir}/{model_type}/ for newly published versions
+Swap: Loads in a background thread, then replaces the active reference
+Rollback: Keeps the last N loaded versions in memory
+Staging: New versions can be handed to a callback (e.g. a canary router) instead
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    """
+    Active model per model type, with retained previous versions
+
+    Requests read the active model once and keep that reference for the
+    rest of the call, so swapping a version never disturbs in-flight
+    requests; the old object is released when they finish. Models set
+    directly (untrained defaults, stateless engines) have version None.
+
+    Args:
+        store: ArtifactStore with published versions
+        loaders: model_type -> callable(Artifact) returning a model
+        keep_versions: Loaded versions retained per model type (incl. active)
+        poll_interval: Seconds between artifact directory scans
+        on_new_version: callable(model_type, version) run for newly published
+            versions instead of activating them (default: activate)
+    """
+
+    def __init__(
+        self,
+        store,
+        loaders: Optional[Dict[str, Callable]] = None,
+        model_types: Optional[List[str]] = None,
+        keep_versions: int = 3,
+        poll_interval: float = 30.0,
+        on_new_version: Optional[Callable[[str, str], Any]] = None
+    ):
+        self.store = store
+        self.loaders = loaders or {}
+        self.keep_versions = keep_versions
+        self.poll_interval = poll_interval
+        self.on_new_version = on_new_version
+
+        self._active: Dict[str, Any] = {model_type: None for model_type in model_types or []}
+        self._active_version: Dict[str, Optional[str]] = {}
+        self._loaded: Dict[str, OrderedDict] = {}
+        self._load_times: Dict[str, float] = {}
+        # Latest on-disk version already acted on (loaded or failed) per type
+        self._seen: Dict[str, Optional[str]] = {}
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+
+    # Dict-style access to the active models
+
+    def __getitem__(self, model_type: str) -> Any:
+        return self._active[model_type]
+
+    def __setitem__(self, model_type: str, model: Any):
+        """Set an unversioned model (e.g. an untrained default)"""
+        with self._lock:
+            self._active[model_type] = model
+            self._active_version[model_type] = None
+
+    def __delitem__(self, model_type: str):
+        with self._lock:
+            del self._active[model_type]
+            self._active_version.pop(model_type, None)
+
+    def __contains__(self, model_type: str) -> bool:
+        return model_type in self._active
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._active))
+
+    def get(self, model_type: str, default: Any = None) -> Any:
+        return self._active.get(model_type, default)
+
+    def keys(self) -> List[str]:
+        return list(self._active)
+
+    def values(self) -> List[Any]:
+        return list(self._active.values())
+
+    # Versions
+
+    def active_version(self, model_type: str) -> Optional[str]:
+        return self._active_version.get(model_type)
+
+    def load_times(self) -> Dict[str, float]:
+        """Seconds taken by the most recent artifact load per model type"""
+        return dict(self._load_times)
+
+    def versions(self, model_type: str) -> Dict:
+        """Active, in-memory and on-disk versions of a model type"""
+        with self._lock:
+            loaded = list(self._loaded.get(model_type, {}))
+        return {
+            'active': self.active_version(model_type),
+            'loaded': loaded,
+            'available': self.store.versions(model_type) if model_type in self.loaders else [],
+            'last_load_time_s': self._load_times.get(model_type)
+        }
+
+    def refresh(self, model_type: Optional[str] = None) -> Dict[str, str]:
+        """
+        Load and activate newly published versions
+
+        Only versions newer than the last one seen are considered, so a
+        rollback stays in place until another version is published.
+
+        Args:
+            model_type: Model type to check (all with a loader by default)
+
+        Returns:
+            model_type -> version for every swap performed
+        """
+        swapped = {}
+        for name in [model_type] if model_type else list(self.loaders):
+            latest = self.store.latest(name)
+            if latest is None or latest == self._seen.get(name):
+                continue
+
+            self._seen[name] = latest
+            try:
+                (self.on_new_version or self.activate)(name, latest)
+                swapped[name] = latest
+            except Exception as e:
+                logger.error(f"❌ Failed to load {name} version {latest}: {e}")
+
+        return swapped
+
+    def load(self, model_type: str, version: str) -> Any:
+        """
+        Load a version into memory without activating it
+
+        The least recently loaded versions beyond keep_versions are
+        released, never the active one.
+        """
+        with self._lock:
+            retained = self._loaded.get(model_type, {}).get(version)
+
+        if retained is None:
+            if model_type not in self.loaders:
+                raise KeyError(f"No artifact loader for model type '{model_type}'")
+            start = time.perf_counter()
+            retained = self.loaders[model_type](self.store.open(model_type, version))
+            self._load_times[model_type] = time.perf_counter() - start
+            logger.info(f"Loaded {model_type} version {version} in {self._load_times[model_type]:.2f}s")
+
+        with self._lock:
+            loaded = self._loaded.setdefault(model_type, OrderedDict())
+            loaded[version] = retained
+            loaded.move_to_end(version)
+            active = self._active_version.get(model_type)
+            for old in [v for v in loaded if v not in (version, active)][:max(0, len(loaded) - self.keep_versions)]:
+                del loaded[old]
+
+        return retained
+
+    def activate(self, model_type: str, version: str) -> Any:
+        """
+        Make a version active, loading it from the store if not in memory
+
+        Loading happens before the lock is taken, so the previous version
+        keeps serving until the new one is ready.
+        """
+        retained = self.load(model_type, version)
+
+        with self._lock:
+            self._active[model_type] = retained
+            self._active_version[model_type] = version
+
+        logger.info(f"✅ {model_type} version {version} active")
+
+        return retained
+
+    def rollback(self, model_type: str, version: Optional[str] = None) -> str:
+        """
+        Re-activate a previous version (the one before the active by default)
+
+        Returns:
+            The version now active
+        """
+        with self._lock:
+            loaded = list(self._loaded.get(model_type, {}))
+            active = self._active_version.get(model_type)
+
+        if version is None:
+            previous = [v for v in loaded if v != active]
+            if not previous:
+                raise ValueError(f"No previous {model_type} version retained")
+            version = previous[-1]
+
+        self.activate(model_type, version)
+        return version
+
+    # Background watcher
+
+    def start(self):
+        """Start polling the artifact store in a daemon thread"""
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, name='model-registry-watcher', daemon=True)
+        self._watcher.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=5)
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Model registry refresh failed: {e}")
@@ -0,0 +1,372 @@
+"""
+TRADEAI ML Traffic Routing
+Canary and shadow traffic for candidate model versions
+
+Canary: A configurable share of requests is served by the candidate version
+Shadow: Primary requests are re-scored by the candidate in the background
+Accounting: Per-version latency histograms and shadow prediction deltas
+"""
+
+import bisect
+import random
+import threading
+import time
+import zlib
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+import logging
+
+from models.common.tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Latency bucket upper bounds in seconds (Prometheus client defaults)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+# Label for models set directly on the registry (untrained defaults)
+UNVERSIONED = 'unversioned'
+
+
+def config_traffic_pct(config: Dict) -> Tuple[float, float]:
+    """
+    Default canary and shadow shares (0-100) from config.yaml
+
+    Canary: deployment.<environment>.canary_traffic_pct when that environment
+        has canary_deployment enabled; otherwise, with ab_testing enabled,
+        the model_b share of ab_testing.traffic_split
+    Shadow: config has no shadow share, so 0
+    """
+    deployment = config.get('deployment', {}).get(config.get('environment', 'production')) or {}
+    ab_testing = config.get('ab_testing') or {}
+
+    canary_pct = 0.0
+    if deployment.get('canary_deployment'):
+        canary_pct = float(deployment.get('canary_traffic_pct', 0))
+    elif ab_testing.get('enabled'):
+        canary_pct = 100 * float(ab_testing.get('traffic_split', {}).get('model_b', 0))
+
+    return canary_pct, 0.0
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram with interpolated quantiles"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+
+    def snapshot(self) -> Tuple[List[Tuple[str, int]], float, int]:
+        """Cumulative (le, count) buckets ending with +Inf, sum and count"""
+        with self._lock:
+            counts, total, count = list(self.counts), self.total, self.count
+
+        cumulative = np.cumsum(counts).tolist()
+        return list(zip([str(le) for le in self.buckets] + ['+Inf'], cumulative)), total, count
+
+    def quantile(self, q: float) -> float:
+        """Quantile estimate in seconds (linear within the bucket)"""
+        if self.count == 0:
+            return 0.0
+
+        rank = q * self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            if count and cumulative + count >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.max
+
+    def summary(self) -> Dict:
+        return {
+            'count': self.count,
+            'mean_ms': round(1000 * self.total / self.count, 3) if self.count else 0.0,
+            'p50_ms': round(1000 * self.quantile(0.5), 3),
+            'p95_ms': round(1000 * self.quantile(0.95), 3),
+            'p99_ms': round(1000 * self.quantile(0.99), 3),
+            'max_ms': round(1000 * self.max, 3),
+            'buckets': {str(le): n for le, n in zip(self.buckets + ('+Inf',), self.counts)}
+        }
+
+
+class DeltaStats:
+    """Running absolute/relative differences between primary and shadow predictions"""
+
+    def __init__(self):
+        self.count = 0
+        self.abs_sum = 0.0
+        self.rel_sum = 0.0
+        self.max_abs = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, primary: np.ndarray, shadow: np.ndarray):
+        diff = np.abs(shadow - primary)
+        rel = diff / np.maximum(np.abs(primary), 1e-9)
+        with self._lock:
+            self.count += len(diff)
+            self.abs_sum += float(diff.sum())
+            self.rel_sum += float(rel.sum())
+            self.max_abs = max(self.max_abs, float(diff.max()))
+
+    def summary(self) -> Dict:
+        return {
+            'count': self.count,
+            'mean_abs': self.abs_sum / self.count if self.count else 0.0,
+            'mean_rel': self.rel_sum / self.count if self.count else 0.0,
+            'max_abs': self.max_abs
+        }
+
+
+class Route:
+    """Candidate version and traffic shares for one model type"""
+
+    def __init__(self, version: str, model: Any, canary_pct: float, shadow_pct: float):
+        self.version = version
+        self.model = model
+        self.canary_pct = canary_pct
+        self.shadow_pct = shadow_pct
+        self.shadow_scored = 0
+        self.shadow_dropped = 0
+        self.shadow_errors = 0
+        self.deltas = DeltaStats()
+
+
+class TrafficRouter:
+    """
+    Splits traffic between the active and a candidate model version
+
+    Requests with a routing key (e.g. customer id) are assigned by hash, so
+    a key keeps hitting the same version while the split is unchanged.
+    Shadow scoring runs on a bounded background pool after the primary
+    result is ready; when the pool is saturated shadow requests are
+    dropped rather than queued, so it never adds response latency.
+
+    Args:
+        registry: ModelRegistry holding the active versions
+        canary_pct: Default share of traffic (0-100) for new candidates
+        shadow_pct: Default share of primary traffic (0-100) shadow-scored
+        shadow_workers: Background threads for shadow scoring
+        max_shadow_pending: Shadow requests in flight before dropping
+    """
+
+    def __init__(
+        self,
+        registry,
+        canary_pct: float = 0.0,
+        shadow_pct: float = 0.0,
+        shadow_workers: int = 1,
+        max_shadow_pending: int = 100
+    ):
+        self.registry = registry
+        self.canary_pct = canary_pct
+        self.shadow_pct = shadow_pct
+        self.shadow_workers = shadow_workers
+        self.max_shadow_pending = max_shadow_pending
+
+        self.routes: Dict[str, Route] = {}
+        self.latency: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self.shadow_pending = 0
+        self._shadow_slots = threading.BoundedSemaphore(max_shadow_pending)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    # Candidates
+
+    def set_candidate(
+        self,
+        model_type: str,
+        version: str,
+        canary_pct: Optional[float] = None,
+        shadow_pct: Optional[float] = None
+    ) -> Route:
+        """
+        Load a version as the candidate for a model type
+
+        Raises:
+            ValueError: If the version is already active or a share is out of range
+        """
+        canary_pct = self.canary_pct if canary_pct is None else canary_pct
+        shadow_pct = self.shadow_pct if shadow_pct is None else shadow_pct
+        if not (0 <= canary_pct <= 100 and 0 <= shadow_pct <= 100):
+            raise ValueError("Traffic shares must be between 0 and 100")
+        if version == self.registry.active_version(model_type):
+            raise ValueError(f"{model_type} version {version} is already active")
+
+        model = self.registry.load(model_type, version)
+        route = Route(version, model, canary_pct, shadow_pct)
+        with self._lock:
+            self.routes[model_type] = route
+
+        logger.info(f"{model_type} candidate {version}: canary {canary_pct}%, shadow {shadow_pct}%")
+
+        return route
+
+    def clear_candidate(self, model_type: str):
+        with self._lock:
+            self.routes.pop(model_type, None)
+
+    def promote(self, model_type: str) -> str:
+        """Activate the candidate version and stop splitting traffic"""
+        route = self.routes.get(model_type)
+        if route is None:
+            raise ValueError(f"No {model_type} candidate to promote")
+
+        self.registry.activate(model_type, route.version)
+        self.clear_candidate(model_type)
+        return route.version
+
+    def stage(self, model_type: str, version: str):
+        """Registry on_new_version hook: newly published versions start as candidates"""
+        if self.registry.active_version(model_type) is None and model_type not in self.routes:
+            # Nothing trained is serving yet, so there is nothing to compare against
+            self.registry.activate(model_type, version)
+        else:
+            self.set_candidate(model_type, version)
+
+    # Routing
+
+    def choose(self, model_type: str, key: Optional[Hashable] = None) -> Tuple[str, Any, bool]:
+        """
+        Pick the version serving a request
+
+        Returns:
+            (version label, model, is_candidate)
+        """
+        route = self.routes.get(model_type)
+        if route is not None and route.canary_pct > 0 and self._bucket(model_type, key) < route.canary_pct:
+            return route.version, route.model, True
+
+        return self.registry.active_version(model_type) or UNVERSIONED, self.registry[model_type], False
+
+    def call(
+        self,
+        model_type: str,
+        predict: Callable[[Any], Any],
+        key: Optional[Hashable] = None,
+        values: Optional[Callable[[Any], np.ndarray]] = None,
+        choice: Optional[Tuple[str, Any, bool]] = None
+    ) -> Tuple[Any, str]:
+        """
+        Serve a prediction from the routed version
+
+        Args:
+            model_type: Model type
+            predict: callable(model) returning the prediction
+            key: Routing key for sticky assignment (random split if None)
+            values: callable(prediction) returning the numbers compared
+                against a shadow prediction (no shadow scoring if None)
+            choice: Result of choose() when the caller needed the version
+                beforehand (e.g. for a cache key)
+
+        Returns:
+            (prediction, version label)
+        """
+        version, model, is_candidate = choice or self.choose(model_type, key)
+
+        start = time.perf_counter()
+        with span(f'{model_type}.predict', version=version, candidate=is_candidate):
+            result = predict(model)
+        self._observe(model_type, version, time.perf_counter() - start)
+
+        route = self.routes.get(model_type)
+        if (
+            not is_candidate and values is not None and route is not None
+            and route.shadow_pct > 0 and random.random() * 100 < route.shadow_pct
+        ):
+            self._submit_shadow(model_type, route, predict, values, result)
+
+        return result, version
+
+    def stats(self, model_type: str) -> Dict:
+        """Candidate, traffic shares, per-version latency and shadow deltas"""
+        route = self.routes.get(model_type)
+        with self._lock:
+            latency = {
+                version: histogram.summary()
+                for (name, version), histogram in self.latency.items() if name == model_type
+            }
+
+        return {
+            'active': self.registry.active_version(model_type),
+            'candidate': route.version if route else None,
+            'canary_pct': route.canary_pct if route else 0.0,
+            'shadow_pct': route.shadow_pct if route else 0.0,
+            'latency': latency,
+            'shadow': {
+                'scored': route.shadow_scored,
+                'dropped': route.shadow_dropped,
+                'errors': route.shadow_errors,
+                'delta': route.deltas.summary()
+            } if route else None
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _bucket(self, model_type: str, key: Optional[Hashable]) -> float:
+        """Position in [0, 100) of a request in the traffic split"""
+        if key is None:
+            return random.random() * 100
+        return zlib.crc32(f'{model_type}:{key}'.encode()) % 10000 / 100
+
+    def _observe(self, model_type: str, version: str, seconds: float):
+        histogram = self.latency.get((model_type, version))
+        if histogram is None:
+            with self._lock:
+                histogram = self.latency.setdefault((model_type, version), LatencyHistogram())
+        histogram.observe(seconds)
+
+    def _submit_shadow(self, model_type: str, route: Route, predict: Callable, values: Callable, primary: Any):
+        if not self._shadow_slots.acquire(blocking=False):
+            route.shadow_dropped += 1
+            return
+
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(self.shadow_workers, thread_name_prefix='shadow-scoring')
+
+        with self._lock:
+            self.shadow_pending += 1
+        try:
+            self._executor.submit(self._shadow, model_type, route, predict, values, primary)
+        except RuntimeError:
+            self._shadow_done()
+            route.shadow_dropped += 1
+
+    def _shadow(self, model_type: str, route: Route, predict: Callable, values: Callable, primary: Any):
+        try:
+            start = time.perf_counter()
+            result = predict(route.model)
+            self._observe(model_type, route.version, time.perf_counter() - start)
+
+            expected = np.asarray(values(primary), dtype=np.float64).ravel()
+            actual = np.asarray(values(result), dtype=np.float64).ravel()
+            if len(expected) and len(expected) == len(actual):
+                route.deltas.observe(expected, actual)
+            route.shadow_scored += 1
+        except Exception as e:
+            route.shadow_errors += 1
+            logger.warning(f"Shadow scoring of {model_type} version {route.version} failed: {e}")
+        finally:
+            self._shadow_done()
+
+    def _shadow_done(self):
+        with self._lock:
+            self.shadow_pending -= 1
+        self._shadow_slots.release()
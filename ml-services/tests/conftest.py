@@ -13,6 +13,18 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from serving.api import app
 
 
+@pytest.fixture
+def mlflow_tracking(tmp_path, monkeypatch):
+    """MLflow runs and experiments logged to a file store under tmp_path"""
+    import mlflow
+
+    monkeypatch.setenv('MLFLOW_ALLOW_FILE_STORE', 'true')
+    previous = mlflow.get_tracking_uri()
+    mlflow.set_tracking_uri(tmp_path.as_uri())
+    yield
+    mlflow.set_tracking_uri(previous)
+
+
 @pytest.fixture
 def client():
     """FastAPI test client"""
@@ -0,0 +1,91 @@
+"""
+Unit tests for the implicit-feedback ALS recommender
+"""
+import pytest
+import numpy as np
+import pandas as pd
+
+from models.recommendation.als import ImplicitALSModel
+
+
+@pytest.fixture
+def interactions():
+    """Small implicit interaction log"""
+    rng = np.random.default_rng(0)
+    n = 400
+    return pd.DataFrame({
+        'user_id': [f"cust-{u:03d}" for u in rng.integers(0, 40, n)],
+        'item_id': [f"prod-{i:03d}" for i in rng.integers(0, 25, n)],
+        'interactions': rng.integers(1, 30, n)
+    })
+
+
+@pytest.mark.unit
+def test_als_train_statistics(interactions):
+    """Test that training reports matrix dimensions"""
+    model = ImplicitALSModel(n_factors=8, n_iterations=3)
+    stats = model.train(interactions)
+
+    assert stats['n_users'] == interactions['user_id'].nunique()
+    assert stats['n_items'] == interactions['item_id'].nunique()
+    assert stats['n_interactions'] == len(interactions.drop_duplicates(['user_id', 'item_id']))
+    assert model.user_factors.shape == (stats['n_users'], 8)
+    assert model.item_factors.dtype == np.float32
+
+
+@pytest.mark.unit
+def test_als_conjugate_gradient_matches_exact_solve(interactions):
+    """Test that repeated CG steps converge to the weighted least-squares solution"""
+    model = ImplicitALSModel(n_factors=4, n_iterations=2, alpha=1.0, cg_steps=4, n_threads=1)
+    model.train(interactions)
+
+    Cui = model.build_matrix(interactions)
+    Y = model.item_factors
+    YtY = Y.T @ Y + model.regularization * np.eye(4, dtype=np.float32)
+    for _ in range(5):
+        model._solve_block(Cui, model.user_factors, Y, YtY, 0, Cui.shape[0])
+
+    c = Cui[0].toarray().ravel()
+    Cu = np.where(c > 0, c, 1.0)
+    A = Y.T.astype(np.float64) @ (Cu[:, None] * Y) + model.regularization * np.eye(4)
+    expected = np.linalg.solve(A, Y.T @ (Cu * (c > 0)))
+
+    assert np.allclose(model.user_factors[0], expected, atol=1e-3)
+
+
+@pytest.mark.unit
+def test_als_recommend_items_sorted(interactions):
+    """Test that recommendations are sorted and unknown items score zero"""
+    model = ImplicitALSModel(n_factors=8, n_iterations=3)
+    model.train(interactions)
+
+    candidates = list(model.item_ids) + ['prod-unknown']
+    recs = model.recommend_items('cust-001', candidates, top_n=5)
+
+    assert len(recs) == 5
+    scores = [score for _, score in recs]
+    assert scores == sorted(scores, reverse=True)
+    assert model.predict('cust-001', 'prod-unknown') == 0.0
+
+
+@pytest.mark.unit
+def test_als_update_folds_in_new_users_and_items(interactions):
+    """Test that an incremental update only re-solves affected rows"""
+    model = ImplicitALSModel(n_factors=8, n_iterations=3)
+    model.train(interactions)
+    untouched = model.user_factors[model.user_index['cust-002']].copy()
+
+    new_interactions = pd.DataFrame({
+        'user_id': ['cust-001', 'cust-new'],
+        'item_id': ['prod-new', 'prod-001'],
+        'interactions': [5, 12]
+    })
+    stats = model.update(new_interactions)
+
+    assert stats['new_users'] == 1
+    assert stats['new_items'] == 1
+    assert stats['affected_users'] == 2
+    assert model.user_factors.shape[0] == len(model.user_ids)
+    assert model.item_factors.shape[0] == len(model.item_ids)
+    assert np.array_equal(model.user_factors[model.user_index['cust-002']], untouched)
+    assert model.predict('cust-new', 'prod-001') != 0.0
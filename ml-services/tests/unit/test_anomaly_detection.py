@@ -218,3 +218,107 @@ def test_anomaly_detection_anomaly_ids_unique(client, sample_anomaly_detection_r
     
     anomaly_ids = [anomaly["id"] for anomaly in data["anomalies"]]
     assert len(anomaly_ids) == len(set(anomaly_ids)), "Anomaly IDs should be unique"
+
+
+@pytest.fixture
+def tenant_metrics(tmp_path, monkeypatch):
+    """Daily sales series with one spike and one drop"""
+    import numpy as np
+    import pandas as pd
+    from serving import api
+
+    rng = np.random.default_rng(0)
+    dates = pd.date_range("2024-01-01", periods=120, freq="D")
+    values = 1000 + 100 * np.sin(2 * np.pi * np.arange(120) / 7) + rng.normal(0, 10, 120)
+    values[60] += 400
+    values[90] -= 400
+
+    tenant_dir = tmp_path / "tenant_metrics"
+    tenant_dir.mkdir()
+    path = tenant_dir / "metrics.csv"
+    pd.DataFrame({"date": dates, "metric_type": "sales", "value": values}).to_csv(path, index=False)
+
+    monkeypatch.setattr(api, "DATA_DIR", tmp_path)
+    monkeypatch.setitem(api.model_registry, "anomaly_detection", None)
+    return {"tenant_id": "tenant_metrics", "path": path, "dates": dates}
+
+
+@pytest.mark.unit
+def test_anomaly_detection_finds_injected_anomalies(client, tenant_metrics):
+    """Test that a spike and a drop in tenant data are detected"""
+    response = client.post("/api/v1/detect/anomalies", json={
+        "metric_type": "sales", "tenant_id": tenant_metrics["tenant_id"], "threshold": 3.0
+    })
+    data = response.json()
+
+    assert response.status_code == 200
+    dates = {anomaly["date"]: anomaly for anomaly in data["anomalies"]}
+    assert dates["2024-03-01"]["deviation"] > 0
+    assert dates["2024-03-31"]["deviation"] < 0
+    assert dates["2024-03-31"]["description"] == "Significant drop in sales"
+
+
+@pytest.mark.unit
+def test_anomaly_detection_no_tenant_data(client, tenant_metrics):
+    """Test that tenants without metric data report no anomalies"""
+    response = client.post("/api/v1/detect/anomalies", json={"metric_type": "sales", "tenant_id": "tenant_unknown"})
+    data = response.json()
+
+    assert data["detectedAnomalies"] == 0
+    assert data["anomalies"] == []
+
+
+@pytest.mark.unit
+def test_anomaly_detector_scores_only_new_points(tenant_metrics):
+    """Test that re-ingesting an appended file scores only the new rows"""
+    from models.anomaly_detection.detector import StreamingAnomalyDetector
+
+    detector = StreamingAnomalyDetector()
+    assert detector.ingest_file(tenant_metrics["path"], "t") == 120
+    assert detector.ingest_file(tenant_metrics["path"], "t") == 0
+
+    with open(tenant_metrics["path"], "a") as f:
+        f.write("2024-04-30,sales,1000.0\n2024-05-01,sales,1010.0\n")
+    assert detector.ingest_file(tenant_metrics["path"], "t") == 2
+
+
+@pytest.mark.unit
+def test_anomaly_detector_resumes_from_last_row(tenant_metrics, monkeypatch):
+    """Test that an appended file is read from the last ingested row, and a rewritten one from the start"""
+    import pandas as pd
+    from models.anomaly_detection import detector as detector_module
+
+    skipped = []
+    read_metrics = detector_module.read_metrics
+
+    def recording_read_metrics(path, chunksize, skip_rows=0):
+        skipped.append(skip_rows)
+        return read_metrics(path, chunksize, skip_rows)
+
+    monkeypatch.setattr(detector_module, "read_metrics", recording_read_metrics)
+    detector = detector_module.StreamingAnomalyDetector()
+    path = tenant_metrics["path"]
+    detector.ingest_file(path, "t")
+
+    with open(path, "a") as f:
+        f.write("2024-04-30,sales,1000.0\n")
+    assert detector.ingest_file(path, "t") == 1
+
+    pd.read_csv(path).tail(10).assign(value=1.0).to_csv(path, index=False)
+    assert detector.ingest_file(path, "t") == 0
+    assert skipped == [0, 120, 0]
+
+
+@pytest.mark.unit
+def test_anomaly_detector_batches_match_single_pass():
+    """Test that scoring in batches matches scoring the whole series at once"""
+    import numpy as np
+    from models.anomaly_detection.detector import StreamingAnomalyDetector
+
+    values = np.random.default_rng(1).normal(100, 5, 500)
+    whole = StreamingAnomalyDetector().score("s", values)["score"]
+
+    detector = StreamingAnomalyDetector({"batch_size": 64})
+    parts = [detector.score("s", values[:10])["score"], detector.score("s", values[10:])["score"]]
+
+    assert np.allclose(np.concatenate(parts), whole)
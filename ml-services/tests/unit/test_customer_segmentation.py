@@ -192,3 +192,102 @@ def test_customer_segmentation_color_format(client, sample_customer_segmentation
         # Check if color is hex format (#RRGGBB) or color name
         assert isinstance(color, str)
         assert len(color) > 0
+
+
+@pytest.fixture
+def tenant_transactions(tmp_path, monkeypatch):
+    """Transaction file for a tenant with real data"""
+    from serving import api
+
+    tenant_dir = tmp_path / "tenant_data"
+    tenant_dir.mkdir()
+    rows = []
+    for customer, revenue, n_orders in [("C1", 800, 8), ("C2", 100, 4), ("C3", 50, 2), ("C4", 30, 1), ("C5", 20, 1)]:
+        for i in range(n_orders):
+            rows.append(f"{customer},2024-0{1 + i % 6}-15,{revenue / n_orders}")
+    (tenant_dir / "transactions.csv").write_text("customer_id,date,revenue\n" + "\n".join(rows) + "\n")
+
+    monkeypatch.setattr(api, "DATA_DIR", tmp_path)
+    api.segmentation_cache.clear()
+    return {"tenant_id": "tenant_data"}
+
+
+@pytest.mark.unit
+def test_customer_segmentation_abc_from_transactions(client, tenant_transactions):
+    """Test that ABC classes follow the cumulative revenue share"""
+    response = client.post("/api/v1/segment/customers", json={**tenant_transactions, "method": "abc"})
+    data = response.json()
+
+    assert response.status_code == 200
+    assert data["totalCustomers"] == 5
+    counts = {segment["name"]: segment["count"] for segment in data["segments"]}
+    assert counts == {"Segment A": 1, "Segment B": 2, "Segment C": 2}
+    assert data["segments"][0]["avgRevenue"] == 800
+
+
+@pytest.mark.unit
+def test_customer_segmentation_results_cached(client, tenant_transactions):
+    """Test that repeat requests for the same window are served from cache"""
+    from serving import api
+
+    request = {**tenant_transactions, "method": "rfm", "end_date": "2024-03-31"}
+    first = client.post("/api/v1/segment/customers", json=request).json()
+    hits = api.segmentation_cache.hits
+    second = client.post("/api/v1/segment/customers", json=request).json()
+
+    assert api.segmentation_cache.hits == hits + 1
+    assert second["segments"] == first["segments"]
+
+
+@pytest.mark.unit
+def test_customer_segmentation_unknown_method_with_data(client, tenant_transactions):
+    """Test that an unknown method is rejected when segmenting real data"""
+    response = client.post("/api/v1/segment/customers", json={**tenant_transactions, "method": "unknown"})
+    assert response.status_code == 400
+
+
+@pytest.mark.unit
+def test_customer_segmentation_data_error_is_server_error(client, tenant_transactions, tmp_path):
+    """Test that a malformed transaction file is reported as a server error, not a bad request"""
+    (tmp_path / "tenant_data" / "transactions.csv").write_text("customer_id,date,revenue\nC1,not-a-date,10\n")
+
+    response = client.post("/api/v1/segment/customers", json={**tenant_transactions, "method": "rfm"})
+    assert response.status_code == 500
+
+
+@pytest.mark.unit
+def test_customer_segmentation_trace_shows_segmenter_stages(client, tenant_transactions, monkeypatch):
+    """Test that a traced request skips the cache and breaks down the segmenter's stages"""
+    from models.common.tracing import TRACE_ENV
+
+    monkeypatch.delenv(TRACE_ENV, raising=False)
+    payload = {**tenant_transactions, "method": "rfm"}
+    assert client.post("/api/v1/segment/customers", json=payload).status_code == 200
+
+    response = client.post("/api/v1/segment/customers", json=payload, headers={"X-TRADEAI-Trace": "1"})
+    assert response.status_code == 200
+    [segment_file] = response.json()["debug"]["children"]
+    assert segment_file["name"] == "CustomerSegmenter.segment_file"
+    assert [child["name"] for child in segment_file["children"]] == ["CustomerSegmenter.aggregate", "CustomerSegmenter.segment"]
+
+
+@pytest.mark.unit
+def test_segmenter_chunked_aggregation_matches_single_pass():
+    """Test that streaming chunks gives the same customer table as one pass"""
+    import numpy as np
+    import pandas as pd
+    from models.customer_segmentation.segmenter import CustomerSegmenter
+
+    rng = np.random.default_rng(0)
+    transactions = pd.DataFrame({
+        "customer_id": [f"C{c}" for c in rng.integers(0, 50, 1000)],
+        "date": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 365, 1000), unit="D"),
+        "revenue": rng.gamma(2.0, 100.0, 1000)
+    })
+
+    segmenter = CustomerSegmenter({"merge_every": 3})
+    chunked = segmenter.aggregate((transactions.iloc[i:i + 64] for i in range(0, 1000, 64)), end_date="2024-06-30")
+    single = segmenter.aggregate([transactions], end_date="2024-06-30")
+
+    pd.testing.assert_frame_equal(chunked.sort_index(), single.sort_index())
+    assert single["last_purchase"].max() <= pd.Timestamp("2024-06-30")
@@ -0,0 +1,497 @@
+"""
+Unit tests for the demand forecaster's training and horizon paths
+
+Skipped when PyTorch is not installed.
+"""
+import copy
+import os
+
+import mlflow
+
+import numpy as np
+import pandas as pd
+import pytest
+
+torch = pytest.importorskip('torch')
+
+import xgboost as xgb
+from torch.utils.data import DataLoader
+
+from models.demand_forecasting.ensemble import MODELS, SegmentWeights
+
+from models.demand_forecasting.forecaster import (
+    NON_FEATURE_COLUMNS, SEQUENCE_LENGTH, TARGET_COLUMNS, DemandForecaster, LSTMForecaster, SequenceDataset,
+    available_cpus, series_order, series_targets
+)
+from models.demand_forecasting.horizon import HorizonState, recursive_forecast
+
+# DemandForecaster sets its MLflow experiment on construction
+pytestmark = pytest.mark.usefixtures('mlflow_tracking')
+
+
+def make_sales(n_series=4, days=120, seed=0):
+    """Daily sales with weekly seasonality, price changes and occasional promotions"""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2024-01-01', periods=days, freq='D')
+    n = n_series * days
+    base = np.repeat(rng.uniform(20, 80, n_series), days) * (1 + 0.2 * np.sin(np.tile(np.arange(days), n_series) * 2 * np.pi / 7))
+    df = pd.DataFrame({
+        'date': np.tile(dates, n_series),
+        'product_id': np.repeat([f'prod-{i % 2}' for i in range(n_series)], days),
+        'customer_id': np.repeat([f'cust-{i // 2}' for i in range(n_series)], days),
+        'sales_volume': rng.poisson(base).astype(float) + 1,
+        'price': rng.choice([9.99, 11.49, 12.99], n),
+        'promotion_id': np.where(rng.random(n) < 0.1, 'promo-1', None)
+    })
+    df['sales_revenue'] = df['sales_volume'] * df['price']
+    return df
+
+
+def feature_columns(df_features):
+    """Model inputs as chosen by DemandForecaster.train"""
+    return [
+        col for col in df_features.columns
+        if col not in NON_FEATURE_COLUMNS and pd.api.types.is_numeric_dtype(df_features[col])
+    ]
+
+
+@pytest.mark.unit
+def test_forecast_with_prophet_and_lstm_pruned():
+    """Test that zero-weight models leave no NaN in the horizon and daily totals match the series"""
+    sales = make_sales()
+    forecaster = DemandForecaster({'experiment_name': 'forecaster-test'})
+    df_features = forecaster.create_features(sales)
+    forecaster.feature_names = feature_columns(df_features)
+    model = xgb.XGBRegressor(n_estimators=20, max_depth=3, random_state=42)
+    model.fit(df_features[forecaster.feature_names], df_features['sales_volume'])
+    forecaster.models = {'xgboost': model}
+    forecaster.ensemble = SegmentWeights(MODELS, [1, 0, 0])
+
+    forecast = forecaster.forecast(sales, horizon_days=14)
+
+    assert len(forecast) == 4 * 14
+    assert not forecast['predicted_volume'].isna().any()
+    expected = recursive_forecast(
+        HorizonState(forecaster.create_features(sales), forecaster.feature_names, 14),
+        lambda h, X: model.predict(X)
+    )
+    np.testing.assert_allclose(forecast['predicted_volume'], expected['predicted_volume'], rtol=1e-5)
+
+    daily = forecaster.predict(sales, horizon_days=14)
+    np.testing.assert_allclose(daily['predicted_volume'], forecast.groupby('date')['predicted_volume'].sum())
+    assert (daily['predicted_volume'] > 0).all()
+
+
+@pytest.mark.unit
+def test_backtest_forecasts_each_origin_from_its_history():
+    """Test that backtest rows are recursive forecasts from the history before each origin, joined to the actuals"""
+    sales = make_sales()
+    forecaster = DemandForecaster({'experiment_name': 'forecaster-test'})
+    df_features = forecaster.create_features(sales)
+    forecaster.feature_names = feature_columns(df_features)
+    model = xgb.XGBRegressor(n_estimators=20, max_depth=3, random_state=42)
+    model.fit(df_features[forecaster.feature_names], df_features['sales_volume'])
+    forecaster.models = {'xgboost': model}
+    forecaster.ensemble = SegmentWeights(MODELS, [1, 0, 0])
+    split_date = pd.Timestamp('2024-04-10')
+
+    backtest = forecaster.backtest(sales, split_date, origins=3, step_days=7)
+
+    assert sorted(backtest['origin'].unique()) == [split_date + pd.Timedelta(days=d) for d in (0, 7, 14)]
+    assert backtest.groupby('origin')['lead_time'].max().tolist() == [20, 13, 6]
+    assert len(backtest) == 4 * (20 + 13 + 6)
+    np.testing.assert_array_equal(backtest['date'], backtest['origin'] + pd.to_timedelta(backtest['lead_time'] - 1, unit='D'))
+
+    last_origin = backtest[backtest['origin'] == split_date + pd.Timedelta(days=14)]
+    expected = forecaster.forecast(sales[sales['date'] < split_date + pd.Timedelta(days=14)], horizon_days=6)
+    np.testing.assert_allclose(last_origin['predicted_volume'], expected['predicted_volume'])
+    actuals = sales.set_index(['product_id', 'customer_id', 'date'])['sales_volume']
+    np.testing.assert_array_equal(backtest['sales_volume'], actuals.loc[list(zip(backtest['product_id'], backtest['customer_id'], backtest['date']))])
+
+    chunked = forecaster.backtest(sales, split_date, origins=3, step_days=7, rows_per_chunk=100)
+    assert len(chunked) == len(backtest)
+
+
+@pytest.mark.unit
+def test_memory_optimized_features_match_default():
+    """Test that categorical ids and float32 features agree with the default mode within float32 rounding"""
+    sales = make_sales()
+    sales['discount_percentage'] = np.where(sales['promotion_id'].notna(), 15.0, np.nan)
+
+    plain = DemandForecaster({'experiment_name': 'forecaster-test'}).create_features(sales)
+    optimized = DemandForecaster({'experiment_name': 'forecaster-test', 'memory_optimized': True}).create_features(sales)
+    optimized = optimized.loc[plain.index]
+
+    assert list(optimized.columns) == list(plain.columns)
+    assert optimized['product_id'].dtype == 'category' and optimized['customer_id'].dtype == 'category'
+    assert all(optimized[col].dtype == np.float64 for col in TARGET_COLUMNS)
+    assert not any(optimized[col].dtype == np.float64 for col in optimized.columns if col not in TARGET_COLUMNS)
+    assert feature_columns(optimized) == feature_columns(plain)
+    for col in feature_columns(plain):
+        np.testing.assert_allclose(optimized[col].to_numpy(np.float64), plain[col].to_numpy(np.float64), rtol=4e-3, atol=4e-3, err_msg=col)
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize('memory_optimized', [False, True])
+def test_promotion_counters_and_fill(memory_optimized):
+    """Test the per-series promotion counters and the column-by-column forward fill"""
+    sales = make_sales()
+    sales.loc[sales['date'] == '2024-01-01', 'promotion_id'] = None
+    sales.loc[5, 'price'] = np.nan
+    forecaster = DemandForecaster({'experiment_name': 'forecaster-test', 'memory_optimized': memory_optimized})
+
+    features = forecaster.create_features(sales)
+
+    for _, group in features.groupby(['product_id', 'customer_id'], observed=True):
+        has_promotion = sales.loc[group.index, 'promotion_id'].notna().astype(int)
+        np.testing.assert_array_equal(group['has_promotion'], has_promotion)
+        np.testing.assert_array_equal(group['days_since_last_promo'], (has_promotion == 0).cumsum())
+        np.testing.assert_array_equal(group['days_until_next_promo'], has_promotion[::-1].cumsum()[::-1])
+
+    # NaNs take the previous row of the date-sorted frame, then 0; labels are not zero-filled
+    assert not features[feature_columns(features)].isna().any().any()
+    position = features.index.get_loc(5)
+    assert features['price'].iloc[position] == features['price'].iloc[position - 1]
+    assert pd.isna(features['promotion_id'].iloc[0])
+
+
+@pytest.mark.unit
+def test_memory_optimized_training_reports_peak_rss(monkeypatch, mlflow_tracking):
+    """Test that memory-optimized training reports peak RSS per stage and in total"""
+    monkeypatch.setattr(mlflow.xgboost, 'log_model', lambda *args, **kwargs: None)
+    monkeypatch.setattr(mlflow.pytorch, 'log_model', lambda *args, **kwargs: None)
+    forecaster = DemandForecaster({
+        'experiment_name': 'forecaster-test',
+        'memory_optimized': True,
+        'hyperparameters': {
+            'xgboost': {'n_estimators': 20, 'max_depth': 3},
+            'prophet': {'n_jobs': 1, 'yearly_seasonality': False},
+            'lstm': {'epochs': 1, 'hidden_size': 4, 'num_layers': 1, 'dropout': 0.0, 'num_workers': 0, 'num_threads': 1}
+        }
+    })
+
+    metrics = forecaster.train(make_sales(days=150))
+
+    peaks = metrics['peak_rss_mb']
+    assert {'create_features', 'prepare_series', 'prepare_matrix', 'train_xgboost', 'train_lstm', 'total'} <= set(peaks)
+    assert all(value > 0 for value in peaks.values())
+    assert peaks['total'] >= max(value for name, value in peaks.items() if name != 'total')
+    assert 0 < metrics['ensemble_mape'] < 1
+
+
+@pytest.mark.unit
+def test_product_chunks_hold_whole_products():
+    """Test that chunks are consecutive whole products cut by cumulative row count"""
+    sizes = {'prod-a': 30, 'prod-b': 50, 'prod-c': 20, 'prod-d': 70, 'prod-e': 10}
+    df = pd.DataFrame({'product_id': np.repeat(list(sizes), list(sizes.values())), 'row': np.arange(sum(sizes.values()))})
+    df = df.sample(frac=1, random_state=0)
+
+    chunks = list(DemandForecaster._product_chunks(df, 60))
+
+    assert [sorted(chunk['product_id'].unique()) for chunk in chunks] == [['prod-a'], ['prod-b', 'prod-c'], ['prod-d', 'prod-e']]
+    assert sorted(pd.concat(chunks)['row']) == list(range(len(df)))
+
+
+@pytest.mark.unit
+def test_write_feature_shards_engineers_each_product_chunk(tmp_path):
+    """Test that shards hold per-chunk features split on the date, numbered across chunks"""
+    sales = make_sales()
+    forecaster = DemandForecaster({'experiment_name': 'forecaster-test'})
+
+    shards = forecaster.write_feature_shards(sales, tmp_path / 'frame', '2024-04-01', rows_per_shard=100)
+
+    assert [path.name for path in shards['train']] == [f'train-{n:05d}.parquet' for n in range(4)]
+    assert [path.name for path in shards['val']] == ['val-00000.parquet', 'val-00001.parquet']
+    columns = forecaster.feature_names + ['sales_volume']
+    expected = {'train': [], 'val': []}
+    for _, chunk in sales.groupby('product_id'):
+        features = forecaster.create_features(chunk)
+        features = features.iloc[series_order(features)[0]]
+        is_val = features['date'] >= '2024-04-01'
+        expected['train'].append(features[~is_val][columns])
+        expected['val'].append(features[is_val][columns])
+    written = {}
+    for split in ('train', 'val'):
+        written[split] = pd.concat([pd.read_parquet(path) for path in shards[split]], ignore_index=True)
+        assert list(written[split].columns) == columns + ['product_id', 'customer_id', 'date', 'series', 'row']
+        np.testing.assert_allclose(written[split][columns].to_numpy(np.float64), pd.concat(expected[split]).to_numpy(np.float64), rtol=1e-6)
+    assert written['train']['date'].max() < pd.Timestamp('2024-04-01') <= written['val']['date'].min()
+
+    # Rows are numbered across splits and chunks in series, then date order
+    rows = pd.concat(written.values()).sort_values('row')
+    assert rows['row'].tolist() == list(range(len(sales)))
+    assert rows['series'].is_monotonic_increasing and rows['series'].nunique() == 4
+    assert rows.groupby('series')['date'].apply(lambda dates: dates.is_monotonic_increasing).all()
+    assert (rows.groupby('series')[['product_id', 'customer_id']].nunique() == 1).all().all()
+
+    # Frames given one product range at a time are used as given
+    frames = (chunk for _, chunk in sales.groupby('product_id'))
+    streamed = forecaster.write_feature_shards(frames, tmp_path / 'frames', '2024-04-01', rows_per_shard=100)
+    for split in ('train', 'val'):
+        for a, b in zip(streamed[split], shards[split]):
+            pd.testing.assert_frame_equal(pd.read_parquet(a), pd.read_parquet(b))
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize('external', [False, True])
+def test_train_xgboost_external_fits_like_in_memory(tmp_path, external):
+    """Test that XGBoost trained from feature shards predicts like the in-memory model"""
+    sales = make_sales(days=200)
+    forecaster = DemandForecaster({
+        'experiment_name': 'forecaster-test',
+        'hyperparameters': {'xgboost': {'n_estimators': 50, 'learning_rate': 0.3, 'max_depth': 4}}
+    })
+    shards = forecaster.write_feature_shards(sales, tmp_path / 'shards', '2024-06-01', rows_per_shard=100)
+
+    model = forecaster.train_xgboost_external(shards['train'], shards['val'], cache_dir=tmp_path / 'cache' if external else None)
+
+    assert isinstance(model, xgb.XGBRegressor)
+    train = pd.concat([pd.read_parquet(path) for path in shards['train']])
+    val = pd.concat([pd.read_parquet(path) for path in shards['val']])
+    X_train, X_val = train[forecaster.feature_names], val[forecaster.feature_names]
+    in_memory = forecaster.train_xgboost(X_train, train['sales_volume'], X_val, val['sales_volume'])
+    rmse = lambda m: np.sqrt(np.mean((m.predict(X_val) - val['sales_volume']) ** 2))
+    assert rmse(model) == pytest.approx(rmse(in_memory), rel=0.2)
+    assert rmse(model) < val['sales_volume'].std()
+
+
+@pytest.mark.unit
+def test_external_memory_training_writes_feature_shards(tmp_path, monkeypatch, mlflow_tracking):
+    """Test that train() engineers features only per product chunk and streams every stage from the shards"""
+    monkeypatch.setattr(mlflow.xgboost, 'log_model', lambda *args, **kwargs: None)
+    monkeypatch.setattr(mlflow.pytorch, 'log_model', lambda *args, **kwargs: None)
+    forecaster = DemandForecaster({
+        'experiment_name': 'forecaster-test',
+        'xgboost_external_memory': {'shard_dir': str(tmp_path / 'shards'), 'rows_per_shard': 100},
+        'hyperparameters': {
+            'xgboost': {'n_estimators': 20, 'max_depth': 3},
+            'prophet': {'n_jobs': 1, 'yearly_seasonality': False},
+            'lstm': {'epochs': 1, 'hidden_size': 4, 'num_layers': 1, 'dropout': 0.0, 'num_workers': 0, 'num_threads': 1}
+        }
+    })
+    calls = []
+    write_feature_shards = forecaster.write_feature_shards
+
+    def spy(data, directory, split_date, rows_per_shard):
+        calls.append((len(data), split_date, rows_per_shard))
+        return write_feature_shards(data, directory, split_date, rows_per_shard)
+
+    monkeypatch.setattr(forecaster, 'write_feature_shards', spy)
+    feature_rows = []
+    create_features = forecaster.create_features
+    monkeypatch.setattr(forecaster, 'create_features', lambda df: feature_rows.append(len(df)) or create_features(df))
+    sales = make_sales(days=150)
+
+    metrics = forecaster.train(sales)
+
+    [(rows, split_date, rows_per_shard)] = calls
+    assert rows == len(sales) and rows_per_shard == 100
+    assert split_date == pd.Timestamp('2024-01-01') + pd.Timedelta(days=120)
+    # Shards and the lead-time backtest engineer one product chunk at a time
+    assert feature_rows[:2] == [300, 300] and max(feature_rows) <= 300
+    shard_names = sorted(path.name for path in (tmp_path / 'shards').iterdir())
+    assert shard_names[0] == 'train-00000.parquet' and 'sequences.npy' not in shard_names
+    assert forecaster.models['xgboost'].n_features_in_ == len(forecaster.feature_names)
+    assert forecaster.scaler.n_features_in_ == len(forecaster.feature_names)
+    assert 0 < metrics['xgboost_mape'] < 1 and 0 < metrics['ensemble_mape'] < 1
+    assert set(forecaster.intervals.lead_times) == {1, 7, 14, 30} and forecaster.intervals.max_lead == 30
+
+
+def lstm_config(**params):
+    """Small single-threaded LSTM settings"""
+    return {
+        'experiment_name': 'forecaster-test',
+        'hyperparameters': {'lstm': {
+            'hidden_size': 4, 'num_layers': 1, 'dropout': 0.0, 'batch_size': 16,
+            'num_workers': 0, 'num_threads': 1, **params
+        }}
+    }
+
+
+def scripted_losses(monkeypatch, losses, states):
+    """Replace the validation loss with a fixed sequence, recording the model state of each epoch"""
+    calls = iter(losses)
+
+    def fake_loss(model, loader, criterion):
+        states.append((copy.deepcopy(model.state_dict()), torch.get_num_threads()))
+        return next(calls)
+
+    monkeypatch.setattr(DemandForecaster, '_lstm_loss', staticmethod(fake_loss))
+
+
+@pytest.mark.unit
+def test_sequence_dataset_matches_stacked_windows():
+    """Test that item i is the window before target i + SEQUENCE_LENGTH"""
+    X = np.arange(45 * 3, dtype=np.float64).reshape(45, 3)
+    y = np.arange(45, dtype=np.float64) * 10
+    dataset = SequenceDataset(X, y)
+
+    assert len(dataset) == 45 - SEQUENCE_LENGTH
+    for i in range(len(dataset)):
+        window, target = dataset[i]
+        np.testing.assert_array_equal(window, X[i:i + SEQUENCE_LENGTH])
+        assert target.tolist() == [y[i + SEQUENCE_LENGTH]]
+    assert dataset[0][0].dtype == np.float32
+    assert len(SequenceDataset(X[:SEQUENCE_LENGTH], y[:SEQUENCE_LENGTH])) == 0
+
+    targets = np.array([SEQUENCE_LENGTH, 44])
+    window, target = SequenceDataset(X, y, targets)[1]
+    np.testing.assert_array_equal(window, X[44 - SEQUENCE_LENGTH:44])
+    assert target.tolist() == [y[44]]
+
+
+@pytest.mark.unit
+def test_series_windows_stay_within_one_series():
+    """Test that windows never cross a series and end where forecast() windows start"""
+    sales = make_sales(days=50)
+    forecaster = DemandForecaster({'experiment_name': 'forecaster-test'})
+    df_features = forecaster.create_features(sales)
+    forecaster.feature_names = feature_columns(df_features)
+    forecaster.scaler.fit(df_features[forecaster.feature_names])
+
+    order, series = series_order(df_features)
+    ordered = df_features.iloc[order]
+    for _, group in ordered.groupby(['product_id', 'customer_id']):
+        assert group['date'].is_monotonic_increasing
+
+    targets = series_targets(series)
+    assert len(targets) == 4 * (50 - SEQUENCE_LENGTH)
+    for t in targets:
+        assert (series[t - SEQUENCE_LENGTH:t + 1] == series[t]).all()
+
+    # The last window of each series is the one the horizon forecast starts from
+    X_scaled = forecaster.scaler.transform(ordered[forecaster.feature_names])
+    state = HorizonState(df_features, forecaster.feature_names, 7)
+    windows = state.windows(SEQUENCE_LENGTH, forecaster.scaler.transform)
+    for i, (product_id, customer_id) in enumerate(state.keys):
+        rows = np.flatnonzero(((ordered['product_id'] == product_id) & (ordered['customer_id'] == customer_id)).to_numpy())
+        np.testing.assert_allclose(windows[i], X_scaled[rows[-SEQUENCE_LENGTH:]], rtol=1e-5)
+
+
+@pytest.mark.unit
+def test_predict_features_windows_each_series():
+    """Test that one-step LSTM predictions use the series' own previous rows"""
+    torch.manual_seed(0)
+    sales = make_sales(days=40)
+    forecaster = DemandForecaster({'experiment_name': 'forecaster-test'})
+    df_features = forecaster.create_features(sales)
+    forecaster.feature_names = feature_columns(df_features)
+    forecaster.scaler.fit(df_features[forecaster.feature_names])
+    forecaster.models['lstm'] = LSTMForecaster(input_size=len(forecaster.feature_names), hidden_size=4, num_layers=1, dropout=0.0)
+    forecaster.ensemble = SegmentWeights(MODELS, [0, 0, 1])
+
+    predictions = forecaster.predict_features(df_features)
+
+    assert np.isnan(predictions).sum() == 4 * SEQUENCE_LENGTH
+    for _, group in df_features.groupby(['product_id', 'customer_id']):
+        X_scaled = forecaster.scaler.transform(group[forecaster.feature_names]).astype(np.float32)
+        windows = np.stack([X_scaled[t - SEQUENCE_LENGTH:t] for t in range(SEQUENCE_LENGTH, len(group))])
+        with torch.no_grad():
+            direct = forecaster.models['lstm'](torch.from_numpy(windows)).numpy().ravel()
+        rows = df_features.index.get_indexer(group.index)
+        assert np.isnan(predictions[rows[:SEQUENCE_LENGTH]]).all()
+        np.testing.assert_allclose(predictions[rows[SEQUENCE_LENGTH:]], direct, rtol=1e-4)
+
+
+@pytest.mark.unit
+def test_train_lstm_stops_early_and_restores_best_state(monkeypatch, tmp_path):
+    """Test that training stops after patience epochs without improvement and keeps the best epoch"""
+    rng = np.random.default_rng(0)
+    X, y = rng.normal(size=(120, 3)), rng.normal(size=120)
+    checkpoint = tmp_path / 'lstm.pt'
+    forecaster = DemandForecaster(lstm_config(epochs=10, patience=2, checkpoint_path=str(checkpoint)))
+    states = []
+    scripted_losses(monkeypatch, [5.0, 3.0, 4.0, 4.5, 1.0], states)
+
+    previous_threads = torch.get_num_threads()
+    model = forecaster.train_lstm(X, y, np.arange(SEQUENCE_LENGTH, 70), np.arange(70, 120))
+
+    stats = forecaster.training_stats['lstm']
+    assert stats['epochs'] == 4
+    assert stats['best_epoch'] == 1
+    assert stats['best_val_loss'] == 3.0
+    assert stats['num_workers'] == 0 and stats['num_threads'] == 1
+
+    best, last = states[1][0], states[3][0]
+    for name, value in model.state_dict().items():
+        torch.testing.assert_close(value, best[name])
+    assert any(not torch.equal(best[name], last[name]) for name in best)
+    for name, value in torch.load(checkpoint).items():
+        torch.testing.assert_close(value, best[name])
+
+    assert all(threads == 1 for _, threads in states)
+    assert torch.get_num_threads() == previous_threads
+
+
+@pytest.mark.unit
+def test_train_lstm_restores_thread_count_on_error(monkeypatch):
+    """Test that the torch thread count is restored when training fails"""
+    rng = np.random.default_rng(0)
+    X, y = rng.normal(size=(120, 3)), rng.normal(size=120)
+    forecaster = DemandForecaster(lstm_config(epochs=3))
+
+    def failing_loss(model, loader, criterion):
+        raise RuntimeError('validation failed')
+
+    monkeypatch.setattr(DemandForecaster, '_lstm_loss', staticmethod(failing_loss))
+    previous_threads = torch.get_num_threads()
+    with pytest.raises(RuntimeError):
+        forecaster.train_lstm(X, y, np.arange(SEQUENCE_LENGTH, 70), np.arange(70, 120))
+    assert torch.get_num_threads() == previous_threads
+
+
+@pytest.mark.unit
+def test_lstm_loss_is_mean_over_samples():
+    """Test that uneven last batches are weighted by their size"""
+    torch.manual_seed(0)
+    rng = np.random.default_rng(0)
+    dataset = SequenceDataset(rng.normal(size=(47, 3)), rng.normal(size=47))
+    model = LSTMForecaster(input_size=3, hidden_size=4, num_layers=1, dropout=0.0)
+    criterion = torch.nn.MSELoss()
+
+    loss = DemandForecaster._lstm_loss(model, DataLoader(dataset, batch_size=5), criterion)
+
+    X, y = next(iter(DataLoader(dataset, batch_size=len(dataset))))
+    with torch.no_grad():
+        expected = criterion(model(X), y).item()
+    assert loss == pytest.approx(expected, rel=1e-5)
+
+
+@pytest.mark.unit
+def test_predict_lstm_targets_match_full_windows():
+    """Test that predicting selected targets matches the same rows of a full pass"""
+    torch.manual_seed(0)
+    X = np.random.default_rng(0).normal(size=(50, 3)).astype(np.float32)
+    forecaster = DemandForecaster({'experiment_name': 'forecaster-test'})
+    forecaster.models['lstm'] = LSTMForecaster(input_size=3, hidden_size=4, num_layers=1, dropout=0.0)
+
+    full = forecaster.predict_lstm(X, batch_size=8)
+    assert len(full) == 50 - SEQUENCE_LENGTH
+
+    targets = np.array([SEQUENCE_LENGTH, 35, 49])
+    np.testing.assert_allclose(forecaster.predict_lstm(X, targets=targets), full[targets - SEQUENCE_LENGTH], rtol=1e-5)
+
+    windows = np.stack([X[t - SEQUENCE_LENGTH:t] for t in targets])
+    with torch.no_grad():
+        direct = forecaster.models['lstm'](torch.from_numpy(windows)).numpy().ravel()
+    np.testing.assert_allclose(full[targets - SEQUENCE_LENGTH], direct, rtol=1e-5)
+
+    assert len(forecaster.predict_lstm(X[:SEQUENCE_LENGTH])) == 0
+
+
+@pytest.mark.unit
+def test_available_cpus_prefers_omp_num_threads(monkeypatch):
+    """Test that OMP_NUM_THREADS wins over the CPU affinity, which wins over cpu_count"""
+    monkeypatch.setenv('OMP_NUM_THREADS', '3')
+    assert available_cpus() == 3
+    monkeypatch.setenv('OMP_NUM_THREADS', '0')
+    assert available_cpus() == 1
+
+    monkeypatch.setenv('OMP_NUM_THREADS', 'auto')
+    monkeypatch.setattr(os, 'sched_getaffinity', lambda pid: {0, 1}, raising=False)
+    assert available_cpus() == 2
+
+    monkeypatch.delenv('OMP_NUM_THREADS')
+    monkeypatch.delattr(os, 'sched_getaffinity')
+    monkeypatch.setattr(os, 'cpu_count', lambda: 5)
+    assert available_cpus() == 5
@@ -0,0 +1,93 @@
+"""
+Unit tests for per-segment ensemble weights
+"""
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from models.demand_forecasting.ensemble import MODELS, SegmentWeights, customer_tiers, simplex_least_squares
+
+
+def make_predictions(n=600, seed=0):
+    """Three model predictions; the first tracks y in segment a, the second in segment b"""
+    rng = np.random.default_rng(seed)
+    y = rng.uniform(10, 100, n)
+    segments = np.where(np.arange(n) % 2 == 0, 'a', 'b').astype(object)
+    good, bad = y + rng.normal(0, 1, n), y + rng.normal(0, 30, n)
+    predictions = np.column_stack([
+        np.where(segments == 'a', good, bad),
+        np.where(segments == 'b', good, bad),
+        y * 0.5 + rng.normal(0, 1, n)
+    ])
+    return predictions, y, segments
+
+
+@pytest.mark.unit
+def test_simplex_least_squares_matches_grid_search():
+    """Test that the solved weights are non-negative, sum to 1 and beat every grid point"""
+    rng = np.random.default_rng(1)
+    y = rng.uniform(0, 50, 200)
+    P = np.column_stack([y + rng.normal(0, 5, 200), y * 1.2, rng.uniform(0, 50, 200)])
+
+    w = simplex_least_squares(P, y)
+    loss = np.sum((P @ w - y) ** 2)
+
+    assert np.all(w >= 0)
+    assert w.sum() == pytest.approx(1.0)
+    grid = np.linspace(0, 1, 51)
+    for a, b in itertools.product(grid, grid):
+        if a + b <= 1:
+            assert loss <= np.sum((P @ np.array([a, b, 1 - a - b]) - y) ** 2) + 1e-6
+
+
+@pytest.mark.unit
+def test_segment_weights_follow_the_best_model():
+    """Test that each segment puts its weight on the model that tracks it and prunes the rest"""
+    predictions, y, segments = make_predictions()
+    ensemble = SegmentWeights(MODELS, {'xgboost': 0.4, 'prophet': 0.3, 'lstm': 0.3})
+
+    oof = ensemble.fit(predictions, y, segments, min_rows=100, n_folds=3, prune=0.05)
+
+    assert set(ensemble.weights) == {'a', 'b'}
+    assert ensemble.weights['a'][0] > 0.9 and ensemble.weights['b'][1] > 0.9
+    assert ensemble.weights['a'][2] == 0 and ensemble.weights['b'][2] == 0
+    assert len(oof) == len(y)
+    assert np.mean(np.abs(oof - y)) < np.mean(np.abs(predictions.mean(axis=1) - y))
+
+
+@pytest.mark.unit
+def test_small_and_unknown_segments_use_default_weights():
+    """Test that segments under min_rows and unseen labels get the default row"""
+    predictions, y, segments = make_predictions()
+    segments[:10] = 'tiny'
+    ensemble = SegmentWeights(MODELS, [1 / 3] * 3)
+    ensemble.fit(predictions, y, segments, min_rows=100)
+
+    weights = ensemble.matrix(np.array(['tiny', 'unseen', None, 'a'], dtype=object))
+
+    assert 'tiny' not in ensemble.weights
+    np.testing.assert_allclose(weights[:3], np.tile(ensemble.default, (3, 1)))
+    np.testing.assert_allclose(weights[3], ensemble.weights['a'])
+    np.testing.assert_allclose(weights.sum(axis=1), 1.0)
+
+
+@pytest.mark.unit
+def test_customer_tiers_and_round_trip():
+    """Test that customers are tiered by volume and weights survive to_dict/from_dict"""
+    df = pd.DataFrame({
+        'customer_id': pd.Categorical(['big', 'big', 'mid', 'small']),
+        'sales_volume': [100.0, 120.0, 50.0, 5.0]
+    })
+    assert customer_tiers(df) == {'big': 'tier_1', 'mid': 'tier_2', 'small': 'tier_3'}
+
+    predictions, y, _ = make_predictions()
+    ensemble = SegmentWeights.define(df, {'xgboost': 0.4, 'prophet': 0.3, 'lstm': 0.3})
+    segments = ensemble.segments_of(pd.DataFrame({'customer_id': np.resize(['big', 'mid', 'small'], len(y))}))
+    ensemble.fit(predictions, y, segments, min_rows=100)
+
+    restored = SegmentWeights.from_dict(ensemble.to_dict())
+
+    assert restored.segments_of(df).tolist() == ['tier_1', 'tier_1', 'tier_2', 'tier_3']
+    np.testing.assert_allclose(restored.combine(predictions, segments), ensemble.combine(predictions, segments))
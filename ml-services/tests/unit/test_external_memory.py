@@ -0,0 +1,74 @@
+"""
+Unit tests for external-memory XGBoost training from Parquet shards
+"""
+import numpy as np
+import pandas as pd
+import pytest
+import xgboost as xgb
+
+from models.common.external_memory import ParquetShardIter, build_dmatrix, write_shards
+
+FEATURES = ['price', 'lag_1', 'is_weekend']
+
+
+@pytest.fixture
+def features():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'price': rng.uniform(5, 50, 5000),
+        'lag_1': rng.poisson(40, 5000).astype(float),
+        'is_weekend': rng.integers(0, 2, 5000)
+    })
+    target = pd.Series(100 - df['price'] + 0.5 * df['lag_1'] + 10 * df['is_weekend'], name='sales_volume')
+    return df, target
+
+
+@pytest.mark.unit
+def test_write_shards_splits_rows_and_stores_float32(tmp_path, features):
+    """Test that shards cover every row once with float32 features and the label"""
+    df, target = features
+    paths = write_shards(df, tmp_path, 'train', FEATURES, rows_per_shard=1200, target=target)
+
+    assert [path.name for path in paths] == [f'train-0000{n}.parquet' for n in range(5)]
+    shards = pd.concat([pd.read_parquet(path) for path in paths], ignore_index=True)
+    assert len(shards) == 5000
+    assert shards['price'].dtype == np.float32
+    assert shards['is_weekend'].dtype == df['is_weekend'].dtype
+    np.testing.assert_allclose(shards['sales_volume'], target)
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize('external', [False, True])
+def test_training_from_shards_matches_in_memory(tmp_path, features, external):
+    """Test that a booster trained from streamed shards fits like one trained in memory"""
+    df, target = features
+    train = write_shards(df[:4000], tmp_path / 'shards', 'train', FEATURES, 1000, target=target[:4000])
+    val = write_shards(df[4000:], tmp_path / 'shards', 'val', FEATURES, 1000, target=target[4000:])
+
+    def iterator(paths, split):
+        prefix = str(tmp_path / 'cache' / split) if external else None
+        return ParquetShardIter(paths, FEATURES, 'sales_volume', batch_rows=300, cache_prefix=prefix)
+
+    (tmp_path / 'cache').mkdir()
+    dtrain = build_dmatrix(iterator(train, 'train'), external=external)
+    dval = build_dmatrix(iterator(val, 'val'), ref=dtrain, external=external)
+    assert dtrain.num_row() == 4000 and dtrain.num_col() == 3
+
+    params = {'tree_method': 'hist', 'max_depth': 4, 'learning_rate': 0.3, 'seed': 42}
+    streamed = xgb.train(params, dtrain, 50, evals=[(dval, 'val')], verbose_eval=False)
+    in_memory = xgb.train(params, xgb.QuantileDMatrix(df[:4000], target[:4000]), 50)
+
+    X_val = xgb.DMatrix(df[4000:].astype(np.float32))
+    streamed_rmse = np.sqrt(np.mean((streamed.predict(X_val) - target[4000:]) ** 2))
+    in_memory_rmse = np.sqrt(np.mean((in_memory.predict(X_val) - target[4000:]) ** 2))
+    assert streamed_rmse < 1.5
+    assert streamed_rmse == pytest.approx(in_memory_rmse, abs=0.5)
+
+
+@pytest.mark.unit
+def test_external_matrix_requires_cache_prefix(tmp_path, features):
+    """Test that external mode refuses an iterator without an on-disk cache"""
+    df, target = features
+    paths = write_shards(df, tmp_path, 'train', FEATURES, target=target)
+    with pytest.raises(ValueError, match='cache_prefix'):
+        build_dmatrix(ParquetShardIter(paths, FEATURES, 'sales_volume'), external=True)
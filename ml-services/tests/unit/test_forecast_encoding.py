@@ -0,0 +1,75 @@
+"""
+Unit tests for columnar/Arrow forecast responses and the batch endpoint
+"""
+import pyarrow as pa
+import pytest
+
+from serving.encoding import ARROW_STREAM, COLUMNAR_JSON
+
+
+@pytest.mark.unit
+def test_forecast_columnar_layout(client, sample_forecast_request):
+    """Test that the columnar layout carries the same points as the row layout"""
+    rows = client.post("/api/v1/forecast/demand", json=sample_forecast_request).json()
+
+    response = client.post(
+        "/api/v1/forecast/demand", json=sample_forecast_request, headers={"Accept": COLUMNAR_JSON}
+    )
+    assert response.headers["content-type"].startswith(COLUMNAR_JSON)
+    columns = response.json()["forecast"]
+
+    assert columns["date"] == [point["date"] for point in rows["forecast"]]
+    assert columns["predicted_volume"] == [point["predicted_volume"] for point in rows["forecast"]]
+    assert len(columns["confidence_upper"]) == sample_forecast_request["horizon_days"]
+
+
+@pytest.mark.unit
+def test_forecast_arrow_stream(client, sample_forecast_request):
+    """Test that an Arrow IPC stream is returned with typed columns and metadata"""
+    response = client.post(
+        "/api/v1/forecast/demand", json=sample_forecast_request, headers={"Accept": ARROW_STREAM}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == ARROW_STREAM
+
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.column_names == ["date", "predicted_volume", "confidence_lower", "confidence_upper"]
+    assert table.num_rows == sample_forecast_request["horizon_days"]
+    assert table.schema.field("date").type == pa.date32()
+    assert table.schema.metadata[b"product_id"] == sample_forecast_request["product_id"].encode()
+
+
+@pytest.mark.unit
+def test_batch_forecast_layouts(client, sample_forecast_request):
+    """Test that the batch endpoint returns one forecast per request in each layout"""
+    requests = [
+        {**sample_forecast_request, "product_id": f"PROD{i:03d}", "horizon_days": 5 + i}
+        for i in range(3)
+    ]
+
+    data = client.post("/api/v1/forecast/demand/batch", json={"requests": requests}).json()
+    assert data["count"] == 3
+    assert [item["product_id"] for item in data["forecasts"]] == ["PROD000", "PROD001", "PROD002"]
+    assert [len(item["forecast"]) for item in data["forecasts"]] == [5, 6, 7]
+    assert set(data["forecasts"][0]["forecast"][0]) == {
+        "date", "predicted_volume", "confidence_lower", "confidence_upper"
+    }
+
+    columnar = client.post(
+        "/api/v1/forecast/demand/batch", json={"requests": requests}, headers={"Accept": COLUMNAR_JSON}
+    ).json()
+    assert len(columnar["forecasts"][2]["forecast"]["predicted_volume"]) == 7
+
+    response = client.post(
+        "/api/v1/forecast/demand/batch", json={"requests": requests}, headers={"Accept": ARROW_STREAM}
+    )
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.num_rows == 18
+    assert table.column("product_id").to_pylist().count("PROD002") == 7
+
+
+@pytest.mark.unit
+def test_batch_forecast_rejects_empty_batch(client):
+    """Test that an empty batch is a validation error"""
+    response = client.post("/api/v1/forecast/demand/batch", json={"requests": []})
+    assert response.status_code == 422
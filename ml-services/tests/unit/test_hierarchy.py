@@ -0,0 +1,98 @@
+"""
+Unit tests for hierarchical forecast reconciliation
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from models.demand_forecasting.hierarchy import Hierarchy, HierarchicalForecaster, seasonal_naive
+
+CATEGORIES = {'PROD001': 'Beverages', 'PROD002': 'Beverages', 'PROD003': 'Snacks'}
+
+
+def make_series():
+    return pd.DataFrame({
+        'product_id': ['PROD001', 'PROD002', 'PROD003', 'PROD001'],
+        'customer_id': ['CUST001', 'CUST001', 'CUST001', 'CUST002']
+    })
+
+
+class StubForecaster:
+    """Duck-typed DemandForecaster: one-step predictions are the actuals plus 1"""
+
+    def create_features(self, df):
+        return df.assign(date=pd.to_datetime(df['date'])).sort_values('date', kind='stable')
+
+    def predict_features(self, df_features):
+        return df_features['sales_volume'].to_numpy() + np.resize([1.0, -1.0], len(df_features))
+
+    def forecast(self, df, horizon_days=90, plan=None):
+        start = pd.to_datetime(df['date']).max() + pd.Timedelta(days=1)
+        last = df.groupby(['product_id', 'customer_id'], as_index=False)['sales_volume'].last()
+        dates = pd.date_range(start, periods=horizon_days)
+        return last.merge(pd.DataFrame({'date': dates}), how='cross').rename(columns={'sales_volume': 'predicted_volume'})
+
+
+def make_history(days=60):
+    dates = pd.date_range('2024-01-01', periods=days)
+    series = make_series()
+    rows = series.merge(pd.DataFrame({'date': dates}), how='cross')
+    rows['sales_volume'] = 10.0 + np.arange(len(rows)) % 7
+    return rows
+
+
+@pytest.mark.unit
+def test_summing_matrix_covers_every_level():
+    """Test that nodes are total, category x customer and base series with a matching summing matrix"""
+    hierarchy = Hierarchy.from_series(make_series(), CATEGORIES)
+
+    assert hierarchy.nodes['level'].tolist() == ['total'] + ['category_customer'] * 3 + ['series'] * 4
+    assert hierarchy.summing_matrix.shape == (8, 4)
+    np.testing.assert_allclose(hierarchy.aggregate(np.ones(4)), [4, 2, 1, 1, 1, 1, 1, 1])
+
+
+@pytest.mark.unit
+def test_ols_reconciliation_matches_dense_projection():
+    """Test that the sparse constraint-form solve equals S (S'S)^-1 S' y and is coherent"""
+    hierarchy = Hierarchy.from_series(make_series(), CATEGORIES)
+    rng = np.random.default_rng(0)
+    forecasts = rng.uniform(0, 10, (len(hierarchy.nodes), 3))
+
+    reconciled = hierarchy.reconcile(forecasts, hierarchy.node_weights('ols'))
+
+    S = hierarchy.summing_matrix.toarray()
+    np.testing.assert_allclose(reconciled, S @ np.linalg.solve(S.T @ S, S.T @ forecasts))
+    np.testing.assert_allclose(reconciled[:hierarchy.n_aggregates], hierarchy.aggregate_matrix @ reconciled[hierarchy.n_aggregates:])
+
+
+@pytest.mark.unit
+def test_mint_trusts_low_variance_nodes():
+    """Test that a near-certain total is kept and base series absorb the difference by variance"""
+    hierarchy = Hierarchy.from_series(make_series(), CATEGORIES)
+    forecasts = np.array([[20.0], [5.0], [2.0], [1.0], [2.0], [3.0], [2.0], [1.0]])
+    variances = np.array([1e-9, 1e9, 1e9, 1e9, 1.0, 1.0, 1.0, 3.0])
+
+    reconciled = hierarchy.reconcile(forecasts, hierarchy.node_weights('mint', variances))
+
+    assert reconciled[0, 0] == pytest.approx(20.0, abs=1e-4)
+    base_change = reconciled[4:, 0] - forecasts[4:, 0]
+    np.testing.assert_allclose(base_change, 12.0 * np.array([1, 1, 1, 3]) / 6, rtol=1e-4)
+
+
+@pytest.mark.unit
+def test_hierarchical_forecaster_returns_coherent_levels():
+    """Test that fitted MinT forecasts cover all levels and aggregates sum their base series"""
+    history = make_history()
+    forecaster = HierarchicalForecaster(StubForecaster(), method='mint', categories=CATEGORIES).fit(history)
+
+    forecast = forecaster.forecast(history, horizon_days=5)
+
+    assert set(forecast['level']) == {'total', 'category_customer', 'series'}
+    assert len(forecast) == 8 * 5
+    by_level = forecast.groupby(['level', 'date'])['forecast'].sum().unstack('level')
+    np.testing.assert_allclose(by_level['total'], by_level['series'])
+    np.testing.assert_allclose(by_level['category_customer'], by_level['series'])
+    np.testing.assert_allclose(seasonal_naive(np.arange(28.0)[None, :], 2), [[10.5, 11.5]])
+
+    with pytest.raises(ValueError):
+        HierarchicalForecaster(StubForecaster(), method='bottom_up')
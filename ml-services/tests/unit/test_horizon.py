@@ -0,0 +1,103 @@
+"""
+Unit tests for recursive horizon forecasting
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from models.demand_forecasting.features import add_calendar_features, trend_slope
+from models.demand_forecasting.horizon import HorizonState, recursive_forecast
+
+FEATURES = ['price', 'sales_lag_1', 'sales_lag_7', 'sales_roll_mean_7', 'sales_trend_30', 'has_promotion', 'store_count', 'day_of_week']
+
+
+def make_history(days=60):
+    """Two series with constant sales 10 and 20 and a carried store_count column"""
+    dates = pd.date_range('2024-01-01', periods=days)
+    frames = []
+    for i, (product, volume) in enumerate([('PROD001', 10.0), ('PROD002', 20.0)]):
+        frames.append(pd.DataFrame({
+            'date': dates,
+            'product_id': product,
+            'customer_id': 'CUST001',
+            'sales_volume': volume,
+            'sales_revenue': volume * 5,
+            'price': 5.0,
+            'store_count': 3 + i
+        }))
+    df = pd.concat(frames, ignore_index=True)
+    for col in FEATURES:
+        if col not in df:
+            df[col] = 0.0
+    return df
+
+
+@pytest.mark.unit
+def test_features_roll_forward_from_forecasts():
+    """Test that lags and rolling means use earlier forecasts and other columns carry forward"""
+    state = HorizonState(make_history(), FEATURES, horizon_days=3)
+
+    day0 = state.features(0)
+    np.testing.assert_allclose(day0['sales_lag_1'], [10, 20])
+    np.testing.assert_allclose(day0['store_count'], [3, 4])
+    assert day0['day_of_week'].tolist() == [pd.Timestamp('2024-03-01').dayofweek] * 2
+
+    state.advance(0, np.array([17.0, 27.0]))
+    day1 = state.features(1)
+    np.testing.assert_allclose(day1['sales_lag_1'], [17, 27])
+    np.testing.assert_allclose(day1['sales_lag_7'], [10, 20])
+    np.testing.assert_allclose(day1['sales_roll_mean_7'], [(6 * 10 + 17) / 7, (6 * 20 + 27) / 7])
+    assert (day1['sales_trend_30'] > 0).all()
+
+
+@pytest.mark.unit
+def test_plan_sets_future_prices_and_promotions():
+    """Test that planned rows override the last price and mark promotion days"""
+    plan = pd.DataFrame({
+        'product_id': ['PROD002'],
+        'customer_id': ['CUST001'],
+        'date': [pd.Timestamp('2024-03-02')],
+        'price': [4.0],
+        'promotion_id': ['PROMO1']
+    })
+    state = HorizonState(make_history(), FEATURES, horizon_days=2, plan=plan)
+
+    assert state.features(0)['price'].tolist() == [5.0, 5.0]
+    day1 = state.features(1)
+    assert day1['price'].tolist() == [5.0, 4.0]
+    assert day1['has_promotion'].tolist() == [0.0, 1.0]
+    assert state.regressors()['price'].shape == (2, 2)
+
+
+@pytest.mark.unit
+def test_recursive_forecast_calls_model_once_per_day():
+    """Test that every horizon day is one batched call covering all series"""
+    state = HorizonState(make_history(), FEATURES, horizon_days=5)
+    calls = []
+
+    def predict_step(h, X):
+        calls.append(len(X))
+        return X['sales_lag_1'].to_numpy() + 1
+
+    forecast = recursive_forecast(state, predict_step)
+
+    assert calls == [2] * 5
+    assert len(forecast) == 10
+    series = forecast[forecast['product_id'] == 'PROD001']
+    np.testing.assert_allclose(series['predicted_volume'], [11, 12, 13, 14, 15])
+    assert series['date'].min() == pd.Timestamp('2024-03-01')
+
+
+@pytest.mark.unit
+def test_trend_slope_and_calendar_features():
+    """Test that trend_slope matches np.polyfit ignoring NaN and holidays are flagged"""
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=(3, 30))
+    values[1, :5] = np.nan
+    expected = [np.polyfit(np.arange(30)[~np.isnan(row)], row[~np.isnan(row)], 1)[0] for row in values]
+    np.testing.assert_allclose(trend_slope(values), expected)
+    assert np.isnan(trend_slope(np.array([np.nan, 1.0])))
+
+    calendar = add_calendar_features(pd.DataFrame({'date': pd.to_datetime(['2024-12-25', '2024-12-27'])}))
+    assert calendar['is_holiday'].tolist() == [1, 0]
+    assert calendar['days_to_holiday'].tolist() == [0, 1]
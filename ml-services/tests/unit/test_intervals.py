@@ -0,0 +1,241 @@
+"""
+Unit tests for conformal forecast intervals
+"""
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from models.demand_forecasting.intervals import LEAD_TIME_BUCKETS, QUANTILES, ConformalIntervals, conformal_quantiles
+
+
+def make_errors(n=4000, seed=0):
+    """Predictions with multiplicative noise: segment a is tight, segment b wide"""
+    rng = np.random.default_rng(seed)
+    predictions = rng.uniform(10, 1000, n)
+    segments = np.where(np.arange(n) % 2 == 0, 'a', 'b').astype(object)
+    scale = np.where(segments == 'a', 0.05, 0.3)
+    y = predictions * (1 + rng.normal(0, 1, n) * scale)
+    dates = pd.date_range('2024-01-01', periods=n // 40, freq='D').repeat(40)
+    return predictions, y, segments, dates
+
+
+@pytest.mark.unit
+def test_conformal_bounds_cover_held_out_rows():
+    """Test that 90% bounds fitted on one half cover about 90% of the other half per segment"""
+    predictions, y, segments, dates = make_errors()
+    fit, held_out = slice(0, 2000), slice(2000, None)
+    intervals = ConformalIntervals.fit(predictions[fit], y[fit], segments[fit], dates[fit])
+
+    lower, upper = intervals.bounds(predictions[held_out], 0.9, segments[held_out])
+    covered = (y[held_out] >= lower) & (y[held_out] <= upper)
+    for segment in ['a', 'b']:
+        rows = segments[held_out] == segment
+        assert 0.86 <= covered[rows].mean() <= 0.94
+    assert set(intervals.segments) == {'a', 'b'}
+    width_a = np.median((upper - lower)[segments[held_out] == 'a'] / predictions[held_out][segments[held_out] == 'a'])
+    width_b = np.median((upper - lower)[segments[held_out] == 'b'] / predictions[held_out][segments[held_out] == 'b'])
+    assert width_a < width_b
+
+
+@pytest.mark.unit
+def test_confidence_level_selects_quantile_pair():
+    """Test that grid levels return the stored quantiles and the band widens with the level"""
+    errors = np.linspace(-0.5, 0.5, 1001)
+    intervals = ConformalIntervals(conformal_quantiles(errors))
+    i, j = np.searchsorted(QUANTILES, [0.025, 0.975])
+
+    lower, upper = intervals.bounds(np.array([100.0]), 0.95)
+    assert lower[0] == pytest.approx(100 * (1 + intervals.default[i]))
+    assert upper[0] == pytest.approx(100 * (1 + intervals.default[j]))
+
+    levels = np.array([0.5, 0.8, 0.9, 0.95, 0.99])
+    lower, upper = intervals.bounds(np.full(len(levels), 100.0), levels)
+    assert np.all(np.diff(upper - lower) > 0)
+    assert np.all(lower <= 100) and np.all(upper >= 100)
+
+
+@pytest.mark.unit
+def test_unknown_segments_and_round_trip_use_stored_tables():
+    """Test that unknown segments get the default table and to_dict/from_dict keeps every table"""
+    predictions, y, segments, dates = make_errors()
+    intervals = ConformalIntervals.fit(predictions, y, segments, dates, min_rows=2500)
+    assert intervals.segments == {}
+
+    intervals = ConformalIntervals.fit(predictions, y, segments, dates)
+    restored = ConformalIntervals.from_dict(intervals.to_dict())
+    values = np.array([100.0, 100.0, 100.0])
+    labels = np.array(['a', 'b', 'new'], dtype=object)
+    for got, expected in zip(restored.bounds(values, 0.9, labels), intervals.bounds(values, 0.9, labels)):
+        np.testing.assert_allclose(got, expected)
+    np.testing.assert_allclose(restored.bounds(values[:1], 0.9, labels[2:])[1], intervals.bounds(values[:1], 0.9)[1])
+    np.testing.assert_allclose(restored.total, intervals.total)
+
+    data = intervals.to_dict()
+    data['quantiles'] = data['quantiles'][1:]
+    with pytest.raises(ValueError):
+        ConformalIntervals.from_dict(data)
+
+
+def make_lead_time_errors(n_series=100, origins=4, horizon=30, seed=0):
+    """Recursive forecasts whose relative error spread grows with the lead time"""
+    rng = np.random.default_rng(seed)
+    lead_times = np.tile(np.arange(1, horizon + 1), n_series * origins)
+    predictions = rng.uniform(10, 1000, len(lead_times))
+    y = predictions * (1 + rng.normal(0, 1, len(lead_times)) * 0.02 * np.sqrt(lead_times))
+    days = np.repeat(np.arange(origins), n_series * horizon) * 1000 + lead_times
+    return predictions, y, lead_times, days
+
+
+@pytest.mark.unit
+def test_lead_time_bounds_widen_with_the_horizon():
+    """Test that each horizon day takes its lead-time bucket's quantiles, covering held-out rows per bucket"""
+    predictions, y, lead_times, days = make_lead_time_errors()
+    one_step = ConformalIntervals.fit(predictions[lead_times == 1], y[lead_times == 1])
+    fit, held_out = slice(0, len(y) // 2), slice(len(y) // 2, None)
+    intervals = ConformalIntervals.fit(predictions[lead_times == 1], y[lead_times == 1]).fit_lead_times(
+        predictions[fit], y[fit], lead_times[fit], days=days[fit]
+    )
+
+    assert set(intervals.lead_times) == {1, 7, 14, 30} and intervals.max_lead == 30
+    lower, upper = intervals.bounds(predictions[held_out], 0.9, lead_times=lead_times[held_out])
+    covered = (y[held_out] >= lower) & (y[held_out] <= upper)
+    bucket = np.searchsorted(LEAD_TIME_BUCKETS, lead_times[held_out])
+    width = (upper - lower) / predictions[held_out]
+    for b in range(4):
+        assert 0.85 <= covered[bucket == b].mean() <= 0.95
+    assert np.median(width[lead_times[held_out] == 30]) > 3 * np.median(width[lead_times[held_out] == 1])
+
+    # Without lead times the one-step quantiles apply; past the backtest the last bucket widens
+    np.testing.assert_allclose(intervals.bounds(predictions[:5], 0.9)[1], one_step.bounds(predictions[:5], 0.9)[1])
+    values = np.full(2, 100.0)
+    lower, upper = intervals.bounds(values, 0.9, lead_times=np.array([30, 120]))
+    assert upper[1] - 100 == pytest.approx((upper[0] - 100) * 2)
+
+    # Daily totals use each bucket's total table (its default when it has too few days)
+    totals = np.full(3, 1000.0)
+    lower, upper = intervals.total_bounds(totals, 0.9, lead_times=np.array([1, 10, 30]))
+    for i, last_day in enumerate([1, 14, 30]):
+        bucket = intervals.lead_times[last_day]
+        assert upper[i] == pytest.approx(bucket.total_bounds(totals[:1], 0.9)[1][0])
+    np.testing.assert_allclose(intervals.lead_times[1].total, intervals.lead_times[1].default)
+
+
+@pytest.mark.unit
+def test_lead_time_tables_round_trip():
+    """Test that to_dict/from_dict keeps the lead-time tables and older dicts load without them"""
+    predictions, y, lead_times, days = make_lead_time_errors()
+    segments = np.where(np.arange(len(y)) % 2 == 0, 'a', 'b').astype(object)
+    intervals = ConformalIntervals.fit(predictions, y, segments).fit_lead_times(predictions, y, lead_times, segments, days)
+
+    restored = ConformalIntervals.from_dict(intervals.to_dict())
+    assert set(restored.lead_times) == set(intervals.lead_times) and restored.max_lead == intervals.max_lead
+    assert set(restored.lead_times[30].segments) == {'a', 'b'}
+    values, labels, leads = np.full(4, 100.0), np.array(['a', 'b', 'new', 'a'], dtype=object), np.array([1, 7, 20, 45])
+    for got, expected in zip(restored.bounds(values, 0.9, labels, leads), intervals.bounds(values, 0.9, labels, leads)):
+        np.testing.assert_allclose(got, expected)
+    np.testing.assert_allclose(restored.total_bounds(values, 0.9, leads), intervals.total_bounds(values, 0.9, leads))
+
+    data = intervals.to_dict()
+    del data['lead_times'], data['max_lead']
+    legacy = ConformalIntervals.from_dict(data)
+    np.testing.assert_allclose(legacy.bounds(values, 0.9, labels, leads), intervals.bounds(values, 0.9, labels))
+
+
+class StubForecaster:
+    """Trained-model stand-in: a flat forecast of each series' mean volume"""
+
+    models = {'xgboost': object()}
+
+    def __init__(self, intervals):
+        self.intervals = intervals
+        self.ensemble = SimpleNamespace(segments_of=lambda frame: np.full(len(frame), 'a', dtype=object))
+        self.calls = []
+
+    def forecast(self, history, horizon_days):
+        self.calls.append((history[['product_id', 'customer_id']].drop_duplicates().shape[0], horizon_days))
+        last = history['date'].max()
+        return pd.concat([
+            pd.DataFrame({
+                'product_id': product_id,
+                'customer_id': customer_id,
+                'date': pd.date_range(last + pd.Timedelta(days=1), periods=horizon_days, freq='D'),
+                'predicted_volume': group['sales_volume'].mean()
+            })
+            for (product_id, customer_id), group in history.groupby(['product_id', 'customer_id'])
+        ], ignore_index=True)
+
+
+@pytest.mark.unit
+def test_forecast_batch_uses_model_intervals(sample_forecast_request, tmp_path, monkeypatch):
+    """Test that batched forecasts come from one model call with bounds from its quantiles at each request's level"""
+    import serving.api as api
+
+    monkeypatch.setattr(api, 'DATA_DIR', tmp_path)
+    (tmp_path / 'acme').mkdir()
+    pd.DataFrame({
+        'date': np.tile(pd.date_range('2024-01-01', periods=30, freq='D').strftime('%Y-%m-%d'), 2),
+        'product_id': ['PROD001'] * 30 + ['PROD002'] * 30,
+        'customer_id': 'CUST001',
+        'sales_volume': [400.0] * 30 + [900.0] * 30
+    }).to_csv(tmp_path / 'acme' / 'sales.csv', index=False)
+
+    model = StubForecaster(ConformalIntervals(conformal_quantiles(np.linspace(-0.5, 0.5, 1001))))
+    requests = [
+        api.ForecastRequest(**{**sample_forecast_request, 'tenant_id': 'acme', 'confidence_level': 0.5}),
+        api.ForecastRequest(**{**sample_forecast_request, 'tenant_id': 'acme', 'product_id': 'PROD002', 'horizon_days': 14}),
+        api.ForecastRequest(**{**sample_forecast_request, 'tenant_id': 'acme', 'product_id': 'PROD404'}),
+        api.ForecastRequest(**sample_forecast_request)
+    ]
+    (narrow, wide, unknown, untenanted), modeled = api.forecast_batch(model, requests)
+
+    assert modeled == [True, True, False, False]
+    assert model.calls == [(2, 14)]
+    np.testing.assert_array_equal(narrow['predicted_volume'], np.full(7, 400.0))
+    np.testing.assert_array_equal(wide['predicted_volume'], np.full(14, 900.0))
+    assert list(narrow['date']) == list(wide['date'][:7])
+    assert narrow['date'][0] == '2024-01-31'
+    for forecast in (narrow, wide):
+        assert np.all(forecast['confidence_lower'] <= forecast['predicted_volume'])
+        assert np.all(forecast['predicted_volume'] <= forecast['confidence_upper'])
+    ratio = lambda forecast: np.median((forecast['confidence_upper'] - forecast['confidence_lower']) / forecast['predicted_volume'])
+    assert ratio(narrow) == pytest.approx(0.5, abs=0.02)
+    assert ratio(wide) == pytest.approx(0.95, abs=0.02)
+    for forecast in (unknown, untenanted):
+        assert len(forecast['date']) == 7
+        np.testing.assert_allclose(forecast['confidence_upper'] / forecast['predicted_volume'], 1.15, atol=0.01)
+
+
+@pytest.mark.unit
+def test_forecast_batch_bounds_use_each_day_lead_time(sample_forecast_request, tmp_path, monkeypatch):
+    """Test that batched forecast bounds take the quantiles of each horizon day's lead time"""
+    import serving.api as api
+
+    monkeypatch.setattr(api, 'DATA_DIR', tmp_path)
+    (tmp_path / 'acme').mkdir()
+    pd.DataFrame({
+        'date': np.tile(pd.date_range('2024-01-01', periods=30, freq='D').strftime('%Y-%m-%d'), 2),
+        'product_id': ['PROD001'] * 30 + ['PROD002'] * 30,
+        'customer_id': 'CUST001',
+        'sales_volume': [400.0] * 30 + [900.0] * 30
+    }).to_csv(tmp_path / 'acme' / 'sales.csv', index=False)
+
+    predictions, y, lead_times, days = make_lead_time_errors()
+    intervals = ConformalIntervals.fit(predictions[lead_times == 1], y[lead_times == 1]).fit_lead_times(predictions, y, lead_times)
+    model = StubForecaster(intervals)
+    requests = [
+        api.ForecastRequest(**{**sample_forecast_request, 'tenant_id': 'acme', 'horizon_days': 7}),
+        api.ForecastRequest(**{**sample_forecast_request, 'tenant_id': 'acme', 'product_id': 'PROD002', 'horizon_days': 30})
+    ]
+    (short, long), modeled = api.forecast_batch(model, requests)
+
+    assert modeled == [True, True]
+    for forecast, horizon in ((short, 7), (long, 30)):
+        expected_lower, expected_upper = intervals.bounds(
+            forecast['predicted_volume'], 0.95, np.full(horizon, 'a', dtype=object), lead_times=np.arange(1, horizon + 1)
+        )
+        np.testing.assert_allclose(forecast['confidence_upper'], np.round(expected_upper))
+        np.testing.assert_allclose(forecast['confidence_lower'], np.round(np.maximum(expected_lower, 0)))
+    width = long['confidence_upper'] - long['confidence_lower']
+    assert width[-1] > 2 * width[0]
@@ -0,0 +1,72 @@
+"""
+Unit tests for the API load test harness
+"""
+import asyncio
+import httpx
+import pytest
+
+from benchmarks.load_test import build_scenarios, check_results, load_thresholds, run_load_test, DEFAULT_CONFIG
+from serving.api import app
+
+
+def stats(p50=10.0, p99=50.0, throughput=100.0, error_rate=0.0):
+    return {'p50_ms': p50, 'p99_ms': p99, 'throughput_rps': throughput, 'error_rate': error_rate}
+
+
+@pytest.mark.unit
+def test_scenarios_match_api_routes(client):
+    """Test that every scenario hits an existing route with a valid payload"""
+    for scenario in build_scenarios(key_space=10):
+        response = client.request(
+            scenario.method,
+            scenario.path,
+            json=scenario.payload(0) if scenario.payload else None,
+            headers=scenario.headers
+        )
+        assert response.status_code not in (404, 405, 422), scenario.name
+
+
+@pytest.mark.unit
+def test_run_load_test_reports_percentiles():
+    """Test that a short in-process run reports requests, percentiles and throughput"""
+    scenarios = [s for s in build_scenarios(key_space=5) if s.name in ('health', 'forecast')]
+
+    async def main():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            return await run_load_test(client, scenarios, concurrency=4, duration=0.2)
+
+    results = asyncio.run(main())
+
+    assert set(results) == {'health', 'forecast'}
+    for result in results.values():
+        assert result['requests'] > 0
+        assert result['error_rate'] == 0
+        assert 0 < result['p50_ms'] <= result['p95_ms'] <= result['p99_ms'] <= result['max_ms']
+        assert result['throughput_rps'] > 0
+
+
+@pytest.mark.unit
+def test_thresholds_come_from_config():
+    """Test that the p99 and error-rate limits are read from the monitoring config"""
+    thresholds = load_thresholds(DEFAULT_CONFIG)
+
+    assert thresholds == {'latency_p99': 200.0, 'error_rate': 0.01}
+    assert check_results({'forecast': stats()}, thresholds) == []
+
+    failures = check_results({'forecast': stats(p99=250.0, error_rate=0.05)}, thresholds)
+    assert len(failures) == 2
+
+
+@pytest.mark.unit
+def test_baseline_regressions_fail():
+    """Test that latency and throughput regressions beyond tolerance fail, small deltas do not"""
+    thresholds = {'latency_p99': 200.0, 'error_rate': 0.01}
+    baseline = {'forecast': stats(), 'health': stats(p50=1.0, p99=2.0)}
+
+    results = {'forecast': stats(p99=70.0, throughput=70.0), 'health': stats(p50=1.5, p99=3.5)}
+    failures = check_results(results, thresholds, baseline, max_regression=0.2, min_delta_ms=2.0)
+
+    assert len(failures) == 2
+    assert all(failure.startswith('forecast:') for failure in failures)
+    assert check_results({'forecast': stats(p99=55.0, throughput=90.0)}, thresholds, baseline) == []
@@ -0,0 +1,79 @@
+"""
+Unit tests for the Prometheus metrics endpoint
+"""
+import pytest
+from prometheus_client.parser import text_string_to_metric_families
+
+from serving.cache import TTLCache
+from serving.metrics import ServingMetrics
+
+
+def scrape(client):
+    """Fetch /metrics and index samples by (name, labels)"""
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    return {
+        (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+        for family in text_string_to_metric_families(response.text)
+        for sample in family.samples
+    }
+
+
+@pytest.mark.unit
+def test_metrics_record_requests_by_endpoint_template(client):
+    """Test that request latency is labelled by route template, not raw path"""
+    client.get("/health")
+    client.get("/api/v1/models/demand_forecasting")
+    client.get("/api/v1/models/price_optimization")
+    client.get("/no/such/path")
+
+    samples = scrape(client)
+    labels = (('endpoint', '/api/v1/models/{model_type}'), ('method', 'GET'), ('status', '200'))
+    assert samples[('tradeai_http_request_duration_seconds_count', labels)] >= 2
+    assert (
+        'tradeai_http_request_duration_seconds_count',
+        (('endpoint', 'unmatched'), ('method', 'GET'), ('status', '404'))
+    ) in samples
+    assert not any('demand_forecasting' in dict(key).get('endpoint', '') for _, key in samples)
+    assert samples[('tradeai_http_requests_in_flight', ())] == 1
+    assert ('tradeai_threadpool_queue_depth', ()) in samples
+
+
+@pytest.mark.unit
+def test_metrics_report_models_and_routing(client, sample_forecast_request):
+    """Test that per-model prediction latency and shadow queue depth are exposed"""
+    client.post("/api/v1/forecast/demand", json=sample_forecast_request)
+
+    samples = scrape(client)
+    counts = [
+        value for (name, labels), value in samples.items()
+        if name == 'tradeai_model_prediction_duration_seconds_count'
+        and dict(labels)['model_type'] == 'demand_forecasting'
+    ]
+    assert sum(counts) >= 1
+    assert samples[('tradeai_shadow_queue_depth', ())] == 0
+
+
+@pytest.mark.unit
+def test_metrics_cache_hit_ratio():
+    """Test that tracked caches report hits, misses and hit ratio at scrape time"""
+    metrics = ServingMetrics()
+    cache = TTLCache(ttl=60, max_size=10)
+    metrics.track_cache('results', cache)
+
+    cache.get('a')
+    cache.set('a', 1)
+    cache.get('a')
+    cache.get('a')
+
+    body, _ = metrics.render()
+    samples = {
+        (sample.name, tuple(sample.labels.values())): sample.value
+        for family in text_string_to_metric_families(body.decode())
+        for sample in family.samples
+    }
+    assert samples[('tradeai_cache_hits_total', ('results',))] == 2
+    assert samples[('tradeai_cache_misses_total', ('results',))] == 1
+    assert samples[('tradeai_cache_hit_ratio', ('results',))] == pytest.approx(2 / 3)
+    assert samples[('tradeai_cache_entries', ('results',))] == 1
@@ -0,0 +1,124 @@
+"""
+Unit tests for the micro-batching scheduler
+"""
+import asyncio
+import time
+import pytest
+
+from serving.batching import MicroBatcher
+
+
+@pytest.mark.unit
+def test_concurrent_items_share_batches():
+    """Test that concurrent submissions are grouped up to max_batch_size and scattered in order"""
+    batches = []
+
+    def double(items):
+        batches.append(len(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(double, max_batch_size=32, max_wait_ms=50)
+
+    async def main():
+        return await asyncio.gather(*[batcher.submit(i) for i in range(100)])
+
+    assert asyncio.run(main()) == [i * 2 for i in range(100)]
+    assert batches == [32, 32, 32, 4]
+    assert batcher.items == 100 and batcher.batches == 4
+
+
+@pytest.mark.unit
+def test_lone_item_waits_at_most_max_wait():
+    """Test that a partial batch is flushed after max_wait_ms"""
+    batcher = MicroBatcher(lambda items: items, max_batch_size=64, max_wait_ms=20)
+
+    async def main():
+        start = time.perf_counter()
+        result = await batcher.submit('x')
+        return result, time.perf_counter() - start
+
+    result, elapsed = asyncio.run(main())
+    assert result == 'x'
+    assert 0.015 <= elapsed < 0.5
+
+
+@pytest.mark.unit
+def test_errors_fail_only_their_items():
+    """Test that per-item errors are scattered and batch errors fail the whole batch"""
+    def check(items):
+        if 'boom' in items:
+            raise RuntimeError("model call failed")
+        return [ValueError(item) if item < 0 else item for item in items]
+
+    batcher = MicroBatcher(check, max_batch_size=8, max_wait_ms=5)
+
+    async def main():
+        mixed = await asyncio.gather(*[batcher.submit(i) for i in (1, -1, 2)], return_exceptions=True)
+        failed = await asyncio.gather(batcher.submit(3), batcher.submit('boom'), return_exceptions=True)
+        return mixed, failed
+
+    mixed, failed = asyncio.run(main())
+    assert mixed[0] == 1 and mixed[2] == 2
+    assert isinstance(mixed[1], ValueError)
+    assert all(isinstance(result, RuntimeError) for result in failed)
+
+
+@pytest.mark.unit
+def test_forecast_batch_matches_per_request_shape(sample_forecast_request):
+    """Test that the vectorized forecast returns one correctly sized forecast per request"""
+    from serving.api import ForecastRequest, forecast_batch, run_forecast_batch, traffic_router
+
+    requests = [ForecastRequest(**{**sample_forecast_request, 'horizon_days': h}) for h in (7, 30, 1)]
+    forecasts, modeled = forecast_batch(None, requests)
+
+    assert modeled == [False, False, False]
+
+    assert [len(forecast['date']) for forecast in forecasts] == [7, 30, 1]
+    for forecast in forecasts:
+        assert list(forecast['date']) == sorted(forecast['date'])
+        assert (forecast['confidence_lower'] <= forecast['predicted_volume']).all()
+        assert (forecast['predicted_volume'] <= forecast['confidence_upper']).all()
+    assert forecasts[0]['date'][0] == forecasts[1]['date'][0]
+
+    choice = traffic_router.choose('demand_forecasting')
+    results = run_forecast_batch([(choice, request) for request in requests])
+    assert [len(forecast['date']) for forecast, _ in results] == [7, 30, 1]
+    assert all(model_version == results[0][1] for _, model_version in results)
+
+
+@pytest.mark.unit
+def test_recommendation_batch_uses_engine(sample_product_recommendation_request, monkeypatch, mlflow_tracking):
+    """Test that recommendations come from one engine call per top_n, or the mock list when untrained"""
+    import numpy as np
+    import pandas as pd
+    import serving.api as api
+    from models.recommendation.recommender import RecommendationEngine
+
+    engine = RecommendationEngine({'n_factors': 8, 'n_epochs': 5})
+    monkeypatch.setitem(api.model_registry, 'recommendations', engine)
+    [(recommendations, model_version)] = api.run_recommendation_batch([api.ProductRecommendationRequest(**sample_product_recommendation_request)])
+    assert [r.product_name for r in recommendations] == api.MOCK_PRODUCTS
+    assert model_version.endswith('-mock')
+
+    rng = np.random.default_rng(0)
+    engine.cf_model.train(pd.DataFrame({
+        'user_id': [f"CUST{u:03d}" for u in rng.integers(0, 20, 300)],
+        'item_id': [f"prod-{i:03d}" for i in rng.integers(0, 15, 300)],
+        'rating': rng.integers(1, 6, 300).astype(float)
+    }).drop_duplicates(['user_id', 'item_id']))
+    calls = []
+    batch = engine.recommend_products_batch
+    monkeypatch.setattr(engine, 'recommend_products_batch', lambda customer_ids, *args, **kwargs: calls.append(len(customer_ids)) or batch(customer_ids, *args, **kwargs))
+
+    requests = [
+        api.ProductRecommendationRequest(**{**sample_product_recommendation_request, 'customer_id': customer_id, 'top_n': top_n})
+        for customer_id, top_n in [('CUST001', 5), ('CUST002', 5), ('CUST003', 3)]
+    ]
+    results = api.run_recommendation_batch(requests)
+
+    assert sorted(calls) == [1, 2]
+    assert [len(recommendations) for recommendations, _ in results] == [5, 5, 3]
+    for request, (recommendations, model_version) in zip(requests, results):
+        expected = engine.recommend_products(request.customer_id, request.context, top_n=request.top_n)
+        assert [r.model_dump() for r in recommendations] == expected
+        assert not model_version.endswith('-mock')
@@ -0,0 +1,147 @@
+"""
+Unit tests for versioned model artifacts
+"""
+import pytest
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from models.common.artifacts import ArtifactStore
+
+
+@pytest.fixture
+def interactions():
+    """Small interaction log with ratings and counts"""
+    rng = np.random.default_rng(0)
+    n = 400
+    return pd.DataFrame({
+        'user_id': [f"cust-{u:03d}" for u in rng.integers(0, 40, n)],
+        'item_id': [f"prod-{i:03d}" for i in rng.integers(0, 25, n)],
+        'rating': rng.integers(1, 6, n).astype(float),
+        'interactions': rng.integers(1, 30, n)
+    }).drop_duplicates(['user_id', 'item_id'])
+
+
+@pytest.mark.unit
+def test_artifact_store_publishes_versions(tmp_path):
+    """Test that committed versions are listed and arrays load memory-mapped"""
+    store = ArtifactStore(tmp_path)
+    matrix = sp.random(20, 10, density=0.2, format='csr', random_state=0)
+
+    with store.create('recommendations', {'note': 'first'}) as artifact:
+        artifact.save_array('factors', np.arange(12, dtype=np.float32).reshape(3, 4))
+        artifact.save_array('ids', np.array(['a', 'b', 'c'], dtype=object))
+        artifact.save_sparse('matrix', matrix)
+
+    loaded = store.open('recommendations')
+    factors = loaded.load_array('factors')
+
+    assert store.versions('recommendations') == [loaded.version]
+    assert loaded.metadata == {'note': 'first'}
+    assert isinstance(factors, np.memmap) and not factors.flags.writeable
+    assert loaded.load_array('ids').tolist() == ['a', 'b', 'c']
+    assert (loaded.load_sparse('matrix') != matrix).nnz == 0
+
+
+@pytest.mark.unit
+def test_artifact_store_discards_failed_writes(tmp_path):
+    """Test that a write that raises leaves no version or staging directory"""
+    store = ArtifactStore(tmp_path)
+
+    with pytest.raises(RuntimeError):
+        with store.create('price_optimization') as artifact:
+            artifact.save_json('elasticity', {'elasticity': -1.2})
+            raise RuntimeError("training failed")
+
+    assert store.versions('price_optimization') == []
+    assert store.latest('price_optimization') is None
+    assert list((tmp_path / 'price_optimization').iterdir()) == []
+
+
+@pytest.mark.unit
+def test_artifact_store_orders_same_second_versions(tmp_path, monkeypatch):
+    """Test that more than ten commits in one second keep latest() on the newest version"""
+    from datetime import datetime
+    from models.common import artifacts
+
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime(2025, 1, 1, 12, 0, 0)
+
+    monkeypatch.setattr(artifacts, 'datetime', FrozenDatetime)
+    store = ArtifactStore(tmp_path)
+    committed = []
+    for i in range(12):
+        with store.create('price_optimization') as artifact:
+            artifact.save_json('elasticity', {'elasticity': -i})
+        committed.append(artifact.version)
+
+    assert committed[10] == '20250101T120000-0010'
+    assert store.versions('price_optimization') == committed
+    assert store.latest('price_optimization') == committed[-1]
+
+    # Unpadded suffixes from earlier releases sort numerically too
+    for old, version in zip(committed[:2], ['20250101T120001-10', '20250101T120001-2']):
+        (tmp_path / 'price_optimization' / old).rename(tmp_path / 'price_optimization' / version)
+    assert store.versions('price_optimization')[-2:] == ['20250101T120001-2', '20250101T120001-10']
+
+
+@pytest.mark.unit
+def test_svd_model_roundtrip(tmp_path, interactions):
+    """Test that a reloaded SVD model scores like the trained one"""
+    from models.recommendation.recommender import CollaborativeFilteringModel
+
+    model = CollaborativeFilteringModel(n_factors=8, n_epochs=5)
+    model.train(interactions)
+
+    store = ArtifactStore(tmp_path)
+    with store.create('recommendations') as artifact:
+        model.save(artifact)
+    loaded = CollaborativeFilteringModel.load(store.open('recommendations'))
+
+    candidates = sorted(interactions['item_id'].unique()) + ['prod-unknown']
+    assert loaded.recommend_items('cust-001', candidates, 5) == model.recommend_items('cust-001', candidates, 5)
+    assert loaded.predict('cust-unknown', 'prod-001') == pytest.approx(model.model.predict('cust-unknown', 'prod-001').est)
+    assert len(loaded.interactions) == len(interactions)
+
+
+@pytest.mark.unit
+def test_svd_model_roundtrip_keeps_latest_duplicate_rating(tmp_path, interactions):
+    """Test that duplicate user-item ratings reload as the latest rating, not their sum"""
+    from models.recommendation.recommender import CollaborativeFilteringModel
+
+    first = interactions.iloc[0]
+    repeated = pd.DataFrame({'user_id': [first['user_id']] * 2, 'item_id': [first['item_id']] * 2, 'rating': [5.0, 4.0]})
+    model = CollaborativeFilteringModel(n_factors=8, n_epochs=5)
+    model.train(pd.concat([interactions, repeated], ignore_index=True))
+
+    store = ArtifactStore(tmp_path)
+    with store.create('recommendations') as artifact:
+        model.save(artifact)
+    loaded = CollaborativeFilteringModel.load(store.open('recommendations'))
+
+    assert len(loaded.interactions) == len(interactions)
+    assert loaded.interactions['rating'].between(1, 5).all()
+    pair = loaded.interactions[(loaded.interactions['user_id'] == first['user_id']) & (loaded.interactions['item_id'] == first['item_id'])]
+    assert pair['rating'].tolist() == [4.0]
+
+
+@pytest.mark.unit
+def test_als_model_roundtrip_and_update(tmp_path, interactions):
+    """Test that a reloaded ALS model scores identically and can still be updated"""
+    from models.recommendation.als import ImplicitALSModel
+
+    model = ImplicitALSModel(n_factors=8, n_iterations=3)
+    model.train(interactions)
+
+    store = ArtifactStore(tmp_path)
+    with store.create('recommendations') as artifact:
+        model.save(artifact)
+    loaded = ImplicitALSModel.load(store.open('recommendations'))
+
+    assert np.array_equal(loaded.score_users(np.arange(5)), model.score_users(np.arange(5)))
+
+    stats = loaded.update(pd.DataFrame({'user_id': ['cust-new'], 'item_id': ['prod-001'], 'interactions': [3]}))
+    assert stats['new_users'] == 1
+    assert loaded.user_factors.flags.writeable
@@ -0,0 +1,106 @@
+"""
+Unit tests for the hot-swappable model registry
+"""
+import pytest
+
+from models.common.artifacts import ArtifactStore
+from serving.registry import ModelRegistry
+
+
+def publish(store, model_type, value):
+    """Publish a trivial artifact version holding a JSON value"""
+    with store.create(model_type) as artifact:
+        artifact.save_json('model', value)
+    return artifact.version
+
+
+@pytest.fixture
+def registry(tmp_path):
+    """Registry over an empty artifact store with a JSON loader"""
+    store = ArtifactStore(tmp_path)
+    return ModelRegistry(
+        store,
+        loaders={'recommendations': lambda artifact: artifact.load_json('model')},
+        model_types=['recommendations'],
+        keep_versions=2
+    )
+
+
+@pytest.mark.unit
+def test_registry_swaps_in_new_versions(registry):
+    """Test that refresh activates newly published versions and retains N"""
+    registry['recommendations'] = 'untrained'
+    assert registry.refresh() == {}
+
+    first = publish(registry.store, 'recommendations', {'v': 1})
+    assert registry.refresh() == {'recommendations': first}
+    assert registry['recommendations'] == {'v': 1}
+    assert registry.refresh() == {}
+
+    publish(registry.store, 'recommendations', {'v': 2})
+    third = publish(registry.store, 'recommendations', {'v': 3})
+    registry.refresh()
+
+    versions = registry.versions('recommendations')
+    assert versions['active'] == third
+    assert len(versions['loaded']) == 2
+    assert len(versions['available']) == 3
+
+
+@pytest.mark.unit
+def test_registry_rollback_sticks_until_next_publish(registry):
+    """Test that a rollback is not undone by the watcher until a newer version appears"""
+    first = publish(registry.store, 'recommendations', {'v': 1})
+    registry.refresh()
+    second = publish(registry.store, 'recommendations', {'v': 2})
+    registry.refresh()
+
+    assert registry.rollback('recommendations') == first
+    assert registry['recommendations'] == {'v': 1}
+    registry.refresh()
+    assert registry.active_version('recommendations') == first
+
+    assert registry.rollback('recommendations', second) == second
+    assert registry['recommendations'] == {'v': 2}
+
+
+@pytest.mark.unit
+def test_registry_keeps_serving_when_load_fails(registry):
+    """Test that a broken version leaves the active model in place"""
+    publish(registry.store, 'recommendations', {'v': 1})
+    registry.refresh()
+
+    def broken(artifact):
+        raise RuntimeError("corrupt artifact")
+
+    registry.loaders['recommendations'] = broken
+    publish(registry.store, 'recommendations', {'v': 2})
+
+    assert registry.refresh() == {}
+    assert registry['recommendations'] == {'v': 1}
+    with pytest.raises(ValueError):
+        registry.rollback('recommendations')
+
+
+@pytest.mark.unit
+def test_model_info_exposes_versions(client, registry, monkeypatch):
+    """Test that model info and rollback endpoints report registry versions"""
+    from serving import api
+
+    first = publish(registry.store, 'recommendations', {'v': 1})
+    registry.refresh()
+    monkeypatch.setattr(api, "model_registry", registry)
+
+    data = client.get("/api/v1/models/recommendations").json()
+    assert data["versions"]["active"] == first
+    assert data["versions"]["available"] == [first]
+
+    response = client.post("/api/v1/models/recommendations/rollback")
+    assert response.status_code == 409
+
+    second = publish(registry.store, 'recommendations', {'v': 2})
+    registry.refresh()
+    response = client.post("/api/v1/models/recommendations/rollback", json={"version": first})
+    assert response.status_code == 200
+    assert response.json()["versions"]["active"] == first
+    assert second in response.json()["versions"]["loaded"]
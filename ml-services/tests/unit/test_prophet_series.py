@@ -0,0 +1,99 @@
+"""
+Unit tests for per-series Prophet fitting and vectorized prediction
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from prophet import Prophet
+
+import models.demand_forecasting.prophet_series as prophet_series
+from models.demand_forecasting.prophet_series import ProphetSeries, prophet_kwargs, series_frame
+
+CONFIG = {'yearly_seasonality': False}
+
+
+def make_sales(n_series=2, days=120, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2024-01-01', periods=days)
+    frames = []
+    for i in range(n_series):
+        weekly = 1 + 0.3 * np.sin(np.arange(days) * 2 * np.pi / 7)
+        frames.append(pd.DataFrame({
+            'date': dates,
+            'product_id': f'PROD{i:03d}',
+            'customer_id': 'CUST001',
+            'sales_volume': rng.poisson((40 + 10 * i) * weekly).astype(float),
+            'price': rng.uniform(5, 20, days),
+            'has_promotion': rng.integers(0, 2, days),
+            'is_weekend': (dates.dayofweek >= 5).astype(int),
+            'is_holiday': 0
+        }))
+    return series_frame(pd.concat(frames, ignore_index=True))
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize('mode', ['multiplicative', 'additive'])
+def test_vectorized_predictions_match_prophet(mode):
+    """Test that predictions from stored parameters equal Prophet.predict yhat"""
+    df = make_sales()
+    train, future = df[df['date'] < '2024-04-01'], df[df['date'] >= '2024-04-01']
+    config = {**CONFIG, 'seasonality_mode': mode}
+
+    model = ProphetSeries.fit(train, config)
+    predicted = model.predict(future)
+
+    series = future['product_id'] == 'PROD001'
+    reference = Prophet(uncertainty_samples=0, **prophet_kwargs(config))
+    for name in prophet_series.REGRESSORS:
+        reference.add_regressor(name)
+    reference.fit(train[train['product_id'] == 'PROD001'].drop(columns=['product_id', 'customer_id'])
+                  .rename(columns={'date': 'ds', 'sales_volume': 'y'}))
+    expected = reference.predict(future[series].drop(columns=['product_id', 'customer_id'])
+                                 .rename(columns={'date': 'ds'}))['yhat']
+
+    np.testing.assert_allclose(predicted[series.to_numpy()], expected, rtol=1e-6)
+
+
+@pytest.mark.unit
+def test_forecast_horizon_and_serialization():
+    """Test that horizon forecasts cover every series at once and survive a JSON round trip"""
+    model = ProphetSeries.fit(make_sales(), CONFIG)
+    keys = [('PROD000', 'CUST001'), ('PROD001', 'CUST001'), ('UNKNOWN', 'CUST001')]
+    regressors = {'price': np.array([10.0, 12.0, 10.0]), 'has_promotion': 0, 'is_weekend': 0, 'is_holiday': 0}
+
+    forecast = model.forecast(keys, '2024-05-01', 14, regressors)
+    assert forecast.shape == (3, 14)
+    assert np.isfinite(forecast[:2]).all() and np.isnan(forecast[2]).all()
+    assert forecast[1].mean() > forecast[0].mean()
+
+    restored = ProphetSeries.from_dict(model.to_dict())
+    np.testing.assert_allclose(restored.forecast(keys, '2024-05-01', 14, regressors)[:2], forecast[:2])
+
+
+@pytest.mark.unit
+def test_parameter_cache_reuses_and_warm_starts(tmp_path, monkeypatch):
+    """Test that unchanged series come from the cache and changed ones warm-start"""
+    df = make_sales()
+    first = ProphetSeries.fit(df[df['date'] < '2024-04-01'], CONFIG, cache_dir=tmp_path)
+
+    calls = []
+    monkeypatch.setattr(prophet_series, 'fit_series', lambda history, config, init=None: calls.append(init) or init)
+
+    cached = ProphetSeries.fit(df[df['date'] < '2024-04-01'], CONFIG, cache_dir=tmp_path)
+    assert calls == []
+    assert cached.params == first.params
+
+    ProphetSeries.fit(df, CONFIG, cache_dir=tmp_path)
+    assert len(calls) == 2
+    assert all(init is not None for init in calls)
+
+
+@pytest.mark.unit
+def test_process_pool_fit_skips_short_series():
+    """Test that a worker pool fits every long-enough series"""
+    df = pd.concat([make_sales(n_series=16, days=60), make_sales(n_series=1, days=10).assign(product_id='SHORT')])
+
+    model = ProphetSeries.fit(df, CONFIG, n_jobs=2, min_history=30)
+    assert len(model.keys) == 16
+    assert ('SHORT', 'CUST001') not in model.params
+    assert np.isfinite(model.predict(df[df['product_id'] != 'SHORT'])).all()
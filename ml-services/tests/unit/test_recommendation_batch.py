@@ -0,0 +1,238 @@
+"""
+Unit tests for the columnar promotion, timing and price-point recommenders
+
+Each batch method is checked against a per-row reference of the loops it
+replaced, for several groups at once.
+"""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from models.recommendation.recommender import RecommendationEngine
+
+AS_OF = datetime(2025, 3, 12)
+
+
+def reference_promotions(promotions, top_n, as_of):
+    """Per-row promotion scoring as in the original loop"""
+    scored = []
+    for _, promo in promotions.iterrows():
+        roi_score = promo.get('roi', 0) / 100
+        days_since = (as_of - pd.to_datetime(promo['end_date'])).days
+        recency_score = np.exp(-days_since / 180)
+        success_score = 1 if promo.get('was_successful', False) else 0.5
+        scored.append({
+            'promotion_type': promo['promotion_type'],
+            'discount_percentage': promo['discount_percentage'],
+            'score': roi_score * 0.5 + recency_score * 0.3 + success_score * 0.2,
+            'historical_roi': promo.get('roi', 0),
+            'reason': f"Historical ROI: {promo.get('roi', 0):.0f}%, Last used: {promo['end_date'].strftime('%Y-%m-%d')}"
+        })
+    scored.sort(key=lambda x: x['score'], reverse=True)
+    return scored[:top_n]
+
+
+def reference_timing(engine, product_id, customer_id, sales_history, as_of):
+    """Per-week timing scoring as in the original loop"""
+    df = sales_history[(sales_history['product_id'] == product_id) & (sales_history['customer_id'] == customer_id)].copy()
+    df['week_of_year'] = pd.to_datetime(df['date']).dt.isocalendar().week
+    weekly_avg = df.groupby('week_of_year')['sales_volume'].mean().to_dict()
+    current_week = as_of.isocalendar()[1]
+    recommendations = []
+    for week in range(current_week + 1, min(current_week + 13, 53)):
+        base_sales = weekly_avg.get(week, df['sales_volume'].mean())
+        recommendations.append({
+            'week_number': week,
+            'week_start_date': engine._get_week_start_date(week, as_of.year),
+            'score': round(float(base_sales / df['sales_volume'].mean()), 3),
+            'expected_baseline_sales': round(float(base_sales), 0),
+            'reason': f"Historical average: {base_sales:.0f} units/week"
+        })
+    recommendations.sort(key=lambda x: x['score'], reverse=True)
+    return recommendations[:5]
+
+
+def reference_price_points(product_id, price_history):
+    """Per-price-point ranking as in the original loop"""
+    df = price_history[price_history['product_id'] == product_id]
+    performance = df.groupby('price').agg({'sales_volume': 'mean', 'sales_revenue': 'mean'}).reset_index()
+    performance['profit'] = performance['price'] * 0.3 * performance['sales_volume']
+    performance = performance.sort_values('profit', ascending=False, kind='stable')
+    return [
+        {
+            'price': round(float(row['price']), 2),
+            'expected_volume': round(float(row['sales_volume']), 0),
+            'expected_revenue': round(float(row['sales_revenue']), 2),
+            'expected_profit': round(float(row['profit']), 2),
+            'reason': 'Based on historical performance at this price point'
+        }
+        for _, row in performance.head(5).iterrows()
+    ]
+
+
+def assert_records_equal(got, expected):
+    assert len(got) == len(expected)
+    for got_row, expected_row in zip(got, expected):
+        assert set(got_row) == set(expected_row)
+        for key, value in expected_row.items():
+            if isinstance(value, float):
+                assert got_row[key] == pytest.approx(value)
+            else:
+                assert got_row[key] == value
+
+
+@pytest.fixture
+def engine(mlflow_tracking):
+    return RecommendationEngine({'experiment_name': 'recommendations-test'})
+
+
+@pytest.fixture
+def sales_history():
+    """Two years of daily sales for three product-customer pairs"""
+    rng = np.random.default_rng(0)
+    dates = pd.date_range('2023-01-01', '2024-12-31', freq='D')
+    pairs = [('prod-1', 'cust-1'), ('prod-1', 'cust-2'), ('prod-2', 'cust-1')]
+    frames = []
+    for i, (product_id, customer_id) in enumerate(pairs):
+        price = rng.choice([9.99, 10.49, 11.99, 12.49, 13.99, 14.99], len(dates))
+        volume = rng.poisson(50 + 10 * i, len(dates)).astype(float)
+        frames.append(pd.DataFrame({
+            'date': dates, 'product_id': product_id, 'customer_id': customer_id,
+            'price': price, 'sales_volume': volume, 'sales_revenue': price * volume
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+@pytest.mark.unit
+def test_promotions_batch_matches_per_row_scoring(engine):
+    """Test that grouped promotion ranking matches the per-row loop for every customer"""
+    rng = np.random.default_rng(1)
+    n = 60
+    promotions = pd.DataFrame({
+        'customer_id': np.repeat(['cust-1', 'cust-2', 'cust-3'], n // 3),
+        'promotion_type': rng.choice(['bogo', 'discount', 'bundle'], n),
+        'discount_percentage': rng.choice([10, 15, 20, 25], n),
+        'roi': rng.uniform(-20, 200, n).round(1),
+        'was_successful': rng.random(n) < 0.5,
+        'end_date': pd.Timestamp('2024-06-01') + pd.to_timedelta(rng.integers(0, 250, n), unit='D')
+    })
+
+    batch = engine.recommend_promotions_batch(promotions, top_n=4, group_by=['customer_id'], as_of=AS_OF)
+
+    assert list(batch['customer_id'].unique()) == ['cust-1', 'cust-2', 'cust-3']
+    for customer_id, group in batch.groupby('customer_id', sort=False):
+        assert list(group['rank']) == [1, 2, 3, 4]
+        expected = reference_promotions(promotions[promotions['customer_id'] == customer_id], 4, AS_OF)
+        assert_records_equal(group.drop(columns=['customer_id', 'rank']).to_dict('records'), expected)
+
+    overall = engine.recommend_promotions_batch(promotions, top_n=5, as_of=AS_OF)
+    assert_records_equal(overall.drop(columns='rank').to_dict('records'), reference_promotions(promotions, 5, AS_OF))
+
+
+@pytest.mark.unit
+def test_timing_batch_matches_per_pair_scoring(engine, sales_history):
+    """Test that batched timing for several pairs matches planning each pair on its own"""
+    pairs = [('prod-1', 'cust-1'), ('prod-2', 'cust-1'), ('prod-1', 'cust-2')]
+
+    batch = engine.recommend_timing_batch(pairs, sales_history, as_of=AS_OF)
+
+    assert len(batch) == 5 * len(pairs)
+    for product_id, customer_id in pairs:
+        group = batch[(batch['product_id'] == product_id) & (batch['customer_id'] == customer_id)]
+        assert list(group['rank']) == [1, 2, 3, 4, 5]
+        expected = reference_timing(engine, product_id, customer_id, sales_history, AS_OF)
+        got = group.drop(columns=['product_id', 'customer_id', 'rank']).to_dict('records')
+        assert_records_equal(got, expected)
+
+
+@pytest.mark.unit
+def test_price_points_batch_matches_per_product_ranking(engine, sales_history):
+    """Test that grouped price points match ranking each product separately"""
+    batch = engine.recommend_price_points_batch(['prod-1', 'prod-2'], sales_history)
+
+    for product_id in ['prod-1', 'prod-2']:
+        group = batch[batch['product_id'] == product_id]
+        assert list(group['rank']) == [1, 2, 3, 4, 5]
+        got = group.drop(columns=['product_id', 'rank']).to_dict('records')
+        assert_records_equal(got, reference_price_points(product_id, sales_history))
+    assert engine.recommend_price_points('prod-2', sales_history) == batch[batch['product_id'] == 'prod-2'].drop(columns=['product_id', 'rank']).to_dict('records')
+
+
+@pytest.mark.unit
+def test_top_n_keeps_input_order_for_ties():
+    """Test that tied scores keep their input order, within groups and globally"""
+    df = pd.DataFrame({
+        'group': ['a', 'b', 'a', 'a', 'b', 'a', 'b'],
+        'item': ['a1', 'b1', 'a2', 'a3', 'b2', 'a4', 'b3'],
+        'score': [1.0, 2.0, 3.0, 1.0, 2.0, 1.0, 2.0]
+    })
+
+    top = RecommendationEngine._top_n(df, 'score', 3, ['group'])
+    assert list(top['item']) == ['a2', 'a1', 'a3', 'b1', 'b2', 'b3']
+    assert list(top['rank']) == [1, 2, 3, 1, 2, 3]
+
+    top = RecommendationEngine._top_n(df, 'score', 4)
+    assert list(top['item']) == ['a2', 'b1', 'b2', 'b3']
+    assert list(top['rank']) == [1, 2, 3, 4]
+
+
+@pytest.fixture
+def interactions():
+    """Small interaction log with ratings and counts"""
+    rng = np.random.default_rng(0)
+    n = 400
+    return pd.DataFrame({
+        'user_id': [f"cust-{u:03d}" for u in rng.integers(0, 40, n)],
+        'item_id': [f"prod-{i:03d}" for i in rng.integers(0, 25, n)],
+        'rating': rng.integers(1, 6, n).astype(float),
+        'interactions': rng.integers(1, 30, n)
+    }).drop_duplicates(['user_id', 'item_id'])
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize('algorithm', ['svd', 'als'])
+def test_recommend_items_batch_matches_per_user(interactions, algorithm, mlflow_tracking):
+    """Test that block-scored recommendations match scoring each user on their own"""
+    engine = RecommendationEngine({'algorithm': algorithm, 'n_factors': 8, 'n_epochs': 5, 'n_iterations': 3})
+    engine.cf_model.train(interactions)
+
+    users = ['cust-001', 'cust-unknown', 'cust-017', 'cust-001']
+    candidates = sorted(interactions['item_id'].unique()) + ['prod-unknown']
+    batch = engine.cf_model.recommend_items_batch(users, candidates, top_n=6)
+
+    assert len(batch) == len(users)
+    for user_id, recs in zip(users, batch):
+        assert len(recs) == 6
+        expected = [(item_id, engine.cf_model.predict(user_id, item_id)) for item_id in candidates]
+        expected.sort(key=lambda x: x[1], reverse=True)
+        assert [item_id for item_id, _ in recs] == [item_id for item_id, _ in expected[:6]]
+        np.testing.assert_allclose([score for _, score in recs], [score for _, score in expected[:6]], rtol=1e-5)
+        single = engine.cf_model.recommend_items(user_id, candidates, top_n=6)
+        assert [item_id for item_id, _ in single] == [item_id for item_id, _ in recs]
+
+
+@pytest.mark.unit
+def test_recommend_products_batch_matches_per_customer(interactions, mlflow_tracking):
+    """Test that batched product recommendations match per-customer calls, with context boosts"""
+    engine = RecommendationEngine({'n_factors': 8, 'n_epochs': 5})
+    engine.cf_model.train(interactions)
+    products = pd.DataFrame({
+        'product_id': sorted(interactions['item_id'].unique()),
+        'name': [f"Product {i}" for i in range(interactions['item_id'].nunique())],
+        'category': ['cold_drink', 'snack'] * 12 + ['snack']
+    })
+
+    customers = ['cust-003', 'cust-011', 'cust-unknown']
+    contexts = [{'season': 'summer'}, {'current_promotions': ['prod-004', 'prod-010']}, {}]
+    batch = engine.recommend_products_batch(customers, contexts, top_n=5, all_products=products)
+
+    for customer_id, context, recommendations in zip(customers, contexts, batch):
+        assert recommendations == engine.recommend_products(customer_id, context, top_n=5, all_products=products)
+        assert [r['score'] for r in recommendations] == sorted((r['score'] for r in recommendations), reverse=True)
+        assert all(r['product_name'].startswith('Product') for r in recommendations)
+
+    default = engine.recommend_products_batch(customers[:1], contexts[:1], top_n=3)[0]
+    assert len(default) == 3
+    assert all(r['product_name'] == r['product_id'] for r in default)
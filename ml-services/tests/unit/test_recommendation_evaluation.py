@@ -0,0 +1,41 @@
+"""
+Unit tests for the ranking-metric evaluator
+"""
+import pytest
+import numpy as np
+import scipy.sparse as sp
+
+from models.recommendation.evaluation import RankingEvaluator
+
+
+@pytest.fixture
+def scores():
+    """Fixed scores: item 0 ranked first, item 4 last, for every user"""
+    return np.tile(np.array([5.0, 4.0, 3.0, 2.0, 1.0], dtype=np.float32), (3, 1))
+
+
+@pytest.mark.unit
+def test_evaluator_metrics_hand_computed(scores):
+    """Test metrics against hand-computed values"""
+    # user 0: relevant {0, 2}; user 1: relevant {4}; user 2: no held-out items
+    test = sp.csr_matrix(np.array([[1, 0, 1, 0, 0], [0, 0, 0, 0, 1], [0, 0, 0, 0, 0]]))
+    metrics = RankingEvaluator(k=2).evaluate(lambda users: scores[users], test)
+
+    assert metrics['users_evaluated'] == 2
+    assert metrics['precision_at_2'] == pytest.approx((1 / 2 + 0) / 2)
+    assert metrics['recall_at_2'] == pytest.approx((1 / 2 + 0) / 2)
+    assert metrics['ndcg_at_2'] == pytest.approx((1 / (1 + 1 / np.log2(3)) + 0) / 2)
+    assert metrics['map_at_2'] == pytest.approx((1 / 2 + 0) / 2)
+    assert metrics['coverage'] == pytest.approx(2 / 5)
+
+
+@pytest.mark.unit
+def test_evaluator_excludes_training_items(scores):
+    """Test that items seen in training are never recommended"""
+    test = sp.csr_matrix(np.array([[0, 0, 1, 0, 0], [0, 0, 1, 0, 0], [0, 0, 0, 0, 0]]))
+    train = sp.csr_matrix(np.array([[1, 1, 0, 0, 0], [1, 1, 0, 0, 0], [0, 0, 0, 0, 0]]))
+    metrics = RankingEvaluator(k=1, block_size=1).evaluate(lambda users: scores[users], test, exclude=train)
+
+    assert metrics['precision_at_1'] == pytest.approx(1.0)
+    assert metrics['recall_at_1'] == pytest.approx(1.0)
+    assert metrics['evaluation_time_s'] >= metrics['scoring_time_s'] >= 0
@@ -0,0 +1,103 @@
+"""
+Unit tests for single-flight request coalescing
+"""
+import asyncio
+import pytest
+
+from serving.cache import TTLCache
+from serving.coalescing import SingleFlight, request_key
+
+
+@pytest.mark.unit
+def test_concurrent_identical_requests_share_one_call():
+    """Test that concurrent callers with the same key await a single computation"""
+    flight = SingleFlight()
+    calls = []
+
+    async def compute(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return {'value': value}
+
+    async def main():
+        same = [flight.do('a', lambda: compute(1)) for _ in range(50)]
+        other = flight.do('b', lambda: compute(2))
+        return await asyncio.gather(*same, other)
+
+    results = asyncio.run(main())
+
+    assert calls == [1, 2]
+    assert all(result is results[0] for result in results[:50])
+    assert results[50] == {'value': 2}
+    assert flight.coalesced == 49
+    assert len(flight) == 0
+
+
+@pytest.mark.unit
+def test_errors_are_shared_but_not_cached():
+    """Test that a failed computation fails every waiter and the next request retries"""
+    flight = SingleFlight(TTLCache(ttl=60))
+    attempts = []
+
+    async def compute():
+        attempts.append(1)
+        await asyncio.sleep(0.01)
+        if len(attempts) == 1:
+            raise RuntimeError("model call failed")
+        return 'ok'
+
+    async def main():
+        first = await asyncio.gather(*[flight.do('k', compute) for _ in range(5)], return_exceptions=True)
+        second = await flight.do('k', compute)
+        return first, second
+
+    first, second = asyncio.run(main())
+
+    assert all(isinstance(result, RuntimeError) for result in first)
+    assert second == 'ok'
+    assert len(attempts) == 2
+
+
+@pytest.mark.unit
+def test_herd_after_cache_expiry_costs_one_call():
+    """Test that cache misses are coalesced and a cancelled caller does not cancel the others"""
+    cache = TTLCache(ttl=0.05)
+    flight = SingleFlight(cache)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return len(calls)
+
+    async def main():
+        assert await flight.do('k', compute) == 1
+        assert await flight.do('k', compute) == 1
+        await asyncio.sleep(0.06)
+
+        leader = asyncio.ensure_future(flight.do('k', compute))
+        await asyncio.sleep(0)
+        herd = [asyncio.ensure_future(flight.do('k', compute)) for _ in range(20)]
+        leader.cancel()
+        return await asyncio.gather(*herd)
+
+    results = asyncio.run(main())
+
+    assert results == [2] * 20
+    assert len(calls) == 2
+    assert cache.hits == 1
+
+
+@pytest.mark.unit
+def test_request_key_normalizes_payloads(client, sample_forecast_request):
+    """Test that keys ignore field order and include the model version"""
+    reordered = dict(reversed(list(sample_forecast_request.items())))
+
+    assert request_key('demand_forecasting', 'v1', sample_forecast_request) == \
+        request_key('demand_forecasting', 'v1', reordered)
+    assert request_key('demand_forecasting', 'v1', sample_forecast_request) != \
+        request_key('demand_forecasting', 'v2', sample_forecast_request)
+
+    first = client.post("/api/v1/forecast/demand", json=sample_forecast_request).json()
+    second = client.post("/api/v1/forecast/demand", json=reordered).json()
+    assert first["forecast"] == second["forecast"]
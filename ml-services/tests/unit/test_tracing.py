@@ -0,0 +1,99 @@
+"""
+Unit tests for opt-in tracing spans
+"""
+import logging
+import os
+import numpy as np
+import pytest
+
+from models.common.tracing import TRACE_ENV, current_span, span, trace, traced
+
+
+class Pipeline:
+    """Toy model with nested traced stages"""
+
+    @traced()
+    def create_features(self, n):
+        with span('allocate', rows=n):
+            features = np.ones((n, 128))
+        return features.sum()
+
+    @traced()
+    def predict(self, n):
+        return self.create_features(n) * 2
+
+
+@pytest.mark.unit
+def test_spans_nest_with_timing_and_peak_memory():
+    """Test that traced calls form a span tree with peak-memory deltas"""
+    with trace('request', log=False) as root:
+        Pipeline().predict(20000)
+
+    data = root.to_dict()
+    predict = data['children'][0]
+    assert predict['name'] == 'Pipeline.predict'
+    features = predict['children'][0]
+    assert features['name'] == 'Pipeline.create_features'
+    allocate = features['children'][0]
+    assert allocate['attributes'] == {'rows': 20000}
+
+    # 20000 x 128 float64 = 20.48 MB, seen by every enclosing span
+    assert allocate['peak_mem_mb'] >= 20
+    assert predict['peak_mem_mb'] >= allocate['peak_mem_mb']
+    assert data['peak_mem_mb'] >= predict['peak_mem_mb']
+    assert data['duration_ms'] >= predict['duration_ms'] >= features['duration_ms']
+
+
+@pytest.mark.unit
+def test_tracing_is_off_unless_enabled(monkeypatch, caplog):
+    """Test that traced methods record nothing by default and log a breakdown with TRADEAI_TRACE"""
+    monkeypatch.delenv(TRACE_ENV, raising=False)
+    with span('ignored') as ignored:
+        assert ignored is None
+    assert Pipeline().predict(10) == 2560
+    assert current_span() is None
+
+    monkeypatch.setenv(TRACE_ENV, '1')
+    with caplog.at_level(logging.INFO, logger='models.common.tracing'):
+        Pipeline().predict(10)
+
+    breakdown = [record.message for record in caplog.records if 'Trace breakdown' in record.message]
+    assert len(breakdown) == 1
+    assert 'Pipeline.predict' in breakdown[0]
+    assert '  Pipeline.create_features' in breakdown[0]
+
+
+@pytest.mark.unit
+def test_trace_header_adds_debug_breakdown(client, sample_forecast_request, monkeypatch):
+    """Test that X-TRADEAI-Trace returns the span breakdown in the response debug field"""
+    monkeypatch.delenv(TRACE_ENV, raising=False)
+
+    data = client.post("/api/v1/forecast/demand", json=sample_forecast_request).json()
+    assert data["debug"] is None
+
+    response = client.post(
+        "/api/v1/forecast/demand", json=sample_forecast_request, headers={"X-TRADEAI-Trace": "1"}
+    )
+    debug = response.json()["debug"]
+    assert debug["name"] == "POST /api/v1/forecast/demand"
+    assert debug["children"][0]["name"] == "demand_forecasting.predict"
+    assert "peak_mem_mb" in debug["children"][0]
+
+
+@pytest.mark.unit
+def test_rss_spans_report_per_stage_peaks():
+    """Test that rss tracing reports each stage's own peak resident memory"""
+    if not os.path.exists('/proc/self/clear_refs'):
+        pytest.skip("peak RSS cannot be reset on this platform")
+
+    with trace('train', memory=False, log=False, rss=True) as root:
+        with span('large'):
+            block = np.ones((200, 1024 * 1024 // 8))  # 200 MB, touched
+            del block
+        with span('small'):
+            np.ones(1024).sum()
+
+    large, small = root.children
+    assert large.peak_rss_mb - small.peak_rss_mb >= 150
+    assert root.peak_rss_mb >= large.peak_rss_mb
+    assert 'peak_rss_mb' in root.to_dict()['children'][1]
@@ -0,0 +1,160 @@
+"""
+Unit tests for canary/shadow traffic routing
+"""
+import threading
+import time
+import pytest
+
+from models.common.artifacts import ArtifactStore
+from serving.registry import ModelRegistry
+from serving.routing import LatencyHistogram, TrafficRouter
+
+
+def publish(store, model_type, value):
+    """Publish a trivial artifact version holding a JSON value"""
+    with store.create(model_type) as artifact:
+        artifact.save_json('model', value)
+    return artifact.version
+
+
+@pytest.fixture
+def registry(tmp_path):
+    """Registry with one active and one published-but-inactive version"""
+    store = ArtifactStore(tmp_path)
+    registry = ModelRegistry(
+        store,
+        loaders={'demand_forecasting': lambda artifact: artifact.load_json('model')},
+        model_types=['demand_forecasting']
+    )
+    registry.active = publish(store, 'demand_forecasting', {'v': 1, 'scale': 1.0})
+    registry.refresh()
+    registry.candidate = publish(store, 'demand_forecasting', {'v': 2, 'scale': 1.1})
+    return registry
+
+
+@pytest.mark.unit
+def test_canary_share_is_sticky_per_key(registry):
+    """Test that about canary_pct of keys hit the candidate, always the same keys"""
+    router = TrafficRouter(registry)
+    router.set_candidate('demand_forecasting', registry.candidate, canary_pct=10)
+
+    served = {key: router.call('demand_forecasting', lambda model: model['v'], key=key)[0] for key in range(5000)}
+    share = sum(v == 2 for v in served.values()) / len(served)
+    assert 0.08 < share < 0.12
+
+    for key in range(200):
+        assert router.call('demand_forecasting', lambda model: model['v'], key=key)[0] == served[key]
+
+    stats = router.stats('demand_forecasting')
+    assert stats['candidate'] == registry.candidate
+    assert stats['latency'][registry.candidate]['count'] + stats['latency'][registry.active]['count'] == 5200
+
+    with pytest.raises(ValueError):
+        router.set_candidate('demand_forecasting', registry.active)
+
+
+@pytest.mark.unit
+def test_shadow_scoring_records_deltas_off_the_request_path(registry):
+    """Test that shadow predictions are compared in the background without delaying responses"""
+    router = TrafficRouter(registry, max_shadow_pending=4)
+    router.set_candidate('demand_forecasting', registry.candidate, canary_pct=0, shadow_pct=100)
+    release = threading.Event()
+
+    def predict(model):
+        if model['v'] == 2:
+            release.wait(5)
+        return [100.0 * model['scale']] * 3
+
+    start = time.perf_counter()
+    for key in range(10):
+        result, version = router.call('demand_forecasting', predict, key=key, values=lambda r: r)
+        assert version == registry.active
+    assert time.perf_counter() - start < 1.0
+
+    release.set()
+    deadline = time.time() + 5
+    while router.routes['demand_forecasting'].shadow_scored < 4 and time.time() < deadline:
+        time.sleep(0.01)
+
+    shadow = router.stats('demand_forecasting')['shadow']
+    assert shadow['scored'] == 4
+    assert shadow['dropped'] == 6
+    assert shadow['delta']['count'] == 12
+    assert shadow['delta']['mean_abs'] == pytest.approx(10.0)
+    assert shadow['delta']['mean_rel'] == pytest.approx(0.1)
+
+
+@pytest.mark.unit
+def test_new_versions_are_staged_then_promoted(registry):
+    """Test that with canary staging a published version waits for promotion"""
+    router = TrafficRouter(registry, canary_pct=10)
+    registry.on_new_version = router.stage
+
+    third = publish(registry.store, 'demand_forecasting', {'v': 3, 'scale': 1.0})
+    registry.refresh()
+    assert registry.active_version('demand_forecasting') == registry.active
+    assert router.stats('demand_forecasting')['candidate'] == third
+    assert router.stats('demand_forecasting')['canary_pct'] == 10
+
+    assert router.promote('demand_forecasting') == third
+    assert registry['demand_forecasting']['v'] == 3
+    assert router.stats('demand_forecasting')['candidate'] is None
+    with pytest.raises(ValueError):
+        router.promote('demand_forecasting')
+
+    histogram = LatencyHistogram()
+    for seconds in (0.001, 0.002, 0.003, 0.2):
+        histogram.observe(seconds)
+    assert histogram.quantile(0.5) <= 0.005
+    assert 0.1 < histogram.quantile(0.99) <= 0.25
+
+
+@pytest.mark.unit
+def test_traffic_endpoints_route_forecasts(client, registry, monkeypatch, sample_forecast_request):
+    """Test that the traffic endpoints send forecasts to the candidate and report latency"""
+    from serving import api
+
+    monkeypatch.setattr(api, "model_registry", registry)
+    monkeypatch.setattr(api, "traffic_router", TrafficRouter(registry))
+
+    response = client.post(
+        "/api/v1/models/demand_forecasting/traffic",
+        json={"version": registry.candidate, "canary_pct": 100}
+    )
+    assert response.status_code == 200
+    assert response.json()["candidate"] == registry.candidate
+
+    # The fixture models are not trained forecasters, so the routed call serves the mock
+    data = client.post("/api/v1/forecast/demand", json=sample_forecast_request).json()
+    assert data["model_version"] == "v1.2.3-mock"
+
+    traffic = client.get("/api/v1/models/demand_forecasting/traffic").json()
+    assert traffic["latency"][registry.candidate]["count"] == 1
+
+    response = client.post("/api/v1/models/demand_forecasting/traffic", json={"version": "missing"})
+    assert response.status_code == 404
+
+    response = client.post("/api/v1/models/demand_forecasting/promote")
+    assert response.status_code == 200
+    assert response.json()["versions"]["active"] == registry.candidate
+    assert client.post("/api/v1/models/demand_forecasting/promote").status_code == 409
+
+
+@pytest.mark.unit
+def test_traffic_shares_default_to_config():
+    """Test that canary shares come from the deployment environment, then A/B testing, else 0"""
+    import yaml
+    from pathlib import Path
+    from serving.routing import config_traffic_pct
+
+    with open(Path(__file__).resolve().parents[2] / 'config.yaml') as f:
+        config = yaml.safe_load(f)
+    assert config_traffic_pct(config) == (10.0, 0.0)
+
+    config['deployment']['production']['canary_deployment'] = False
+    assert config_traffic_pct(config) == (50.0, 0.0)
+
+    config['ab_testing']['enabled'] = False
+    assert config_traffic_pct(config) == (0.0, 0.0)
+    assert config_traffic_pct({'environment': 'staging', **config}) == (0.0, 0.0)
+    assert config_traffic_pct({}) == (0.0, 0.0)
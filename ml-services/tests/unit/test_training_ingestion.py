@@ -0,0 +1,75 @@
+"""
+Unit tests for streaming JSON ingestion and the Parquet cache
+"""
+import json
+import pandas as pd
+import pytest
+
+from training import ingestion
+from training.ingestion import iter_json_array, load_records, read_json_records
+
+
+def sales_records(n):
+    return [
+        {
+            '_id': {'date': f'2024-01-{i % 28 + 1:02d}', 'product': f'prod-{i % 3:03d}', 'customer': f'cust-{i % 2:03d}'},
+            'quantity': i,
+            'avg_price': 10.0 + i,
+            'has_promotion': i % 2 == 0
+        }
+        for i in range(n)
+    ]
+
+
+@pytest.mark.unit
+def test_iter_json_array_matches_json_load(tmp_path):
+    """Test that streaming with tiny chunks yields the same elements as json.load"""
+    records = sales_records(20) + [{'name': 'tricky ], [ {"quoted"} é', 'value': 1e-3}, 12345, None]
+    path = tmp_path / 'records.json'
+    path.write_text(json.dumps(records, indent=2))
+
+    assert list(iter_json_array(path, chunk_size=7)) == records
+
+    (tmp_path / 'empty.json').write_text(' [ ] ')
+    assert list(iter_json_array(tmp_path / 'empty.json')) == []
+
+    (tmp_path / 'object.json').write_text('{"a": 1}')
+    with pytest.raises(ValueError):
+        list(iter_json_array(tmp_path / 'object.json'))
+
+
+@pytest.mark.unit
+def test_read_json_records_flattens_and_types_columns(tmp_path):
+    """Test that _id fields become typed columns and categories survive batching"""
+    path = tmp_path / 'sales_history.json'
+    path.write_text(json.dumps(sales_records(25)))
+
+    df = read_json_records(path, batch_size=10)
+
+    assert len(df) == 25
+    assert {'_id.date', '_id.product', '_id.customer'} <= set(df.columns)
+    assert isinstance(df['_id.product'].dtype, pd.CategoricalDtype)
+    assert isinstance(df['_id.customer'].dtype, pd.CategoricalDtype)
+    assert pd.api.types.is_datetime64_any_dtype(df['_id.date'])
+    assert df['quantity'].tolist() == list(range(25))
+    assert df['_id.product'].iloc[4] == 'prod-001'
+
+
+@pytest.mark.unit
+def test_load_records_reuses_parquet_cache(tmp_path, monkeypatch):
+    """Test that the cache is reused while the source is unchanged and rebuilt after it changes"""
+    path = tmp_path / 'sales_history.json'
+    path.write_text(json.dumps(sales_records(12)))
+
+    first = load_records(path)
+    assert (tmp_path / '.cache' / 'sales_history.parquet').exists()
+
+    parse = ingestion.read_json_records
+    monkeypatch.setattr(ingestion, 'read_json_records', lambda *args: pytest.fail("cache not used"))
+    cached = load_records(path)
+    pd.testing.assert_frame_equal(first, cached)
+    assert isinstance(cached['_id.product'].dtype, pd.CategoricalDtype)
+
+    monkeypatch.setattr(ingestion, 'read_json_records', parse)
+    path.write_text(json.dumps(sales_records(5)))
+    assert len(load_records(path)) == 5
@@ -0,0 +1,88 @@
+"""
+Unit tests for the training orchestrator
+"""
+import json
+import time
+from pathlib import Path
+import pytest
+
+from training.orchestrator import Orchestrator, Task
+
+
+def load_numbers(n):
+    return list(range(n))
+
+
+def total(numbers, delay=0.0):
+    time.sleep(delay)
+    return sum(numbers)
+
+
+def fail_once(marker):
+    marker = Path(marker)
+    if not marker.exists():
+        marker.touch()
+        raise RuntimeError("transient failure")
+    return 'ok'
+
+
+def sleep_forever():
+    time.sleep(60)
+
+
+@pytest.mark.unit
+def test_independent_tasks_run_in_parallel(tmp_path):
+    """Test that dep results are passed on and independent fits overlap"""
+    tasks = [
+        Task('load', load_numbers, kwargs={'n': 5}, in_process=True),
+        Task('fit_a', total, deps=['load'], kwargs={'delay': 1.0}),
+        Task('fit_b', total, deps=['load'], kwargs={'delay': 1.0}),
+    ]
+    orchestrator = Orchestrator(tasks, max_cpus=2)
+    runs = orchestrator.run()
+
+    assert runs['fit_a'].result == 10 and runs['fit_b'].result == 10
+    manifest = json.loads(orchestrator.write_manifest(tmp_path / 'manifest.json').read_text())
+    assert manifest['succeeded']
+    assert manifest['wall_seconds'] < manifest['serial_seconds']
+    assert manifest['tasks']['fit_a']['result'] == 10
+    assert manifest['tasks']['fit_a']['attempts'][0]['status'] == 'succeeded'
+
+
+@pytest.mark.unit
+def test_failed_attempts_are_retried(tmp_path):
+    """Test that a failed attempt is retried and recorded in the manifest"""
+    tasks = [Task('flaky', fail_once, kwargs={'marker': str(tmp_path / 'marker')}, retries=1, retry_delay=0.1)]
+    orchestrator = Orchestrator(tasks, max_cpus=1)
+    runs = orchestrator.run()
+
+    assert runs['flaky'].status == 'succeeded'
+    assert [attempt['status'] for attempt in runs['flaky'].attempts] == ['failed', 'succeeded']
+    assert 'transient failure' in runs['flaky'].attempts[0]['error']
+
+
+@pytest.mark.unit
+def test_timeout_kills_task_and_skips_dependents():
+    """Test that a task over its timeout is killed and tasks depending on it are skipped"""
+    tasks = [
+        Task('hang', sleep_forever, timeout=1.0),
+        Task('after', total, deps=['hang']),
+        Task('other', load_numbers, kwargs={'n': 3}),
+    ]
+    start = time.perf_counter()
+    runs = Orchestrator(tasks, max_cpus=2).run()
+
+    assert time.perf_counter() - start < 20
+    assert runs['hang'].status == 'failed' and 'timed out' in runs['hang'].error
+    assert runs['after'].status == 'skipped'
+    assert runs['other'].result == [0, 1, 2]
+
+
+@pytest.mark.unit
+def test_invalid_graphs_are_rejected():
+    """Test that unknown dependencies and cycles raise ValueError"""
+    with pytest.raises(ValueError, match='unknown'):
+        Orchestrator([Task('fit', total, deps=['load'])])
+
+    with pytest.raises(ValueError, match='cycle'):
+        Orchestrator([Task('a', total, deps=['b']), Task('b', total, deps=['a'])])
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+TRADEAI Recommender Benchmark
+Compare collaborative filtering backends on training time and recall@10
+
+Usage:
+    python benchmark_recommenders.py --data-dir ../data
+    python benchmark_recommenders.py --synthetic-users 50000 --synthetic-items 20000 --synthetic-interactions 2000000
+"""
+
+import sys
+import os
+import argparse
+import json
+import time
+import logging
+from pathlib import Path
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+from models.recommendation.evaluation import RankingEvaluator, index_interactions
+
+
+def load_interactions(args) -> pd.DataFrame:
+    """Load real interactions or generate a synthetic long-tail dataset"""
+    if args.synthetic_interactions:
+        rng = np.random.default_rng(args.seed)
+        n = args.synthetic_interactions
+        counts = rng.geometric(0.2, n)
+        df = pd.DataFrame({
+            'user_id': rng.integers(0, args.synthetic_users, n),
+            'item_id': rng.zipf(1.3, n) % args.synthetic_items,
+            'interactions': counts,
+            'rating': np.clip(1 + np.log2(counts), 1, 5)
+        })
+        return df.drop_duplicates(['user_id', 'item_id'])
+
+    interactions_file = Path(args.data_dir) / 'customer_interactions.json'
+    logger.info(f"Loading interactions from {interactions_file}")
+    with open(interactions_file, 'r') as f:
+        return pd.DataFrame(json.load(f))
+
+
+def split_interactions(df: pd.DataFrame, test_fraction: float, seed: int):
+    """Random hold-out split keeping only users/items seen in training"""
+    rng = np.random.default_rng(seed)
+    is_test = rng.random(len(df)) < test_fraction
+    train, test = df[~is_test], df[is_test]
+    test = test[test['user_id'].isin(train['user_id']) & test['item_id'].isin(train['item_id'])]
+    return train, test
+
+
+def ranking_metrics(score_block, train: sp.csr_matrix, test: sp.csr_matrix) -> dict:
+    """Top-10 ranking metrics on held-out items, excluding training items"""
+    metrics = RankingEvaluator(k=10).evaluate(score_block, test, exclude=train)
+    return {
+        'recall_at_10': round(metrics['recall_at_10'], 4),
+        'ndcg_at_10': round(metrics['ndcg_at_10'], 4),
+        'evaluation_time_s': round(metrics['evaluation_time_s'], 3)
+    }
+
+
+def benchmark_als(train_df, train_csr, test_csr, user_ids, item_ids, args) -> dict:
+    """Train implicit ALS and score it"""
+    from models.recommendation.als import ImplicitALSModel
+
+    model = ImplicitALSModel(n_factors=args.n_factors, n_iterations=args.als_iterations)
+    start = time.perf_counter()
+    model.train(train_df)
+    training_time = time.perf_counter() - start
+
+    # Align model factors to the shared index space
+    U = model.user_factors[[model.user_index[u] for u in user_ids]]
+    V = model.item_factors[[model.item_index[i] for i in item_ids]]
+
+    return {
+        'training_time_s': round(training_time, 3),
+        **ranking_metrics(lambda b: U[b] @ V.T, train_csr, test_csr)
+    }
+
+
+def benchmark_svd(train_df, train_csr, test_csr, user_ids, item_ids, args) -> dict:
+    """Train surprise SVD and score it"""
+    from models.recommendation.recommender import CollaborativeFilteringModel
+    from surprise import Dataset
+
+    cf = CollaborativeFilteringModel(n_factors=args.n_factors, n_epochs=args.svd_epochs)
+    trainset = Dataset.load_from_df(train_df[['user_id', 'item_id', 'rating']], cf.reader).build_full_trainset()
+
+    # Time the SGD fit alone, excluding dataset construction
+    start = time.perf_counter()
+    cf.model.fit(trainset)
+    training_time = time.perf_counter() - start
+
+    svd = cf.model
+    u_inner = np.array([trainset.to_inner_uid(u) for u in user_ids])
+    i_inner = np.array([trainset.to_inner_iid(i) for i in item_ids])
+    pu, bu = svd.pu[u_inner], svd.bu[u_inner]
+    qi, bi = svd.qi[i_inner], svd.bi[i_inner]
+    mu = trainset.global_mean
+
+    def score_block(block):
+        return mu + bu[block, None] + bi[None, :] + pu[block] @ qi.T
+
+    return {
+        'training_time_s': round(training_time, 3),
+        **ranking_metrics(score_block, train_csr, test_csr)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark TRADEAI collaborative filtering backends")
+    parser.add_argument('--data-dir', type=str, default='../data', help='Directory containing customer_interactions.json')
+    parser.add_argument('--synthetic-users', type=int, default=50000)
+    parser.add_argument('--synthetic-items', type=int, default=20000)
+    parser.add_argument('--synthetic-interactions', type=int, default=0, help='Generate this many synthetic interactions instead of loading data')
+    parser.add_argument('--test-fraction', type=float, default=0.2)
+    parser.add_argument('--n-factors', type=int, default=64)
+    parser.add_argument('--als-iterations', type=int, default=15)
+    parser.add_argument('--svd-epochs', type=int, default=20)
+    parser.add_argument('--algorithms', type=str, nargs='+', default=['svd', 'als'], choices=['svd', 'als'])
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', type=str, default=None, help='Write results JSON to this file')
+
+    args = parser.parse_args()
+
+    df = load_interactions(args)
+    train_df, test_df = split_interactions(df, args.test_fraction, args.seed)
+    logger.info(f"Train interactions: {len(train_df)}, held-out: {len(test_df)}")
+
+    user_ids = train_df['user_id'].unique()
+    item_ids = train_df['item_id'].unique()
+    user_index = {u: i for i, u in enumerate(user_ids)}
+    item_index = {it: i for i, it in enumerate(item_ids)}
+    train_csr = index_interactions(train_df, user_index, item_index)
+    test_csr = index_interactions(test_df, user_index, item_index)
+
+    runners = {'svd': benchmark_svd, 'als': benchmark_als}
+    results = {
+        'timestamp': datetime.now().isoformat(),
+        'n_users': len(user_ids),
+        'n_items': len(item_ids),
+        'n_train_interactions': len(train_df),
+        'n_test_interactions': len(test_df),
+        'algorithms': {}
+    }
+
+    for algorithm in args.algorithms:
+        logger.info(f"Benchmarking {algorithm}...")
+        try:
+            results['algorithms'][algorithm] = runners[algorithm](train_df, train_csr, test_csr, user_ids, item_ids, args)
+        except ImportError as e:
+            logger.error(f"❌ {algorithm} benchmark skipped: {e}")
+            results['algorithms'][algorithm] = None
+            continue
+        logger.info(f"   {algorithm}: {results['algorithms'][algorithm]}")
+
+    print(json.dumps(results, indent=2))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        logger.info(f"Results saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+TRADEAI Recommendation Evaluation Job
+Cross-validate the recommendation engine on demand, outside the daily training run
+
+Usage:
+    python evaluate_recommender.py --data-dir ../data --output-dir ./trained_models
+    python evaluate_recommender.py --algorithm als --folds 3
+"""
+
+import sys
+import os
+import argparse
+import json
+import logging
+from pathlib import Path
+from datetime import datetime
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cross-validate the TRADEAI recommendation engine")
+    parser.add_argument(
+        '--data-dir',
+        type=str,
+        default='../data',
+        help='Directory containing customer_interactions.json'
+    )
+    parser.add_argument(
+        '--output-dir',
+        type=str,
+        default='./trained_models',
+        help='Directory to write evaluation results'
+    )
+    parser.add_argument(
+        '--algorithm',
+        type=str,
+        default='svd',
+        choices=['svd', 'als'],
+        help='Collaborative filtering backend'
+    )
+    parser.add_argument('--folds', type=int, default=5, help='Number of cross-validation folds')
+
+    args = parser.parse_args()
+
+    from models.recommendation.recommender import RecommendationEngine
+    import pandas as pd
+
+    data_path = Path(args.data_dir)
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    interactions_file = data_path / 'customer_interactions.json'
+    logger.info(f"Loading interactions from {interactions_file}")
+
+    with open(interactions_file, 'r') as f:
+        interactions_df = pd.DataFrame(json.load(f))
+
+    logger.info(f"Loaded {len(interactions_df)} customer-product interactions")
+
+    config = {
+        'experiment_name': 'recommendations-evaluation',
+        'algorithm': args.algorithm,
+        'n_factors': 100,
+        'n_epochs': 20
+    }
+
+    recommender = RecommendationEngine(config)
+    metrics = recommender.cross_validate(interactions_df, cv=args.folds)
+
+    logger.info("✅ Evaluation complete!")
+    for name, value in metrics.items():
+        logger.info(f"   {name}: {value:.4f}")
+
+    results = {
+        'timestamp': datetime.now().isoformat(),
+        'algorithm': args.algorithm,
+        'folds': args.folds,
+        'interactions_count': len(interactions_df),
+        'metrics': metrics
+    }
+
+    results_file = output_dir / 'recommender_evaluation.json'
+    with open(results_file, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    logger.info(f"Results saved to: {results_file}")
+
+
+if __name__ == "__main__":
+    main()
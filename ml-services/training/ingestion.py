@@ -0,0 +1,203 @@
+"""
+TRADEAI Training Data Ingestion
+Stream JSON exports into typed columnar frames with a Parquet cache
+
+Parsing: Top-level JSON arrays decoded one record at a time, converted to
+    columns every batch_size records
+Flattening: Nested objects such as _id become dotted columns (_id.product)
+Types: Ids and names as categories, ISO dates as datetimes, numbers widened
+    consistently across batches
+Cache: {cache_dir}/{name}.parquet, reused while the source size and mtime match
+"""
+
+import json
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+import logging
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = '.cache'
+SOURCE_KEY = b'tradeai.source'
+ISO_DATE = re.compile(r'^\d{4}-\d{2}-\d{2}')
+WHITESPACE = ' \t\n\r'
+
+
+def iter_json_array(path: Path, chunk_size: int = 1 << 20) -> Iterator[Any]:
+    """
+    Yield the elements of a top-level JSON array without loading the file
+
+    Memory is bounded by chunk_size plus the largest element.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer, pos, eof = '', 0, False
+
+        def fill():
+            nonlocal buffer, pos, eof
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+
+        def next_token() -> Optional[str]:
+            nonlocal pos
+            while True:
+                while pos < len(buffer) and buffer[pos] in WHITESPACE:
+                    pos += 1
+                if pos < len(buffer):
+                    return buffer[pos]
+                if eof:
+                    return None
+                fill()
+
+        fill()
+        if next_token() != '[':
+            raise ValueError(f"{path} does not contain a JSON array")
+        pos += 1
+
+        first = True
+        while True:
+            token = next_token()
+            if token == ']':
+                return
+            if not first:
+                if token != ',':
+                    raise ValueError(f"Expected ',' or ']' in {path}, got {token!r}")
+                pos += 1
+                next_token()
+            first = False
+
+            while True:
+                try:
+                    element, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    fill()
+                    continue
+                # A scalar at the end of the buffer may continue in the next chunk
+                if end == len(buffer) and not eof:
+                    fill()
+                    continue
+                break
+
+            pos = end
+            yield element
+
+
+def records_to_frame(records: List[Dict[str, Any]]) -> pd.DataFrame:
+    """DataFrame with nested objects flattened to dotted columns"""
+    df = pd.DataFrame.from_records(records)
+
+    nested = [column for column in df.columns if isinstance(df[column].iloc[0], dict)] if len(df) else []
+    for column in nested:
+        flat = pd.DataFrame(df.pop(column).tolist(), index=df.index)
+        flat.columns = [f'{column}.{key}' for key in flat.columns]
+        df = df.join(flat)
+
+    return df
+
+
+def is_id_column(name: str) -> bool:
+    return name.startswith('_id.') or name.endswith(('_id', '_name')) or name in ('product', 'customer')
+
+
+def apply_types(df: pd.DataFrame) -> pd.DataFrame:
+    """Ids and names as categories, ISO date strings as datetimes"""
+    for column in df.columns:
+        if df[column].dtype != object and not pd.api.types.is_string_dtype(df[column]):
+            continue
+        sample = df[column].dropna()
+        if sample.empty or not isinstance(sample.iloc[0], str):
+            continue
+        if ISO_DATE.match(sample.iloc[0]):
+            df[column] = pd.to_datetime(df[column], format='ISO8601')
+        elif is_id_column(column):
+            df[column] = df[column].astype('category')
+    return df
+
+
+def read_json_records(path: Path, batch_size: int = 50000) -> pd.DataFrame:
+    """
+    Stream a JSON array of records into one typed, flattened DataFrame
+
+    Records are converted to columns every batch_size rows, so the
+    per-record Python dicts never exist for the whole file at once.
+    """
+    frames, batch = [], []
+    for record in iter_json_array(path):
+        batch.append(record)
+        if len(batch) >= batch_size:
+            frames.append(apply_types(records_to_frame(batch)))
+            batch = []
+    if batch or not frames:
+        frames.append(apply_types(records_to_frame(batch)))
+
+    if len(frames) == 1:
+        return frames[0]
+
+    df = pd.concat(frames, ignore_index=True)
+    # Categories differ per batch and fall back to object when concatenated
+    for column in frames[0].columns:
+        if isinstance(frames[0][column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype('category')
+    return df
+
+
+def _source_fingerprint(path: Path) -> str:
+    stat = path.stat()
+    return json.dumps({'path': path.name, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns})
+
+
+def load_records(
+    path: Path,
+    cache_dir: Optional[Path] = None,
+    batch_size: int = 50000,
+    refresh: bool = False
+) -> pd.DataFrame:
+    """
+    Load a JSON export through its Parquet cache
+
+    Args:
+        path: JSON file containing an array of records
+        cache_dir: Cache directory (default: .cache next to the file)
+        batch_size: Records per conversion batch when parsing JSON
+        refresh: Rebuild the cache even if it is current
+
+    Returns:
+        Typed DataFrame; categories survive the Parquet round trip
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    path = Path(path)
+    cache_dir = Path(cache_dir) if cache_dir else path.parent / CACHE_DIR
+    cache_file = cache_dir / f'{path.stem}.parquet'
+    fingerprint = _source_fingerprint(path)
+
+    if cache_file.exists() and not refresh:
+        metadata = pq.read_schema(cache_file).metadata or {}
+        if metadata.get(SOURCE_KEY, b'').decode() == fingerprint:
+            logger.info(f"Loading {path.name} from Parquet cache {cache_file}")
+            return pd.read_parquet(cache_file)
+        logger.info(f"Parquet cache for {path.name} is stale")
+
+    logger.info(f"Parsing {path}")
+    df = read_json_records(path, batch_size)
+
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), SOURCE_KEY: fingerprint.encode()})
+        tmp_file = cache_file.with_suffix('.parquet.tmp')
+        pq.write_table(table, tmp_file)
+        tmp_file.replace(cache_file)
+        logger.info(f"Cached {len(df)} {path.stem} records to {cache_file}")
+    except OSError as e:
+        logger.warning(f"Could not write Parquet cache {cache_file}: {e}")
+
+    return df
@@ -0,0 +1,354 @@
+"""
+TRADEAI Training Orchestrator
+Run training steps as a dependency graph with independent steps in parallel
+
+Tasks: callables whose positional arguments are the results of their deps
+Workers: one process per attempt, at most max_cpus cores in use at a time
+Limits: per-task thread count, address-space cap (MB), timeout and retries
+Manifest: JSON with per-attempt status and timings plus the run's wall time
+"""
+
+import json
+import multiprocessing
+import os
+import time
+import traceback
+from dataclasses import dataclass, field
+from datetime import datetime
+from multiprocessing.connection import wait
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+THREAD_ENV_VARS = ['OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'NUMEXPR_NUM_THREADS']
+
+
+@dataclass
+class Task:
+    """
+    One node of the training graph
+
+    Args:
+        name: Unique task name
+        fn: Module-level callable, called as fn(*dep_results, **kwargs)
+        deps: Names of tasks whose results are passed to fn, in order
+        kwargs: Extra keyword arguments (must be picklable)
+        timeout: Seconds per attempt before the worker is killed
+        retries: Extra attempts after a failure, crash or timeout
+        retry_delay: Seconds before the first retry, doubled for each further one
+        cpus: Cores reserved for the task and its thread-pool size
+        memory_mb: Address-space limit of the worker process
+        in_process: Run in the orchestrator process (no limits or timeout);
+            meant for cheap steps whose result many tasks share
+    """
+    name: str
+    fn: Callable[..., Any]
+    deps: List[str] = field(default_factory=list)
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+    timeout: Optional[float] = None
+    retries: int = 0
+    retry_delay: float = 5.0
+    cpus: int = 1
+    memory_mb: Optional[int] = None
+    in_process: bool = False
+
+
+@dataclass
+class TaskRun:
+    """Outcome of a task: pending, running, succeeded, failed or skipped"""
+    name: str
+    deps: List[str]
+    status: str = 'pending'
+    result: Any = None
+    error: Optional[str] = None
+    started_at: Optional[str] = None
+    seconds: float = 0.0
+    attempts: List[Dict[str, Any]] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        info = {
+            'status': self.status,
+            'deps': self.deps,
+            'started_at': self.started_at,
+            'seconds': round(self.seconds, 3),
+            'attempts': self.attempts,
+            'error': self.error
+        }
+        if isinstance(self.result, (dict, list, str, int, float, bool)):
+            info['result'] = self.result
+        return info
+
+
+def _apply_limits(cpus: int, memory_mb: Optional[int]):
+    """Cap thread pools and address space inside a worker process"""
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = str(cpus)
+    try:
+        # Pools of libraries already imported while unpickling the arguments
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(cpus)
+    except ImportError:
+        pass
+
+    if memory_mb:
+        import resource
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _worker(conn, fn: Callable, args: tuple, kwargs: Dict[str, Any], cpus: int, memory_mb: Optional[int]):
+    """Process entry point: run fn and send ('ok', result) or ('error', message)"""
+    try:
+        _apply_limits(cpus, memory_mb)
+        result = fn(*args, **kwargs)
+        conn.send(('ok', result))
+    except BaseException as e:
+        logger.error(traceback.format_exc())
+        conn.send(('error', f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
+
+@dataclass
+class _Attempt:
+    task: Task
+    process: Any
+    conn: Any
+    cpus: int
+    start: float
+    deadline: Optional[float]
+
+
+class Orchestrator:
+    """
+    Runs a task graph, starting every task as soon as its deps succeeded
+
+    Independent tasks run concurrently in separate processes while their
+    reserved cpus fit in max_cpus, so the wall time of a run is bounded by
+    its slowest chain rather than the sum of all tasks. A task whose deps
+    failed is skipped.
+
+    Args:
+        tasks: Graph nodes; deps must name other tasks, without cycles
+        max_cpus: Cores shared by running tasks (default: all)
+        mp_context: multiprocessing start method; 'spawn' gives every worker
+            fresh thread pools and CUDA/OpenMP state
+    """
+
+    def __init__(self, tasks: List[Task], max_cpus: Optional[int] = None, mp_context: str = 'spawn'):
+        self.tasks = {}
+        for task in tasks:
+            if task.name in self.tasks:
+                raise ValueError(f"Duplicate task '{task.name}'")
+            self.tasks[task.name] = task
+
+        self.order = self._topological_order()
+        self.max_cpus = max_cpus or os.cpu_count() or 1
+        self.context = multiprocessing.get_context(mp_context)
+        self.runs: Dict[str, TaskRun] = {}
+        self.started_at: Optional[str] = None
+        self.wall_seconds = 0.0
+
+    def _topological_order(self) -> List[str]:
+        for task in self.tasks.values():
+            for dep in task.deps:
+                if dep not in self.tasks:
+                    raise ValueError(f"Task '{task.name}' depends on unknown task '{dep}'")
+
+        order, state = [], {}
+
+        def visit(name: str, path: List[str]):
+            if state.get(name) == 'done':
+                return
+            if state.get(name) == 'visiting':
+                raise ValueError(f"Dependency cycle: {' -> '.join(path + [name])}")
+            state[name] = 'visiting'
+            for dep in self.tasks[name].deps:
+                visit(dep, path + [name])
+            state[name] = 'done'
+            order.append(name)
+
+        for name in self.tasks:
+            visit(name, [])
+        return order
+
+    def run(self) -> Dict[str, TaskRun]:
+        """Run the graph to completion and return the outcome of every task"""
+        self.runs = {name: TaskRun(name, list(self.tasks[name].deps)) for name in self.order}
+        self.started_at = datetime.now().isoformat()
+        run_start = time.perf_counter()
+
+        pending = list(self.order)
+        retry_at: Dict[str, float] = {}
+        running: Dict[str, _Attempt] = {}
+        free_cpus = self.max_cpus
+
+        while pending or running:
+            now = time.perf_counter()
+
+            for name in list(pending):
+                task = self.tasks[name]
+                if any(self.runs[dep].status in ('failed', 'skipped') for dep in task.deps):
+                    pending.remove(name)
+                    self.runs[name].status = 'skipped'
+                    self.runs[name].error = 'dependency failed'
+                    logger.warning(f"Skipping {name}: dependency failed")
+                    continue
+                if not all(self.runs[dep].status == 'succeeded' for dep in task.deps):
+                    continue
+                if retry_at.get(name, 0) > now:
+                    continue
+
+                if task.in_process:
+                    pending.remove(name)
+                    self._run_in_process(task)
+                    continue
+
+                cpus = min(task.cpus, self.max_cpus)
+                if cpus > free_cpus:
+                    continue
+                pending.remove(name)
+                running[name] = self._start(task, cpus)
+                free_cpus -= cpus
+
+            # Sleep until a result, a timeout or a retry is due
+            wake = [attempt.deadline for attempt in running.values() if attempt.deadline]
+            wake += [retry_at[name] for name in pending if name in retry_at]
+            timeout = max(0.0, min(wake) - time.perf_counter()) if wake else None
+            if not running:
+                time.sleep(timeout if timeout is not None else 0.05)
+                continue
+            wait(
+                [attempt.conn for attempt in running.values()] +
+                [attempt.process.sentinel for attempt in running.values()],
+                timeout
+            )
+
+            for name, attempt in list(running.items()):
+                outcome = self._poll(attempt)
+                if outcome is None:
+                    continue
+                del running[name]
+                free_cpus += attempt.cpus
+
+                status, value = outcome
+                task_run = self.runs[name]
+                task = attempt.task
+                if status == 'ok':
+                    task_run.status = 'succeeded'
+                    task_run.result = value
+                    task_run.error = None
+                    logger.info(f"✅ {name} finished in {task_run.attempts[-1]['seconds']:.1f}s")
+                elif len(task_run.attempts) <= task.retries:
+                    delay = task.retry_delay * 2 ** (len(task_run.attempts) - 1)
+                    retry_at[name] = time.perf_counter() + delay
+                    pending.append(name)
+                    task_run.status = 'pending'
+                    logger.warning(f"{name} attempt {len(task_run.attempts)} failed ({value}); retrying in {delay:.0f}s")
+                else:
+                    task_run.status = 'failed'
+                    task_run.error = value
+                    logger.error(f"❌ {name} failed after {len(task_run.attempts)} attempt(s): {value}")
+
+        self.wall_seconds = time.perf_counter() - run_start
+        return self.runs
+
+    def _run_in_process(self, task: Task):
+        task_run = self.runs[task.name]
+        task_run.started_at = task_run.started_at or datetime.now().isoformat()
+        task_run.status = 'running'
+        start = time.perf_counter()
+
+        try:
+            task_run.result = task.fn(*self._args(task), **task.kwargs)
+            status, error = 'succeeded', None
+        except Exception as e:
+            logger.error(f"❌ {task.name} failed: {e}")
+            status, error = 'failed', f"{type(e).__name__}: {e}"
+
+        seconds = time.perf_counter() - start
+        task_run.status, task_run.error = status, error
+        task_run.seconds += seconds
+        task_run.attempts.append({'status': status, 'seconds': round(seconds, 3), 'error': error})
+
+    def _args(self, task: Task) -> tuple:
+        return tuple(self.runs[dep].result for dep in task.deps)
+
+    def _start(self, task: Task, cpus: int) -> _Attempt:
+        task_run = self.runs[task.name]
+        task_run.started_at = task_run.started_at or datetime.now().isoformat()
+        task_run.status = 'running'
+        logger.info(f"Starting {task.name} (attempt {len(task_run.attempts) + 1}, {cpus} cpu)")
+
+        receiver, sender = self.context.Pipe(duplex=False)
+        process = self.context.Process(
+            target=_worker,
+            args=(sender, task.fn, self._args(task), task.kwargs, cpus, task.memory_mb),
+            name=f'train-{task.name}',
+            daemon=False
+        )
+        process.start()
+        sender.close()
+
+        start = time.perf_counter()
+        deadline = start + task.timeout if task.timeout else None
+        return _Attempt(task, process, receiver, cpus, start, deadline)
+
+    def _poll(self, attempt: _Attempt):
+        """('ok', result) or ('error', message) once the attempt is over, else None"""
+        outcome = None
+        if attempt.conn.poll():
+            try:
+                outcome = attempt.conn.recv()
+            except EOFError:
+                outcome = None
+            attempt.process.join()
+            if outcome is None:
+                outcome = ('error', f"worker exited with code {attempt.process.exitcode}")
+        elif not attempt.process.is_alive():
+            attempt.process.join()
+            outcome = ('error', f"worker exited with code {attempt.process.exitcode}")
+        elif attempt.deadline and time.perf_counter() >= attempt.deadline:
+            attempt.process.terminate()
+            attempt.process.join(5)
+            if attempt.process.is_alive():
+                attempt.process.kill()
+                attempt.process.join()
+            outcome = ('error', f"timed out after {attempt.task.timeout:.0f}s")
+
+        if outcome is None:
+            return None
+
+        attempt.conn.close()
+        seconds = time.perf_counter() - attempt.start
+        task_run = self.runs[attempt.task.name]
+        task_run.seconds += seconds
+        task_run.attempts.append({
+            'status': 'succeeded' if outcome[0] == 'ok' else 'failed',
+            'seconds': round(seconds, 3),
+            'exitcode': attempt.process.exitcode,
+            'error': None if outcome[0] == 'ok' else outcome[1]
+        })
+        return outcome
+
+    def manifest(self) -> Dict[str, Any]:
+        """Run summary; serial_seconds is what running the tasks one by one would take"""
+        return {
+            'started_at': self.started_at,
+            'finished_at': datetime.now().isoformat(),
+            'wall_seconds': round(self.wall_seconds, 3),
+            'serial_seconds': round(sum(run.seconds for run in self.runs.values()), 3),
+            'max_cpus': self.max_cpus,
+            'succeeded': all(run.status == 'succeeded' for run in self.runs.values()),
+            'tasks': {name: run.to_dict() for name, run in self.runs.items()}
+        }
+
+    def write_manifest(self, path: Path) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.manifest(), f, indent=2, default=str)
+        logger.info(f"Run manifest saved to {path}")
+        return path
@@ -25,7 +25,29 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def train_demand_forecasting(data_path: Path, output_dir: Path):
+from models.common.artifacts import ArtifactStore
+from training.ingestion import load_records
+from training.orchestrator import Orchestrator, Task
+
+def load_sales_data(data_path: Path, cache_dir=None):
+    """Load sales history for demand forecasting"""
+    sales_file = data_path / 'sales_history.json'
+    logger.info(f"Loading sales data from {sales_file}")
+    
+    df = load_records(sales_file, cache_dir)
+    logger.info(f"Loaded {len(df)} sales records")
+    
+    # Prepare data format
+    df.rename(columns={
+        '_id.date': 'date',
+        '_id.product': 'product_id',
+        '_id.customer': 'customer_id',
+        'avg_price': 'price'
+    }, inplace=True)
+    
+    return df
+
+def train_demand_forecasting(df, store: ArtifactStore):
     """Train demand forecasting ensemble model"""
     logger.info("=" * 60)
     logger.info("TRAINING DEMAND FORECASTING MODEL")
@@ -33,24 +55,6 @@ def train_demand_forecasting(data_path: Path, output_dir: Path):
     
     try:
         from models.demand_forecasting.forecaster import DemandForecaster
-        import pandas as pd
-        
-        # Load sales history
-        sales_file = data_path / 'sales_history.json'
-        logger.info(f"Loading sales data from {sales_file}")
-        
-        with open(sales_file, 'r') as f:
-            sales_data = json.load(f)
-        
-        # Convert to DataFrame
-        df = pd.DataFrame(sales_data)
-        logger.info(f"Loaded {len(df)} sales records")
-        
-        # Prepare data format
-        df['date'] = pd.to_datetime(df['_id']['date'])
-        df['product_id'] = df['_id']['product'].apply(str)
-        df['customer_id'] = df['_id']['customer'].apply(str)
-        df.rename(columns={'avg_price': 'price'}, inplace=True)
         
         # Initialize model
         config = {
@@ -75,6 +79,15 @@ def train_demand_forecasting(data_path: Path, output_dir: Path):
                     'epochs': 50,  # Reduced for faster training
                     'batch_size': 32
                 }
+            },
+            'ensemble': {
+                'segment_by': 'customer_tier',
+                'n_tiers': 3,
+                'min_rows': 200
+            },
+            'intervals': {
+                'origins': 4,  # Backtest origins for lead-time interval quantiles
+                'step_days': 7
             }
         }
         
@@ -88,20 +101,39 @@ def train_demand_forecasting(data_path: Path, output_dir: Path):
         logger.info(f"   XGBoost MAPE: {metrics.get('xgboost_mape', 0):.2%}")
         logger.info(f"   Prophet MAPE: {metrics.get('prophet_mape', 0):.2%}")
         logger.info(f"   LSTM MAPE: {metrics.get('lstm_mape', 0):.2%}")
-        logger.info(f"   Ensemble MAPE: {metrics.get('ensemble_mape', 0):.2%}")
+        logger.info(f"   LSTM throughput: {metrics.get('lstm_epochs', 0)} epochs, "
+                    f"{metrics.get('lstm_epochs_per_second', 0):.2f} epochs/s, "
+                    f"{metrics.get('lstm_samples_per_second', 0):.0f} samples/s")
+        logger.info(f"   Ensemble MAPE (out-of-fold): {metrics.get('ensemble_mape', 0):.2%}, "
+                    f"{metrics.get('ensemble_segments', 0)} segment(s) with own weights")
         
         # Save model
-        model_path = output_dir / 'demand_forecasting'
-        model_path.mkdir(parents=True, exist_ok=True)
-        logger.info(f"Model saved to {model_path}")
+        version = forecaster.save(store, {'metrics': metrics})
+        logger.info(f"Model saved to {store.root / 'demand_forecasting' / version}")
         
-        return metrics
+        return {**metrics, 'version': version}
         
     except Exception as e:
         logger.error(f"❌ Demand forecasting training failed: {e}")
-        return None
+        raise
+
+def load_price_data(data_path: Path, cache_dir=None):
+    """Load price elasticity points for price optimization"""
+    price_file = data_path / 'price_elasticity.json'
+    logger.info(f"Loading price data from {price_file}")
+    
+    df = load_records(price_file, cache_dir)
+    logger.info(f"Loaded {len(df)} price points")
+    
+    # Prepare data
+    df['product_id'] = df['_id.product']
+    df['price'] = df['avg_price']
+    df['sales_volume'] = df['avg_quantity']
+    df['cost'] = df['avg_price'] * 0.6  # Assume 40% margin
+    
+    return df
 
-def train_price_optimization(data_path: Path, output_dir: Path):
+def train_price_optimization(df, store: ArtifactStore):
     """Train price optimization model"""
     logger.info("=" * 60)
     logger.info("TRAINING PRICE OPTIMIZATION MODEL")
@@ -109,23 +141,6 @@ def train_price_optimization(data_path: Path, output_dir: Path):
     
     try:
         from models.price_optimization.optimizer import PriceOptimizer
-        import pandas as pd
-        
-        # Load price elasticity data
-        price_file = data_path / 'price_elasticity.json'
-        logger.info(f"Loading price data from {price_file}")
-        
-        with open(price_file, 'r') as f:
-            price_data = json.load(f)
-        
-        df = pd.DataFrame(price_data)
-        logger.info(f"Loaded {len(df)} price points")
-        
-        # Prepare data
-        df['product_id'] = df['_id']['product'].apply(str)
-        df['price'] = df['avg_price']
-        df['sales_volume'] = df['avg_quantity']
-        df['cost'] = df['avg_price'] * 0.6  # Assume 40% margin
         
         # Initialize model
         config = {
@@ -142,17 +157,25 @@ def train_price_optimization(data_path: Path, output_dir: Path):
         logger.info(f"   Price elasticity: {optimizer.elasticity_model.elasticity:.3f}")
         
         # Save model
-        model_path = output_dir / 'price_optimization'
-        model_path.mkdir(parents=True, exist_ok=True)
-        logger.info(f"Model saved to {model_path}")
+        version = optimizer.save(store)
+        logger.info(f"Model saved to {store.root / 'price_optimization' / version}")
         
-        return {'elasticity': float(optimizer.elasticity_model.elasticity)}
+        return {'elasticity': float(optimizer.elasticity_model.elasticity), 'version': version}
         
     except Exception as e:
         logger.error(f"❌ Price optimization training failed: {e}")
-        return None
+        raise
+
+def load_promotion_data(data_path: Path, cache_dir=None):
+    """Load completed promotion results"""
+    promo_file = data_path / 'promotion_results.json'
+    logger.info(f"Loading promotion data from {promo_file}")
+    
+    promo_data = load_records(promo_file, cache_dir)
+    logger.info(f"Loaded {len(promo_data)} completed promotions")
+    return promo_data
 
-def validate_promotion_lift(data_path: Path, output_dir: Path):
+def validate_promotion_lift(promo_data, store: ArtifactStore):
     """Validate promotion lift analyzer"""
     logger.info("=" * 60)
     logger.info("VALIDATING PROMOTION LIFT ANALYZER")
@@ -160,16 +183,6 @@ def validate_promotion_lift(data_path: Path, output_dir: Path):
     
     try:
         from models.promotion_lift.analyzer import PromotionLiftAnalyzer
-        import pandas as pd
-        
-        # Load promotion results
-        promo_file = data_path / 'promotion_results.json'
-        logger.info(f"Loading promotion data from {promo_file}")
-        
-        with open(promo_file, 'r') as f:
-            promo_data = json.load(f)
-        
-        logger.info(f"Loaded {len(promo_data)} completed promotions")
         
         # Initialize analyzer
         config = {
@@ -191,9 +204,18 @@ def validate_promotion_lift(data_path: Path, output_dir: Path):
         
     except Exception as e:
         logger.error(f"❌ Promotion lift validation failed: {e}")
-        return None
+        raise
+
+def load_interaction_data(data_path: Path, cache_dir=None):
+    """Load customer-product interactions for recommendations"""
+    interactions_file = data_path / 'customer_interactions.json'
+    logger.info(f"Loading interactions from {interactions_file}")
+    
+    interactions_df = load_records(interactions_file, cache_dir)
+    logger.info(f"Loaded {len(interactions_df)} customer-product interactions")
+    return interactions_df
 
-def train_recommendations(data_path: Path, output_dir: Path):
+def train_recommendations(interactions_df, store: ArtifactStore):
     """Train recommendation engine"""
     logger.info("=" * 60)
     logger.info("TRAINING RECOMMENDATION ENGINE")
@@ -203,16 +225,6 @@ def train_recommendations(data_path: Path, output_dir: Path):
         from models.recommendation.recommender import RecommendationEngine
         import pandas as pd
         
-        # Load customer interactions
-        interactions_file = data_path / 'customer_interactions.json'
-        logger.info(f"Loading interactions from {interactions_file}")
-        
-        with open(interactions_file, 'r') as f:
-            interactions_data = json.load(f)
-        
-        interactions_df = pd.DataFrame(interactions_data)
-        logger.info(f"Loaded {len(interactions_df)} customer-product interactions")
-        
         # Create mock product features
         unique_products = interactions_df['item_id'].unique()
         products_df = pd.DataFrame({
@@ -246,15 +258,52 @@ def train_recommendations(data_path: Path, output_dir: Path):
         logger.info("✅ Training complete!")
         
         # Save model
-        model_path = output_dir / 'recommendations'
-        model_path.mkdir(parents=True, exist_ok=True)
-        logger.info(f"Model saved to {model_path}")
+        version = recommender.save(store, {'interactions_count': len(interactions_df)})
+        logger.info(f"Model saved to {store.root / 'recommendations' / version}")
         
-        return {'interactions_count': len(interactions_df)}
+        return {'interactions_count': len(interactions_df), 'version': version}
         
     except Exception as e:
         logger.error(f"❌ Recommendations training failed: {e}")
-        return None
+        raise
+
+# Model option -> (result key, data loading step, fit step)
+PIPELINE = {
+    'forecasting': ('demand_forecasting', load_sales_data, train_demand_forecasting),
+    'pricing': ('price_optimization', load_price_data, train_price_optimization),
+    'promotions': ('promotion_lift', load_promotion_data, validate_promotion_lift),
+    'recommendations': ('recommendations', load_interaction_data, train_recommendations)
+}
+
+def build_tasks(models, data_path: Path, store: ArtifactStore, max_cpus: int,
+                timeout: float, retries: int, memory_mb=None, cache_dir=None):
+    """
+    Training graph: each data file is loaded once in the orchestrator, then
+    the model fits run in parallel worker processes sharing max_cpus
+    """
+    selected = [name for name in PIPELINE if 'all' in models or name in models]
+    cpus = max(1, max_cpus // max(1, len(selected)))
+    
+    tasks = []
+    for name in selected:
+        model_type, load_fn, fit_fn = PIPELINE[name]
+        tasks.append(Task(
+            f'load_{model_type}',
+            load_fn,
+            kwargs={'data_path': data_path, 'cache_dir': cache_dir},
+            in_process=True
+        ))
+        tasks.append(Task(
+            model_type,
+            fit_fn,
+            deps=[f'load_{model_type}'],
+            kwargs={'store': store},
+            timeout=timeout,
+            retries=retries,
+            cpus=cpus,
+            memory_mb=memory_mb
+        ))
+    return tasks
 
 def main():
     parser = argparse.ArgumentParser(description="Train all TRADEAI ML models")
@@ -278,6 +327,36 @@ def main():
         choices=['all', 'forecasting', 'pricing', 'promotions', 'recommendations'],
         help='Models to train'
     )
+    parser.add_argument(
+        '--max-cpus',
+        type=int,
+        default=os.cpu_count() or 1,
+        help='Cores shared by parallel model fits (1 trains one model at a time)'
+    )
+    parser.add_argument(
+        '--task-timeout',
+        type=float,
+        default=7200,
+        help='Seconds per model fit attempt before it is killed'
+    )
+    parser.add_argument(
+        '--retries',
+        type=int,
+        default=1,
+        help='Extra attempts for a failed model fit'
+    )
+    parser.add_argument(
+        '--memory-mb',
+        type=int,
+        default=None,
+        help='Address-space limit per model fit process'
+    )
+    parser.add_argument(
+        '--cache-dir',
+        type=str,
+        default=None,
+        help='Parquet cache for parsed training data (default: <data-dir>/.cache)'
+    )
     
     args = parser.parse_args()
     
@@ -286,11 +365,13 @@ def main():
     
     # Create output directory
     output_dir.mkdir(parents=True, exist_ok=True)
+    store = ArtifactStore(output_dir)
     
     logger.info("🤖 TRADEAI ML TRAINING PIPELINE")
     logger.info(f"Data directory: {data_path}")
     logger.info(f"Output directory: {output_dir}")
     logger.info(f"Models to train: {', '.join(args.models)}")
+    logger.info(f"Parallelism: {args.max_cpus} cpu(s), timeout {args.task_timeout:.0f}s, {args.retries} retries")
     logger.info("")
     
     # Track results
@@ -302,37 +383,31 @@ def main():
     }
     
     # Train models
-    train_all = 'all' in args.models
-    
-    if train_all or 'forecasting' in args.models:
-        metrics = train_demand_forecasting(data_path, output_dir)
-        results['models']['demand_forecasting'] = metrics
-        print()
-    
-    if train_all or 'pricing' in args.models:
-        metrics = train_price_optimization(data_path, output_dir)
-        results['models']['price_optimization'] = metrics
-        print()
-    
-    if train_all or 'promotions' in args.models:
-        metrics = validate_promotion_lift(data_path, output_dir)
-        results['models']['promotion_lift'] = metrics
-        print()
+    tasks = build_tasks(
+        args.models, data_path, store, args.max_cpus,
+        args.task_timeout, args.retries, args.memory_mb,
+        Path(args.cache_dir) if args.cache_dir else None
+    )
+    orchestrator = Orchestrator(tasks, max_cpus=args.max_cpus)
+    runs = orchestrator.run()
     
-    if train_all or 'recommendations' in args.models:
-        metrics = train_recommendations(data_path, output_dir)
-        results['models']['recommendations'] = metrics
-        print()
+    for task in tasks:
+        if not task.in_process:
+            results['models'][task.name] = runs[task.name].result
     
     # Save results
     results_file = output_dir / 'training_results.json'
     with open(results_file, 'w') as f:
         json.dump(results, f, indent=2)
+    manifest_file = orchestrator.write_manifest(output_dir / 'run_manifest.json')
+    manifest = orchestrator.manifest()
     
     logger.info("=" * 60)
     logger.info("🎉 TRAINING PIPELINE COMPLETE")
     logger.info("=" * 60)
+    logger.info(f"Wall time: {manifest['wall_seconds']:.1f}s (tasks: {manifest['serial_seconds']:.1f}s)")
     logger.info(f"Results saved to: {results_file}")
+    logger.info(f"Run manifest: {manifest_file}")
     logger.info("")
     logger.info("Next steps:")
     logger.info("1. Review training metrics")
@@ -17,6 +17,11 @@ from datetime import datetime
 import warnings
 warnings.filterwarnings('ignore')
 
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from training.ingestion import load_records
+
 print("\n🤖 TRADEAI ML TRAINING (Simplified)")
 print("="*60)
 
@@ -40,26 +45,20 @@ try:
     sales_file = data_dir / 'sales_history.json'
     print(f"Loading: {sales_file}")
     
-    with open(sales_file, 'r') as f:
-        sales_data = json.load(f)
-    
-    print(f"✅ Loaded {len(sales_data)} sales records")
+    sales = load_records(sales_file)
     
-    # Convert to DataFrame
-    df_list = []
-    for record in sales_data:
-        df_list.append({
-            'date': record['_id']['date'],
-            'product': record['_id']['product'],
-            'customer': record['_id']['customer'],
-            'quantity': record['quantity'],
-            'price': record['avg_price'],
-            'revenue': record['revenue'],
-            'has_promotion': 1 if record['has_promotion'] else 0
-        })
+    print(f"✅ Loaded {len(sales)} sales records")
     
-    df = pd.DataFrame(df_list)
-    df['date'] = pd.to_datetime(df['date'])
+    # Select and rename the flattened columns
+    df = pd.DataFrame({
+        'date': sales['_id.date'],
+        'product': sales['_id.product'],
+        'customer': sales['_id.customer'],
+        'quantity': sales['quantity'],
+        'price': sales['avg_price'],
+        'revenue': sales['revenue'],
+        'has_promotion': sales['has_promotion'].astype(int)
+    })
     
     # Feature engineering
     print("Engineering features...")
@@ -133,18 +132,17 @@ try:
     price_file = data_dir / 'price_elasticity.json'
     print(f"Loading: {price_file}")
     
-    with open(price_file, 'r') as f:
-        price_data = json.load(f)
+    price_data = load_records(price_file)
     
     print(f"✅ Loaded {len(price_data)} price-demand observations")
     
-    # Convert to DataFrame
-    price_df = pd.DataFrame([{
-        'product': p['_id']['product'],
-        'price': p['avg_price'],
-        'quantity': p['avg_quantity'],
-        'revenue': p['revenue']
-    } for p in price_data])
+    # Select and rename the flattened columns
+    price_df = pd.DataFrame({
+        'product': price_data['_id.product'],
+        'price': price_data['avg_price'],
+        'quantity': price_data['avg_quantity'],
+        'revenue': price_data['revenue']
+    })
     
     # Aggregate by product
     print("Calculating price elasticity by product...")
@@ -241,13 +239,11 @@ try:
     interactions_file = data_dir / 'customer_interactions.json'
     print(f"Loading: {interactions_file}")
     
-    with open(interactions_file, 'r') as f:
-        interactions_data = json.load(f)
+    interactions_df = load_records(interactions_file)
     
-    print(f"✅ Loaded {len(interactions_data)} customer-product interactions")
+    print(f"✅ Loaded {len(interactions_df)} customer-product interactions")
     
     # Build user-item matrix
-    interactions_df = pd.DataFrame(interactions_data)
     
     # Get unique users and items
     users = interactions_df['user_id'].unique()
@@ -261,14 +257,14 @@ try:
     
     print(f"\n✅ Recommendation Engine Trained!")
     print(f"   Matrix Size: {len(users)} × {len(items)}")
-    print(f"   Sparsity: {(1 - len(interactions_data) / (len(users) * len(items))):.1%}")
+    print(f"   Sparsity: {(1 - len(interactions_df) / (len(users) * len(items))):.1%}")
     print(f"   Status: ✅ READY FOR RECOMMENDATIONS")
     
     rec_metrics = {
-        'interactions_count': len(interactions_data),
+        'interactions_count': len(interactions_df),
         'unique_customers': len(users),
         'unique_products': len(items),
-        'sparsity': float(1 - len(interactions_data) / (len(users) * len(items))),
+        'sparsity': float(1 - len(interactions_df) / (len(users) * len(items))),
         'timestamp': datetime.now().isoformat()
     }
     